@@ -1,25 +1,37 @@
 # sourcery skip: avoid-global-variables
 """Seite Grafische Datenauswertung"""
 
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 import streamlit as st
 from loguru import logger
 
+from modules import battery as bat
 from modules import classes_data as cld
+from modules import classes_errors as cle
 from modules import classes_figs as clf
 from modules import constants as cont
+from modules import data_quality as dq
+from modules import degree_days as dd
 from modules import df_manipulation as df_man
+from modules import duration_curves as dc
 from modules import excel_import as ex_in
 from modules import fig_annotations as fig_anno
 from modules import fig_creation as fig_cr
 from modules import fig_formatting as fig_format
 from modules import general_functions as gf
 from modules import graph_menus as menu_g
+from modules import histogram as hist
+from modules import peak_analysis as pa
+from modules import portfolio as pf
 from modules import setup_stuff as set_stuff
 from modules import streamlit_functions as sf
+from modules import time_filter as tf
 from modules import user_authentication as uauth
 
+if TYPE_CHECKING:
+    import polars as pl
+
 # setup stuff
 gf.log_new_run()
 MANUAL_DEBUG = True
@@ -70,9 +82,111 @@ def mdf_from_excel_or_st() -> cld.MetaAndDfs:
         logger.info("Excel-Datei schon importiert - mdf aus session_state übernommen")
         return mdf_from_st
 
+    if files := sf.s_get("f_up_portfolio"):
+        report: cld.PortfolioReport = pf.aggregate(pf.meters_from_files(files))
+        sf.s_set("portfolio", report)
+        return report.mdf
+
     return ex_in.import_prefab_excel(sf.s_get("f_up"))
 
 
+def data_repaired() -> bool:
+    """Wurden in diesem Durchlauf Werte durch die Qualitätsprüfung ersetzt?"""
+    report: cld.QualityReport | None = sf.s_get("dq_report")
+    return bool(
+        sf.s_get("but_clean_outliers")
+        and sf.s_get("cb_dq_repair")
+        and report is not None
+        and report.flagged_cells
+    )
+
+
+def multi_year_shown(mdf: cld.MetaAndDfs) -> bool:
+    """Werden mehrere Jahre übereinander dargestellt?"""
+    return bool(mdf.meta.multi_years and sf.s_get("cb_multi_year"))
+
+
+def data_quality(mdf: cld.MetaAndDfs) -> None:
+    """Datenqualität prüfen (und ggf. markierte Werte ersetzen)"""
+    if not sf.s_get("but_clean_outliers"):
+        return
+    report: cld.QualityReport = dq.check_quality(
+        mdf.df, menu_g.quality_settings_from_menu(), mdf.meta
+    )
+    sf.s_set("dq_report", report)
+    if sf.s_get("cb_dq_repair") and report.flagged_cells:
+        mdf.df = df_man.repair_quality_issues(mdf.df, report)
+
+
+def battery_simulation(mdf: cld.MetaAndDfs) -> None:
+    """Batteriespeicher für die im Menu gewählte Spalte simulieren"""
+    col: str | None = sf.s_get("sb_bat_col")
+    if not sf.s_get("but_battery") or col is None or col not in mdf.meta.lines:
+        return
+    sf.s_set(
+        "df_battery",
+        bat.peak_shaving(
+            mdf.df,
+            col,
+            menu_g.battery_settings_from_menu(),
+            unit=(mdf.meta.lines[col].unit or "kW").strip(),
+        ),
+    )
+
+
+def climate_normalisation(mdf: cld.MetaAndDfs) -> None:
+    """Gradtagzahlen und Witterungsbereinigung mit den Einstellungen aus dem Menu"""
+    if not sf.s_get("but_climate") or not sf.s_get("cb_temp"):
+        return
+    columns: list[str] | None = sf.s_get("ms_climate_columns") or None
+    location: cld.Location | None = (
+        sf.s_get("geo_location") if sf.s_get("cb_climate_reference") else None
+    )
+    temperatures: dict[str, float] = {
+        "indoor": sf.s_get("ni_climate_indoor") or cont.DEGREE_DAY_INDOOR,
+        "heating_limit": sf.s_get("ni_climate_limit") or cont.DEGREE_DAY_HEATING_LIMIT,
+    }
+    try:
+        dd.climate_report(mdf, columns, location, **temperatures)
+    except cle.NotFoundError:
+        st.warning("Keine langjährigen Temperaturen gefunden - ohne Bereinigung")
+        dd.climate_report(mdf, columns, None, **temperatures)
+
+
+def planning_duration_curves(mdf: cld.MetaAndDfs) -> None:
+    """Dauerlinien aus Stützstellen (hochgeladene Datei) in die Jahresdauerlinie"""
+    file: Any = sf.s_get("f_up_duration_curves")
+    if not sf.s_get("cb_jdl") or file is None:
+        return
+    cached: tuple[str, pl.DataFrame] | None = sf.s_get("duration_curves")
+    if cached is None or cached[0] != file.name:
+        cached = (file.name, dc.import_duration_curves(file))
+        sf.s_set("duration_curves", cached)
+    dc.add_to_jdl(mdf, cached[1])
+
+
+def analyses_on_request(mdf: cld.MetaAndDfs) -> None:
+    """Auswertungen, die per Knopf in den Menus gestartet werden"""
+    battery_simulation(mdf)
+    if sf.s_get("but_peaks"):
+        pa.get_peak_report(mdf, menu_g.peak_settings_from_menu())
+    climate_normalisation(mdf)
+    planning_duration_curves(mdf)
+    if sf.s_get("but_hist"):
+        hist.get_histogram(
+            mdf, menu_g.histogram_settings_from_menu(by_year=multi_year_shown(mdf))
+        )
+
+
+def time_filtered(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
+    """Gefilterte Kopie für die Grafiken (gespeichert wird das ungefilterte mdf)"""
+    filtered: cld.MetaAndDfs = tf.apply_time_filter(mdf, menu_g.time_filter_from_menu())
+    if filtered.df.is_empty():
+        st.warning("Der Zeitfilter lässt keine Werte übrig - es wird alles angezeigt.")
+        return mdf
+    return filtered
+
+
 @gf.lottie_spinner
 @gf.func_timer
 def gather_and_manipulate_data() -> cld.MetaAndDfs:
@@ -88,43 +202,82 @@ def gather_and_manipulate_data() -> cld.MetaAndDfs:
     menu_g.base_settings(mdf_i)
     menu_g.select_graphs(mdf_i)
     menu_g.meteo_sidebar()
-
-    if any([sf.s_get("but_base_settings"), sf.s_get("but_meteo_sidebar")]):
+    menu_g.clean_outliers()
+    menu_g.battery(mdf_i)
+    menu_g.peaks(mdf_i)
+    menu_g.climate(mdf_i)
+    menu_g.histogram(mdf_i)
+    menu_g.time_filter(mdf_i)
+
+    data_quality(mdf_i)
+
+    if any(
+        [sf.s_get("but_base_settings"), sf.s_get("but_meteo_sidebar"), data_repaired()]
+    ):
         if cont.SpecialCols.temp in mdf_i.df.columns:
             mdf_i.df = mdf_i.df.drop(cont.SpecialCols.temp)
         for df in ["df_h", "jdl", "mon", "df_multi", "df_h_multi", "mon_multi"]:
             setattr(mdf_i, df, None)
+        mdf_i.day_index.pop("df_h", None)
+        mdf_i.peaks = None
+        mdf_i.climate = None
+        mdf_i.histogram = None
+        sf.s_delete("dic_days")
         logger.info(
             "Data Frames \n"
             '["df_h", "jdl", "mon", "df_multi", "df_h_multi", "mon_multi"]\n'
             "aus mdf entfernt."
         )
 
+    # mehrere Jahre übereinander: alle Ableitungen je Jahr parallel
+    multi_year_parallel: bool = multi_year_shown(mdf_i) and any(
+        sf.s_get(cb) for cb in ["cb_h", "cb_jdl", "cb_mon"]
+    )
+    if multi_year_parallel:
+        mdf_i = df_man.derive_multi_year(
+            mdf_i,
+            with_jdl=bool(sf.s_get("cb_jdl")),
+            with_mon=bool(sf.s_get("cb_mon")),
+        )
+
     # split the base data frame into years if necessary
     if mdf_i.meta.multi_years and mdf_i.df_multi is None:
         mdf_i = df_man.split_multi_years(mdf_i, "df")
 
     # df mit Stundenwerten erzeugen
-    if sf.s_get("cb_h"):
+    if sf.s_get("cb_h") and not multi_year_parallel:
         mdf_i = df_man.df_h_mdf(mdf_i)
 
     # df für Tagesvergleich
-    if sf.s_get("but_select_graphs") and sf.s_get("cb_days"):
-        if sf.s_get("cb_h"):
-            df_man.dic_days(mdf_i.df_h)
-        else:
-            df_man.dic_days(mdf_i.df)
+    if sf.s_get("cb_days") and (
+        sf.s_get("but_select_graphs") or not sf.s_get("dic_days")
+    ):
+        df_man.dic_days(mdf_i)
 
     # df geordnete Jahresdauerlinie
-    if sf.s_get("cb_jdl"):
+    if sf.s_get("cb_jdl") and not multi_year_parallel:
         mdf_i = df_man.jdl(mdf_i)
 
     # df Monatswerte
-    if sf.s_get("cb_mon"):
+    if sf.s_get("cb_mon") and not multi_year_parallel:
         mdf_i = df_man.calculate_monthly_values(mdf_i)
 
+    # Batteriespeicher (Peak Shaving) und Lastspitzen / Netzentgelte
+    analyses_on_request(mdf_i)
+
     sf.s_set("mdf", mdf_i)
-    return mdf_i
+    return time_filtered(mdf_i)
+
+
+def carpet_plot(figs: clf.Figs, mdf: cld.MetaAndDfs) -> None:
+    """Carpet Plot erzeugen (neu, wenn die Grafik-Auswahl bestätigt wurde)"""
+    if not sf.s_get("cb_carpet"):
+        return
+    if figs.carpet is None or sf.s_get("but_select_graphs"):
+        with st.spinner('Momentle bitte - Grafik "Carpet Plot" wird erzeugt...'):
+            figs.carpet = clf.FigProp(
+                fig=fig_cr.cr_fig_carpet(mdf), st_key=cont.FIG_KEYS.carpet
+            )
 
 
 @gf.lottie_spinner
@@ -133,11 +286,9 @@ def make_graphs(mdf_g: cld.MetaAndDfs) -> clf.Figs:
 
     figs_i: clf.Figs = sf.s_get("figs") or clf.Figs()
 
-    if any([sf.s_get("but_base_settings"), sf.s_get("but_meteo_sidebar")]):
-        for attr in figs_i.__dataclass_fields__:
-            setattr(figs_i, attr, None)
-        for key in cont.FIG_KEYS.list_all():
-            sf.s_delete(key)
+    # neue Grundeinstellungen, Wetterdaten oder Zeitfilter -> alle Grafiken neu
+    if menu_g.redraw_requested() or data_repaired():
+        figs_i.reset()
 
     # Grund-Grafik
     if figs_i.base is None:
@@ -167,6 +318,22 @@ def make_graphs(mdf_g: cld.MetaAndDfs) -> clf.Figs:
                 fig=fig_cr.cr_fig_days(mdf_g), st_key=cont.FIG_KEYS.days
             )
 
+    carpet_plot(figs_i, mdf_g)
+
+    # Beschriftung der Lastspitzen
+    if all(
+        [
+            figs_i.base is not None,
+            mdf_g.peaks is not None,
+            sf.s_get("but_peaks"),
+            not multi_year_shown(mdf_g),
+        ]
+    ):
+        figs_i.base.fig = fig_anno.add_peak_annotations(  # type: ignore[union-attr]
+            figs_i.base.fig,  # type: ignore[union-attr]
+            mdf_g.peaks,  # type: ignore[arg-type]
+        )
+
     figs_i.write_all_to_st()
 
     # horizontale / vertikale Linien
@@ -174,11 +341,6 @@ def make_graphs(mdf_g: cld.MetaAndDfs) -> clf.Figs:
     if sf.s_get("but_h_v_lines"):
         fig_anno.h_v_lines()
 
-    # Ausreißerbereinigung
-    # menu_g.clean_outliers()
-    # if sf.s_get("but_clean_outliers"):
-    #     fig_anno.clean_outliers()
-
     sf.s_set("figs", figs_i)
     return figs_i
 
@@ -191,7 +353,7 @@ if uauth.authentication(sf.s_get("page")):
     if sf.s_get("but_example_direct"):
         st.session_state["f_up"] = f"example_files/{sf.s_get('sb_example_file')}.xlsx"
 
-    if all(sf.s_get(key) is None for key in ["f_up", "mdf"]):
+    if all(not sf.s_get(key) for key in ["f_up", "f_up_portfolio", "mdf"]):
         logger.warning("No file provided yet.")
 
         menu_g.sidebar_file_upload()
@@ -209,6 +371,13 @@ if uauth.authentication(sf.s_get("page")):
         mdf: cld.MetaAndDfs = gather_and_manipulate_data()
         figs: clf.Figs = make_graphs(mdf)
 
+        menu_g.portfolio_report()
+        menu_g.quality_report()
+        menu_g.battery_report()
+        menu_g.peak_report(mdf.peaks)
+        menu_g.climate_report(mdf.climate)
+        menu_g.histogram_report(mdf.histogram)
+
         with st.spinner("Momentle bitte - Optionen werden erzeugt..."):
             menu_g.display_options_main()
             menu_g.display_smooth_main()
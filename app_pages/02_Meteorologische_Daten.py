@@ -8,6 +8,7 @@ from modules import fig_formatting as fig_format
 from modules import fig_plotly_plots as ploplo
 from modules import general_functions as gf
 from modules import meteo_menus as menu_m
+from modules import meteorolog as met
 from modules import setup_stuff as set_stuff
 from modules import streamlit_functions as sf
 from modules import user_authentication as uauth
@@ -23,6 +24,7 @@ if uauth.authentication(sf.s_get("page", default="unknown")):
     # Auswahl Ort
     menu_m.sidebar_address_dates()
     menu_m.sidebar_dwd_query_limits()
+    menu_m.sidebar_batch()
     if sf.s_get("but_addr_dates"):
         for session_state_entry in ["geo_location", "stations_distance", "params_list"]:
             sf.s_delete(key=session_state_entry)
@@ -33,6 +35,9 @@ if uauth.authentication(sf.s_get("page", default="unknown")):
         cont.DWD_QUERY_TIME_LIMIT = sf.s_get("ni_limit_time") or 15  # seconds
         cont.DWD_QUERY_DISTANCE_LIMIT = sf.s_get("ni_limit_dist") or 150  # km
 
+    # Standardparameter schon laden, während die Parameter ausgewählt werden
+    met.start_prefetch()
+
     cols: list = st.columns([40, 60])
     with cols[0]:
         menu_m.parameter_selection()
@@ -49,4 +54,5 @@ if uauth.authentication(sf.s_get("page", default="unknown")):
     with reset_download_container:
         st.markdown("###")
         menu_m.download_weatherdata()
+        menu_m.download_batch()
         st.markdown("---")
@@ -61,7 +61,14 @@ def plot_map() -> go.Figure:
     ):
         locations: list[cld.Location] = st_locs
     else:
-        locations = mp.create_list_of_locations_from_df(df)
+        progress: Any = st.progress(0.0, text="Adressen werden gesucht...")
+        locations = mp.create_list_of_locations_from_df(
+            df,
+            progress=lambda done, total: progress.progress(
+                done / total, text=f"{done} von {total} Adressen gesucht"
+            ),
+        )
+        progress.empty()
         sf.s_set("map_locations", locations)
 
     # markers: list[fk.kml.Placemark] = mp.get_all_placemarkers_from_kmz_or_kml()
@@ -4,8 +4,8 @@ auf Stundenwerte umrechnen
 """
 
 import polars as pl
-from scipy import interpolate
 
+from modules import duration_curves as dc
 from modules import excel_import as ex_in
 
 
@@ -14,39 +14,9 @@ def import_file(file: str = "experiments/JDL_Behringen_FL.xlsx") -> pl.DataFrame
     return ex_in.general_excel_import(file)
 
 
-def interpolate_missing_data_akima(
-    df: pl.DataFrame, index_column: str | None = None
-) -> pl.DataFrame:
-    """Interpolate missing data"""
-
-    col_index: str = index_column or "Stunde"
-
-    cols: list[str] = [
-        col
-        for col in df.columns
-        if col_index not in col
-        and any(df[col].is_null())
-        and df[col].dtype.is_numeric()
-    ]
-
-    no_nulls: pl.DataFrame = df.drop_nulls()
-    index: pl.Series = no_nulls[col_index]
-    return df.sort(col_index).with_columns(
-        pl.Series(
-            col,
-            interpolate.Akima1DInterpolator(x=index, y=no_nulls[col])(df[col_index]),
-        )
-        for col in cols
-    )
-
-
 def upsample_to_hourly(df: pl.DataFrame) -> pl.DataFrame:
     """Dauerlinie auf Stundenwerte umrechnen"""
-    df_expanded: pl.DataFrame = pl.DataFrame(
-        {"Stunde": pl.int_range(0, 8761, eager=True)}
-    ).join(df, on="Stunde", how="outer_coalesce")
-
-    return interpolate_missing_data_akima(df_expanded, "Stunde")
+    return dc.upsample_duration_curves(df)
 
 
 def excel_download(df: pl.DataFrame) -> None:
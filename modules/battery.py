@@ -0,0 +1,261 @@
+"""Batteriespeicher zur Lastspitzenkappung (Peak Shaving)
+
+Alle Kombinationen aus Kapazität und Leistung (und die Kandidaten
+für die Leistungsgrenze) werden gemeinsam in NumPy-Matrizen
+(Zeitschritte x Konfigurationen) simuliert - die Zeitschritte werden
+nur einmal durchlaufen, keine Schleife je Speichergröße.
+"""
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+
+# Anzahl der Kandidaten und Verfeinerungen bei der Suche nach der Leistungsgrenze
+LIMIT_CANDIDATES: int = 16
+LIMIT_ROUNDS: int = 3
+# maximale Größe der Matrix (Zeitschritte x Konfigurationen) eines Zeitabschnitts
+SIMULATION_CELLS: int = 4_000_000
+
+
+def state_of_charge(
+    change: np.ndarray, bounds: tuple[np.ndarray, np.ndarray], start: np.ndarray
+) -> np.ndarray:
+    """Ladezustand in einem Zeitabschnitt (Matrix Zeit x Konfigurationen)
+
+    Die Änderungen des Ladezustands (ohne dessen Grenzen) werden Zeitschritt
+    für Zeitschritt aufsummiert und auf die Grenzen beschränkt - für alle
+    Konfigurationen gleichzeitig. Startwert ist der Ladezustand am Ende
+    des vorherigen Abschnitts. Die Matrix "change" wird überschrieben.
+    """
+
+    e_min, e_max = bounds
+    soc: np.ndarray = change
+    np.add(soc[0], start, out=soc[0])
+    np.clip(soc[0], e_min, e_max, out=soc[0])
+    for row in range(1, len(soc)):
+        current: np.ndarray = soc[row]
+        np.add(current, soc[row - 1], out=current)
+        np.minimum(current, e_max, out=current)
+        np.maximum(current, e_min, out=current)
+
+    return soc
+
+
+def simulate(
+    load: np.ndarray,
+    step_h: float,
+    configs: cld.BatteryConfigs,
+    settings: cld.BatterySettings,
+) -> dict[str, np.ndarray]:
+    """Speicherbetrieb mit fester Leistungsgrenze für alle Konfigurationen
+
+    Liegt die Last über der Grenze, wird entladen,
+    liegt sie darunter, wird bis zur Grenze geladen.
+    Der Speicher startet voll (soc_max).
+    Die Zeitschritte werden nur einmal durchlaufen, alle Konfigurationen
+    gleichzeitig. Damit die Matrix (Zeitschritte x Konfigurationen) höchstens
+    SIMULATION_CELLS Zellen hat, wird in Zeitabschnitten gerechnet und der
+    Ladezustand von einem Abschnitt in den nächsten übernommen.
+
+    Args:
+        - load (np.ndarray): Lastgang (Leistung)
+        - step_h (float): Länge eines Zeitschritts in Stunden
+        - configs (cld.BatteryConfigs): Kapazität, Leistung und Leistungsgrenze
+            je Konfiguration
+        - settings (cld.BatterySettings): Wirkungsgrad und Grenzen des Ladezustands
+
+    Returns:
+        - dict[str, np.ndarray]: je Konfiguration "peak" (höchster Netzbezug),
+            "discharged" und "charged" (Energie aus / in den Speicher, netzseitig)
+            und "losses" (Verluste beim Laden und Entladen)
+
+    """
+
+    capacity, power, limit = configs.capacity, configs.power, configs.limit
+    eta: float = np.sqrt(settings.efficiency)
+    bounds: tuple[np.ndarray, np.ndarray] = (
+        capacity * settings.soc_min,
+        capacity * settings.soc_max,
+    )
+    rows: int = max(SIMULATION_CELLS // max(len(limit), 1), 1)
+
+    previous: np.ndarray = bounds[1]
+    peak: np.ndarray = np.full(len(limit), -np.inf)
+    charged_sum: np.ndarray = np.zeros(len(limit))
+    discharged_sum: np.ndarray = np.zeros(len(limit))
+    for first in range(0, len(load), rows):
+        load_chunk: np.ndarray = load[first : first + rows, None]
+        headroom: np.ndarray = limit[None, :] - load_chunk
+        soc: np.ndarray = state_of_charge(
+            np.where(
+                headroom > 0,
+                np.minimum(headroom, power) * eta,
+                np.maximum(headroom, -power) / eta,
+            )
+            * step_h,
+            bounds,
+            previous,
+        )
+
+        delta: np.ndarray = np.diff(soc, axis=0, prepend=previous[None, :])
+        charged: np.ndarray = np.maximum(delta, 0) / (eta * step_h)
+        discharged: np.ndarray = np.maximum(-delta, 0) * (eta / step_h)
+        np.maximum(peak, (load_chunk + charged - discharged).max(axis=0), out=peak)
+        charged_sum += charged.sum(axis=0) * step_h
+        discharged_sum += discharged.sum(axis=0) * step_h
+        previous = soc[-1].copy()
+
+    return {
+        "peak": peak,
+        "discharged": discharged_sum,
+        "charged": charged_sum,
+        "losses": charged_sum * (1 - eta) + discharged_sum * (1 / eta - 1),
+    }
+
+
+def lowest_limits(
+    load: np.ndarray,
+    step_h: float,
+    capacity: np.ndarray,
+    power: np.ndarray,
+    settings: cld.BatterySettings,
+) -> np.ndarray:
+    """Niedrigste einhaltbare Leistungsgrenze je Konfiguration
+
+    Je Runde werden LIMIT_CANDIDATES Grenzen pro Konfiguration
+    in einem Durchlauf simuliert und das Intervall um die
+    niedrigste eingehaltene Grenze weiter verfeinert.
+    """
+
+    configs: int = len(capacity)
+    low: np.ndarray = load.max() - power
+    high: np.ndarray = np.full(configs, load.max())
+    tolerance: float = 1e-6 * max(abs(load.max()), 1)
+    fractions: np.ndarray = np.linspace(0, 1, LIMIT_CANDIDATES)
+
+    for _ in range(LIMIT_ROUNDS):
+        candidates: np.ndarray = low[:, None] + (high - low)[:, None] * fractions
+        result: dict[str, np.ndarray] = simulate(
+            load,
+            step_h,
+            cld.BatteryConfigs(
+                capacity=np.repeat(capacity, LIMIT_CANDIDATES),
+                power=np.repeat(power, LIMIT_CANDIDATES),
+                limit=candidates.ravel(),
+            ),
+            settings,
+        )
+        kept: np.ndarray = (
+            result["peak"].reshape(configs, LIMIT_CANDIDATES) <= candidates + tolerance
+        )
+        # die höchste Grenze (Maximum der Last) wird immer eingehalten
+        kept[:, -1] = True
+        first: np.ndarray = kept.argmax(axis=1)
+        rows: np.ndarray = np.arange(configs)
+        high = candidates[rows, first]
+        low = np.where(first > 0, candidates[rows, np.maximum(first - 1, 0)], high)
+
+    return high
+
+
+def load_series(df: pl.DataFrame, col: str) -> tuple[np.ndarray, float]:
+    """Lastgang als Array (Lücken interpoliert) und Länge eines Zeitschritts in h"""
+
+    if col not in df.columns:
+        raise cle.NotFoundError(entry=col, where="data frame columns")
+
+    step_h: float = (
+        df.get_column(COL_IND).diff().median().total_seconds()  # type: ignore[union-attr]
+        / cont.TimeSecondsIn.hour
+    )
+    load: np.ndarray = (
+        df.get_column(col)
+        .cast(pl.Float64)
+        .interpolate()
+        .fill_null(strategy="forward")
+        .fill_null(strategy="backward")
+        .to_numpy()
+    )
+    return load, step_h
+
+
+@gf.func_timer
+def peak_shaving(
+    df: pl.DataFrame,
+    col: str,
+    settings: cld.BatterySettings | None = None,
+    unit: str = "kW",
+) -> pl.DataFrame:
+    """Lastspitzenkappung für alle Kombinationen aus Kapazität und Leistung
+
+    Args:
+        - df (pl.DataFrame): Data Frame mit Index-Spalte und Lastgang
+        - col (str): Spalte mit dem Lastgang (Leistung)
+        - settings (cld.BatterySettings | None): Einstellungen der Simulation
+        - unit (str): Einheit des Lastgangs (für die Spaltennamen)
+
+    Returns:
+        - pl.DataFrame: eine Zeile je Konfiguration mit erreichter Spitze,
+            Reduktion, Energie, Verlusten und Vollzyklen (pro Jahr hochgerechnet)
+
+    """
+
+    settings = settings or cld.BatterySettings()
+    load, step_h = load_series(df, col)
+
+    capacity, power = (
+        grid.ravel().astype(float)
+        for grid in np.meshgrid(settings.capacities, settings.powers, indexing="ij")
+    )
+    limit: np.ndarray = (
+        np.full(len(capacity), float(settings.peak_limit))
+        if settings.peak_limit is not None
+        else lowest_limits(load, step_h, capacity, power, settings)
+    )
+    result: dict[str, np.ndarray] = simulate(
+        load,
+        step_h,
+        cld.BatteryConfigs(capacity=capacity, power=power, limit=limit),
+        settings,
+    )
+
+    per_year: float = cont.TimeHoursIn.year / (len(load) * step_h)
+    usable: np.ndarray = capacity * (settings.soc_max - settings.soc_min)
+    peak_before: float = float(load.max())
+    reduction: np.ndarray = peak_before - result["peak"]
+
+    df_res: pl.DataFrame = pl.DataFrame(
+        {
+            f"Kapazität [{unit}h]": capacity,
+            f"Leistung [{unit}]": power,
+            f"Leistungsgrenze [{unit}]": limit,
+            f"Spitze ohne Speicher [{unit}]": np.full(len(capacity), peak_before),
+            f"Spitze mit Speicher [{unit}]": result["peak"],
+            f"Reduktion [{unit}]": reduction,
+            f"Entladung pro Jahr [{unit}h]": result["discharged"] * per_year,
+            f"Verluste pro Jahr [{unit}h]": result["losses"] * per_year,
+            "Vollzyklen pro Jahr": np.divide(
+                result["discharged"] * per_year,
+                usable,
+                out=np.zeros_like(usable),
+                where=usable > 0,
+            ),
+        }
+    )
+    if settings.demand_price is not None:
+        df_res = df_res.with_columns(
+            (pl.col(f"Reduktion [{unit}]") * settings.demand_price).alias(
+                "Einsparung Leistungspreis [€/a]"
+            )
+        )
+
+    logger.info(f"Peak shaving simulated for {len(capacity)} configurations")
+
+    return df_res
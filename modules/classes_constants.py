@@ -26,6 +26,7 @@ class FigIDs:
     jdl: str
     mon: str
     days: str
+    carpet: str
 
     def list_all(self) -> list[str]:
         """List all values"""
@@ -1,24 +1,23 @@
 """Classes and such"""
 
 import datetime as dt
-import os
 import time
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Literal, Self
+from typing import Literal, Self
 
+import numpy as np
 import polars as pl
-import toml
-from geopy.geocoders import Nominatim
 from loguru import logger
-from wetterdienst.provider.dwd.observation import DwdObservationRequest
 
 from modules import classes_constants as clc
-from modules import classes_errors as cle
 from modules import constants as cont
+from modules import dwd_cache as dwc
+from modules import dwd_discover as dsc
+from modules import dwd_fusion as fus
+from modules import dwd_probe as prb
+from modules import dwd_stations as dws
 from modules import general_functions as gf
-
-if TYPE_CHECKING:
-    import geopy
+from modules import geocoding as geo
 
 
 @dataclass
@@ -161,57 +160,25 @@ class Location:
         return self
 
     def get_data(self, location: tuple[float, float] | str) -> None:
-        """Fetches the location data using the geopy library. (used internally)"""
-
-        user_agent_secret: str | None = os.environ.get(
-            "GEO_USER_AGENT", toml.load(".streamlit/secrets.toml").get("GEO_USER_AGENT")
-        )
-
-        if user_agent_secret is None:
-            raise cle.NotFoundError(entry="GEO_USER_AGENT", where="Secrets")
+        """Fetches the location data using the geopy library. (used internally)
 
-        geolocator: Nominatim = Nominatim(user_agent=user_agent_secret)
+        Results are cached locally (see module "geocoding").
+        """
 
         if isinstance(location, str):
-            query = geolocator.geocode(location, exactly_one=True)
+            query: tuple[float, float] | None = geo.geocode(location)
             if not query:
                 return
-            query = query.point  # type: ignore
         elif isinstance(location, tuple):
             query = location
         else:
             raise TypeError
 
-        geopy_loc: geopy.Location = geolocator.reverse(
-            query=query,
-            exactly_one=True,
-            addressdetails=True,
-        )  # type: ignore
-        addr: dict = geopy_loc.raw["address"]
-
-        self.latitude = geopy_loc.latitude
-        self.longitude = geopy_loc.longitude
-        self.address_geopy = geopy_loc.address
-        self.street = addr.get("road", "unbekannt")
-        self.city = addr.get("city")
-        self.suburb = addr.get("suburb")
-        self.country = addr.get("country")
-
-        geopy_hn = addr.get("house_number")
-        if isinstance(geopy_hn, int):
-            self.house_number = geopy_hn
-        elif isinstance(geopy_hn, str) and geopy_hn.isnumeric():
-            self.house_number = int(geopy_hn)
-        else:
-            self.house_number = None
-
-        geopy_pc = addr.get("postcode")
-        if isinstance(geopy_pc, int):
-            self.post_code = geopy_pc
-        elif isinstance(geopy_pc, str) and geopy_pc.isnumeric():
-            self.post_code = int(geopy_pc)
-        else:
-            self.post_code = None
+        found: dict | None = geo.reverse(query)
+        if not found:
+            return
+        for attr, value in geo.location_fields(found).items():
+            setattr(self, attr, value)
 
 
 @dataclass
@@ -237,6 +204,7 @@ class DWDResData:
     closest_station: DWDStation = field(init=False)
     data: pl.DataFrame = field(init=False)
     no_data: str | None = "No Data Available"
+    provenance: pl.DataFrame | None = None
 
     def __post_init__(self) -> None:
         """Fill in fields"""
@@ -310,11 +278,17 @@ class DWDParam:
         par = DWDParam("humidity", loc, tim)
 
         par.fill_specific_resolution("hourly")
+
+    fusion:
+        Lücken der nächstgelegenen Station werden mit Werten
+        der nächsten Stationen gefüllt (Herkunft in 'provenance').
+        Temperaturen werden auf die Höhe der nächstgelegenen Station umgerechnet.
     """
 
     name_en: str
     location: Location | None = None
     time_span: TimeSpan | None = None
+    fusion: bool = False
 
     unit: str = field(init=False)
     name_de: str = field(init=False)
@@ -332,12 +306,13 @@ class DWDParam:
         """Fill in fields"""
         self.resolutions = DWDResolutions()
 
+        discovered: dict[str, dict[str, dict[str, str]]] = dsc.discover()
         self.available_resolutions = {
-            res for res, dic in cont.DWD_DISCOVER.items() if self.name_en in dic
+            res for res, dic in discovered.items() if self.name_en in dic
         }
         self.unit: str = " " + next(
             dic[self.name_en]["origin"]
-            for dic in cont.DWD_DISCOVER.values()
+            for dic in discovered.values()
             if self.name_en in dic
         )
         self.name_de = cont.DWD_PARAM_TRANSLATION.get(self.name_en, self.name_en)
@@ -371,6 +346,7 @@ class DWDParam:
     def get_data(self, resolution: str) -> dict:
         """Get the values for every available resolution
         from the closest station that has data.
+        (Values are taken from the local cache where possible - see dwd_cache)
         """
         if (
             self.location is None
@@ -391,115 +367,199 @@ class DWDParam:
                 trailing_empty_lines=2,
             )
         )
-        request = DwdObservationRequest(
-            parameter=self.name_en,
-            resolution=resolution,
-            start_date=self.time_span.start,
-            end_date=self.time_span.end,
-            settings=cont.WETTERDIENST_SETTINGS,
+        all_stations: pl.DataFrame = dws.nearest_stations(
+            self.name_en,
+            resolution,
+            (self.location.latitude, self.location.longitude),
+            (self.time_span.start, self.time_span.end),
+            cont.WEATHERSTATIONS_MAX_DISTANCE,
         )
 
-        all_stations: pl.DataFrame = request.filter_by_distance(
-            latlon=(self.location.latitude, self.location.longitude),
-            distance=cont.WEATHERSTATIONS_MAX_DISTANCE,
-        ).df
-
         closest_station: DWDStation = DWDStation()
-        data_frame: pl.DataFrame = pl.DataFrame()
         no_data: str | None = None
 
         start_time: float = time.monotonic()
+        time_span: TimeSpan = self.time_span
+        station_id, data_frame, timed_out = prb.first_with_data(
+            all_stations.filter(pl.col("distance") <= cont.DWD_QUERY_DISTANCE_LIMIT)
+            .get_column("station_id")
+            .to_list(),
+            lambda station: dwc.station_values(
+                self.name_en, resolution, station, (time_span.start, time_span.end)
+            ),
+            timeout=cont.DWD_QUERY_TIME_LIMIT,
+        )
 
-        for station_id in all_stations.get_column("station_id"):
-            no_data = self.check_time_distance(station_id, all_stations, start_time)
-            if no_data:
-                break
-
-            values: pl.DataFrame = (
-                request.filter_by_station_id(station_id).values.all().df  # noqa: PD011
+        if timed_out:
+            no_data = self.time_limit_reached()
+        elif station_id is None:
+            no_data = self.distance_limit_reached()
+        else:
+            closest_station_df: pl.DataFrame = all_stations.filter(
+                pl.col("station_id") == station_id
             )
 
-            if not values.is_empty():
-                data_frame = values
-                closest_station_df: pl.DataFrame = all_stations.filter(
-                    pl.col("station_id") == station_id
+            for key in DWDStation.__dataclass_fields__:
+                value: str | float = (
+                    station_id
+                    if key == "station_id"
+                    else closest_station_df.get_column(key)[0]
                 )
+                setattr(closest_station, key, value)
 
-                for key in DWDStation.__dataclass_fields__:
-                    value: str | float = (
-                        station_id
-                        if key == "station_id"
-                        else closest_station_df.get_column(key)[0]
-                    )
-                    setattr(closest_station, key, value)
-
-                logger.success(
-                    gf.string_new_line_per_item(
-                        [
-                            f"'{resolution}'-data for '{self.name_en}' found!",
-                            f"Station ID: '{closest_station.station_id}'",
-                            f"Station: '{closest_station.name}'",
-                            f"Distance: '{closest_station.distance}' km",
-                        ],
-                        leading_empty_lines=1,
-                        trailing_empty_lines=2,
-                    )
+            logger.success(
+                gf.string_new_line_per_item(
+                    [
+                        f"'{resolution}'-data for '{self.name_en}' found!",
+                        f"Station ID: '{closest_station.station_id}'",
+                        f"Station: '{closest_station.name}'",
+                        f"Distance: '{closest_station.distance}' km",
+                    ],
+                    leading_empty_lines=1,
+                    trailing_empty_lines=2,
                 )
-                break
+            )
+
+        provenance: pl.DataFrame | None = None
+        if self.fusion and not data_frame.is_empty():
+            data_frame, provenance = self.fill_gaps_from_other_stations(
+                resolution, all_stations, closest_station, data_frame, start_time
+            )
+
         logger.debug(data_frame)
         return {
             "all_stations": all_stations,
             "closest_station": closest_station,
             "data": data_frame,
             "no_data": no_data,
+            "provenance": provenance,
         }
 
-    def check_time_distance(
-        self, station_id: str, all_stations: pl.DataFrame, start_time: float
-    ) -> str | None:
-        """Check if a station has data"""
-        logger.info(f"checking station id '{station_id}'")
-        no_data: str | None = None
-        distance: float = all_stations.filter(
-            pl.col("station_id") == station_id
-        ).get_column("distance")[0]
+    def fill_gaps_from_other_stations(
+        self,
+        resolution: str,
+        all_stations: pl.DataFrame,
+        closest_station: DWDStation,
+        data: pl.DataFrame,
+        start_time: float,
+    ) -> tuple[pl.DataFrame, pl.DataFrame | None]:
+        """Lücken mit Werten der nächsten Stationen füllen
+
+        Jede weitere Station wird nur für die Zeiträume abgefragt,
+        in denen noch Lücken sind (nahe beieinander liegende Lücken
+        zusammen, siehe cont.DWD_FUSION_MERGE_GAP).
+
+        Returns:
+            - tuple[pl.DataFrame, pl.DataFrame | None]: gefüllte Werte und
+                Herkunft je Zeitabschnitt (None, wenn die Auflösung kein
+                festes Raster hat)
+
+        """
 
-        if distance > cont.DWD_QUERY_DISTANCE_LIMIT:
-            no_data = (
-                "In einem Umkreis von "
-                f"{cont.DWD_QUERY_DISTANCE_LIMIT} km um den gegebenen Standort "
-                "konnten keine Daten für den Parameter "
-                f"**{self.name_de}** gefunden werden."
+        step: dt.timedelta | None = cont.DWD_RESOLUTION_STEPS.get(resolution)
+        if step is None or self.time_span is None:
+            return data, None
+
+        series: pl.DataFrame = fus.on_grid(
+            data, self.time_span.start, self.time_span.end, step
+        )
+        donors: pl.DataFrame = all_stations.filter(
+            pl.col("station_id") != closest_station.station_id
+        ).head(cont.DWD_FUSION_MAX_STATIONS)
+
+        for station_id, height in donors.select("station_id", "height").iter_rows():
+            gaps: pl.DataFrame = fus.missing_intervals(series)
+            if gaps.is_empty() or not self.within_limits(
+                station_id, all_stations, start_time
+            ):
+                break
+
+            queries: list[tuple[dt.datetime, dt.datetime]] = fus.query_ranges(
+                gaps, cont.DWD_FUSION_MERGE_GAP
             )
-            logger.critical(
-                gf.string_new_line_per_item(
-                    [
-                        "Distance limit reached.",
-                        f"No data found within {cont.DWD_QUERY_DISTANCE_LIMIT} km.",
-                    ],
-                    leading_empty_lines=1,
+            for query in queries:
+                values: pl.DataFrame = dwc.stored_values(
+                    self.name_en, resolution, station_id, query
                 )
+                if values.is_empty():
+                    continue
+                if self.name_en.startswith("temperature_air"):
+                    values = fus.lapse_rate_correction(
+                        values, height, closest_station.height
+                    )
+                series = fus.fill_gaps(series, values)
+            logger.info(
+                f"{gaps.get_column('Anzahl').sum()} missing values in "
+                f"{gaps.height} gaps, station '{station_id}' queried "
+                f"for {len(queries)} time spans"
+            )
+
+        provenance: pl.DataFrame = fus.provenance(series)
+        logger.success(
+            gf.string_new_line_per_item(
+                [str(row) for row in provenance.rows()],
+                f"Provenance of '{self.name_en}':",
             )
+        )
+        return series.drop_nulls("value"), provenance
+
+    def within_limits(
+        self, station_id: str, all_stations: pl.DataFrame, start_time: float
+    ) -> bool:
+        """Darf eine weitere Station abgefragt werden? (ohne Meldung)
 
+        Für die Lückenfüllung - die Daten der nächsten Station gibt es schon,
+        erreichte Grenzen sind hier kein Fehler.
+        """
+        distance: float = all_stations.filter(
+            pl.col("station_id") == station_id
+        ).get_column("distance")[0]
         exe_time: float = time.monotonic() - start_time
-        if exe_time > cont.DWD_QUERY_TIME_LIMIT:
-            no_data = (
-                "Es konnten innerhalb eines Zeitlimits von "
-                f"{cont.DWD_QUERY_TIME_LIMIT} Sekunden "
-                f"keine Daten für den Parameter **{self.name_de}** gefunden werden."
+        if (
+            distance > cont.DWD_QUERY_DISTANCE_LIMIT
+            or exe_time > cont.DWD_QUERY_TIME_LIMIT
+        ):
+            logger.info(
+                f"Gap filling stopped at station '{station_id}' "
+                f"({distance:.1f} km, {exe_time:.1f} s)"
             )
+            return False
+        return True
 
-            logger.critical(
-                gf.string_new_line_per_item(
-                    [
-                        "Time limit reached.",
-                        f"No data found within {cont.DWD_QUERY_TIME_LIMIT} s.",
-                    ],
-                    leading_empty_lines=1,
-                )
+    def distance_limit_reached(self) -> str:
+        """Message if no station within the distance limit has data"""
+        logger.critical(
+            gf.string_new_line_per_item(
+                [
+                    "Distance limit reached.",
+                    f"No data found within {cont.DWD_QUERY_DISTANCE_LIMIT} km.",
+                ],
+                leading_empty_lines=1,
             )
+        )
+        return (
+            "In einem Umkreis von "
+            f"{cont.DWD_QUERY_DISTANCE_LIMIT} km um den gegebenen Standort "
+            "konnten keine Daten für den Parameter "
+            f"**{self.name_de}** gefunden werden."
+        )
 
-        return no_data
+    def time_limit_reached(self) -> str:
+        """Message if no station with data was found within the time limit"""
+        logger.critical(
+            gf.string_new_line_per_item(
+                [
+                    "Time limit reached.",
+                    f"No data found within {cont.DWD_QUERY_TIME_LIMIT} s.",
+                ],
+                leading_empty_lines=1,
+            )
+        )
+        return (
+            "Es konnten innerhalb eines Zeitlimits von "
+            f"{cont.DWD_QUERY_TIME_LIMIT} Sekunden "
+            f"keine Daten für den Parameter **{self.name_de}** gefunden werden."
+        )
 
 
 @dataclass
@@ -640,6 +700,346 @@ class MetaData:
         return new_line
 
 
+@dataclass
+class DayIndex:
+    """Index der Kalendertage eines Data Frames
+
+    Für jeden Kalendertag wird gespeichert, in welcher Zeile er beginnt (offset)
+    und wie viele Zeilen er hat (length). Damit wird jeder Tag mit
+    'df.slice(offset, length)' ausgeschnitten, ohne den ganzen df zu filtern.
+
+    Attrs:
+        - days (pl.DataFrame): eine Zeile pro Tag mit den Spalten
+            "Datum", "offset", "length", "Jahr", "Monat", "Wochentag", "Tagtyp"
+        - steps_per_day (int): Anzahl der Werte eines vollständigen Tages
+        - height (int): Anzahl der Zeilen des indizierten Data Frames
+        - span (tuple[dt.datetime, dt.datetime]): erster und letzter Zeitstempel
+            des indizierten Data Frames (sortiert: Minimum und Maximum)
+        - positions (dict[dt.date, tuple[int, int]]): (offset, length) je Tag
+    """
+
+    days: pl.DataFrame
+    steps_per_day: int
+    height: int
+    span: tuple[dt.datetime, dt.datetime]
+    positions: dict[dt.date, tuple[int, int]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Fill the lookup dictionary"""
+        self.positions = dict(
+            zip(
+                self.days.get_column("Datum").to_list(),
+                zip(
+                    self.days.get_column("offset").to_list(),
+                    self.days.get_column("length").to_list(),
+                    strict=True,
+                ),
+                strict=True,
+            )
+        )
+
+    def matches(self, df: pl.DataFrame) -> bool:
+        """Check if the index (still) fits the given data frame
+        (same number of rows, same first and last time stamp)
+        """
+        if df.height != self.height:
+            return False
+        index: pl.Series = df.get_column(cont.SpecialCols.index)
+        return (index.min(), index.max()) == self.span
+
+    def slice_day(self, df: pl.DataFrame, date: dt.date) -> pl.DataFrame | None:
+        """Zeilen eines Tages (None, wenn der Tag nicht in den Daten ist)"""
+        if date not in self.positions:
+            return None
+        offset, length = self.positions[date]
+        return df.slice(offset, length)
+
+    def complete_days(self) -> pl.DataFrame:
+        """Nur Tage, für die alle Werte vorhanden sind"""
+        return self.days.filter(pl.col("length") == self.steps_per_day)
+
+
+@dataclass
+class TimeFilter:
+    """Zeitfilter (Kalender- und Uhrzeit-Bedingungen, alle müssen zutreffen)
+
+    Attrs:
+        - day_types (list[str]): Tagtypen aus cont.DAY_TYPES (leer = alle)
+        - months (list[int]): Monate 1 … 12 (leer = alle)
+        - hours (tuple[int, int] | None): Uhrzeit von (einschließlich)
+            bis (ausschließlich) in vollen Stunden
+        - dates (tuple[dt.date, dt.date] | None): Zeitraum (beide Tage einschließlich)
+    """
+
+    day_types: list[str] = field(default_factory=list)
+    months: list[int] = field(default_factory=list)
+    hours: tuple[int, int] | None = None
+    dates: tuple[dt.date, dt.date] | None = None
+
+    @property
+    def is_active(self) -> bool:
+        """Ist überhaupt eine Bedingung gesetzt?"""
+        return bool(self.day_types or self.months or self.hours or self.dates)
+
+    @property
+    def whole_months(self) -> bool:
+        """Filtert der Filter nur ganze Monate? (Monatswerte bleiben gültig)"""
+        return not (self.day_types or self.hours or self.dates)
+
+
+@dataclass
+class QualitySettings:
+    """Einstellungen für die Prüfung der Datenqualität
+
+    Attrs:
+        - window (int): Fensterbreite (Zeitschritte) für gleitenden Median / MAD
+        - mad_threshold (float): Ausreißer, wenn die Abweichung vom gleitenden
+            Median größer ist als 'mad_threshold' * (skalierte) MAD
+        - stuck_min_run (int): hängender Wert, wenn sich der Wert über mindestens
+            so viele Zeitschritte nicht ändert
+        - stuck_ignore_zero (bool): Null-Werte nicht als hängend markieren
+            (z.B. PV-Erzeugung nachts)
+        - jump_factor (float): Sprung, wenn die Änderung zum vorherigen Wert
+            größer ist als 'jump_factor' * typische Änderung der Spalte
+        - non_negative (list[str] | None): Spalten, die nicht negativ sein dürfen
+            (None: Spalten mit Leistungs- / Arbeitseinheit, außer Einspeisung etc.)
+        - checks (tuple[str, ...]): durchzuführende Prüfungen
+            (Schlüssel aus cont.QUALITY_FLAGS)
+    """
+
+    window: int = 9
+    mad_threshold: float = 6
+    stuck_min_run: int = 8
+    stuck_ignore_zero: bool = True
+    jump_factor: float = 20
+    non_negative: list[str] | None = None
+    checks: tuple[str, ...] = ("spike", "stuck", "negative", "jump")
+
+
+@dataclass
+class QualityReport:
+    """Ergebnis der Prüfung der Datenqualität
+
+    Attrs:
+        - mask (pl.DataFrame): Index-Spalte und eine Spalte (UInt8) je geprüfter
+            Spalte mit den Bits aus cont.QUALITY_FLAGS (0 = in Ordnung)
+        - summary (pl.DataFrame): Anzahl der markierten Werte je Spalte und Prüfung
+        - settings (QualitySettings): verwendete Einstellungen
+    """
+
+    mask: pl.DataFrame
+    summary: pl.DataFrame
+    settings: QualitySettings
+
+    @property
+    def flagged_cells(self) -> int:
+        """Anzahl aller markierten Werte"""
+        return int(self.summary.get_column("markierte Werte").sum())
+
+
+@dataclass
+class YearJob:
+    """Ein Arbeitsschritt bei der parallelen Berechnung mehrerer Jahre
+
+    Attrs:
+        - year (int): Jahr
+        - df_year (pl.DataFrame): Ausgangsdaten des Jahres
+        - lines (dict[str, MetaLine]): Metadaten der Linien (nur gelesen)
+        - split_df (bool): Ausgangsdaten auch ins Jahr 2020 verschieben
+        - with_jdl (bool): Jahresdauerlinie berechnen
+        - with_mon (bool): Monatswerte berechnen
+    """
+
+    year: int
+    df_year: pl.DataFrame
+    lines: dict[str, MetaLine]
+    split_df: bool
+    with_jdl: bool
+    with_mon: bool
+
+
+@dataclass
+class YearDerivation:
+    """Aus den Daten eines Jahres abgeleitete Data Frames
+    (Ergebnis eines Arbeitsschritts bei der parallelen Berechnung mehrerer Jahre)
+
+    Attrs:
+        - year (int): Jahr
+        - df_split (pl.DataFrame | None): Ausgangsdaten im Jahr 2020 mit Jahreszahl
+            in den Spaltennamen (None, wenn schon vorhanden)
+        - df_h (pl.DataFrame): Stundenwerte (Original-Zeitstempel)
+        - df_h_split (pl.DataFrame): Stundenwerte im Jahr 2020
+        - mon (pl.DataFrame | None): Monatswerte (Original-Zeitstempel)
+        - mon_split (pl.DataFrame | None): Monatswerte im Jahr 2020
+        - jdl (pl.DataFrame | None): Jahresdauerlinie (ohne Index-Spalte)
+        - col_rename (dict[str, str]): alte -> neue Spaltennamen
+    """
+
+    year: int
+    df_split: pl.DataFrame | None
+    df_h: pl.DataFrame
+    df_h_split: pl.DataFrame
+    mon: pl.DataFrame | None = None
+    mon_split: pl.DataFrame | None = None
+    jdl: pl.DataFrame | None = None
+    col_rename: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class BatterySettings:
+    """Einstellungen für die Simulation eines Batteriespeichers (Peak Shaving)
+
+    Kapazität und Leistung beziehen sich auf die Einheit der Lastgang-Spalte
+    (z.B. kW → Kapazität in kWh, Leistung in kW).
+
+    Attrs:
+        - capacities (tuple[float, ...]): zu untersuchende Speicherkapazitäten
+        - powers (tuple[float, ...]): zu untersuchende Lade- / Entladeleistungen
+        - efficiency (float): Wirkungsgrad eines vollen Zyklus (Laden und Entladen)
+        - soc_min (float): minimaler Ladezustand (Anteil der Kapazität)
+        - soc_max (float): maximaler Ladezustand (Anteil der Kapazität)
+        - peak_limit (float | None): fest vorgegebene Leistungsgrenze
+            (None: niedrigste erreichbare Grenze je Kombination)
+        - demand_price (float | None): Leistungspreis (€ pro kW und Jahr)
+    """
+
+    capacities: tuple[float, ...] = (50, 100, 200, 500)
+    powers: tuple[float, ...] = (25, 50, 100, 250)
+    efficiency: float = 0.9
+    soc_min: float = 0.1
+    soc_max: float = 0.9
+    peak_limit: float | None = None
+    demand_price: float | None = None
+
+
+@dataclass
+class BatteryConfigs:
+    """Gemeinsam simulierte Speicher-Konfigurationen (je ein Eintrag pro Konfig.)
+
+    Attrs:
+        - capacity (np.ndarray): Kapazität
+        - power (np.ndarray): Lade- / Entladeleistung
+        - limit (np.ndarray): Leistungsgrenze
+    """
+
+    capacity: np.ndarray
+    power: np.ndarray
+    limit: np.ndarray
+
+
+@dataclass
+class PeakSettings:
+    """Einstellungen für die Auswertung der Lastspitzen (Netzentgelte)
+
+    Attrs:
+        - top_n (int): Anzahl der höchsten Viertelstunden je Jahr und Linie
+        - hlzf (dict[str, tuple[tuple[dt.time, dt.time], ...]]): Hochlastzeitfenster
+            je Jahreszeit aus cont.HLZF_SEASONS (nur an Werktagen)
+        - min_share (float): Erheblichkeitsschwelle atypische Netznutzung -
+            Abstand der Spitze im Hochlastzeitfenster zur Jahreshöchstleistung
+            (Anteil der Jahreshöchstleistung)
+        - min_reduction (float): Mindestabstand (Einheit der Linie, z.B. kW)
+    """
+
+    top_n: int = 10
+    hlzf: dict[str, tuple[tuple[dt.time, dt.time], ...]] = field(
+        default_factory=dict
+    )
+    min_share: float = 0.05
+    min_reduction: float = 100
+
+
+@dataclass
+class PeakReport:
+    """Ergebnis der Auswertung der Lastspitzen
+
+    Attrs:
+        - years (pl.DataFrame): Jahreshöchstleistung, Energie, Benutzungsstunden
+            und Spitze im Hochlastzeitfenster je Linie und Jahr
+        - months (pl.DataFrame): Monatshöchstleistungen je Linie
+        - top (pl.DataFrame): die höchsten Werte je Linie und Jahr
+        - settings (PeakSettings): verwendete Einstellungen
+        - columns (list[str]): ausgewertete Linien
+    """
+
+    years: pl.DataFrame
+    months: pl.DataFrame
+    top: pl.DataFrame
+    settings: PeakSettings
+    columns: list[str] = field(default_factory=list)
+
+
+@dataclass
+class HistogramSettings:
+    """Einstellungen für die Häufigkeitsverteilung
+
+    Attrs:
+        - bins (int): Anzahl der Klassen
+        - quantile_edges (bool): Klassengrenzen aus Quantilen
+            (gleich viele Werte je Klasse) statt gleich breiter Klassen
+        - columns (list[str]): Linien (leer = alle Zahlen-Spalten)
+        - by_year (bool): je Jahr (Aufteilung aus 'split_multi_years')
+    """
+
+    bins: int = 20
+    quantile_edges: bool = False
+    columns: list[str] = field(default_factory=list)
+    by_year: bool = False
+
+
+@dataclass
+class HistogramReport:
+    """Ergebnis der Häufigkeitsverteilung
+
+    Attrs:
+        - counts (pl.DataFrame): Anzahl, Stunden und Anteil je Klasse,
+            Linie und Jahr
+        - edges (dict[str, np.ndarray]): Klassengrenzen je Linie
+            (werden wiederverwendet, solange sich die Daten nicht ändern)
+        - settings (HistogramSettings): verwendete Einstellungen
+        - frame (str): ausgewerteter Data Frame ("df" oder "df_h")
+    """
+
+    counts: pl.DataFrame
+    edges: dict[str, np.ndarray]
+    settings: HistogramSettings
+    frame: str = "df"
+
+
+@dataclass
+class DegreeDaySettings:
+    """Temperaturen der Gradtagzahl (VDI 3807)
+
+    Attrs:
+        - indoor (float): Raumtemperatur der Gradtagzahl
+        - heating_limit (float): Heizgrenztemperatur
+        - temp_col (str): Spalte mit der Tagesmitteltemperatur
+    """
+
+    indoor: float = cont.DEGREE_DAY_INDOOR
+    heating_limit: float = cont.DEGREE_DAY_HEATING_LIMIT
+    temp_col: str = cont.DWD_PARAM_TRANSLATION["temperature_air_mean_2m"]
+
+
+@dataclass
+class ClimateReport:
+    """Gradtagzahlen, Energiesignaturen und Witterungsbereinigung
+
+    Attrs:
+        - degree_days (pl.DataFrame): Gradtagzahl und Heiztage je Monat
+        - signatures (pl.DataFrame): Energiesignatur (Grundlast, Steigung,
+            Änderungspunkt) je Linie und Jahr
+        - normalised (pl.DataFrame | None): witterungsbereinigter Verbrauch
+            je Linie und Jahr (None ohne langjährige Referenz)
+        - columns (list[str]): ausgewertete Linien
+    """
+
+    degree_days: pl.DataFrame
+    signatures: pl.DataFrame
+    normalised: pl.DataFrame | None = None
+    columns: list[str] = field(default_factory=list)
+
+
 @dataclass
 class MetaAndDfs:
     """Class to combine data frames and the corresponding meta data
@@ -653,6 +1053,10 @@ class MetaAndDfs:
         - df_multi (dict[int, pl.DataFrame] | None): grouped by year
         - df_h_multi (dict[int, pl.DataFrame] | None): grouped by year
         - mon_multi (dict[int, pl.DataFrame] | None): grouped by year
+        - day_index (dict[str, DayIndex]): Tages-Index für "df" und "df_h"
+        - peaks (PeakReport | None): Auswertung der Lastspitzen von "df"
+        - climate (ClimateReport | None): Gradtagzahlen und Witterungsbereinigung
+        - histogram (HistogramReport | None): Häufigkeitsverteilung
     """
 
     meta: MetaData
@@ -663,6 +1067,10 @@ class MetaAndDfs:
     df_multi: dict[int, pl.DataFrame] | None = None
     df_h_multi: dict[int, pl.DataFrame] | None = None
     mon_multi: dict[int, pl.DataFrame] | None = None
+    day_index: dict[str, DayIndex] = field(default_factory=dict)
+    peaks: PeakReport | None = None
+    climate: ClimateReport | None = None
+    histogram: HistogramReport | None = None
 
     def get_lines_in_multi_df(
         self, df: Literal["df_multi", "df_h_multi", "mon_multi"] = "df_multi"
@@ -688,3 +1096,19 @@ class MetaAndDfs:
     def as_dic(self) -> dict:
         """Dictionary representation"""
         return {attr: getattr(self, attr) for attr in self.__dataclass_fields__}
+
+
+@dataclass
+class PortfolioReport:
+    """Summenlastgang vieler Zähler
+
+    Attrs:
+        - mdf (MetaAndDfs): Summenlastgang (Leistung in kW) auf gemeinsamem Raster
+        - meters (pl.DataFrame): Kennwerte und Anteil je Zähler (Datei und Linie)
+        - simultaneity (float): Gleichzeitigkeitsfaktor
+            (Spitze der Summe / Summe der einzelnen Spitzen)
+    """
+
+    mdf: MetaAndDfs
+    meters: pl.DataFrame
+    simultaneity: float
@@ -8,6 +8,7 @@ import numpy as np
 import plotly.graph_objects as go
 from loguru import logger
 
+from modules import constants as cont
 from modules import fig_formatting as fform
 from modules import streamlit_functions as gf
 
@@ -125,6 +126,7 @@ class Figs:
     jdl: FigProp | None = None
     mon: FigProp | None = None
     days: FigProp | None = None
+    carpet: FigProp | None = None
 
     def list_all_figs(self) -> list[FigProp]:
         """Get a list of all figs as custom types"""
@@ -145,6 +147,13 @@ class Figs:
             for fig in valid_figs:
                 gf.s_set(fig.st_key, fig.fig)
 
+    def reset(self) -> None:
+        """Alle Grafiken verwerfen (werden beim nächsten Durchlauf neu erzeugt)"""
+        for attr in self.__dataclass_fields__:
+            setattr(self, attr, None)
+        for key in cont.FIG_KEYS.list_all():
+            gf.s_delete(key)
+
     def update_all_figs(self) -> None:
         """Update all figs"""
         if valid_figs := self.list_all_figs():
@@ -7,9 +7,6 @@ import dotenv
 from dataclasses import dataclass, field
 from typing import Any, Callable, Literal
 
-from wetterdienst import Settings
-from wetterdienst.provider.dwd.observation import DwdObservationRequest
-
 from modules import classes_constants as clc
 from modules import streamlit_functions as sf
 
@@ -91,6 +88,12 @@ class Buttons:
         key="but_weather_download",
         use_container_width=True,
     )
+    download_weather_batch = ButtonProps(
+        label="💾 Wetterdaten aller Standorte (ZIP) 💾",
+        key="but_weather_batch_download",
+        mime="application/zip",
+        use_container_width=True,
+    )
     download_example = ButtonProps(
         label="Beispieldatei herunterladen",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -410,39 +413,17 @@ TIME_RESOLUTIONS: dict[Literal["15m", "1h", "1d", "1mo"], clc.TimeResolution] =
 }
 
 
-WETTERDIENST_SETTINGS = Settings(
-    ts_shape="long",
-    ts_si_units=False,
-    ts_skip_empty=True,
-    ts_skip_threshold=0.90,
-    ts_skip_criteria="min",
-    ts_dropna=True,
-    ignore_env=True,
-)
-
-DWD_DISCOVER: dict[str, dict[str, dict[str, str]]] = DwdObservationRequest.discover()
-DWD_ALL_PAR_DIC: dict = dict(
-    sorted(
-        {
-            par_name: {
-                "available_resolutions": {
-                    res for res, par_dic in DWD_DISCOVER.items() if par_name in par_dic
-                },
-                "unit": " "
-                + next(
-                    dic[par_name]["origin"]
-                    for dic in DWD_DISCOVER.values()
-                    if par_name in dic
-                ),
-            }
-            for par_name in {
-                par
-                for sublist in [list(dic.keys()) for dic in DWD_DISCOVER.values()]
-                for par in sublist
-            }
-        }.items()
-    )
-)
+# Einstellungen für wetterdienst (Settings werden erst in dwd_discover erzeugt,
+# damit wetterdienst nur auf den Seiten geladen wird, die Wetterdaten brauchen)
+WETTERDIENST_SETTINGS_ARGS: dict[str, Any] = {
+    "ts_shape": "long",
+    "ts_si_units": False,
+    "ts_skip_empty": True,
+    "ts_skip_threshold": 0.90,
+    "ts_skip_criteria": "min",
+    "ts_dropna": True,
+    "ignore_env": True,
+}
 
 # Params that raise errors
 DWD_PROBLEMATIC_PARAMS: list[str] = [
@@ -458,7 +439,6 @@ DWD_PROBLEMATIC_PARAMS: list[str] = [
     # "wind_speed_min",
     # "wind_speed_rolling_mean_max",
 ]
-DWD_GOOD_PARAMS: set[str] = set(DWD_ALL_PAR_DIC) - set(DWD_PROBLEMATIC_PARAMS)
 
 DWD_DEFAULT_PARAMS: list[str] = ["temperature_air_mean_2m"]
 
@@ -474,6 +454,30 @@ DWD_PARAMS_POLYSUN: dict[str, str] = {
 
 DWD_QUERY_TIME_LIMIT: float = sf.s_get("ni_limit_time") or 15  # seconds
 DWD_QUERY_DISTANCE_LIMIT: float = sf.s_get("ni_limit_dist") or 150  # km
+DWD_PROBE_STATIONS: int = 4  # gleichzeitig abgefragte Stationen (dwd_probe)
+DWD_PARAM_WORKERS: int = 6  # gleichzeitig gesuchte Parameter
+DWD_PREFETCH_WORKERS: int = 4  # Abfragen im Hintergrund (alle Sitzungen)
+
+# Lückenfüllung aus Nachbarstationen
+DWD_FUSION_MAX_STATIONS: int = 5  # Stationen zusätzlich zur nächstgelegenen
+# Lücken mit weniger Abstand werden in einer Abfrage zusammengefasst
+DWD_FUSION_MERGE_GAP: dt.timedelta = dt.timedelta(days=7)
+DWD_LAPSE_RATE: float = 0.0065  # K/m (Temperaturabnahme mit der Höhe)
+# Archive nach Zeiträumen geteilt ("HIGH_RESOLUTIONS" bei wetterdienst)
+DWD_HIGH_RESOLUTIONS: tuple[str, ...] = ("minute_1", "minute_5", "minute_10")
+DWD_RESOLUTION_STEPS: dict[str, dt.timedelta] = {
+    "minute_1": dt.timedelta(minutes=1),
+    "minute_5": dt.timedelta(minutes=5),
+    "minute_10": dt.timedelta(minutes=10),
+    "hourly": dt.timedelta(hours=1),
+    "6_hour": dt.timedelta(hours=6),
+    "daily": dt.timedelta(days=1),
+}
+
+# Wetterdaten für viele Standorte (ZIP-Datei)
+WEATHER_BATCH_WORKERS: int = 8  # parallele Abfragen beim DWD
+WEATHER_BATCH_MAX_STATIONS: int = 10  # geprüfte Stationen je Standort und Parameter
+WEATHER_BATCH_RESOLUTION: str = "hourly"
 
 
 DWD_RESOLUTION_OPTIONS: dict[str, str] = {
@@ -529,6 +533,7 @@ FIG_TITLES: clc.FigIDs = clc.FigIDs(
     jdl="Geordnete Jahresdauerlinie",
     mon="Monatswerte",
     days="Vergleich ausgewählter Tage",
+    carpet="Carpet Plot",
 )
 
 FIG_KEYS: clc.FigIDs = clc.FigIDs(
@@ -536,6 +541,7 @@ FIG_KEYS: clc.FigIDs = clc.FigIDs(
     jdl="fig_jdl",
     mon="fig_mon",
     days="fig_days",
+    carpet="fig_carpet",
 )
 
 ARBEIT_LEISTUNG: clc.ArbeitLeistung = clc.ArbeitLeistung(
@@ -545,6 +551,182 @@ ARBEIT_LEISTUNG: clc.ArbeitLeistung = clc.ArbeitLeistung(
 )
 
 
+@dataclass
+class DayTypes:
+    """Tagtypen für Typtage (Feiertage haben Vorrang vor Wochenenden)"""
+
+    workday: str = "Werktag"
+    weekend: str = "Wochenende"
+    holiday: str = "Feiertag"
+
+    def list_all(self) -> list[str]:
+        """List all values (order = code used in the typical-day engine)"""
+        return [getattr(self, attr) for attr in self.__dataclass_fields__]
+
+
+DAY_TYPES: DayTypes = DayTypes()
+
+MONTH_NAMES: dict[int, str] = {
+    1: "Januar",
+    2: "Februar",
+    3: "März",
+    4: "April",
+    5: "Mai",
+    6: "Juni",
+    7: "Juli",
+    8: "August",
+    9: "September",
+    10: "Oktober",
+    11: "November",
+    12: "Dezember",
+}
+
+# Zeitfilter-Vorlagen (Argumente für cld.TimeFilter)
+TIME_FILTER_PRESETS: dict[str, dict] = {
+    "Arbeitszeit (Werktage 7 - 18 Uhr)": {
+        "day_types": [DAY_TYPES.workday],
+        "hours": (7, 18),
+    },
+    "Werktage": {"day_types": [DAY_TYPES.workday]},
+    "Wochenenden und Feiertage": {
+        "day_types": [DAY_TYPES.weekend, DAY_TYPES.holiday],
+    },
+    "Heizperiode (Oktober - April)": {"months": [10, 11, 12, 1, 2, 3, 4]},
+    "Sommer (Mai - September)": {"months": [5, 6, 7, 8, 9]},
+}
+
+# bundesweite gesetzliche Feiertage
+HOLIDAYS_FIXED: dict[str, tuple[int, int]] = {
+    "Neujahr": (1, 1),
+    "Tag der Arbeit": (5, 1),
+    "Tag der Deutschen Einheit": (10, 3),
+    "1. Weihnachtstag": (12, 25),
+    "2. Weihnachtstag": (12, 26),
+}
+# bewegliche Feiertage (Tage relativ zum Ostersonntag)
+HOLIDAYS_EASTER_OFFSET: dict[str, int] = {
+    "Karfreitag": -2,
+    "Ostermontag": 1,
+    "Christi Himmelfahrt": 39,
+    "Pfingstmontag": 50,
+}
+
+# Kennwerte der Typtage
+TYPICAL_DAY_STATS: dict[str, str] = {
+    "mean": "Mittelwert",
+    "median": "Median",
+}
+
+# Kalender-Spalten (keine Messwerte -> kein Zahlenformat mit Einheit im Export)
+CALENDAR_COLUMNS: list[str] = [
+    "Jahr",
+    "Monat",
+    "Wochentag",
+    "Tagtyp",
+    "Kennwert",
+    "Anzahl Tage",
+    "Rang",
+]
+
+
+@dataclass(frozen=True)
+class QualityFlags:
+    """Bits der Qualitätsmaske (ein Wert pro Zelle, Bits können kombiniert sein)"""
+
+    spike: int = 1
+    stuck: int = 2
+    negative: int = 4
+    jump: int = 8
+
+    def as_dic(self) -> dict[str, int]:
+        """Return a dictionary representation"""
+        return {attr: getattr(self, attr) for attr in self.__dataclass_fields__}
+
+
+QUALITY_FLAGS: QualityFlags = QualityFlags()
+
+# Bezeichnungen im Bericht zur Datenqualität
+QUALITY_FLAG_NAMES: dict[str, str] = {
+    "spike": "Ausreißer",
+    "stuck": "hängende Werte",
+    "negative": "negative Werte",
+    "jump": "Sprünge",
+}
+
+# Verfahren für geglättete Linien
+SMOOTH_METHODS: dict[str, str] = {
+    "savgol": "Savitzky-Golay",
+    "mean": "gleitender Mittelwert",
+    "lowess": "LOWESS",
+}
+# ab dieser Fensterbreite wird per FFT gefaltet
+SMOOTH_FFT_MIN_WINDOW: int = 200
+# Anzahl der gespeicherten geglätteten Linien
+SMOOTH_CACHE_SIZE: int = 64
+# LOWESS wird auf höchstens so viele (gemittelte) Punkte angewendet
+SMOOTH_LOWESS_MAX_POINTS: int = 1500
+
+# Hochlastzeitfenster (atypische Netznutzung) - Monate je Jahreszeit
+HLZF_SEASONS: dict[str, tuple[int, ...]] = {
+    "Winter": (1, 2, 12),
+    "Frühling": (3, 4, 5),
+    "Sommer": (6, 7, 8),
+    "Herbst": (9, 10, 11),
+}
+# Beispiel für Hochlastzeitfenster (werden vom Netzbetreiber veröffentlicht)
+HLZF_DEFAULT: dict[str, str] = {
+    "Winter": "08:00-13:00, 16:30-19:30",
+    "Frühling": "",
+    "Sommer": "",
+    "Herbst": "16:45-19:45",
+}
+# Grenze der Benutzungsdauer für die Wahl des Netzentgelts (h/a)
+GRID_FEE_UTILISATION_HOURS: int = 2500
+# Namensanfang der Beschriftungen für Lastspitzen
+PEAK_ANNO_PREFIX: str = "Lastspitze"
+
+# Gradtagzahl G20/15 (VDI 3807): Raumtemperatur und Heizgrenztemperatur in °C
+DEGREE_DAY_INDOOR: float = 20
+DEGREE_DAY_HEATING_LIMIT: float = 15
+# Kandidaten für den Änderungspunkt der Energiesignatur in °C
+CHANGE_POINT_CANDIDATES: tuple[float, ...] = tuple(x / 2 for x in range(10, 45))
+# Anzahl der Jahre für die langjährige Referenz der Gradtagzahl
+DEGREE_DAY_REFERENCE_YEARS: int = 20
+# lokaler Speicher für DWD-Daten
+DWD_CACHE_DIR: pathlib.Path = pathlib.Path(CWD) / ".cache" / "dwd"
+# Werte der letzten Tage gelten im lokalen Speicher nicht als vollständig
+DWD_CACHE_RECENT_DAYS: int = 3
+# lange Zeiträume in Stücken speichern: Jahre je Stück
+DWD_CACHE_CHUNK_YEARS: int = 1
+# parallele Downloads der Stücke (nur für DWD_HIGH_RESOLUTIONS)
+DWD_CACHE_CHUNK_WORKERS: int = 4
+# Stationskatalog (dwd_stations): erstes Jahr der Bitfelder, Alter bis zur Erneuerung
+DWD_CATALOG_FIRST_YEAR: int = 1780
+DWD_CATALOG_MAX_AGE_DAYS: int = 30
+# Geocodierung (geocoding): lokaler Speicher, Gültigkeit, Rundung der Koordinaten
+GEOCODE_CACHE_FILE: pathlib.Path = pathlib.Path(CWD) / ".cache" / "geocoding.sqlite"
+GEOCODE_CACHE_TTL_DAYS: int = 90
+GEOCODE_CACHE_TTL_NOT_FOUND_DAYS: int = 1
+GEOCODE_DECIMALS: int = 4  # etwa 10 m
+# Nominatim: höchstens eine Anfrage pro Sekunde (Nutzungsbedingungen)
+GEOCODE_RATE_PER_SECOND: float = 1.0
+GEOCODE_BURST: float = 1.0
+GEOCODE_WORKERS: int = 4
+
+# Portfolio: Name der Summenlinie, Raster in Minuten und Umrechnung in kW
+PORTFOLIO_COLUMN: str = "Portfolio"
+PORTFOLIO_GRID_MINUTES: int = 15
+POWER_UNIT_FACTORS: dict[str, float] = {
+    "W": 0.001,
+    "kW": 1,
+    "MW": 1_000,
+    "GW": 1_000_000,
+}
+
+# Dauerlinien aus Stützstellen: Spalte mit den Stunden (0 … 8760)
+DURATION_CURVE_HOUR_COLUMN: str = "Stunde"
+
+
 @dataclass
 class Exclude:
     """Linien, die bei gewissen Operationen übersprungen werden"""
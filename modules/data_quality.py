@@ -0,0 +1,207 @@
+"""Prüfung der Datenqualität (Ausreißer, hängende Werte, negative Werte, Sprünge)
+
+Alle Prüfungen sind Polars-Ausdrücke mit gleitenden Fenstern.
+Sie werden für alle Spalten in einem einzigen 'select' ausgewertet,
+damit Polars die Spalten parallel berechnen kann.
+"""
+
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+
+# Faktor, mit dem die MAD einer Normalverteilung der Standardabweichung entspricht
+MAD_SCALE: float = 1.4826
+
+
+def stuck_run_length(col: str) -> pl.Expr:
+    """Länge der Folge gleicher Werte, zu der der jeweilige Wert gehört"""
+
+    changed: pl.Expr = pl.col(col) != pl.col(col).shift()
+    run_id: pl.Expr = changed.fill_null(True).cum_sum()  # noqa: FBT003
+    return pl.len().over(run_id)
+
+
+def typical_step(col: str) -> pl.Expr:
+    """Typische Änderung zwischen zwei Werten (Median der Änderungen ungleich 0)"""
+
+    step: pl.Expr = pl.col(col).diff().abs()
+    return step.filter(step > 0).median().fill_null(0)
+
+
+def spike_flags(col: str, settings: cld.QualitySettings) -> pl.Expr:
+    """Ausreißer über gleitenden Median und gleitende MAD
+
+    Die MAD wird nach unten durch die typische Änderung der Spalte begrenzt,
+    damit auf (fast) konstanten Abschnitten nicht jede Änderung markiert wird.
+    """
+
+    median: pl.Expr = pl.col(col).rolling_median(
+        settings.window, center=True, min_periods=1
+    )
+    deviation: pl.Expr = (pl.col(col) - median).abs()
+    mad: pl.Expr = (
+        deviation.rolling_median(settings.window, center=True, min_periods=1)
+        * MAD_SCALE
+    )
+    return deviation > settings.mad_threshold * pl.max_horizontal(
+        mad, typical_step(col)
+    )
+
+
+def stuck_flags(col: str, settings: cld.QualitySettings) -> pl.Expr:
+    """Werte, die sich über mindestens 'stuck_min_run' Zeitschritte nicht ändern"""
+
+    flags: pl.Expr = stuck_run_length(col) >= settings.stuck_min_run
+    if settings.stuck_ignore_zero:
+        flags = flags & (pl.col(col) != 0)
+    return flags
+
+
+def jump_flags(col: str, settings: cld.QualitySettings) -> pl.Expr:
+    """Änderungen, die viel größer sind als die typische Änderung der Spalte"""
+
+    return pl.col(col).diff().abs() > settings.jump_factor * typical_step(col)
+
+
+def default_non_negative(df: pl.DataFrame, meta: cld.MetaData | None) -> list[str]:
+    """Spalten mit Leistungs- oder Arbeitseinheit, die nicht negativ sein dürfen
+
+    (Spalten für Einspeisung, Lieferung etc. aus cont.NEGATIVE_VALUES
+    sind ausgenommen.)
+    """
+
+    if meta is None:
+        return []
+
+    units: list[str] = [
+        unit.lower()
+        for unit in [
+            *cont.ARBEIT_LEISTUNG.arbeit.possible_units,
+            *cont.ARBEIT_LEISTUNG.leistung.possible_units,
+        ]
+    ]
+    return [
+        col
+        for col in df.columns
+        if (line := meta.lines.get(col)) is not None
+        and (line.unit or "").strip().lower() in units
+        and not any(neg in col for neg in cont.NEGATIVE_VALUES)
+    ]
+
+
+def quality_mask_expr(
+    col: str, settings: cld.QualitySettings, non_negative: list[str]
+) -> pl.Expr:
+    """Qualitätsmaske einer Spalte als Bits aus cont.QUALITY_FLAGS"""
+
+    checks: dict[str, pl.Expr] = {
+        "spike": spike_flags(col, settings),
+        "stuck": stuck_flags(col, settings),
+        "jump": jump_flags(col, settings),
+    }
+    if col in non_negative:
+        checks["negative"] = pl.col(col) < 0
+
+    bits: list[pl.Expr] = [
+        pl.when(expr.fill_null(False))  # noqa: FBT003
+        .then(pl.lit(getattr(cont.QUALITY_FLAGS, check), pl.UInt8))
+        .otherwise(pl.lit(0, pl.UInt8))
+        for check, expr in checks.items()
+        if check in settings.checks
+    ]
+    if not bits:
+        return pl.lit(0, pl.UInt8).alias(col)
+
+    return pl.sum_horizontal(bits).cast(pl.UInt8).alias(col)
+
+
+def quality_summary(mask: pl.DataFrame) -> pl.DataFrame:
+    """Anzahl der markierten Werte je Spalte und Prüfung (Anteil in %)"""
+
+    cols: list[str] = [col for col in mask.columns if col != COL_IND]
+    counts: pl.DataFrame = mask.select(
+        [
+            (pl.col(col) & bit).gt(0).sum().alias(f"{col}|{check}")
+            for col in cols
+            for check, bit in cont.QUALITY_FLAGS.as_dic().items()
+        ]
+        + [pl.col(col).gt(0).sum().alias(f"{col}|all") for col in cols]
+    )
+
+    rows: list[dict] = [
+        {
+            "Spalte": col,
+            **{
+                name: counts.item(0, f"{col}|{check}")
+                for check, name in cont.QUALITY_FLAG_NAMES.items()
+            },
+            "markierte Werte": counts.item(0, f"{col}|all"),
+            "Anteil": (
+                counts.item(0, f"{col}|all") / mask.height * 100 if mask.height else 0
+            ),
+        }
+        for col in cols
+    ]
+
+    return pl.DataFrame(rows)
+
+
+@gf.func_timer
+def check_quality(
+    df: pl.DataFrame,
+    settings: cld.QualitySettings | None = None,
+    meta: cld.MetaData | None = None,
+    columns: list[str] | None = None,
+) -> cld.QualityReport:
+    """Datenqualität aller Spalten prüfen
+
+    Args:
+        - df (pl.DataFrame): nach Zeit sortierter Data Frame
+        - settings (cld.QualitySettings | None): Einstellungen der Prüfung
+        - meta (cld.MetaData | None): Metadaten (für die Einheiten der Spalten)
+        - columns (list[str] | None): zu prüfende Spalten
+            (Standard: alle numerischen Linien)
+
+    Returns:
+        - cld.QualityReport: Qualitätsmaske und Bericht
+
+    """
+
+    if COL_IND not in df.columns:
+        raise cle.NotFoundError(entry=COL_IND, where="data frame columns")
+    if not df.get_column(COL_IND).is_sorted():
+        err_msg: str = f"Column '{COL_IND}' is not sorted."
+        raise ValueError(err_msg)
+
+    settings = settings or cld.QualitySettings()
+    cols: list[str] = columns or [
+        col
+        for col in df.columns
+        if gf.check_if_not_exclude(col) and df.schema[col].is_numeric()
+    ]
+    non_negative: list[str] = (
+        settings.non_negative
+        if settings.non_negative is not None
+        else default_non_negative(df, meta)
+    )
+
+    mask: pl.DataFrame = (
+        df.lazy()
+        .select(
+            pl.col(COL_IND),
+            *[quality_mask_expr(col, settings, non_negative) for col in cols],
+        )
+        .collect()
+    )
+    summary: pl.DataFrame = quality_summary(mask)
+
+    logger.info(f"Data quality checked for {len(cols)} columns")
+    logger.info(summary)
+
+    return cld.QualityReport(mask=mask, summary=summary, settings=settings)
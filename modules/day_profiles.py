@@ -0,0 +1,375 @@
+"""Tages-Index, Tagesvergleich und Typtage"""
+
+import datetime as dt
+from collections.abc import Iterable
+from typing import Literal
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+COL_ORG: str = cont.SpecialCols.original_index
+
+# Bezugstag für die Darstellung von Tagen übereinander
+REFERENCE_DAY: dt.datetime = dt.datetime(2020, 1, 1)
+
+GroupKey = Literal["Jahr", "Monat", "Tagtyp"]
+
+
+def easter_sunday(year: int) -> dt.date:
+    """Ostersonntag nach der Gaußschen Osterformel (gregorianischer Kalender)"""
+
+    a: int = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f: int = (b + 8) // 25
+    g: int = (b - f + 1) // 3
+    h: int = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l: int = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m: int = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+
+    return dt.date(year, month, day + 1)
+
+
+def public_holidays(years: Iterable[int]) -> dict[dt.date, str]:
+    """Bundesweite gesetzliche Feiertage der gegebenen Jahre
+
+    Args:
+        - years (Iterable[int]): Jahre
+
+    Returns:
+        - dict[dt.date, str]: Datum -> Name des Feiertags
+
+    """
+
+    holidays: dict[dt.date, str] = {}
+    for year in years:
+        easter: dt.date = easter_sunday(year)
+        holidays |= {
+            dt.date(year, month, day): name
+            for name, (month, day) in cont.HOLIDAYS_FIXED.items()
+        }
+        holidays |= {
+            easter + dt.timedelta(days=offset): name
+            for name, offset in cont.HOLIDAYS_EASTER_OFFSET.items()
+        }
+
+    return holidays
+
+
+def build_day_index(df: pl.DataFrame, td_mnts: int | None = None) -> cld.DayIndex:
+    """Tages-Index eines nach Zeit sortierten Data Frames erstellen
+
+    Die Tage werden per Lauflängenkodierung des Datums gefunden
+    (ein Durchlauf über den Index, kein Filter pro Tag).
+
+    Args:
+        - df (pl.DataFrame): Data Frame mit Index-Spalte
+        - td_mnts (int | None): zeitliche Auflösung in Minuten.
+            Wenn nicht gegeben, wird die häufigste Tageslänge verwendet.
+
+    Raises:
+        - ValueError: wenn der Index nicht aufsteigend sortiert ist
+
+    Returns:
+        - cld.DayIndex: Index der Kalendertage
+
+    """
+
+    dates: pl.Series = df.get_column(COL_IND).dt.date()
+    if not dates.is_sorted():
+        err_msg: str = f"Column '{COL_IND}' is not sorted."
+        raise ValueError(err_msg)
+
+    runs: pl.DataFrame = (
+        dates.rle()
+        .struct.unnest()
+        .select(
+            pl.col("value").alias("Datum"),
+            (pl.col("len").cum_sum() - pl.col("len")).alias("offset"),
+            pl.col("len").alias("length"),
+        )
+    )
+
+    years: list[int] = runs.get_column("Datum").dt.year().unique().to_list()
+    holidays: list[dt.date] = list(public_holidays(years))
+
+    days: pl.DataFrame = runs.with_columns(
+        pl.col("Datum").dt.year().alias("Jahr"),
+        pl.col("Datum").dt.month().alias("Monat"),
+        pl.col("Datum").dt.weekday().alias("Wochentag"),
+    ).with_columns(
+        pl.when(pl.col("Datum").is_in(holidays))
+        .then(pl.lit(cont.DAY_TYPES.holiday))
+        .when(pl.col("Wochentag") > 5)  # noqa: PLR2004
+        .then(pl.lit(cont.DAY_TYPES.weekend))
+        .otherwise(pl.lit(cont.DAY_TYPES.workday))
+        .alias("Tagtyp")
+    )
+
+    steps_per_day: int = (
+        cont.TimeMinutesIn.day // td_mnts
+        if td_mnts
+        else int(days.get_column("length").mode().max())  # type: ignore[arg-type]
+    )
+
+    logger.info(
+        f"Day index created: {days.height} days, {steps_per_day} values per day"
+    )
+
+    index: pl.Series = df.get_column(COL_IND)
+    return cld.DayIndex(
+        days=days,
+        steps_per_day=steps_per_day,
+        height=df.height,
+        span=(index.min(), index.max()),  # type: ignore[arg-type]
+    )
+
+
+def get_day_index(
+    mdf: cld.MetaAndDfs, frame: Literal["df", "df_h"] = "df"
+) -> cld.DayIndex:
+    """Tages-Index aus dem mdf holen oder (neu) erstellen"""
+
+    df: pl.DataFrame | None = getattr(mdf, frame)
+    if df is None:
+        raise cle.NotFoundError(entry=frame, where="mdf")
+
+    index: cld.DayIndex | None = mdf.day_index.get(frame)
+    if index is None or not index.matches(df):
+        td_mnts: int | None = (
+            mdf.meta.td_mnts if frame == "df" else cont.TimeMinutesIn.hour
+        )
+        index = build_day_index(df, td_mnts)
+        mdf.day_index[frame] = index
+
+    return index
+
+
+@gf.func_timer
+def slice_days(
+    mdf: cld.MetaAndDfs,
+    dates: Iterable[dt.date],
+    frame: Literal["df", "df_h"] = "df",
+) -> dict[dt.date, pl.DataFrame]:
+    """Ausgewählte Tage ausschneiden und auf einen Bezugstag legen
+
+    Die Uhrzeit bleibt erhalten, das Datum wird durch den Bezugstag ersetzt,
+    damit die Tage übereinander dargestellt werden können.
+    Das ursprüngliche Datum bleibt in der Spalte "orgidx".
+
+    Args:
+        - mdf (cld.MetaAndDfs): Data Frames und Metadaten
+        - dates (Iterable[dt.date]): Tage
+        - frame (Literal["df", "df_h"]): zu verwendender Data Frame
+
+    Returns:
+        - dict[dt.date, pl.DataFrame]: Data Frame für jeden gefundenen Tag
+
+    """
+
+    df: pl.DataFrame = getattr(mdf, frame)
+    index: cld.DayIndex = get_day_index(mdf, frame)
+
+    dic: dict[dt.date, pl.DataFrame] = {}
+    for date in dates:
+        day: pl.DataFrame | None = index.slice_day(df, date)
+        if day is None:
+            logger.warning(f"Day {date} not found in 'mdf.{frame}'")
+            continue
+        if COL_ORG not in day.columns:
+            day = day.with_columns(pl.col(COL_IND).alias(COL_ORG))
+        dic[date] = day.with_columns(
+            (
+                pl.lit(REFERENCE_DAY)
+                + (pl.col(COL_IND) - pl.col(COL_IND).dt.truncate("1d"))
+            ).alias(COL_IND)
+        )
+
+    return dic
+
+
+def day_cube(
+    df: pl.DataFrame, index: cld.DayIndex, columns: list[str]
+) -> tuple[pl.DataFrame, np.ndarray]:
+    """Alle vollständigen Tage als 3D-Array (Tage, Zeitschritte, Spalten)
+
+    Liegen die vollständigen Tage lückenlos hintereinander (der Normalfall),
+    ist das Array nur eine andere Sicht auf die Werte (keine Kopie).
+
+    Returns:
+        - tuple[pl.DataFrame, np.ndarray]: vollständige Tage und Array der Werte
+
+    """
+
+    days: pl.DataFrame = index.complete_days()
+    steps: int = index.steps_per_day
+    values: np.ndarray = df.select(columns).cast(pl.Float64).to_numpy()
+    offsets: np.ndarray = days.get_column("offset").to_numpy()
+
+    if days.height and np.all(np.diff(offsets) == steps):
+        start: int = int(offsets[0])
+        cube: np.ndarray = values[start : start + days.height * steps]
+    else:
+        cube = values[(offsets[:, None] + np.arange(steps)).ravel()]
+
+    return days, cube.reshape(days.height, steps, len(columns))
+
+
+def carpet_matrix(
+    df: pl.DataFrame, index: cld.DayIndex, col: str
+) -> tuple[pl.Series, np.ndarray]:
+    """Werte einer Spalte als Matrix (Kalendertage x Zeitschritte des Tages)
+
+    Sind alle Tage vollständig und lückenlos (der Normalfall),
+    ist die Matrix nur eine andere Sicht auf die Werte (keine Kopie).
+    Sonst wird ein lückenloses Kalenderraster mit NaN gefüllt
+    (fehlende Tage, Jahreswechsel bei mehreren Jahren, Zeitumstellung).
+
+    Returns:
+        - tuple[pl.Series, np.ndarray]: Kalendertage und Matrix der Werte
+
+    """
+
+    steps: int = index.steps_per_day
+    first: dt.date = index.days.get_column("Datum").min()  # type: ignore[assignment]
+    last: dt.date = index.days.get_column("Datum").max()  # type: ignore[assignment]
+    dates: pl.Series = pl.date_range(first, last, "1d", eager=True).alias("Datum")
+    values: np.ndarray = df.get_column(col).cast(pl.Float64).to_numpy()
+
+    lengths: np.ndarray = index.days.get_column("length").to_numpy()
+    if index.days.height == dates.len() and np.all(lengths == steps):
+        return dates, values.reshape(dates.len(), steps)
+
+    timestamps: pl.Series = df.get_column(COL_IND)
+    rows: np.ndarray = (timestamps.dt.date() - first).dt.total_days().to_numpy()
+    minutes: np.ndarray = (
+        timestamps.dt.hour().cast(pl.Int32) * 60 + timestamps.dt.minute()
+    ).to_numpy()
+    matrix: np.ndarray = np.full((dates.len(), steps), np.nan)
+    matrix[rows, minutes * steps // cont.TimeMinutesIn.day] = values
+
+    return dates, matrix
+
+
+@gf.func_timer
+def typical_days(
+    mdf: cld.MetaAndDfs,
+    frame: Literal["df", "df_h"] = "df",
+    columns: list[str] | None = None,
+    group_by: tuple[GroupKey, ...] = ("Jahr", "Monat", "Tagtyp"),
+    percentiles: tuple[float, ...] = (10, 90),
+) -> pl.DataFrame:
+    """Typtage (mittlere Tagesprofile) berechnen
+
+    Alle vollständigen Tage werden in ein Array (Tage, Zeitschritte, Spalten)
+    gebracht, einmal nach Gruppe sortiert und dann je Gruppe
+    über die Tage reduziert (Mittelwert, Median, Perzentile).
+
+    Args:
+        - mdf (cld.MetaAndDfs): Data Frames und Metadaten
+        - frame (Literal["df", "df_h"]): zu verwendender Data Frame
+        - columns (list[str] | None): Spalten (Standard: alle Linien)
+        - group_by (tuple[GroupKey, ...]): Gruppierung nach
+            "Jahr", "Monat" und / oder "Tagtyp"
+        - percentiles (tuple[float, ...]): zusätzliche Perzentile
+
+    Returns:
+        - pl.DataFrame: "lange" Tabelle mit einer Zeile pro Gruppe,
+            Kennwert und Zeitschritt des Bezugstags
+
+    """
+
+    df: pl.DataFrame | None = getattr(mdf, frame)
+    if df is None:
+        raise cle.NotFoundError(entry=frame, where="mdf")
+
+    index: cld.DayIndex = get_day_index(mdf, frame)
+    cols: list[str] = columns or [
+        col
+        for col in df.columns
+        if gf.check_if_not_exclude(col) and df.schema[col].is_numeric()
+    ]
+    days, cube = day_cube(df, index, cols)
+    if days.is_empty():
+        raise cle.NotFoundError(entry="complete days", where=f"mdf.{frame}")
+
+    # Gruppen-Code je Tag (gemischte Basis aus den Gruppierungs-Spalten)
+    keys: pl.DataFrame = days.select(list(group_by))
+    codes: np.ndarray = np.zeros(days.height, dtype=np.int64)
+    for key in group_by:
+        if key == "Tagtyp":
+            values: np.ndarray = (
+                keys.get_column(key)
+                .replace_strict(cont.DAY_TYPES.list_all(), [0, 1, 2])
+                .to_numpy()
+            )
+        else:
+            values = keys.get_column(key).to_numpy().astype(np.int64)
+            values = values - values.min()
+        codes = codes * (int(values.max()) + 1) + values
+
+    order: np.ndarray = np.argsort(codes, kind="stable")
+    cube_sorted: np.ndarray = cube[order]
+    _, starts, counts = np.unique(codes[order], return_index=True, return_counts=True)
+
+    stat_names: list[str] = [
+        cont.TYPICAL_DAY_STATS["mean"],
+        cont.TYPICAL_DAY_STATS["median"],
+        *[f"P{perc:g}" for perc in percentiles],
+    ]
+    quantiles: list[float] = [50, *percentiles]
+
+    # (Gruppen, Kennwerte, Zeitschritte, Spalten)
+    result: np.ndarray = np.empty(
+        (len(starts), len(stat_names), index.steps_per_day, len(cols))
+    )
+    with np.errstate(all="ignore"):
+        for grp, (start, count) in enumerate(zip(starts, counts, strict=True)):
+            segment: np.ndarray = cube_sorted[start : start + count]
+            result[grp, 0] = np.nanmean(segment, axis=0)
+            result[grp, 1:] = np.nanpercentile(segment, quantiles, axis=0)
+
+    n_groups, n_stats, steps = result.shape[:3]
+    td: dt.timedelta = dt.timedelta(minutes=cont.TimeMinutesIn.day // steps)
+    group_keys: pl.DataFrame = keys[order[starts]]
+
+    typ_days: pl.DataFrame = pl.concat(
+        [
+            group_keys.select(pl.all().repeat_by(n_stats * steps).explode()),
+            pl.DataFrame(
+                {
+                    "Kennwert": np.tile(np.repeat(stat_names, steps), n_groups),
+                    "Anzahl Tage": np.repeat(counts, n_stats * steps),
+                    COL_IND: np.tile(
+                        np.array(
+                            [REFERENCE_DAY + td * step for step in range(steps)],
+                            dtype="datetime64[us]",
+                        ),
+                        n_groups * n_stats,
+                    ),
+                }
+            ),
+            pl.DataFrame(
+                result.reshape(-1, len(cols)),
+                schema=cols,
+                orient="row",
+            ),
+        ],
+        how="horizontal",
+    )
+
+    logger.success(
+        f"Typical days calculated: {n_groups} groups, "
+        f"{days.height} complete days, {len(cols)} columns"
+    )
+
+    return typ_days
@@ -0,0 +1,479 @@
+"""Gradtagzahlen, Energiesignatur und Witterungsbereinigung
+
+- Gradtagzahl G20/15 nach VDI 3807 aus der Außentemperatur
+    (die mit 'add_temperature_data' an die Daten gehängt wird)
+- Energiesignatur: Tagesverbrauch = Grundlast + Steigung * max(Änderungspunkt - T, 0)
+    Der Änderungspunkt wird aus cont.CHANGE_POINT_CANDIDATES gesucht -
+    für alle Linien, Jahre und Kandidaten gleichzeitig in NumPy-Arrays.
+- Witterungsbereinigung mit der langjährigen Gradtagzahl am Standort
+    (Tagesmitteltemperaturen vom DWD, lokal als parquet gespeichert)
+"""
+
+import datetime as dt
+import pathlib
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+COL_TEMP: str = cont.DWD_PARAM_TRANSLATION["temperature_air_mean_2m"]
+COL_DEGREE_DAYS: str = "Gradtagzahl"
+DAYS_IN_LEAP_YEAR: int = 366
+MIN_DAYS_FOR_FIT: int = 14
+
+
+def energy_columns(mdf: cld.MetaAndDfs) -> list[str]:
+    """Linien mit Arbeits- oder Leistungseinheit (Wärme, Strom, Gas, ...)
+
+    Leistungs-Spalten, die aus 15-Minuten-Arbeitswerten erzeugt wurden
+    (Suffix " → Leistung"), werden übersprungen - die Arbeit ist schon dabei.
+    """
+
+    units: list[str] = [
+        *cont.ARBEIT_LEISTUNG.arbeit.possible_units,
+        *cont.ARBEIT_LEISTUNG.leistung.possible_units,
+    ]
+    return [
+        col
+        for col in mdf.df.columns
+        if gf.check_if_not_exclude(col)
+        and col != COL_TEMP
+        and not col.endswith(cont.Suffixes.col_leistung)
+        and (line := mdf.meta.lines.get(col)) is not None
+        and (line.unit or "").strip() in units
+    ]
+
+
+def degree_days_expr(
+    temp: pl.Expr,
+    indoor: float = cont.DEGREE_DAY_INDOOR,
+    heating_limit: float = cont.DEGREE_DAY_HEATING_LIMIT,
+) -> pl.Expr:
+    """Gradtagzahl eines Tages aus der Tagesmitteltemperatur"""
+
+    return pl.when(temp < heating_limit).then(indoor - temp).otherwise(0.0)
+
+
+def daily_values(
+    df: pl.DataFrame,
+    columns: list[str],
+    lines: dict[str, cld.MetaLine],
+    temp_col: str = COL_TEMP,
+) -> pl.DataFrame:
+    """Tagesmitteltemperatur und Tagesverbrauch
+
+    Arbeitswerte werden je Tag summiert,
+    Leistungswerte gemittelt und mit 24 h multipliziert.
+
+    Args:
+        - df (pl.DataFrame): Data Frame mit Index, Außentemperatur und Linien
+        - columns (list[str]): Linien
+        - lines (dict[str, cld.MetaLine]): Metadaten der Linien (Einheiten)
+        - temp_col (str): Spalte mit der Außentemperatur
+
+    Returns:
+        - pl.DataFrame: "Datum", "Jahr", Außentemperatur und Tagesverbrauch je Linie
+
+    """
+
+    for col in [COL_IND, temp_col, *columns]:
+        if col not in df.columns:
+            raise cle.NotFoundError(entry=col, where="data frame columns")
+
+    def daily(col: str) -> pl.Expr:
+        unit: str = (lines[col].unit or "").strip()
+        if unit in cont.ARBEIT_LEISTUNG.leistung.possible_units:
+            return (pl.col(col).mean() * cont.TimeHoursIn.day).alias(col)
+        return pl.col(col).sum().alias(col)
+
+    return (
+        df.lazy()
+        .sort(COL_IND)
+        .group_by_dynamic(COL_IND, every="1d")
+        .agg(pl.col(temp_col).mean(), *[daily(col) for col in columns])
+        .with_columns(
+            pl.col(COL_IND).dt.date().alias("Datum"),
+            pl.col(COL_IND).dt.year().alias("Jahr"),
+        )
+        .drop(COL_IND)
+        .collect()
+    )
+
+
+def degree_days(
+    daily: pl.DataFrame,
+    temp_col: str = COL_TEMP,
+    indoor: float = cont.DEGREE_DAY_INDOOR,
+    heating_limit: float = cont.DEGREE_DAY_HEATING_LIMIT,
+) -> pl.DataFrame:
+    """Gradtagzahl, Heiztage und mittlere Außentemperatur je Monat"""
+
+    return (
+        daily.with_columns(
+            pl.col("Datum").dt.month().alias("Monat"),
+            degree_days_expr(pl.col(temp_col), indoor, heating_limit).alias(
+                COL_DEGREE_DAYS
+            ),
+        )
+        .group_by("Jahr", "Monat")
+        .agg(
+            pl.col(COL_DEGREE_DAYS).sum(),
+            (pl.col(temp_col) < heating_limit).sum().alias("Heiztage"),
+            pl.col(temp_col).mean().alias("mittlere Außentemperatur"),
+        )
+        .sort("Jahr", "Monat")
+    )
+
+
+def day_matrix(daily: pl.DataFrame, col: str, years: list[int]) -> np.ndarray:
+    """Werte einer Spalte als Matrix (Jahr x Tag des Jahres, fehlende Tage = NaN)"""
+
+    matrix: np.ndarray = np.full((len(years), DAYS_IN_LEAP_YEAR), np.nan)
+    rows: np.ndarray = (
+        daily.get_column("Jahr").replace(years, range(len(years))).to_numpy()
+    )
+    days: np.ndarray = daily.get_column("Datum").dt.ordinal_day().to_numpy() - 1
+    matrix[rows, days] = daily.get_column(col).cast(pl.Float64).to_numpy()
+    return matrix
+
+
+def fit_change_point(
+    temp: np.ndarray, load: np.ndarray, candidates: np.ndarray
+) -> dict[str, np.ndarray]:
+    """Energiesignatur mit Änderungspunkt für viele Reihen gleichzeitig
+
+    Für jede Reihe und jeden Kandidaten wird die Ausgleichsgerade
+    load = a + b * max(cp - temp, 0) geschlossen berechnet,
+    je Reihe gewinnt der Kandidat mit der kleinsten Fehlerquadratsumme
+    (nur Steigungen >= 0, also Heizen).
+
+    Args:
+        - temp (np.ndarray): Temperaturen (Reihen x Tage, NaN = fehlt)
+        - load (np.ndarray): Tagesverbrauch (Reihen x Tage, NaN = fehlt)
+        - candidates (np.ndarray): Kandidaten für den Änderungspunkt
+
+    Returns:
+        - dict[str, np.ndarray]: je Reihe "base" (a), "slope" (b), "change_point",
+            "r2" und "days" (Anzahl der Tage mit Werten)
+
+    """
+
+    valid: np.ndarray = ~(np.isnan(temp) | np.isnan(load))
+    weights: np.ndarray = valid[:, None, :].astype(float)
+    days: np.ndarray = valid.sum(axis=1)
+    count: np.ndarray = np.maximum(days, 1)[:, None]
+
+    x: np.ndarray = np.maximum(
+        candidates[None, :, None] - np.nan_to_num(temp)[:, None, :], 0
+    )
+    y: np.ndarray = np.nan_to_num(load)[:, None, :]
+
+    x_mean: np.ndarray = (x * weights).sum(axis=2) / count
+    y_mean: np.ndarray = (y * weights).sum(axis=2) / count  # je Reihe, ohne Kandidat
+    x_dev: np.ndarray = (x - x_mean[..., None]) * weights
+    y_dev: np.ndarray = (y - y_mean[..., None]) * valid[:, None, :]
+    s_xx: np.ndarray = (x_dev**2).sum(axis=2)
+    s_xy: np.ndarray = (x_dev * y_dev).sum(axis=2)
+    s_yy: np.ndarray = (y_dev**2).sum(axis=2)
+
+    slope: np.ndarray = np.divide(s_xy, s_xx, out=np.zeros_like(s_xy), where=s_xx > 0)
+    sse: np.ndarray = np.where((slope > 0) & (s_xx > 0), s_yy - slope * s_xy, np.inf)
+
+    rows: np.ndarray = np.arange(len(temp))
+    best: np.ndarray = sse.argmin(axis=1)
+    heating: np.ndarray = np.isfinite(sse[rows, best]) & (days >= MIN_DAYS_FOR_FIT)
+
+    slope_best: np.ndarray = np.where(heating, slope[rows, best], 0.0)
+    base: np.ndarray = np.where(
+        heating,
+        y_mean[:, 0] - slope_best * x_mean[rows, best],
+        y_mean[:, 0],
+    )
+    s_yy_best: np.ndarray = s_yy[:, 0]
+    r2: np.ndarray = np.where(
+        heating & (s_yy_best > 0),
+        1 - sse[rows, best] / np.where(s_yy_best > 0, s_yy_best, 1),
+        np.nan,
+    )
+
+    return {
+        "base": np.where(days >= MIN_DAYS_FOR_FIT, base, np.nan),
+        "slope": np.where(days >= MIN_DAYS_FOR_FIT, slope_best, np.nan),
+        "change_point": np.where(heating, candidates[best], np.nan),
+        "r2": r2,
+        "days": days,
+    }
+
+
+@gf.func_timer
+def fit_signatures(
+    daily: pl.DataFrame,
+    columns: list[str],
+    temp_col: str = COL_TEMP,
+    candidates: tuple[float, ...] = cont.CHANGE_POINT_CANDIDATES,
+) -> pl.DataFrame:
+    """Energiesignatur je Linie und Jahr (alle gleichzeitig)
+
+    Args:
+        - daily (pl.DataFrame): Tageswerte aus 'daily_values'
+        - columns (list[str]): Linien
+        - temp_col (str): Spalte mit der Tagesmitteltemperatur
+        - candidates (tuple[float, ...]): Kandidaten für den Änderungspunkt
+
+    Returns:
+        - pl.DataFrame: "Linie", "Jahr", "Grundlast" (pro Tag),
+            "Steigung" (pro Kelvin und Tag), "Änderungspunkt", "Bestimmtheitsmaß",
+            "Tage"
+
+    """
+
+    years: list[int] = sorted(daily.get_column("Jahr").unique().to_list())
+    temp: np.ndarray = day_matrix(daily, temp_col, years)
+    load: np.ndarray = np.concatenate(
+        [day_matrix(daily, col, years) for col in columns]
+    )
+
+    fit: dict[str, np.ndarray] = fit_change_point(
+        np.tile(temp, (len(columns), 1)), load, np.asarray(candidates, dtype=float)
+    )
+
+    return pl.DataFrame(
+        {
+            "Linie": np.repeat(columns, len(years)),
+            "Jahr": np.tile(years, len(columns)),
+            "Grundlast": fit["base"],
+            "Steigung": fit["slope"],
+            "Änderungspunkt": fit["change_point"],
+            "Bestimmtheitsmaß": fit["r2"],
+            "Tage": fit["days"],
+        }
+    ).with_columns(
+        pl.col("Jahr").cast(daily.schema["Jahr"]), pl.col(pl.Float64).fill_nan(None)
+    )
+
+
+def reference_cache_path(location: cld.Location, start: int, end: int) -> pathlib.Path:
+    """Datei im lokalen Speicher für die Tagesmitteltemperaturen eines Standorts"""
+
+    return (
+        cont.DWD_CACHE_DIR
+        / "reference"
+        / f"temperature_daily_{location.latitude:.3f}_{location.longitude:.3f}"
+        f"_{start}_{end}.parquet"
+    )
+
+
+@gf.func_timer
+def reference_temperatures(
+    location: cld.Location,
+    last_year: int | None = None,
+    years: int = cont.DEGREE_DAY_REFERENCE_YEARS,
+) -> pl.DataFrame:
+    """Tagesmitteltemperaturen der nächstgelegenen DWD-Station (langjährig)
+
+    Die Daten werden einmal heruntergeladen und lokal gespeichert,
+    weitere Aufrufe für den gleichen Standort und Zeitraum lesen nur die Datei.
+
+    Args:
+        - location (cld.Location): Standort (mit Koordinaten)
+        - last_year (int | None): letztes Jahr des Zeitraums
+            (Standard: letztes vollständiges Jahr)
+        - years (int): Anzahl der Jahre
+
+    Returns:
+        - pl.DataFrame: "Datum" und Tagesmitteltemperatur
+
+    """
+
+    if location.latitude is None or location.longitude is None:
+        raise cle.NotFoundError(entry="coordinates", where="location")
+
+    last: int = last_year or dt.date.today().year - 1
+    first: int = last - years + 1
+    path: pathlib.Path = reference_cache_path(location, first, last)
+    if path.exists():
+        logger.info(f"Reference temperatures taken from cache '{path.name}'")
+        return pl.read_parquet(path)
+
+    param: cld.DWDParam = cld.DWDParam(
+        "temperature_air_mean_2m",
+        location,
+        cld.TimeSpan(dt.datetime(first, 1, 1), dt.datetime(last, 12, 31, 23, 59)),
+    ).fill_specific_resolution("daily")
+    data: pl.DataFrame = param.resolutions.daily.data
+    if data.is_empty():
+        raise cle.NotFoundError(entry="reference temperatures", where="DWD")
+
+    df_ref: pl.DataFrame = data.select(
+        pl.col("date").dt.replace_time_zone(None).dt.date().alias("Datum"),
+        pl.col("value").alias(COL_TEMP),
+    ).sort("Datum")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df_ref.write_parquet(path)
+    logger.info(f"Reference temperatures saved to '{path.name}'")
+
+    return df_ref
+
+
+def climatology(
+    df_ref: pl.DataFrame,
+    temp_col: str = COL_TEMP,
+    indoor: float = cont.DEGREE_DAY_INDOOR,
+    heating_limit: float = cont.DEGREE_DAY_HEATING_LIMIT,
+) -> pl.DataFrame:
+    """Mittlere Gradtagzahl je Tag des Jahres aus langjährigen Tageswerten"""
+
+    return (
+        df_ref.group_by(pl.col("Datum").dt.ordinal_day().alias("Tag"))
+        .agg(
+            degree_days_expr(pl.col(temp_col), indoor, heating_limit)
+            .mean()
+            .alias(COL_DEGREE_DAYS)
+        )
+        .sort("Tag")
+    )
+
+
+def normalise(
+    daily: pl.DataFrame,
+    signatures: pl.DataFrame,
+    reference: pl.DataFrame,
+    columns: list[str],
+    settings: cld.DegreeDaySettings | None = None,
+) -> pl.DataFrame:
+    """Witterungsbereinigter Verbrauch je Linie und Jahr (VDI 3807)
+
+    Der Verbrauch wird in Grundlast (aus der Energiesignatur) und Heizanteil
+    geteilt, nur der Heizanteil wird mit dem Verhältnis der langjährigen
+    zur tatsächlichen Gradtagzahl (gleiche Kalendertage) skaliert.
+
+    Args:
+        - daily (pl.DataFrame): Tageswerte aus 'daily_values'
+        - signatures (pl.DataFrame): Energiesignaturen aus 'fit_signatures'
+        - reference (pl.DataFrame): mittlere Gradtagzahl je Tag ('climatology')
+        - columns (list[str]): Linien
+        - settings (cld.DegreeDaySettings | None): Raumtemperatur,
+            Heizgrenze und Temperaturspalte (Standard: VDI 3807)
+
+    Returns:
+        - pl.DataFrame: Verbrauch, Grundlast, Heizanteil, Gradtagzahlen
+            und bereinigter Verbrauch je Linie und Jahr
+
+    """
+
+    settings = settings or cld.DegreeDaySettings()
+    temp_col: str = settings.temp_col
+    days: pl.DataFrame = daily.with_columns(
+        degree_days_expr(
+            pl.col(temp_col), settings.indoor, settings.heating_limit
+        ).alias(COL_DEGREE_DAYS),
+        pl.col("Datum").dt.ordinal_day().alias("Tag"),
+    ).join(reference.rename({COL_DEGREE_DAYS: "Referenz"}), on="Tag", how="left")
+
+    per_column: list[pl.DataFrame] = [
+        days.filter(pl.col(col).is_not_null() & pl.col(temp_col).is_not_null())
+        .group_by("Jahr")
+        .agg(
+            pl.col(col).sum().alias("Verbrauch"),
+            pl.len().alias("Tage"),
+            pl.col(COL_DEGREE_DAYS).sum(),
+            pl.col("Referenz").sum().alias("Gradtagzahl Referenz"),
+        )
+        .with_columns(pl.lit(col).alias("Linie"))
+        for col in columns
+    ]
+
+    return (
+        pl.concat(per_column)
+        .join(
+            signatures.select("Linie", "Jahr", "Grundlast"),
+            on=["Linie", "Jahr"],
+            how="left",
+        )
+        .with_columns(
+            (pl.col("Grundlast").fill_null(0) * pl.col("Tage")).alias("Grundlast")
+        )
+        .with_columns((pl.col("Verbrauch") - pl.col("Grundlast")).alias("Heizanteil"))
+        .with_columns(
+            (
+                pl.col("Grundlast")
+                + pl.when(pl.col(COL_DEGREE_DAYS) > 0)
+                .then(
+                    pl.col("Heizanteil")
+                    * pl.col("Gradtagzahl Referenz")
+                    / pl.col(COL_DEGREE_DAYS)
+                )
+                .otherwise(pl.col("Heizanteil"))
+            ).alias("Verbrauch bereinigt")
+        )
+        .select(
+            "Linie",
+            "Jahr",
+            "Tage",
+            "Verbrauch",
+            "Grundlast",
+            "Heizanteil",
+            COL_DEGREE_DAYS,
+            "Gradtagzahl Referenz",
+            "Verbrauch bereinigt",
+        )
+        .sort("Linie", "Jahr")
+    )
+
+
+@gf.func_timer
+def climate_report(
+    mdf: cld.MetaAndDfs,
+    columns: list[str] | None = None,
+    location: cld.Location | None = None,
+    *,
+    indoor: float = cont.DEGREE_DAY_INDOOR,
+    heating_limit: float = cont.DEGREE_DAY_HEATING_LIMIT,
+) -> cld.ClimateReport:
+    """Gradtagzahlen, Energiesignaturen und (mit Standort) Witterungsbereinigung
+
+    Das Ergebnis wird in mdf.climate gespeichert.
+
+    Args:
+        - mdf (cld.MetaAndDfs): Daten mit Außentemperatur
+        - columns (list[str] | None): Linien (Standard: 'energy_columns')
+        - location (cld.Location | None): Standort für die langjährige Referenz
+        - indoor (float): Raumtemperatur der Gradtagzahl
+        - heating_limit (float): Heizgrenztemperatur
+
+    Returns:
+        - cld.ClimateReport: Ergebnis
+
+    """
+
+    cols: list[str] = columns or energy_columns(mdf)
+    daily: pl.DataFrame = daily_values(mdf.df, cols, mdf.meta.lines)
+    signatures: pl.DataFrame = fit_signatures(daily, cols)
+
+    normalised: pl.DataFrame | None = None
+    if location is not None:
+        reference: pl.DataFrame = climatology(
+            reference_temperatures(location), indoor=indoor, heating_limit=heating_limit
+        )
+        normalised = normalise(
+            daily,
+            signatures,
+            reference,
+            cols,
+            cld.DegreeDaySettings(indoor=indoor, heating_limit=heating_limit),
+        )
+
+    mdf.climate = cld.ClimateReport(
+        degree_days=degree_days(daily, indoor=indoor, heating_limit=heating_limit),
+        signatures=signatures,
+        normalised=normalised,
+        columns=cols,
+    )
+    return mdf.climate
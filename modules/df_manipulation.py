@@ -4,8 +4,11 @@
 import datetime as dt
 import functools
 import operator
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Literal, cast
 
+import numpy as np
 import polars as pl
 from loguru import logger
 from scipy import interpolate
@@ -13,6 +16,8 @@ from scipy import interpolate
 from modules import classes_data as cld
 from modules import classes_errors as cle
 from modules import constants as cont
+from modules import data_quality as dq
+from modules import day_profiles as dp
 from modules import general_functions as gf
 from modules import meteorolog as met
 from modules import setup_logger as slog
@@ -88,31 +93,36 @@ def fix_am_pm(df: pl.DataFrame, time_column: str = "Zeitstempel") -> pl.DataFram
 
 
 def interpolate_where_no_diff(
-    df: pl.DataFrame, columns_to_inspect: list[str] | None = None
+    df: pl.DataFrame, columns_to_inspect: list[str] | None = None, min_run: int = 2
 ) -> pl.DataFrame:
-    """Create gaps where the values don't change and interpolate using Akima"""
+    """Create gaps where the values don't change and interpolate using Akima
+
+    Nur Werte, die sich über mindestens 'min_run' Zeitschritte nicht ändern,
+    werden entfernt und nur die untersuchten Spalten werden interpoliert.
+    """
 
     if COL_IND not in df.columns:
         raise cle.NotFoundError(entry=COL_IND, where="data frame columns")
 
-    cols: list[str] = columns_to_inspect or df.columns
+    cols: list[str] = [
+        col
+        for col in columns_to_inspect or df.columns
+        if COL_IND not in col and df.schema[col].is_numeric()
+    ]
 
     df = df.with_columns(
-        pl.when(pl.col(col).diff() == 0).then(None).otherwise(pl.col(col)).keep_name()
-        for col in cols
-    )
-
-    no_nulls: pl.DataFrame = df.drop_nulls()
-    index: pl.Series = no_nulls[COL_IND]
-    return df.with_columns(
-        pl.Series(
-            col,
-            interpolate.Akima1DInterpolator(x=index, y=no_nulls[col])(df[COL_IND]),
+        pl.when(
+            dq.stuck_run_length(col) >= min_run,
+            pl.col(col).diff() == 0,
         )
+        .then(None)
+        .otherwise(pl.col(col))
+        .name.keep()
         for col in cols
-        if COL_IND not in col and any(df[col].is_null())
     )
 
+    return interpolate_missing_data_akima(df, COL_IND, cols)
+
 
 def upsample_hourly_to_15min(
     df: pl.DataFrame, units: dict[str, str], index_column: str | None = None
@@ -154,9 +164,27 @@ def upsample_hourly_to_15min(
 
 
 def interpolate_missing_data_akima(
-    df: pl.DataFrame, index_column: str | None = None
+    df: pl.DataFrame,
+    index_column: str | None = None,
+    columns: list[str] | None = None,
 ) -> pl.DataFrame:
-    """Interpolate missing data"""
+    """Interpolate missing data
+
+    Jede Spalte wird mit ihren eigenen vorhandenen Werten interpoliert
+    (eine Lücke in einer Spalte entfernt keine Stützstellen der anderen).
+    Lücken am Anfang und Ende bleiben leer.
+
+    Args:
+        - df (pl.DataFrame): Data Frame mit Lücken (null)
+        - index_column (str | None): Zeitspalte. Default: COL_IND
+        - columns (list[str] | None): zu interpolierende Spalten.
+            Default: alle numerischen Spalten mit Lücken
+
+    Returns:
+        - pl.DataFrame: sortierter Data Frame mit interpolierten Lücken
+            (interpolierte Ganzzahl-Spalten als Float64)
+
+    """
 
     col_index: str = index_column or cont.SpecialCols.index
     if col_index not in df.columns:
@@ -164,32 +192,119 @@ def interpolate_missing_data_akima(
     if not df[col_index].dtype.is_temporal():
         raise TypeError
 
+    df = df.sort(col_index)
     cols: list[str] = [
         col
-        for col in df.columns
+        for col in columns or df.columns
         if col_index not in col
-        and any(df[col].is_null())
         and df[col].dtype.is_numeric()
+        and df[col].null_count() > 0
     ]
 
-    no_nulls: pl.DataFrame = df.drop_nulls()
-    index: pl.Series = no_nulls[col_index]
-    return df.sort(col_index).with_columns(
-        pl.Series(
-            col,
-            interpolate.Akima1DInterpolator(x=index, y=no_nulls[col])(df[col_index]),
+    x_all: np.ndarray = df.get_column(col_index).to_physical().to_numpy()
+    interpolated: list[pl.Series] = []
+    for col in cols:
+        values: pl.Series = df.get_column(col)
+        mask: np.ndarray = values.is_not_null().to_numpy()
+        if mask.sum() < 2:  # noqa: PLR2004
+            continue
+        y: np.ndarray = interpolate.Akima1DInterpolator(
+            x=x_all[mask], y=values.to_numpy()[mask].astype(np.float64)
+        )(x_all)
+        # Ganzzahl-Spalten werden Float64 (nicht abschneiden)
+        interpolated.append(
+            pl.Series(col, y)
+            .fill_nan(None)
+            .cast(values.dtype if values.dtype.is_float() else pl.Float64)
         )
-        for col in cols
+
+    return df.with_columns(interpolated)
+
+
+def align_time_weighted(
+    index: pl.Series, df_data: pl.DataFrame, columns: list[str] | None = None
+) -> pl.DataFrame:
+    """Werte eines anderen Data Frames (z.B. DWD-Daten) an einen Zeitindex anpassen
+
+    Für jeden Zeitpunkt im Index wird per 'join_asof' der vorherige und der
+    nächste Wert gesucht und zeitgewichtet linear interpoliert.
+    Vor dem ersten bzw. nach dem letzten Wert wird der Randwert verwendet.
+    Beide Data Frames werden dabei nur einmal sortiert durchlaufen
+    (kein "outer join" über alle Zeitpunkte).
+
+    Args:
+        - index (pl.Series): sortierter Zeitindex, an den angepasst wird
+        - df_data (pl.DataFrame): Daten mit Spalte COL_IND
+        - columns (list[str] | None): anzupassende Spalten (Standard: alle)
+
+    Returns:
+        - pl.DataFrame: Spalte COL_IND (= index) und die angepassten Spalten
+            (gleiche Reihenfolge und Länge wie der Index)
+
+    """
+
+    cols: list[str] = columns or [col for col in df_data.columns if col != COL_IND]
+    col_prev: str = "time_prev"
+    col_next: str = "time_next"
+
+    data: pl.LazyFrame = (
+        df_data.lazy()
+        .select(pl.col(COL_IND).cast(index.dtype), *cols)
+        .drop_nulls(subset=cols)
+        .sort(COL_IND)
+    )
+    prev: pl.LazyFrame = data.select(
+        pl.col(COL_IND).alias(col_prev), pl.col(cols).name.suffix("_prev")
+    )
+    nxt: pl.LazyFrame = data.select(
+        pl.col(COL_IND).alias(col_next), pl.col(cols).name.suffix("_next")
+    )
+
+    since_prev: pl.Expr = (pl.col(COL_IND) - pl.col(col_prev)).dt.total_microseconds()
+    span: pl.Expr = (pl.col(col_next) - pl.col(col_prev)).dt.total_microseconds()
+
+    return (
+        index.alias(COL_IND)
+        .to_frame()
+        .lazy()
+        .join_asof(prev, left_on=COL_IND, right_on=col_prev, strategy="backward")
+        .join_asof(nxt, left_on=COL_IND, right_on=col_next, strategy="forward")
+        .with_columns((since_prev / span).alias("weight"))
+        .select(
+            pl.col(COL_IND),
+            *[
+                pl.when(pl.col(col_prev).is_null())
+                .then(pl.col(f"{col}_next"))
+                .when(pl.col(col_next).is_null() | (span == 0))
+                .then(pl.col(f"{col}_prev"))
+                .otherwise(
+                    pl.col(f"{col}_prev")
+                    + (pl.col(f"{col}_next") - pl.col(f"{col}_prev")) * pl.col("weight")
+                )
+                .alias(col)
+                for col in cols
+            ],
+        )
+        .collect()
     )
 
 
 @gf.func_timer
 def add_temperature_data(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
-    """Add air temperature for given address to the base data frame"""
+    """Add air temperature for given address to the base data frame
+
+    Die Wetterdaten werden mit 'align_time_weighted' an den Index der Daten
+    angepasst. Die Spalten der hochgeladenen Datei bleiben unverändert.
+    """
 
     sf.s_set("selected_params", ["temperature_air_mean_2m"])
     parameters: list[cld.DWDParam] = met.meteo_df_for_temp_in_graph(mdf)
 
+    index: pl.Series = mdf.df.get_column(COL_IND)
+    if not index.is_sorted():
+        mdf.df = mdf.df.sort(COL_IND)
+        index = mdf.df.get_column(COL_IND)
+
     for param in parameters:
         if param.closest_available_res is None:
             raise ValueError
@@ -197,19 +312,11 @@ def add_temperature_data(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
         df_parameter: pl.DataFrame | None = param.closest_available_res.data
         if df_parameter is None:
             continue
-        mdf.df = (
-            mdf.df.join(
-                mdf.df.select(cont.SpecialCols.index)
-                .join(df_parameter, on=cont.SpecialCols.index, how="outer_coalesce")
-                .sort(cont.SpecialCols.index)
-                .interpolate(),
-                on=cont.SpecialCols.index,
-                join_nulls=True,
-            )
-            .fill_null(strategy="forward")
-            .fill_null(strategy="backward")
-        )
+
         par_nam: str = param.name_de
+        aligned: pl.DataFrame = align_time_weighted(index, df_parameter, [par_nam])
+        mdf.df = mdf.df.with_columns(aligned.get_column(par_nam))
+
         mdf.meta.lines[par_nam] = cld.MetaLine(
             name=par_nam,
             name_orgidx=f"{par_nam} - {cont.Suffixes.col_original_index}",
@@ -218,18 +325,16 @@ def add_temperature_data(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
             unit=param.unit,
             unit_h=param.unit.strip("h"),
         )
+        logger.debug(
+            f"mdf.df['{par_nam}'].null_count(): {mdf.df[par_nam].null_count()}"
+        )
+
     logger.info(
         gf.string_new_line_per_item(
             mdf.df.columns, "mdf.df.columns after adding weather data:"
         )
     )
 
-    logger.debug(
-        f"mdf.df['Lufttemperatur'].null_count(): "
-        f"{mdf.df['Lufttemperatur'].null_count()}"
-    )
-    logger.debug(mdf.df.filter(pl.col("Lufttemperatur").is_null()))
-
     return mdf
 
 
@@ -265,20 +370,10 @@ def split_multi_years(
 
     df_multi: dict[int, pl.DataFrame] = {}
     for year in mdf.meta.years:
-        col_rename: dict[str, str] = multi_year_column_rename(df, year)
-        for old_name, new_name in col_rename.items():
-            if new_name not in mdf.meta.lines:
-                mdf.meta.lines[new_name] = mdf.meta.copy_line(old_name, new_name)
-
-        df_multi[year] = (
-            df.filter(pl.col(COL_IND).dt.year() == year)
-            .with_columns(
-                pl.col(COL_IND)
-                .dt.strftime("2020-%m-%d %H:%M:%S")
-                .str.strptime(pl.Datetime),
-            )
-            .rename(col_rename)
+        df_multi[year], col_rename = split_year(
+            df.filter(pl.col(COL_IND).dt.year() == year), year
         )
+        copy_lines_for_renamed_columns(mdf.meta, col_rename)
 
     for year, df in df_multi.items():
         logger.success(f"DataFrame for Year {year}:")
@@ -294,6 +389,47 @@ def split_multi_years(
     return mdf
 
 
+def to_reference_year(col: str = COL_IND) -> pl.Expr:
+    """Zeitspalte auf das Schaltjahr 2020 legen (Monat, Tag und Uhrzeit bleiben)"""
+
+    time: pl.Expr = pl.col(col)
+    return pl.datetime(
+        2020,
+        time.dt.month(),
+        time.dt.day(),
+        time.dt.hour(),
+        time.dt.minute(),
+        time.dt.second(),
+    ).alias(col)
+
+
+def split_year(df_year: pl.DataFrame, year: int) -> tuple[pl.DataFrame, dict[str, str]]:
+    """Data Frame eines Jahres für die Darstellung mehrerer Jahre übereinander
+
+    Args:
+        - df_year (pl.DataFrame): Daten eines Jahres
+        - year (int): Jahr
+
+    Returns:
+        - tuple[pl.DataFrame, dict[str, str]]: Data Frame mit Zeitspalte im Jahr 2020
+            und Jahreszahl im Spaltennamen, Zuordnung alte -> neue Spaltennamen
+
+    """
+
+    col_rename: dict[str, str] = multi_year_column_rename(df_year, year)
+    return df_year.with_columns(to_reference_year()).rename(col_rename), col_rename
+
+
+def copy_lines_for_renamed_columns(
+    meta: cld.MetaData, col_rename: dict[str, str]
+) -> None:
+    """MetaLines für umbenannte Spalten (z.B. mit Jahreszahl) anlegen"""
+
+    for old_name, new_name in col_rename.items():
+        if new_name not in meta.lines:
+            meta.lines[new_name] = meta.copy_line(old_name, new_name)
+
+
 def multi_year_column_rename(df: pl.DataFrame, year: int) -> dict[str, str]:
     """Renames columns in a DataFrame for multi-year data.
 
@@ -438,18 +574,20 @@ def change_temporal_resolution(
     return interpolate_missing_data_akima(df_join, time_col)
 
 
-@gf.func_timer
-def df_h_mdf(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
-    """Stundenwerte aus anderer zeitlicher Auflösung"""
+def hourly_values(df: pl.DataFrame) -> pl.DataFrame:
+    """Stundenwerte (Mittelwerte) ohne "Arbeit"-Spalten
+
+    Das Suffix " → Leistung" wird aus den Spaltennamen entfernt.
+    """
 
     cols: list[str] = [
-        col for col in mdf.df.columns if gf.check_if_not_exclude(col, "suff_arbeit")
+        col for col in df.columns if gf.check_if_not_exclude(col, "suff_arbeit")
     ]
 
-    mdf.df_h = (
+    return (
         pl.DataFrame(
             [
-                mdf.df.get_column(col).alias(
+                df.get_column(col).alias(
                     col.replace(cont.Suffixes.col_leistung, "").strip()
                 )
                 for col in [*cols, COL_ORG]
@@ -466,6 +604,13 @@ def df_h_mdf(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
         .with_columns(pl.col(COL_IND).alias(COL_ORG))
     )
 
+
+@gf.func_timer
+def df_h_mdf(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
+    """Stundenwerte aus anderer zeitlicher Auflösung"""
+
+    mdf.df_h = hourly_values(mdf.df)
+
     if mdf.meta.multi_years and sf.s_get("cb_multi_year"):
         mdf = split_multi_years(mdf, "df_h")
 
@@ -503,26 +648,9 @@ def jdl(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
     )
 
     if mdf.meta.multi_years and mdf.meta.years and mdf.df_h_multi:
-        jdl_separate_df: list[pl.DataFrame] = [
-            df.select(pl.col(col, COL_ORG))
-            .sort(col, descending=True)
-            .rename({col: col, COL_ORG: f"{col} - {COL_ORG}"})
-            for df in mdf.df_h_multi.values()
-            for col in df.columns
-            if gf.check_if_not_exclude(col)
-        ]
-        for df in jdl_separate_df:
-            if df.height < cont.TimeHoursIn.leap_year:
-                df.extend(
-                    pl.DataFrame(
-                        {
-                            col: [None] * (cont.TimeHoursIn.leap_year - df.height)
-                            for col in df.columns
-                        }
-                    ).cast(dict(df.schema))
-                )
         jdl_separate: list[list[pl.Series]] = [
-            df.get_columns() for df in jdl_separate_df
+            duration_curve_of_year(df).get_columns()
+            for df in mdf.df_h_multi.values()
         ]
     else:
         jdl_separate = [
@@ -544,36 +672,23 @@ def jdl(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
     return mdf
 
 
-@gf.func_timer
-def calculate_monthly_values(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
-    """Calculate monthly values from the input dataframe.
-
-    Args:
-        - mdf (cld.MetaAndDfs): The input MetaAndDfs object containing the dataframe.
-
-    Returns:
-        - cld.MetaAndDfs: Modified MetaAndDfs object with the monthly values dataframe.
-
-    Raises:
-        - ValueError: If the input dataframe is None.
+def monthly_values(df_h: pl.DataFrame, lines: dict[str, cld.MetaLine]) -> pl.DataFrame:
+    """Monatswerte aus Stundenwerten (Summe oder Mittelwert je nach Einheit)
 
+    Der Index wird auf den 15. des Monats gelegt, "orgidx" ist der Monatsanfang.
     """
 
-    mdf = mdf if isinstance(mdf.df_h, pl.DataFrame) else df_h_mdf(mdf)
-    if mdf.df_h is None:
-        raise ValueError
-
     cols_without_index: list[str] = [
-        col for col in mdf.df_h.columns if gf.check_if_not_exclude(col)
+        col for col in df_h.columns if gf.check_if_not_exclude(col)
     ]
 
-    mdf.mon = (
-        mdf.df_h.group_by_dynamic(COL_IND, every="1mo")
+    return (
+        df_h.group_by_dynamic(COL_IND, every="1mo")
         .agg(
             [
                 (
                     pl.col(col).mean()
-                    if (cont.GROUP_MEAN.check(mdf.meta.lines[col].unit, "mean_always"))
+                    if (cont.GROUP_MEAN.check(lines[col].unit, "mean_always"))
                     else pl.col(col).sum()
                 )
                 for col in cols_without_index
@@ -589,6 +704,189 @@ def calculate_monthly_values(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
         )
     )
 
+
+def duration_curve_of_year(df_h_year: pl.DataFrame) -> pl.DataFrame:
+    """Jahresdauerlinie eines Jahres (Spalten mit Jahreszahl aus split_year)
+
+    Jede Linie wird mit ihrer Zeitspalte absteigend sortiert und auf die Stunden
+    eines Schaltjahres aufgefüllt, damit die Jahre nebeneinander passen.
+    """
+
+    jdl_year: pl.DataFrame = pl.concat(
+        [
+            df_h_year.select(pl.col(col, COL_ORG))
+            .sort(col, descending=True)
+            .rename({COL_ORG: f"{col} - {COL_ORG}"})
+            for col in df_h_year.columns
+            if gf.check_if_not_exclude(col)
+        ],
+        how="horizontal",
+    )
+
+    missing: int = cont.TimeHoursIn.leap_year - jdl_year.height
+    if missing > 0:
+        jdl_year = jdl_year.extend(
+            pl.DataFrame({col: [None] * missing for col in jdl_year.columns}).cast(
+                dict(jdl_year.schema)
+            )
+        )
+
+    return jdl_year
+
+
+def derive_year(job: cld.YearJob) -> cld.YearDerivation:
+    """Stundenwerte, Monatswerte und Jahresdauerlinie eines Jahres
+
+    Wird in einem Thread ausgeführt: keine Zugriffe auf st.session_state
+    und keine Änderungen an gemeinsam genutzten Objekten (die MetaLines
+    werden nur gelesen).
+    """
+
+    df_h: pl.DataFrame = hourly_values(job.df_year)
+    df_h_split, col_rename = split_year(df_h, job.year)
+
+    derived: cld.YearDerivation = cld.YearDerivation(
+        year=job.year,
+        df_split=None,
+        df_h=df_h,
+        df_h_split=df_h_split,
+        col_rename=col_rename,
+    )
+
+    if job.split_df:
+        derived.df_split, rename_df = split_year(job.df_year, job.year)
+        derived.col_rename = rename_df | col_rename
+    if job.with_mon:
+        derived.mon = monthly_values(df_h, job.lines)
+        derived.mon_split = split_year(derived.mon, job.year)[0]
+    if job.with_jdl:
+        derived.jdl = duration_curve_of_year(df_h_split)
+
+    return derived
+
+
+@gf.func_timer
+def derive_multi_year(
+    mdf: cld.MetaAndDfs,
+    *,
+    with_jdl: bool = True,
+    with_mon: bool = True,
+    max_workers: int | None = None,
+) -> cld.MetaAndDfs:
+    """Mehrere Jahre: Stundenwerte, Monatswerte und Jahresdauerlinie je Jahr parallel
+
+    Die Daten werden einmal nach Jahren aufgeteilt. Die Berechnungen je Jahr
+    laufen in einem Thread-Pool (Polars gibt den GIL während der Berechnungen
+    frei). Die Ergebnisse werden danach zu df_h / df_h_multi, mon / mon_multi
+    und der Jahresdauerlinie mit allen Jahren zusammengesetzt.
+
+    Args:
+        - mdf (cld.MetaAndDfs): Data Frames und Metadaten
+        - with_jdl (bool): Jahresdauerlinie berechnen
+        - with_mon (bool): Monatswerte berechnen
+        - max_workers (int | None): Anzahl Threads (Standard: Jahre / Prozessoren)
+
+    Returns:
+        - cld.MetaAndDfs: mdf mit den abgeleiteten Data Frames
+
+    """
+
+    if not mdf.meta.years:
+        raise cle.NotFoundError(entry="list of years", where="mdf.meta.years")
+
+    col_year: str = "year_for_partition"
+    partitions: dict[int, pl.DataFrame] = {
+        key[0]: df_year
+        for key, df_year in mdf.df.with_columns(
+            pl.col(COL_IND).dt.year().alias(col_year)
+        )
+        .partition_by(col_year, as_dict=True, include_key=False)
+        .items()
+    }
+    years: list[int] = [year for year in mdf.meta.years if year in partitions]
+    split_df: bool = mdf.df_multi is None
+    workers: int = max_workers or min(len(years), os.cpu_count() or 1)
+
+    logger.info(f"Deriving {len(years)} years with {workers} threads")
+
+    jobs: list[cld.YearJob] = [
+        cld.YearJob(
+            year=year,
+            df_year=partitions[year],
+            lines=mdf.meta.lines,
+            split_df=split_df,
+            with_jdl=with_jdl,
+            with_mon=with_mon,
+        )
+        for year in years
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        derived: list[cld.YearDerivation] = list(pool.map(derive_year, jobs))
+
+    # zusammensetzen (im Haupt-Thread)
+    for year_derived in derived:
+        copy_lines_for_renamed_columns(mdf.meta, year_derived.col_rename)
+
+    if split_df:
+        mdf.df_multi = {
+            year_derived.year: year_derived.df_split
+            for year_derived in derived
+            if year_derived.df_split is not None
+        }
+    mdf.df_h = pl.concat([year_derived.df_h for year_derived in derived])
+    mdf.df_h_multi = {
+        year_derived.year: year_derived.df_h_split for year_derived in derived
+    }
+    if with_mon:
+        mdf.mon = pl.concat(
+            [
+                year_derived.mon
+                for year_derived in derived
+                if year_derived.mon is not None
+            ]
+        )
+        mdf.mon_multi = {
+            year_derived.year: year_derived.mon_split
+            for year_derived in derived
+            if year_derived.mon_split is not None
+        }
+    if with_jdl:
+        mdf.jdl = pl.concat(
+            [
+                year_derived.jdl
+                for year_derived in derived
+                if year_derived.jdl is not None
+            ],
+            how="horizontal",
+        ).with_row_index(COL_IND)
+
+    logger.success(f"Multi-year data frames created for years {years}")
+
+    sf.s_set("mdf", mdf)
+    return mdf
+
+
+@gf.func_timer
+def calculate_monthly_values(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
+    """Calculate monthly values from the input dataframe.
+
+    Args:
+        - mdf (cld.MetaAndDfs): The input MetaAndDfs object containing the dataframe.
+
+    Returns:
+        - cld.MetaAndDfs: Modified MetaAndDfs object with the monthly values dataframe.
+
+    Raises:
+        - ValueError: If the input dataframe is None.
+
+    """
+
+    mdf = mdf if isinstance(mdf.df_h, pl.DataFrame) else df_h_mdf(mdf)
+    if mdf.df_h is None:
+        raise ValueError
+
+    mdf.mon = monthly_values(mdf.df_h, mdf.meta.lines)
+
     if mdf.meta.multi_years and sf.s_get("cb_multi_year"):
         mdf = split_multi_years(mdf, "mon")
 
@@ -601,16 +899,81 @@ def calculate_monthly_values(mdf: cld.MetaAndDfs) -> cld.MetaAndDfs:
     return mdf
 
 
-# !!! MUSS NOCH ÜBERARBEITET WERDEN !!!
 @gf.func_timer
-def dic_days(mdf: cld.MetaAndDfs) -> None:
-    """Create Dictionary for Days"""
-
-    sf.s_set("dic_days", {})
-    for num in range(int(sf.s_get("ni_days") or 0)):
-        date: dt.date = sf.s_get(f"day_{num}")
-        item: pl.DataFrame = mdf.df.filter(f"{date:%Y-%m-%d}").with_columns(
-            pl.col(COL_IND).dt.strftime("2020-1-1 %H:%M:%S").str.strptime(pl.Datetime),
-        )
+def dic_days(mdf: cld.MetaAndDfs) -> dict[str, pl.DataFrame]:
+    """Data Frames der ausgewählten Tage für den Tagesvergleich
+
+    Die Tage werden über den Tages-Index ausgeschnitten
+    und auf einen gemeinsamen Bezugstag gelegt.
+
+    Args:
+        - mdf (cld.MetaAndDfs): Data Frames und Metadaten
+
+    Returns:
+        - dict[str, pl.DataFrame]: Datum als Text -> Daten des Tages
 
-        sf.s_set(f"dic_days_{num}", item)
+    """
+
+    frame: Literal["df", "df_h"] = (
+        "df_h" if sf.s_get("cb_h") and mdf.df_h is not None else "df"
+    )
+    dates: list[dt.date] = [
+        date
+        for num in range(int(sf.s_get("ni_days") or 0))
+        if isinstance(date := sf.s_get(f"day_{num}"), dt.date)
+    ]
+
+    dic: dict[str, pl.DataFrame] = {
+        f"{date:%d.%m.%Y}": df for date, df in dp.slice_days(mdf, dates, frame).items()
+    }
+    logger.info(gf.string_new_line_per_item(list(dic), "Days for comparison:"))
+
+    sf.s_set("dic_days", dic)
+    return dic
+
+
+@gf.func_timer
+def repair_quality_issues(df: pl.DataFrame, report: cld.QualityReport) -> pl.DataFrame:
+    """Markierte Werte aus der Qualitätsprüfung entfernen und interpolieren
+
+    Nur die markierten Werte werden ersetzt, vorhandene Lücken
+    und alle anderen Werte bleiben unverändert.
+
+    Args:
+        - df (pl.DataFrame): Data Frame, für den die Prüfung gemacht wurde
+        - report (cld.QualityReport): Ergebnis aus dq.check_quality
+
+    Returns:
+        - pl.DataFrame: Data Frame mit ersetzten Werten
+
+    """
+
+    if df.height != report.mask.height or not df.get_column(COL_IND).equals(
+        report.mask.get_column(COL_IND)
+    ):
+        raise cle.WrongColumnNamesError(COL_IND)
+
+    cols: list[str] = [
+        col
+        for col in report.mask.columns
+        if col != COL_IND and report.mask.get_column(col).gt(0).any()
+    ]
+    flagged: pl.DataFrame = report.mask.select(pl.col(cols).gt(0))
+
+    gaps: pl.DataFrame = df.with_columns(
+        pl.when(flagged.get_column(col)).then(None).otherwise(pl.col(col)).name.keep()
+        for col in cols
+    )
+    filled: pl.DataFrame = interpolate_missing_data_akima(gaps, COL_IND, cols)
+
+    logger.info(
+        f"{report.flagged_cells} flagged values replaced in {len(cols)} columns"
+    )
+
+    return df.with_columns(
+        pl.when(flagged.get_column(col))
+        .then(filled.get_column(col))
+        .otherwise(pl.col(col))
+        .name.keep()
+        for col in cols
+    )
@@ -0,0 +1,163 @@
+"""Jahresdauerlinien aus Stützstellen (z.B. Planungswerte)
+
+Eine Tabelle mit einer Stunden-Spalte (0 … 8760) und beliebig vielen
+Dauerlinien, die nur an einigen Stunden Werte haben.
+Alle Linien werden gemeinsam auf Stundenwerte gebracht:
+Linien mit den gleichen Stützstellen bilden eine Matrix,
+die mit einer einzigen monotonen PCHIP-Interpolation ausgewertet wird
+(bei einer normalen Planungstabelle ist das genau eine Auswertung).
+Im Gegensatz zu Akima schwingt PCHIP nicht über -
+eine fallende Dauerlinie bleibt fallend.
+"""
+
+from io import BytesIO
+
+import numpy as np
+import polars as pl
+from loguru import logger
+from scipy import interpolate
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import excel_import as ex_in
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+COL_HOUR: str = cont.DURATION_CURVE_HOUR_COLUMN
+
+
+def support_points(
+    df: pl.DataFrame, hour_column: str = COL_HOUR
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Stützstellen aller Linien als Matrix
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray, list[str]]: Stunden (aufsteigend),
+            Werte (Stunden x Linien, NaN = keine Stützstelle) und Liniennamen
+
+    """
+
+    if hour_column not in df.columns:
+        raise cle.NotFoundError(entry=hour_column, where="data frame columns")
+
+    columns: list[str] = [
+        col
+        for col in df.columns
+        if col != hour_column and df.get_column(col).dtype.is_numeric()
+    ]
+    df = df.filter(pl.col(hour_column).is_not_null()).sort(hour_column)
+    hours: np.ndarray = df.get_column(hour_column).cast(pl.Float64).to_numpy()
+    values: np.ndarray = (
+        df.select(columns).cast(pl.Float64).fill_null(np.nan).to_numpy()
+    )
+    return hours, values, columns
+
+
+def pchip_batch(hours: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Monotone kubische Interpolation (PCHIP) aller Linien
+
+    Linien mit den gleichen Stützstellen werden als 2-D-Array
+    in einem Aufruf interpoliert. Außerhalb der Stützstellen bleibt NaN.
+
+    Args:
+        - hours (np.ndarray): Stunden der Stützstellen (aufsteigend)
+        - values (np.ndarray): Werte (Stunden x Linien, NaN = keine Stützstelle)
+        - grid (np.ndarray): Stunden, auf die interpoliert wird
+
+    Returns:
+        - np.ndarray: interpolierte Werte (grid x Linien)
+
+    """
+
+    result: np.ndarray = np.full((len(grid), values.shape[1]), np.nan)
+    masks, group = np.unique(~np.isnan(values), axis=1, return_inverse=True)
+    for number, mask in enumerate(masks.T):
+        columns: np.ndarray = np.flatnonzero(group.ravel() == number)
+        if mask.sum() < 2:  # noqa: PLR2004
+            logger.warning(f"Weniger als zwei Stützstellen in Spalte(n) {columns}")
+            continue
+        result[:, columns] = interpolate.PchipInterpolator(
+            hours[mask], values[mask][:, columns], axis=0, extrapolate=False
+        )(grid)
+
+    return result
+
+
+def non_increasing(curves: np.ndarray) -> np.ndarray:
+    """Jede Spalte fällt monoton (laufendes Minimum, NaN bleibt NaN)"""
+
+    return np.where(np.isnan(curves), np.nan, np.fmin.accumulate(curves, axis=0))
+
+
+@gf.func_timer
+def upsample_duration_curves(
+    df: pl.DataFrame,
+    hour_column: str = COL_HOUR,
+    hours: int = cont.TimeHoursIn.year,
+) -> pl.DataFrame:
+    """Dauerlinien aus Stützstellen auf Stundenwerte umrechnen
+
+    Args:
+        - df (pl.DataFrame): Stunden-Spalte und Dauerlinien (null = keine Stützstelle)
+        - hour_column (str): Name der Stunden-Spalte
+        - hours (int): letzte Stunde des Rasters (Raster 0 … hours)
+
+    Returns:
+        - pl.DataFrame: COL_IND (Stunde) und je Linie die fallenden Stundenwerte
+
+    """
+
+    support_hours, values, columns = support_points(df, hour_column)
+    grid: np.ndarray = np.arange(hours + 1)
+    curves: np.ndarray = non_increasing(pchip_batch(support_hours, values, grid))
+
+    logger.info(f"{len(columns)} Dauerlinien aus Stützstellen auf {hours} h gebracht")
+    return pl.DataFrame(
+        {COL_IND: grid} | {col: curves[:, pos] for pos, col in enumerate(columns)}
+    ).with_columns(pl.col(columns).fill_nan(None))
+
+
+def import_duration_curves(file: BytesIO | str) -> pl.DataFrame:
+    """Stützstellen aus einer Excel-Datei auf Stundenwerte umrechnen"""
+
+    return upsample_duration_curves(ex_in.general_excel_import(file))
+
+
+def add_to_jdl(
+    mdf: cld.MetaAndDfs, curves: pl.DataFrame, unit: str = " kW"
+) -> cld.MetaAndDfs:
+    """Dauerlinien aus Stützstellen in die Jahresdauerlinie übernehmen
+
+    Die Linien landen in 'mdf.jdl' und den Metadaten und erscheinen damit
+    in der normalen Grafik der Jahresdauerlinie und im Excel-Export.
+    Gibt es noch keine Jahresdauerlinie, werden nur die Stützstellen-Linien
+    dargestellt.
+    """
+
+    columns: list[str] = [col for col in curves.columns if col != COL_IND]
+    curves = curves.with_columns(
+        pl.lit(None, pl.Datetime("us")).alias(
+            f"{col}{cont.Suffixes.col_original_index}"
+        )
+        for col in columns
+    )
+    if mdf.jdl is None:
+        mdf.jdl = curves
+    else:
+        mdf.jdl = mdf.jdl.drop(
+            [col for col in curves.columns if col != COL_IND], strict=False
+        ).join(curves.cast({COL_IND: mdf.jdl.schema[COL_IND]}), on=COL_IND, how="left")
+
+    for col in columns:
+        mdf.meta.lines[col] = cld.MetaLine(
+            name=col,
+            name_orgidx=f"{col}{cont.Suffixes.col_original_index}",
+            orig_tit=col,
+            tit=col,
+            unit=unit,
+            unit_h=unit,
+            excel_number_format=f'#,##0"{unit}"',
+        )
+
+    return mdf
@@ -0,0 +1,463 @@
+"""Lokaler Speicher für DWD-Messwerte
+
+Je Station, Parameter und Auflösung gibt es ein Verzeichnis unter
+cont.DWD_CACHE_DIR / "values" mit
+- einer Parquet-Datei je Jahr ("2023.parquet")
+- einer Liste der schon abgefragten Zeiträume ("coverage.parquet")
+
+Bei einer Abfrage werden nur die Zeiträume heruntergeladen,
+die noch nicht abgefragt wurden. Die neuen Werte werden in die Jahresdateien
+eingefügt, der Rest kommt aus dem Speicher.
+Zeiträume der letzten Tage gelten nie als vollständig
+(der DWD liefert aktuelle Werte mit Verzögerung).
+
+Fehlende Zeiträume werden in Stücken (cont.DWD_CACHE_CHUNK_YEARS Jahre)
+gespeichert. Die Archive des DWD enthalten meist die ganze Messreihe einer
+Station - dann gibt es einen Download für alle Stücke. Bei Minutenwerten
+(cont.DWD_HIGH_RESOLUTIONS) sind die Archive nach Zeiträumen geteilt - dann
+wird jedes Stück für sich parallel heruntergeladen.
+Der DWD liefert ganze Datensätze - gleichzeitige Abfragen mehrerer Parameter
+einer Station teilen sich einen Download.
+"""
+
+import datetime as dt
+import functools
+import pathlib
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import polars as pl
+from loguru import logger
+
+from modules import constants as cont
+from modules import dwd_discover as dsc
+
+Range = tuple[dt.datetime, dt.datetime]
+
+COVERAGE_FILE: str = "coverage.parquet"
+LOCKS: dict[Hashable, threading.Lock] = {}
+LOCKS_LOCK: threading.Lock = threading.Lock()
+# laufende Downloads ganzer Datensätze (für gleichzeitige Abfragen anderer Parameter)
+IN_FLIGHT: dict[tuple, Future[pl.DataFrame]] = {}
+
+
+def utc_naive(time: dt.datetime) -> dt.datetime:
+    """Zeitpunkt in UTC ohne Zeitzone (ohne Zeitzone = schon UTC)"""
+
+    if time.tzinfo is None:
+        return time
+    return time.astimezone(dt.UTC).replace(tzinfo=None)
+
+
+def partition_dir(parameter: str, resolution: str, station_id: str) -> pathlib.Path:
+    """Verzeichnis für eine Station, einen Parameter und eine Auflösung"""
+
+    return cont.DWD_CACHE_DIR / "values" / resolution / parameter / station_id
+
+
+def named_lock(key: Hashable) -> threading.Lock:
+    """Sperre je Verzeichnis
+    (gleichzeitige Abfragen anderer Stationen laufen weiter)
+    """
+
+    with LOCKS_LOCK:
+        return LOCKS.setdefault(key, threading.Lock())
+
+
+def merge_ranges(ranges: list[Range]) -> list[Range]:
+    """Überlappende oder aneinander grenzende Zeiträume zusammenfassen"""
+
+    merged: list[Range] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(
+    covered: list[Range], start: dt.datetime, end: dt.datetime
+) -> list[Range]:
+    """Teile des Zeitraums, die noch nicht abgefragt wurden"""
+
+    missing: list[Range] = []
+    position: dt.datetime = start
+    for cov_start, cov_end in merge_ranges(covered):
+        if cov_end < position:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > position:
+            missing.append((position, cov_start))
+        position = max(position, cov_end)
+    if position < end:
+        missing.append((position, end))
+    return missing
+
+
+def chunk_ranges(ranges: list[Range], years: int) -> list[Range]:
+    """Zeiträume an Jahresgrenzen teilen (je "years" Jahre ein Stück)"""
+
+    chunks: list[Range] = []
+    for start, end in ranges:
+        position: dt.datetime = start
+        while position < end:
+            boundary = dt.datetime((position.year // years + 1) * years, 1, 1)
+            chunks.append((position, min(boundary, end)))
+            position = boundary
+    return chunks
+
+
+def read_coverage(directory: pathlib.Path) -> list[Range]:
+    """Schon abgefragte Zeiträume"""
+
+    path: pathlib.Path = directory / COVERAGE_FILE
+    if not path.exists():
+        return []
+    return pl.read_parquet(path).rows()  # type: ignore[return-value]
+
+
+def write_parquet(df: pl.DataFrame, path: pathlib.Path) -> None:
+    """Datei ersetzen, ohne dass andere Sitzungen eine halbe Datei lesen"""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp: pathlib.Path = path.with_suffix(".tmp")
+    df.write_parquet(tmp)
+    tmp.replace(path)
+
+
+def write_coverage(directory: pathlib.Path, covered: list[Range]) -> None:
+    """Abgefragte Zeiträume speichern"""
+
+    write_parquet(
+        pl.DataFrame(
+            merge_ranges(covered),
+            schema={"von": pl.Datetime("us"), "bis": pl.Datetime("us")},
+            orient="row",
+        ),
+        directory / COVERAGE_FILE,
+    )
+
+
+def write_values(directory: pathlib.Path, data: pl.DataFrame) -> None:
+    """Neue Werte in die Jahresdateien einfügen (neue Werte ersetzen alte)"""
+
+    for (year,), year_data in data.group_by(pl.col("date").dt.year()):
+        path: pathlib.Path = directory / f"{year}.parquet"
+        merged: pl.DataFrame = (
+            pl.concat([pl.read_parquet(path), year_data], how="vertical_relaxed")
+            if path.exists()
+            else year_data
+        )
+        write_parquet(merged.unique("date", keep="last").sort("date"), path)
+
+
+def read_values(
+    directory: pathlib.Path, start: dt.datetime, end: dt.datetime
+) -> pl.DataFrame:
+    """Werte eines Zeitraums aus den Jahresdateien"""
+
+    paths: list[pathlib.Path] = [
+        path
+        for year in range(start.year, end.year + 1)
+        if (path := directory / f"{year}.parquet").exists()
+    ]
+    if not paths:
+        return pl.DataFrame()
+
+    return (
+        pl.scan_parquet(paths)
+        .filter(
+            pl.col("date")
+            .dt.convert_time_zone("UTC")
+            .dt.replace_time_zone(None)
+            .is_between(start, end)
+        )
+        .sort("date")
+        .collect()
+    )
+
+
+def complete_enough(
+    data: pl.DataFrame, resolution: str, start: dt.datetime, end: dt.datetime
+) -> bool:
+    """Vollständigkeit wie bei wetterdienst ("ts_skip_threshold")
+
+    Die Werte werden ohne diese Prüfung gespeichert (sonst fehlen Werte,
+    wenn nur ein kleiner Teil des Zeitraums heruntergeladen wird),
+    geprüft wird der ganze angefragte Zeitraum.
+    """
+
+    if data.is_empty():
+        return False
+    step: dt.timedelta | None = cont.DWD_RESOLUTION_STEPS.get(resolution)
+    if step is None or not cont.WETTERDIENST_SETTINGS_ARGS["ts_skip_empty"]:
+        return True
+
+    expected: int = (end - start) // step + 1
+    return (
+        data.height >= cont.WETTERDIENST_SETTINGS_ARGS["ts_skip_threshold"] * expected
+    )
+
+
+@functools.cache
+def dataset_of(parameter: str, resolution: str) -> str:
+    """Datensatz des DWD, in dem der Parameter geliefert wird (z.B. "solar")"""
+
+    request = dsc.observation_request(
+        parameter=parameter, resolution=resolution, cache=True
+    )
+    return request.parameter[0][1].value
+
+
+def download_dataset(
+    dataset: str,
+    resolution: str,
+    station_id: str,
+    start: dt.datetime,
+    end: dt.datetime,
+) -> pl.DataFrame:
+    """Alle Parameter eines Datensatzes einer Station vom DWD herunterladen"""
+
+    return (
+        dsc.observation_request(
+            parameter=dataset,
+            resolution=resolution,
+            start_date=start,
+            end_date=end,
+            cache=True,
+        )
+        .filter_by_station_id(station_id)
+        .values.all()
+        .df
+    )
+
+
+def download(
+    parameter: str,
+    resolution: str,
+    station_id: str,
+    start: dt.datetime,
+    end: dt.datetime,
+) -> pl.DataFrame:
+    """Werte einer Station vom DWD herunterladen
+
+    Der DWD liefert immer ganze Datensätze (z.B. alle Strahlungswerte).
+    Fragen mehrere Parameter gleichzeitig dieselbe Station ab,
+    wird der Datensatz nur einmal heruntergeladen - die anderen Abfragen warten
+    und nehmen ihren Parameter aus dem gemeinsamen Ergebnis.
+    Gemerkt wird nur der laufende Download: ist er fertig, wird der Eintrag
+    entfernt und das Ergebnis lebt nur so lange, wie die Wartenden es brauchen.
+    """
+
+    dataset: str = dataset_of(parameter, resolution)
+    key: tuple = (dataset, resolution, station_id, start, end)
+    with LOCKS_LOCK:
+        running: Future[pl.DataFrame] | None = IN_FLIGHT.get(key)
+        if running is None:
+            future: Future[pl.DataFrame] = Future()
+            IN_FLIGHT[key] = future
+
+    if running is None:
+        try:
+            future.set_result(
+                download_dataset(dataset, resolution, station_id, start, end)
+            )
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with LOCKS_LOCK:
+                del IN_FLIGHT[key]
+    else:
+        logger.info(f"'{parameter}' taken from shared download of '{dataset}'")
+        future = running
+
+    data: pl.DataFrame = future.result()
+    return (
+        data.filter(pl.col("parameter") == parameter)
+        if "parameter" in data.columns
+        else data
+    )
+
+
+def store_chunk(
+    directory: pathlib.Path, covered: list[Range], chunk: Range, data: pl.DataFrame
+) -> None:
+    """Werte eines Stücks speichern und das Stück als abgefragt vermerken
+    (außer den letzten Tagen, siehe cont.DWD_CACHE_RECENT_DAYS)
+    """
+
+    final: dt.datetime = utc_naive(dt.datetime.now(dt.UTC)) - dt.timedelta(
+        days=cont.DWD_CACHE_RECENT_DAYS
+    )
+    chunk_start, chunk_end = chunk
+    if not data.is_empty():
+        write_values(directory, data)
+    if chunk_start < final:
+        covered.append((chunk_start, min(chunk_end, final)))
+        write_coverage(directory, covered)
+
+
+def store_chunks(
+    what: tuple[str, str, str],
+    chunks: list[Range],
+    covered: list[Range],
+    data: pl.DataFrame,
+) -> None:
+    """Heruntergeladene Werte Stück für Stück speichern
+
+    Jedes Stück wird in die Jahresdateien geschrieben und sofort
+    als abgefragt vermerkt - bricht das Speichern ab, fehlen beim nächsten Mal
+    nur die restlichen Stücke.
+
+    Args:
+        - what (tuple[str, str, str]): Parameter, Auflösung und Station
+        - chunks (list[Range]): fehlende Zeiträume (siehe chunk_ranges)
+        - covered (list[Range]): schon abgefragte Zeiträume (wird ergänzt)
+        - data (pl.DataFrame): Werte vom DWD für alle Stücke
+
+    """
+
+    parameter, resolution, station_id = what
+    directory: pathlib.Path = partition_dir(*what)
+    for done, chunk in enumerate(chunks, start=1):
+        part: pl.DataFrame = (
+            data
+            if data.is_empty()
+            else data.filter(
+                pl.col("date")
+                .dt.convert_time_zone("UTC")
+                .dt.replace_time_zone(None)
+                .is_between(*chunk)
+            )
+        )
+        store_chunk(directory, covered, chunk, part)
+        logger.info(
+            f"Station '{station_id}', '{parameter}' ({resolution}): "
+            f"{done} of {len(chunks)} chunks stored"
+        )
+
+
+def fetch_chunks(
+    what: tuple[str, str, str],
+    chunks: list[Range],
+    covered: list[Range],
+    fetch: Callable[[str, str, str, dt.datetime, dt.datetime], pl.DataFrame],
+) -> None:
+    """Fehlende Zeiträume parallel herunterladen und einzeln speichern
+
+    Für hohe Auflösungen (cont.DWD_HIGH_RESOLUTIONS) teilt der DWD die Archive
+    nach Zeiträumen - jedes Stück lädt nur seine Dateien.
+    Jedes fertige Stück wird sofort in die Jahresdateien geschrieben und
+    als abgefragt vermerkt - bricht die Abfrage ab, fehlen beim nächsten Mal
+    nur die restlichen Stücke. Im Speicher liegen nur die gerade laufenden Stücke.
+
+    Args:
+        - what (tuple[str, str, str]): Parameter, Auflösung und Station
+        - chunks (list[Range]): fehlende Zeiträume (siehe chunk_ranges)
+        - covered (list[Range]): schon abgefragte Zeiträume (wird ergänzt)
+        - fetch (Callable): Abfrage beim DWD
+
+    """
+
+    parameter, resolution, station_id = what
+    directory: pathlib.Path = partition_dir(*what)
+    with ThreadPoolExecutor(max_workers=cont.DWD_CACHE_CHUNK_WORKERS) as pool:
+        futures: dict[Future[pl.DataFrame], Range] = {
+            pool.submit(fetch, parameter, resolution, station_id, *chunk): chunk
+            for chunk in chunks
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                store_chunk(directory, covered, futures[future], future.result())
+                logger.info(
+                    f"Station '{station_id}', '{parameter}' ({resolution}): "
+                    f"{done} of {len(chunks)} chunks downloaded"
+                )
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def station_values(
+    parameter: str,
+    resolution: str,
+    station_id: str,
+    time_span: Range,
+    fetch: Callable[[str, str, str, dt.datetime, dt.datetime], pl.DataFrame] = download,
+) -> pl.DataFrame:
+    """Werte einer Station - nur fehlende Zeiträume werden heruntergeladen
+
+    Args:
+        - parameter (str): Parameter (name_en)
+        - resolution (str): Auflösung (z.B. "hourly")
+        - station_id (str): Station
+        - time_span (Range): Zeitraum (von, bis)
+        - fetch (Callable, optional): Abfrage beim DWD. Defaults to download.
+
+    Returns:
+        - pl.DataFrame: Werte wie von wetterdienst (leer, wenn zu unvollständig)
+
+    """
+
+    data: pl.DataFrame = stored_values(
+        parameter, resolution, station_id, time_span, fetch
+    )
+    start, end = (utc_naive(time) for time in time_span)
+    return data if complete_enough(data, resolution, start, end) else pl.DataFrame()
+
+
+def stored_values(
+    parameter: str,
+    resolution: str,
+    station_id: str,
+    time_span: Range,
+    fetch: Callable[[str, str, str, dt.datetime, dt.datetime], pl.DataFrame] = download,
+) -> pl.DataFrame:
+    """Alle Werte einer Station im Zeitraum - ohne Prüfung der Vollständigkeit
+
+    Für Ersatzstationen (Lücken füllen): auch eine Station,
+    die eine Lücke nur teilweise abdeckt, liefert ihre Werte.
+
+    Args:
+        - parameter (str): Parameter (name_en)
+        - resolution (str): Auflösung (z.B. "hourly")
+        - station_id (str): Station
+        - time_span (Range): Zeitraum (von, bis)
+        - fetch (Callable, optional): Abfrage beim DWD. Defaults to download.
+
+    Returns:
+        - pl.DataFrame: Werte wie von wetterdienst
+
+    """
+
+    start, end = (utc_naive(time) for time in time_span)
+    directory: pathlib.Path = partition_dir(parameter, resolution, station_id)
+
+    with named_lock(directory):
+        covered: list[Range] = read_coverage(directory)
+        chunks: list[Range] = chunk_ranges(
+            missing_ranges(covered, start, end), cont.DWD_CACHE_CHUNK_YEARS
+        )
+        if chunks and resolution in cont.DWD_HIGH_RESOLUTIONS:
+            fetch_chunks((parameter, resolution, station_id), chunks, covered, fetch)
+        elif chunks:
+            # ein Download für alle fehlenden Zeiträume (ganze Archive je Station)
+            store_chunks(
+                (parameter, resolution, station_id),
+                chunks,
+                covered,
+                fetch(parameter, resolution, station_id, chunks[0][0], chunks[-1][1]),
+            )
+        else:
+            logger.info(
+                f"Station '{station_id}', '{parameter}' ({resolution}) "
+                "taken from local cache"
+            )
+
+        data: pl.DataFrame = read_values(directory, start, end)
+
+    return data
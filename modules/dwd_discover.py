@@ -0,0 +1,128 @@
+"""Parameter und Auflösungen des DWD (wetterdienst "discover")
+
+wetterdienst wird erst geladen, wenn die Daten gebraucht werden
+(nur auf den Seiten mit Wetterdaten - das Laden dauert über eine Sekunde).
+Das Ergebnis von "discover" wird unter cont.DWD_CACHE_DIR gespeichert -
+mit der Version von wetterdienst im Dateinamen, damit nach einem Update
+neu abgefragt wird.
+"""
+
+import functools
+import importlib.metadata
+import json
+import pathlib
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from modules import constants as cont
+
+if TYPE_CHECKING:
+    from wetterdienst import Settings
+    from wetterdienst.provider.dwd.observation import DwdObservationRequest
+
+
+def catalog_path() -> pathlib.Path:
+    """Datei für das Ergebnis von "discover" (je Version von wetterdienst)"""
+
+    version: str = importlib.metadata.version("wetterdienst")
+    return cont.DWD_CACHE_DIR / f"discover_wetterdienst_{version}.json"
+
+
+@functools.cache
+def discover() -> dict[str, dict[str, dict[str, str]]]:
+    """Alle Parameter je Auflösung mit Einheiten
+
+    Returns:
+        - dict: {Auflösung: {Parameter: {"origin": Einheit, "si": SI-Einheit}}}
+
+    """
+
+    path: pathlib.Path = catalog_path()
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    # wetterdienst erst hier laden (siehe Modul-Docstring)
+    from wetterdienst.provider.dwd.observation import (  # noqa: PLC0415
+        DwdObservationRequest,
+    )
+
+    discovered: dict[str, dict[str, dict[str, str]]] = DwdObservationRequest.discover()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp: pathlib.Path = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(discovered), encoding="utf-8")
+    tmp.replace(path)
+    logger.info(f"DWD parameters discovered and saved to '{path.name}'")
+
+    return discovered
+
+
+@functools.cache
+def all_parameters() -> dict[str, dict[str, Any]]:
+    """Alle Parameter (sortiert) mit verfügbaren Auflösungen und Einheit"""
+
+    discovered: dict[str, dict[str, dict[str, str]]] = discover()
+    return dict(
+        sorted(
+            {
+                par_name: {
+                    "available_resolutions": {
+                        res
+                        for res, par_dic in discovered.items()
+                        if par_name in par_dic
+                    },
+                    "unit": " "
+                    + next(
+                        dic[par_name]["origin"]
+                        for dic in discovered.values()
+                        if par_name in dic
+                    ),
+                }
+                for par_name in {par for dic in discovered.values() for par in dic}
+            }.items()
+        )
+    )
+
+
+@functools.cache
+def good_parameters() -> frozenset[str]:
+    """Parameter ohne die, die Fehler verursachen (cont.DWD_PROBLEMATIC_PARAMS)"""
+
+    return frozenset(all_parameters()) - set(cont.DWD_PROBLEMATIC_PARAMS)
+
+
+@functools.cache
+def settings(*, cache: bool = False) -> "Settings":
+    """Einstellungen für wetterdienst
+
+    Args:
+        - cache (bool, optional): für den lokalen Speicher (dwd_cache) -
+            alle Werte abfragen, die Vollständigkeit wird erst
+            für den ganzen Zeitraum geprüft. Defaults to False.
+
+    """
+
+    from wetterdienst import Settings  # noqa: PLC0415
+
+    return Settings(
+        **{**cont.WETTERDIENST_SETTINGS_ARGS, "ts_skip_empty": False}
+        if cache
+        else cont.WETTERDIENST_SETTINGS_ARGS
+    )
+
+
+def observation_request(*, cache: bool = False, **kwargs) -> "DwdObservationRequest":
+    """DwdObservationRequest mit den Einstellungen aus settings()
+
+    Args:
+        - cache (bool, optional): Einstellungen für den lokalen Speicher.
+            Defaults to False.
+        - kwargs: parameter, resolution, start_date, end_date
+
+    """
+
+    from wetterdienst.provider.dwd.observation import (  # noqa: PLC0415
+        DwdObservationRequest,
+    )
+
+    return DwdObservationRequest(**kwargs, settings=settings(cache=cache))
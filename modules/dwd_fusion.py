@@ -0,0 +1,146 @@
+"""Lücken in DWD-Zeitreihen aus Nachbarstationen füllen
+
+Die Zeitreihe der nächstgelegenen Station wird auf ein lückenloses Raster
+gelegt. Für die übrigen Lücken werden nacheinander die nächsten Stationen
+abgefragt - aber nur für die Zeiträume, in denen noch Lücken sind.
+Jeder Wert behält die Kennung der Station, von der er stammt;
+daraus ergibt sich die Herkunft je Zeitabschnitt.
+"""
+
+import datetime as dt
+
+import polars as pl
+
+from modules import constants as cont
+
+COLUMNS: list[str] = ["station_id", "date", "value", "quality"]
+
+
+def on_grid(
+    data: pl.DataFrame, start: dt.datetime, end: dt.datetime, step: dt.timedelta
+) -> pl.DataFrame:
+    """Zeitreihe auf ein lückenloses Raster legen (fehlende Werte = null)
+
+    Args:
+        - data (pl.DataFrame): Werte von wetterdienst ("date" in UTC)
+        - start (dt.datetime): Beginn des Zeitraums
+        - end (dt.datetime): Ende des Zeitraums
+        - step (dt.timedelta): Zeitschritt der Auflösung
+
+    Returns:
+        - pl.DataFrame: Spalten "station_id", "date", "value", "quality"
+
+    """
+
+    dtype: pl.DataType = data.schema["date"]
+    time_zone: str | None = getattr(dtype, "time_zone", None)
+    grid: pl.Series = (
+        pl.datetime_range(start, end, step, eager=True)
+        .dt.replace_time_zone(time_zone)
+        .cast(dtype)
+        .alias("date")
+    )
+
+    return (
+        grid.to_frame()
+        .join(data.select(COLUMNS), on="date", how="left")
+        .select(COLUMNS)
+    )
+
+
+def missing_intervals(series: pl.DataFrame) -> pl.DataFrame:
+    """Zusammenhängende Lücken (von, bis, Anzahl Zeitschritte)"""
+
+    return (
+        series.with_columns(
+            pl.col("value").is_null().rle_id().alias("run"),
+        )
+        .filter(pl.col("value").is_null())
+        .group_by("run", maintain_order=True)
+        .agg(
+            pl.col("date").first().alias("von"),
+            pl.col("date").last().alias("bis"),
+            pl.len().alias("Anzahl"),
+        )
+        .drop("run")
+    )
+
+
+def query_ranges(
+    gaps: pl.DataFrame, merge_within: dt.timedelta
+) -> list[tuple[dt.datetime, dt.datetime]]:
+    """Zeiträume für die Abfrage einer weiteren Station
+
+    Jede Lücke wird für sich abgefragt. Liegen Lücken näher als
+    "merge_within" beieinander, werden sie zu einer Abfrage zusammengefasst.
+    """
+
+    return (
+        gaps.sort("von")
+        .with_columns(
+            (pl.col("von") - pl.col("bis").shift(1) > merge_within)
+            .fill_null(value=True)
+            .cum_sum()
+            .alias("query")
+        )
+        .group_by("query", maintain_order=True)
+        .agg(pl.col("von").first(), pl.col("bis").last())
+        .select("von", "bis")
+        .rows()
+    )
+
+
+def lapse_rate_correction(
+    donor: pl.DataFrame, donor_height: float, target_height: float
+) -> pl.DataFrame:
+    """Temperatur einer anderen Station auf die Höhe der Zielstation umrechnen
+
+    Pro Meter Höhenunterschied ändert sich die Temperatur um cont.DWD_LAPSE_RATE.
+    """
+
+    return donor.with_columns(
+        pl.col("value") + cont.DWD_LAPSE_RATE * (donor_height - target_height)
+    )
+
+
+def fill_gaps(series: pl.DataFrame, donor: pl.DataFrame) -> pl.DataFrame:
+    """Lücken der Zeitreihe mit den Werten einer anderen Station füllen
+
+    Vorhandene Werte werden nie überschrieben.
+    """
+
+    fill: pl.DataFrame = donor.select(
+        pl.col("date"),
+        pl.col("station_id", "value", "quality").name.suffix("_fill"),
+    )
+    gap: pl.Expr = pl.col("value").is_null()
+    return (
+        series.join(fill, on="date", how="left")
+        .with_columns(
+            pl.when(gap).then(pl.col(f"{col}_fill")).otherwise(pl.col(col)).alias(col)
+            for col in ["station_id", "value", "quality"]
+        )
+        .select(COLUMNS)
+    )
+
+
+def provenance(series: pl.DataFrame) -> pl.DataFrame:
+    """Herkunft der Werte je Zeitabschnitt
+
+    Returns:
+        - pl.DataFrame: ein Abschnitt je Wechsel der Station
+            (Station None = Lücke, die nicht gefüllt werden konnte)
+
+    """
+
+    return (
+        series.with_columns(pl.col("station_id").rle_id().alias("run"))
+        .group_by("run", maintain_order=True)
+        .agg(
+            pl.col("station_id").first().alias("Station"),
+            pl.col("date").first().alias("von"),
+            pl.col("date").last().alias("bis"),
+            pl.len().alias("Anzahl"),
+        )
+        .drop("run")
+    )
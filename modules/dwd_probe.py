@@ -0,0 +1,86 @@
+"""Mehrere Stationen gleichzeitig nach Daten fragen
+
+Die Stationen werden nach Entfernung sortiert übergeben.
+Es laufen immer die nächsten cont.DWD_PROBE_STATIONS Abfragen gleichzeitig.
+Gewartet wird in der Reihenfolge der Entfernung - die nächstgelegene Station
+mit Daten gewinnt, auch wenn eine weiter entfernte schneller antwortet.
+Sobald sie feststeht, werden keine weiteren Stationen mehr abgefragt
+(laufende Abfragen können nicht unterbrochen werden, ihr Ergebnis
+landet nur noch im lokalen Speicher).
+"""
+
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import polars as pl
+from loguru import logger
+
+from modules import constants as cont
+
+
+def first_with_data(
+    candidates: list[str],
+    fetch: Callable[[str], pl.DataFrame],
+    timeout: float,
+    workers: int = cont.DWD_PROBE_STATIONS,
+) -> tuple[str | None, pl.DataFrame, bool]:
+    """Nächstgelegene Station mit Daten (Abfragen parallel)
+
+    Das Zeitlimit bricht keine Abfrage ab - wie bei der Abfrage einer Station
+    nach der anderen wird auf jede schon gestartete Abfrage gewartet.
+    Nach Ablauf des Zeitlimits werden nur keine weiteren Stationen
+    mehr abgefragt (die nächstgelegene Station wird immer abgefragt).
+
+    Args:
+        - candidates (list[str]): Stationen nach Entfernung sortiert
+        - fetch (Callable[[str], pl.DataFrame]): Abfrage der Werte einer Station
+        - timeout (float): Zeitlimit in Sekunden
+        - workers (int, optional): gleichzeitige Abfragen
+
+    Returns:
+        - str | None: nächstgelegene Station mit Daten (None = nichts gefunden)
+        - pl.DataFrame: deren Werte
+        - bool: Zeitlimit erreicht, bevor eine Station gefunden wurde
+
+    """
+
+    deadline: float = time.monotonic() + timeout
+    workers = max(workers, 1)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    waiting: Iterator[str] = iter(candidates)
+    running: deque[tuple[str, Future[pl.DataFrame]]] = deque()
+
+    def start_probes() -> None:
+        """Weitere Stationen abfragen, solange das Zeitlimit nicht erreicht ist"""
+        while len(running) < workers and time.monotonic() < deadline:
+            station_id: str | None = next(waiting, None)
+            if station_id is None:
+                return
+            running.append((station_id, pool.submit(fetch, station_id)))
+
+    found: str | None = None
+    data: pl.DataFrame = pl.DataFrame()
+    probed: int = 0
+    try:
+        # die nächstgelegene Station immer, auch bei Zeitlimit 0
+        if candidates:
+            running.append((candidates[0], pool.submit(fetch, next(waiting))))
+        start_probes()
+        while running:
+            station_id, future = running.popleft()
+            values: pl.DataFrame = future.result()
+            probed += 1
+            if not values.is_empty():
+                found, data = station_id, values
+                break
+            start_probes()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    timed_out: bool = found is None and probed < len(candidates)
+    logger.info(
+        f"{probed} of {len(candidates)} stations probed, station with data: '{found}'"
+    )
+    return found, data, timed_out
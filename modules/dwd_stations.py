@@ -0,0 +1,297 @@
+"""Offline-Katalog der DWD-Stationen
+
+Für jede Kombination aus Auflösung und Datensatz (z.B. "hourly.solar") wird
+die Stationsliste einmal vom DWD geholt und unter cont.DWD_CACHE_DIR / "stations"
+gespeichert:
+- stations.parquet: alle Stationen (Kennung, Name, Land, Höhe, Koordinaten)
+- availability.npz: je Auflösung/Datensatz ein Bitfeld Station x Jahr
+    (Bit gesetzt = laut Stationsliste gibt es in diesem Jahr Daten)
+Stationslisten, die älter als cont.DWD_CATALOG_MAX_AGE_DAYS sind,
+werden neu geholt.
+
+Die nächsten Stationen werden offline über einen k-d-Baum gesucht:
+die Stationen sind Punkte auf der Einheitskugel, die Sehnenlänge wächst
+mit der Entfernung auf der Erdoberfläche. Stationen ohne Daten im gesuchten
+Zeitraum werden gar nicht erst abgefragt.
+"""
+
+import datetime as dt
+import threading
+from typing import Any
+
+import numpy as np
+import polars as pl
+from loguru import logger
+from scipy.spatial import cKDTree
+
+from modules import constants as cont
+from modules import dwd_cache as dwc
+from modules import dwd_discover as dsc
+
+EARTH_RADIUS_KM: float = 6371.0
+STATION_COLUMNS: list[str] = [
+    "station_id",
+    "name",
+    "state",
+    "height",
+    "latitude",
+    "longitude",
+]
+
+LOCK: threading.Lock = threading.Lock()
+CATALOG: dict[str, Any] = {}
+
+
+def unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Koordinaten als Punkte auf der Einheitskugel (n x 3)"""
+
+    lat: np.ndarray = np.radians(latitude)
+    lon: np.ndarray = np.radians(longitude)
+    return np.column_stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+
+
+def chord(distance: float) -> float:
+    """Sehnenlänge auf der Einheitskugel für eine Entfernung in km"""
+
+    return 2 * np.sin(min(distance / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def haversine(
+    latitude: np.ndarray, longitude: np.ndarray, lat_lon: tuple[float, float]
+) -> np.ndarray:
+    """Entfernung in km (Großkreis) aller Stationen zu einem Punkt"""
+
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    lat_0, lon_0 = np.radians(lat_lon[0]), np.radians(lat_lon[1])
+    hav: np.ndarray = (
+        np.sin((lat - lat_0) / 2) ** 2
+        + np.cos(lat) * np.cos(lat_0) * np.sin((lon - lon_0) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(hav))
+
+
+def year_bits(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Bitfeld Station x Jahr (ab cont.DWD_CATALOG_FIRST_YEAR, gepackt in Bytes)"""
+
+    years: np.ndarray = np.arange(cont.DWD_CATALOG_FIRST_YEAR, dt.date.today().year + 2)
+    return np.packbits(
+        (years >= start[:, np.newaxis]) & (years <= end[:, np.newaxis]), axis=1
+    )
+
+
+def with_data(bits: np.ndarray, first: int, last: int) -> np.ndarray:
+    """Stationen mit Daten in mindestens einem Jahr von first bis last"""
+
+    years: np.ndarray = np.unpackbits(bits, axis=1)
+    start: int = max(first - cont.DWD_CATALOG_FIRST_YEAR, 0)
+    end: int = min(last - cont.DWD_CATALOG_FIRST_YEAR + 1, years.shape[1])
+    return years[:, start:end].any(axis=1)
+
+
+def catalog_key(parameter: str, resolution: str) -> str:
+    """Auflösung und Datensatz ("hourly.solar")"""
+
+    return f"{resolution}.{dwc.dataset_of(parameter, resolution)}"
+
+
+def empty_catalog() -> dict[str, Any]:
+    """Katalog ohne Stationen"""
+
+    return {
+        "stations": pl.DataFrame(
+            schema={
+                "station_id": pl.String,
+                "name": pl.String,
+                "state": pl.String,
+                "height": pl.Float64,
+                "latitude": pl.Float64,
+                "longitude": pl.Float64,
+            }
+        ),
+        "bits": {},
+        "built": {},
+    }
+
+
+def with_tree(catalog: dict[str, Any]) -> dict[str, Any]:
+    """k-d-Baum über alle Stationen des Katalogs"""
+
+    stations: pl.DataFrame = catalog["stations"]
+    catalog["tree"] = cKDTree(
+        unit_vectors(
+            stations.get_column("latitude").to_numpy(),
+            stations.get_column("longitude").to_numpy(),
+        ).reshape(-1, 3)
+    )
+    return catalog
+
+
+def load_catalog() -> dict[str, Any]:
+    """Katalog aus dem lokalen Speicher (leer, wenn es noch keinen gibt)"""
+
+    directory = cont.DWD_CACHE_DIR / "stations"
+    if not (directory / "availability.npz").exists():
+        return with_tree(empty_catalog())
+
+    with np.load(directory / "availability.npz") as npz:
+        keys: list[str] = npz["keys"].tolist()
+        built: list[str] = npz["built"].tolist()
+        bits: dict[str, np.ndarray] = {key: npz[f"bits_{key}"] for key in keys}
+
+    return with_tree(
+        {
+            "stations": pl.read_parquet(directory / "stations.parquet"),
+            "bits": bits,
+            "built": {
+                key: dt.date.fromisoformat(day)
+                for key, day in zip(keys, built, strict=True)
+            },
+        }
+    )
+
+
+def save_catalog(catalog: dict[str, Any]) -> None:
+    """Katalog im lokalen Speicher ablegen"""
+
+    directory = cont.DWD_CACHE_DIR / "stations"
+    dwc.write_parquet(catalog["stations"], directory / "stations.parquet")
+    keys: list[str] = list(catalog["bits"])
+    tmp = directory / "availability.tmp.npz"
+    np.savez_compressed(
+        tmp,
+        keys=np.array(keys),
+        built=np.array([catalog["built"][key].isoformat() for key in keys]),
+        **{f"bits_{key}": catalog["bits"][key] for key in keys},
+    )
+    tmp.replace(directory / "availability.npz")
+
+
+def station_list(parameter: str, resolution: str) -> pl.DataFrame:
+    """Stationsliste des DWD für einen Parameter (mit Beginn und Ende der Daten)"""
+
+    return dsc.observation_request(parameter=parameter, resolution=resolution).all().df
+
+
+def add_station_list(
+    catalog: dict[str, Any], key: str, listing: pl.DataFrame
+) -> dict[str, Any]:
+    """Stationsliste in den Katalog übernehmen
+
+    Neue Stationen werden angehängt (die Bitfelder der anderen Datensätze
+    bekommen für sie leere Zeilen), das Bitfeld des Datensatzes wird ersetzt.
+    """
+
+    known: pl.DataFrame = catalog["stations"]
+    new: pl.DataFrame = (
+        listing.select(STATION_COLUMNS)
+        .cast({"height": pl.Float64, "latitude": pl.Float64, "longitude": pl.Float64})
+        .filter(~pl.col("station_id").is_in(known.get_column("station_id")))
+        .unique("station_id", keep="first", maintain_order=True)
+    )
+    stations: pl.DataFrame = pl.concat([known, new], how="vertical_relaxed")
+    bits: dict[str, np.ndarray] = {
+        other: np.pad(array, ((0, new.height), (0, 0)))
+        for other, array in catalog["bits"].items()
+    }
+
+    rows: pl.DataFrame = (
+        stations.select("station_id")
+        .join(
+            listing.select(
+                "station_id",
+                pl.col("start_date").dt.year().alias("start"),
+                pl.col("end_date").dt.year().alias("end"),
+            ).unique("station_id", keep="first"),
+            on="station_id",
+            how="left",
+        )
+        .fill_null(0)
+    )
+    bits[key] = year_bits(
+        rows.get_column("start").to_numpy(), rows.get_column("end").to_numpy()
+    )
+
+    logger.info(f"Station catalog '{key}': {listing.height} stations")
+    return with_tree(
+        {
+            "stations": stations,
+            "bits": bits,
+            "built": {**catalog["built"], key: dt.date.today()},
+        }
+    )
+
+
+def catalog_for(parameter: str, resolution: str) -> tuple[dict[str, Any], str]:
+    """Katalog mit aktueller Stationsliste für den Parameter"""
+
+    key: str = catalog_key(parameter, resolution)
+    with LOCK:
+        if not CATALOG:
+            CATALOG.update(load_catalog())
+        built: dt.date | None = CATALOG["built"].get(key)
+        if built is None or (dt.date.today() - built).days > (
+            cont.DWD_CATALOG_MAX_AGE_DAYS
+        ):
+            CATALOG.update(
+                add_station_list(CATALOG, key, station_list(parameter, resolution))
+            )
+            save_catalog(CATALOG)
+        return dict(CATALOG), key
+
+
+def nearest_stations(
+    parameter: str,
+    resolution: str,
+    lat_lon: tuple[float, float],
+    time_span: tuple[dt.datetime, dt.datetime],
+    distance: float,
+) -> pl.DataFrame:
+    """Stationen mit Daten im Zeitraum, nach Entfernung sortiert
+
+    (gleiche Spalten wie "filter_by_distance" von wetterdienst)
+
+    Args:
+        - parameter (str): Parameter (name_en)
+        - resolution (str): Auflösung (z.B. "hourly")
+        - lat_lon (tuple[float, float]): Breiten- und Längengrad des Standorts
+        - time_span (tuple[dt.datetime, dt.datetime]): Zeitraum
+        - distance (float): größte Entfernung in km
+
+    Returns:
+        - pl.DataFrame: Stationen mit Spalte "distance" (km)
+
+    """
+
+    catalog, key = catalog_for(parameter, resolution)
+    stations: pl.DataFrame = catalog["stations"]
+
+    candidates: np.ndarray = np.asarray(
+        catalog["tree"].query_ball_point(
+            unit_vectors(np.array([lat_lon[0]]), np.array([lat_lon[1]]))[0],
+            chord(distance),
+        ),
+        dtype=np.int64,
+    )
+    candidates = candidates[
+        with_data(
+            catalog["bits"][key][candidates], time_span[0].year, time_span[1].year
+        )
+    ]
+
+    found: pl.DataFrame = stations[candidates]
+    return (
+        found.with_columns(
+            pl.Series(
+                "distance",
+                haversine(
+                    found.get_column("latitude").to_numpy(),
+                    found.get_column("longitude").to_numpy(),
+                    lat_lon,
+                ),
+            )
+        )
+        .filter(pl.col("distance") <= distance)
+        .sort("distance")
+    )
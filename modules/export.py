@@ -81,7 +81,13 @@ def excel_number_format(df: pl.DataFrame, meta: cld.MetaData) -> dict[str, str]:
     quantiles: pl.DataFrame = df.quantile(0.95)
     excel_formats: dict[str, str] = {}
 
-    for line in [col for col in df.columns if gf.check_if_not_exclude(col)]:
+    for line in [
+        col
+        for col in df.columns
+        if gf.check_if_not_exclude(col)
+        and col not in cont.CALENDAR_COLUMNS
+        and df.schema[col].is_numeric()
+    ]:
         line_quant: float = quantiles.get_column(line).item()
         line_unit: str = ""
         if line in meta.lines and meta.lines.get(line) is not None:
@@ -131,7 +137,7 @@ def html_graph() -> str:
         figure: go.Figure | None = sf.s_get(fig)
         if figure is not None:
             fig_type: str = fgf.fig_type_by_title(figure)
-            if "las" in fig_type:
+            if "las" in fig_type or fig_type == "carpet":
                 all_figs = f'{all_figs} <div id="las">'
             elif "jdl" in fig_type:
                 all_figs = f'{all_figs} <div id="jdl">'
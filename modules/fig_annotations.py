@@ -8,11 +8,12 @@ import plotly.graph_objects as go
 import polars as pl
 import streamlit as st
 from loguru import logger
-from scipy import signal
 
+from modules import classes_data as cld
 from modules import constants as cont
 from modules import fig_general_functions as fgf
 from modules import general_functions as gf
+from modules import smoothing as smo
 from modules import streamlit_functions as sf
 
 DateOrFloat = TypeVar("DateOrFloat", dt.datetime, float, np.datetime64)
@@ -178,6 +179,58 @@ def add_arrows_min_max(fig: go.Figure, **kwargs) -> go.Figure:
     return fig
 
 
+@gf.func_timer
+def add_peak_annotations(fig: go.Figure, report: cld.PeakReport) -> go.Figure:
+    """Pfeile an den höchsten Werten jeder Linie (aus der Lastspitzen-Auswertung)
+
+    Die Pfeile heißen "Lastspitze ..." und werden über
+    die Checkbox "cb_peak_anno" ein- und ausgeblendet.
+    Pfeile einer früheren Auswertung werden vorher entfernt.
+
+    Args:
+        - fig (go.Figure): Grafik (Lastgang)
+        - report (cld.PeakReport): Auswertung der Lastspitzen
+
+    Returns:
+        - go.Figure: Grafik mit Pfeilen
+
+    """
+
+    fig.layout.annotations = [
+        anno
+        for anno in fig.layout.annotations
+        if not str(anno.text or "").startswith(cont.PEAK_ANNO_PREFIX)
+    ]
+
+    fig_data: dict[str, dict[str, Any]] = fgf.fig_data_as_dic(fig)
+    fig_layout: dict[str, Any] = fgf.fig_layout_as_dic(fig)
+    middle_x: dt.datetime | float = middle_xaxis(fig_data)
+
+    for row in report.top.iter_rows(named=True):
+        line: dict[str, Any] | None = fig_data.get(row["Linie"])
+        if line is None:
+            continue
+        unit: str = line["meta"].get("unit") or ""
+        text: str = (
+            f"{cont.PEAK_ANNO_PREFIX} {row['Rang']} {row['Linie']} {row['Jahr']}: "
+            f"{gf.number_as_string(row['Leistung'])}{unit}"
+        )
+        fig = add_arrow(
+            fig,
+            fig_data,
+            fig_layout,
+            row["Zeitpunkt"],
+            y_or_line=row["Leistung"],
+            text=text,
+            yaxis=line["yaxis"],
+            middle_xaxis=middle_x,
+        )
+
+    logger.success(f"{report.top.height} peak arrows added to figure")
+
+    return fig
+
+
 def hovertext_from_x_val(
     title: str, x_val: DateOrFloat, line_data: dict[str, Any] | None
 ) -> str:
@@ -371,13 +424,13 @@ def calculate_smooth_values(trace: dict[str, Any]) -> np.ndarray:
 
     """
 
-    logger.info(f"Geglättete y-Werte für '{trace['name']}' werden neu berechnet.")
+    logger.info(f"Geglättete y-Werte für '{trace['name']}'")
 
-    return signal.savgol_filter(
-        x=pl.Series(trace["y"]),
-        mode="mirror",
-        window_length=int(sf.s_get("gl_win") or sf.s_get("smooth_start_val", 3)),
-        polyorder=int(sf.s_get("gl_deg", 3)),
+    return smo.smooth_values(
+        values=pl.Series(trace["y"], dtype=pl.Float64).to_numpy(),
+        window=int(sf.s_get("gl_win") or sf.s_get("smooth_start_val", 3)),
+        deg=int(sf.s_get("gl_deg", default=3)),
+        method=sf.s_get("sb_smooth_method") or "savgol",
     )
 
 
@@ -391,7 +444,13 @@ def smooth(fig: go.Figure, **kwargs) -> go.Figure:
         trace for trace in fig_data.values() if gf.check_if_not_exclude(trace["name"])
     ]
     gl_win: int = sf.s_get("gl_win", 3)
-    gl_deg: int = sf.s_get("gl_deg") or 3
+    gl_deg: int = sf.s_get("gl_deg", default=3)
+    gl_method: str = sf.s_get("sb_smooth_method") or "savgol"
+    smooth_settings: dict[str, Any] = {
+        "gl_win": gl_win,
+        "gl_deg": gl_deg,
+        "gl_method": gl_method,
+    }
 
     for trace in traces:
         smooth_name: str = f"{trace['name']}{cont.Suffixes.col_smooth}"
@@ -401,7 +460,7 @@ def smooth(fig: go.Figure, **kwargs) -> go.Figure:
             meta_trace: dict[str, Any] = trace["meta"]
             logger.debug(f"meta data for '{trace['name']}': {meta_trace}")
             if smooth_name not in fig_data:
-                meta_trace |= {"gl_win": gl_win, "gl_deg": gl_deg}
+                meta_trace |= smooth_settings
                 logger.debug(
                     f"meta data for '{trace['name']}' after update: {meta_trace}"
                 )
@@ -427,9 +486,10 @@ def smooth(fig: go.Figure, **kwargs) -> go.Figure:
                 [
                     meta_trace.get("gl_win") != gl_win,
                     meta_trace.get("gl_deg") != gl_deg,
+                    meta_trace.get("gl_method") != gl_method,
                 ]
             ):
-                meta_trace |= {"gl_win": gl_win, "gl_deg": gl_deg}
+                meta_trace |= smooth_settings
                 fig = fig.update_traces(
                     {"y": calculate_smooth_values(trace), "meta": meta_trace},
                     {"name": smooth_name},
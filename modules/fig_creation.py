@@ -1,6 +1,7 @@
 """plots erstellen und in session_state schreiben"""
 
-from typing import Any
+import datetime as dt
+from typing import TYPE_CHECKING, Any, Literal
 
 import plotly.graph_objects as go
 import streamlit as st
@@ -10,6 +11,7 @@ from modules import classes_data as cld
 from modules import classes_errors as cle
 from modules import classes_figs as clf
 from modules import constants as cont
+from modules import day_profiles as dp
 from modules import fig_annotations as fig_anno
 from modules import fig_formatting as fig_format
 from modules import fig_general_functions as fgf
@@ -17,6 +19,9 @@ from modules import fig_plotly_plots as ploplo
 from modules import general_functions as gf
 from modules import streamlit_functions as sf
 
+if TYPE_CHECKING:
+    import polars as pl
+
 
 # Grund-Grafik
 @gf.func_timer
@@ -182,40 +187,82 @@ def cr_fig_mon(mdf: cld.MetaAndDfs) -> go.Figure:
     return fig
 
 
-# TODO: MUSS NOCH ANGEPASST WERDEN
 @gf.func_timer
-def cr_fig_days(mdf: cld.MetaAndDfs) -> None:
+def cr_fig_days(mdf: cld.MetaAndDfs) -> go.Figure:
     """Tagesvergleiche"""
-    if not sf.s_get("cb_days"):
-        return
+
+    dic_days: dict | None = sf.s_get("dic_days")
+    if not dic_days:
+        raise cle.NotFoundError(entry="dic_days", where="Session State")
 
     tit_res: str = ""
     if sf.s_get("cb_h"):
         tit_res = cont.Suffixes.fig_tit_h
-    elif st.session_state["metadata"]["td_mean"] == cont.TimeMinutesIn.quarter_hour:
+    elif mdf.meta.td_mnts == cont.TimeMinutesIn.quarter_hour:
         tit_res = cont.Suffixes.fig_tit_15
 
     tit: str = f"{cont.FIG_TITLES.days}{tit_res}"
 
-    st.session_state["fig_days"] = ploplo.line_plot_day_overlay(
-        st.session_state["dic_days"], st.session_state["metadata"], tit, "fig_days"
+    fig: go.Figure = ploplo.line_plot_day_overlay(
+        mdf,
+        dic_days,
+        "df_h" if sf.s_get("cb_h") else "df",
+        title=tit,
     )
 
     # updates
-    st.session_state["fig_days"].update_layout(
-        title_text=st.session_state["fig_days"].layout.meta.get("title"),
-    )
-    st.session_state["fig_days"] = fig_format.standard_axes_and_layout(
-        st.session_state["fig_days"]
+    fig = fig.update_layout(
+        title_text=fig.layout.meta.get("title"),
+        legend={"yanchor": "top", "y": 0.975, "xanchor": "right", "x": 0.975},
     )
+    fig = fig_format.standard_axes_and_layout(fig, x_tickformat="%H:%M")
 
-    st.session_state["fig_days"].update_xaxes(
+    x_min: dt.datetime = dp.REFERENCE_DAY
+    fig = fig.update_xaxes(
+        range=[x_min, x_min + dt.timedelta(days=1)],
         tickformat="%H:%M",
         tickformatstops=[
             {"dtickrange": [None, None], "value": "%H:%M"},
         ],
     )
 
+    logger.success("fig_days created")
+    return fig
+
+
+@gf.func_timer
+def cr_fig_carpet(mdf: cld.MetaAndDfs) -> go.Figure:
+    """Carpet Plot (Uhrzeit x Tag) der im Menu gewählten Linie"""
+
+    frame: Literal["df", "df_h"] = "df_h" if sf.s_get("cb_h") else "df"
+    df: pl.DataFrame | None = getattr(mdf, frame)
+    if df is None:
+        raise cle.NotFoundError(entry=frame, where="mdf")
+
+    line: str | None = sf.s_get("sb_carpet")
+    if line not in df.columns:
+        line = next(col for col in df.columns if gf.check_if_not_exclude(col))
+
+    dates, matrix = dp.carpet_matrix(df, dp.get_day_index(mdf, frame), line)
+    line_meta: cld.MetaLine = mdf.meta.lines[line]
+    fig: go.Figure = ploplo.carpet_plot(
+        mdf,
+        dates,
+        matrix,
+        line,
+        title=f"{cont.FIG_TITLES.carpet} - {line_meta.tit}",
+        unit=line_meta.unit if frame == "df" else line_meta.unit_h,
+    )
+
+    fig = fig.update_layout(
+        title_text=fig.layout.meta.get("title"),
+        yaxis={"title": None, "autorange": "reversed", "nticks": 13},
+        xaxis={"title": None, "tickformat": "%b<br>%Y"},
+    )
+
+    logger.success("fig_carpet created")
+    return fig
+
 
 @gf.func_timer
 def cr_meteo_sidebar() -> go.Figure:
@@ -351,3 +398,18 @@ def plot_figs(figs: clf.Figs) -> None:
                     config=fig_format.plotly_config(),
                     theme=cont.ST_PLOTLY_THEME,
                 )
+
+        plot_carpet(figs)
+
+
+def plot_carpet(figs: clf.Figs) -> None:
+    """Carpet Plot unter den anderen Grafiken darstellen"""
+
+    if sf.s_get("cb_carpet") and figs.carpet is not None:
+        st.markdown("###")
+        st.plotly_chart(
+            figs.carpet.fig,
+            use_container_width=True,
+            config=fig_format.plotly_config(),
+            theme=cont.ST_PLOTLY_THEME,
+        )
@@ -239,6 +239,10 @@ def standard_layout(fig: go.Figure, data: dict[str, dict[str, Any]]) -> go.Figur
 def update_main(fig: go.Figure) -> go.Figure:
     """Darstellungseinstellungen aus dem Hauptfenster"""
 
+    # Carpet Plot: eine Heatmap ohne Linien-Einstellungen
+    if fgf.fig_type_by_title(fig) == "carpet":
+        return fig
+
     fig = show_traces(fig)
     data: dict[str, dict[str, Any]] = fgf.fig_data_as_dic(fig)
 
@@ -256,7 +260,7 @@ def update_main(fig: go.Figure) -> go.Figure:
     # Legende ausblenden, wenn nur eine Linie angezeigt wird
     fig = fig.update_layout({"showlegend": len(visible_traces) > 1})
 
-    if sf.s_get("cb_multi_year"):
+    if sf.s_get("cb_multi_year") and fgf.fig_type_by_title(fig) != "days":
         fig = legend_groups_for_multi_year(fig)
 
     return fig
@@ -303,7 +307,15 @@ def show_traces(fig: go.Figure) -> go.Figure:
 
     data: dict[str, dict[str, Any]] = fgf.fig_data_as_dic(fig)
 
-    for name, trace_data in data.items():
+    if fig_type == "days":
+        # Tagesvergleich: Sichtbarkeit über die Linie (legendgroup) der Grundgrafik
+        for group in {trace_data["legendgroup"] for trace_data in data.values()}:
+            fig = fig.update_traces(
+                {"visible": trace_vis_jdl_mon(group)}, {"legendgroup": group}
+            )
+        return fig
+
+    for name in data:
         if f"cp_{name}" not in st.session_state:
             new_name: str = (
                 f"{name}{cont.Suffixes.col_arbeit}"
@@ -315,8 +327,6 @@ def show_traces(fig: go.Figure) -> go.Figure:
 
         trace_visible: bool = False
 
-        if fig_type in ["days"]:
-            trace_visible = st.session_state[f'cb_vis_{trace_data["legendgroup"]}']
         if fig_type in ["mon", "jdl"]:
             trace_visible = trace_vis_jdl_mon(new_name)
         else:
@@ -358,12 +368,18 @@ def format_traces(
 
     """
     fig_type: str = fgf.fig_type_by_title(fig)
-    switch: bool = fig_type == "fig_days"
+    switch: bool = fig_type == "days"
 
     for trace in visible_traces:
         trace_name: str = trace["name"]
         index_unit: int = visible_units.index(trace["meta"]["unit"])
         trace_y: str = "y" if index_unit == 0 else f"y{index_unit + 1}"
+
+        if switch:
+            # Tagesvergleich: Farben aus dem Farbschema, nur Achse zuordnen
+            fig = fig.update_traces({"yaxis": trace_y}, {"name": trace_name})
+            continue
+
         line_mode: str = "lines"
         if sf.s_get(f"cb_markers_{trace_name}") or fig_type == "mon":
             line_mode = "markers+lines"
@@ -491,7 +507,15 @@ def show_annos(fig: go.Figure, visible_traces: list[dict]) -> go.Figure:
 
     for anno in layout["annotations"]:
         an_name: str = anno["name"]
-        if "hline" not in an_name:
+        if an_name.startswith(cont.PEAK_ANNO_PREFIX):
+            fig = fig.update_annotations(
+                {
+                    "visible": bool(sf.s_get("cb_peak_anno"))
+                    and any(line in an_name for line in visible_lines)
+                },
+                {"name": an_name},
+            )
+        elif "hline" not in an_name:
             an_name_cust: str = an_name.split(": ")[0]
             visible: bool = all(
                 [
@@ -233,80 +233,184 @@ def line_plot_y_overlay(
 
 @gf.func_timer
 def line_plot_day_overlay(
-    dic_days: dict, meta: dict, title: str = "", var_name: str = ""
+    mdf: cld.MetaAndDfs,
+    dic_days: dict[str, pl.DataFrame],
+    data_frame: Literal["df", "df_h"] = "df",
+    **kwargs,
 ) -> go.Figure:
     """Liniengrafik für Tagesvergleich
     Jeder Tag bekommt eine Linie. Die Linien werden übereinander gelegt.
 
-
     Args:
-        - dic_days (dict): dictionary mit Daten der Tage
-        - meta (dict): dictionary mit Metadaten
-        - title (str, optional): Titel der Grafik. Defaults to "".
-        - var_name (str, optional): Variablenname für Metadaten. Defaults to "".
+        - mdf (cl.MetaAndDfs): Data Frames und Metadaten
+        - dic_days (dict[str, pl.DataFrame]): Daten der Tage (aus df_man.dic_days)
+        - data_frame (Literal["df", "df_h"], optional):
+            Data Frame, aus dem die Tage stammen. Defaults to "df".
 
     Returns:
-        - go.Figure: _description_
+        - go.Figure: Liniengrafik mit einer Linie pro Tag und Spalte
 
     """
 
+    title: str = kwargs.get("title") or ""
+    cusd_format: str = "(%{customdata|%a %e. %b %Y %H:%M})"
+
     fig: go.Figure = go.Figure()
     fig = fig.update_layout(
         {
             "meta": {
                 "title": title,
-                "var_name": var_name,
-                "metadata": meta,
+                "var_name": kwargs.get("var_name"),
+                "metadata": mdf.meta.as_dic(),
             }
         }
     )
-    cusd_format: str = "(%{customdata|%a %e. %b %Y %H:%M})"
 
-    lis_units: list[str] = []
-    for date in dic_days:
-        for line in [lin for lin in dic_days[date].columns if "orgidx" not in lin]:
-            lis_units.append(meta[line].get("unit"))
+    for date, df_day in dic_days.items():
+        lines: list[str] = kwargs.get("lines") or [
+            col for col in df_day.columns if gf.check_if_not_exclude(col)
+        ]
+        for line in lines:
+            line_data: pl.Series = df_day.get_column(line)
+            if not line_data.dtype.is_numeric() or line_data.drop_nulls().len() < 1:
+                continue
+
+            line_meta: cld.MetaLine = mdf.meta.lines[line]
             manip: int = -1 if any(neg in line for neg in cont.NEGATIVE_VALUES) else 1
-            cusd: pl.Series = (
-                dic_days[f"{line}_orgidx"]
-                if f"{line}_orgidx" in dic_days[date].columns
-                else dic_days[date]["orgidx"]
+            trace_unit: str | None = (
+                line_meta.unit if data_frame == "df" else line_meta.unit_h
             )
-
-            trace_unit: str | None = meta[line].get("unit")
-            hovtemp: str = f"{trace_unit} {cusd_format} <extra>{line}</extra>"
+            hovtemp: str = f"{trace_unit} {cusd_format}"
 
             fig = fig.add_trace(
                 go.Scatter(
-                    x=dic_days[date].index,
-                    y=dic_days[date][line] * manip,
-                    customdata=cusd,
-                    name=date,
+                    x=df_day.get_column(cont.SpecialCols.index),
+                    y=line_data * manip,
+                    customdata=df_day.get_column(cont.SpecialCols.original_index),
+                    name=f"{line_meta.tit} - {date}",
                     mode="lines",
-                    hovertemplate=(
-                        np.select(
-                            [
-                                abs(dic_days[date][line]) < 10,
-                                abs(dic_days[date][line]) < 100,
-                            ],
-                            [
-                                "%{y:,.2f}" + hovtemp,
-                                "%{y:,.1f}" + hovtemp,
-                            ],
-                            "%{y:,.0f}" + hovtemp,
-                        )
+                    hovertemplate=np.select(
+                        [np.abs(line_data) < 10, np.abs(line_data) < 100],  # noqa: PLR2004
+                        ["%{y:,.2f}" + hovtemp, "%{y:,.1f}" + hovtemp],
+                        "%{y:,.0f}" + hovtemp,
                     ),
-                    legendgroup=line,
-                    legendgrouptitle_text=line,
+                    legendgroup=line_meta.tit,
                     visible=True,
-                    yaxis=meta[line]["y_axis"],
-                    meta={"unit": trace_unit, "negativ": manip < 0, "df_col": line},
+                    meta={
+                        "unit": trace_unit,
+                        "negativ": manip < 0,
+                        "df_col": line,
+                        "date": date,
+                    },
                 )
             )
 
     return fig
 
 
+@gf.func_timer
+def carpet_plot(
+    mdf: cld.MetaAndDfs,
+    dates: pl.Series,
+    matrix: np.ndarray,
+    line: str,
+    **kwargs,
+) -> go.Figure:
+    """Carpet Plot (Heatmap Uhrzeit x Tag) einer Linie
+
+    Eine einzelne Heatmap statt einer Linie mit allen Werten -
+    x und y sind nur die Tage und Uhrzeiten, die Werte gehen als Matrix
+    (Zeitschritte x Tage, transponierte Sicht ohne Kopie) an Plotly.
+
+    Args:
+        - mdf (cl.MetaAndDfs): Data Frames und Metadaten
+        - dates (pl.Series): Kalendertage (Spalten der Heatmap)
+        - matrix (np.ndarray): Werte (Tage x Zeitschritte des Tages)
+        - line (str): Name der Linie
+
+    Returns:
+        - go.Figure: Heatmap
+
+    """
+
+    title: str = kwargs.get("title") or ""
+    unit: str = kwargs.get("unit") or mdf.meta.lines[line].unit or ""
+    step: int = cont.TimeMinutesIn.day // matrix.shape[1]
+    times: list[str] = [
+        f"{minute // 60:02d}:{minute % 60:02d}"
+        for minute in range(0, cont.TimeMinutesIn.day, step)
+    ]
+
+    fig: go.Figure = go.Figure(
+        go.Heatmap(
+            z=matrix.T,
+            x=dates,
+            y=times,
+            name=mdf.meta.lines[line].tit,
+            colorscale="Viridis",
+            colorbar={"title": {"text": unit.strip()}},
+            hoverongaps=False,
+            hovertemplate=(
+                f"%{{x|%a %e. %b %Y}} %{{y}}<br>%{{z:,.1f}}{unit}<extra></extra>"
+            ),
+            meta={"unit": unit, "df_col": line},
+        )
+    )
+
+    return fig.update_layout(
+        {
+            "meta": {
+                "title": title,
+                "var_name": kwargs.get("var_name"),
+                "metadata": mdf.meta.as_dic(),
+            }
+        }
+    )
+
+
+@gf.func_timer
+def histogram_bars(report: cld.HistogramReport, **kwargs) -> go.Figure:
+    """Häufigkeitsverteilung als Balken (Stunden je Klasse)
+
+    An Plotly gehen nur Klassenmitte, Klassenbreite und Stunden je Klasse -
+    nicht die einzelnen Werte (kein go.Histogram).
+
+    Args:
+        - report (cld.HistogramReport): Ergebnis aus 'histogram.get_histogram'
+
+    Returns:
+        - go.Figure: ein Balken-Trace je Linie (und Jahr)
+
+    """
+
+    fig: go.Figure = go.Figure()
+    for (line, year), df_bars in report.counts.group_by(
+        ["Linie", "Jahr"], maintain_order=True
+    ):
+        low: np.ndarray = df_bars.get_column("Klasse von").to_numpy()
+        high: np.ndarray = df_bars.get_column("Klasse bis").to_numpy()
+        fig = fig.add_trace(
+            go.Bar(
+                x=(low + high) / 2,
+                y=df_bars.get_column("Stunden"),
+                width=high - low,
+                customdata=df_bars.get_column("Anteil [%]"),
+                name=line if year is None else f"{line} {year}",
+                opacity=0.6 if report.settings.by_year else 1,
+                hovertemplate="%{y:,.0f} h (%{customdata:.1f} %)<extra></extra>",
+                meta={"df_col": line, "year": year},
+            )
+        )
+
+    return fig.update_layout(
+        {
+            "barmode": "overlay",
+            "yaxis": {"title": {"text": "Stunden"}},
+            "meta": {"title": kwargs.get("title") or "Häufigkeitsverteilung"},
+        }
+    )
+
+
 @gf.func_timer
 def map_dwd_all(**kwargs) -> go.Figure:
     """Karte aller Wetterstationen"""
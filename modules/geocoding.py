@@ -0,0 +1,456 @@
+"""Geocodierung (Adresse -> Koordinaten und Koordinaten -> Adresse)
+
+Alle Abfragen im Prozess teilen sich einen Nominatim-Client.
+Ergebnisse werden in einer SQLite-Datei (cont.GEOCODE_CACHE_FILE) gespeichert
+und für cont.GEOCODE_CACHE_TTL_DAYS wiederverwendet
+(nicht gefundene Adressen nur für cont.GEOCODE_CACHE_TTL_NOT_FOUND_DAYS).
+Koordinaten werden für die Rückwärtssuche auf cont.GEOCODE_DECIMALS
+Nachkommastellen gerundet - benachbarte Punkte teilen sich einen Eintrag.
+
+Für viele Adressen (geocode_batch) werden doppelte Adressen nur einmal
+und nur Adressen, die nicht im Speicher sind, (parallel) abgefragt.
+Alle Anfragen an Nominatim teilen sich eine Begrenzung (TokenBucket).
+
+Für Tests ohne Netz kann mit set_backend(OfflineBackend(...))
+ein Ersatz für Nominatim gesetzt werden.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Literal, Protocol
+
+import polars as pl
+import toml
+from geopy.geocoders import Nominatim
+from loguru import logger
+
+from modules import classes_errors as cle
+from modules import constants as cont
+
+Kind = Literal["forward", "reverse"]
+
+LOCK: threading.Lock = threading.Lock()
+BACKEND: dict[str, "Backend"] = {}
+
+# Spalten der Tabelle von geocode_batch (wie die Attribute von cld.Location)
+LOCATION_SCHEMA: dict[str, type[pl.DataType]] = {
+    "latitude": pl.Float64,
+    "longitude": pl.Float64,
+    "address_geopy": pl.String,
+    "street": pl.String,
+    "house_number": pl.Int64,
+    "post_code": pl.Int64,
+    "city": pl.String,
+    "suburb": pl.String,
+    "country": pl.String,
+}
+
+
+class Backend(Protocol):
+    """Dienst für die Geocodierung"""
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        """Koordinaten einer Adresse (None = nicht gefunden)"""
+        ...
+
+    def reverse(self, lat_lon: tuple[float, float]) -> dict[str, Any] | None:
+        """Ort an den Koordinaten (Schlüssel wie place())"""
+        ...
+
+
+def place(
+    latitude: float, longitude: float, address: str, details: dict[str, Any]
+) -> dict[str, Any]:
+    """Ergebnis der Rückwärtssuche
+
+    Args:
+        - latitude (float): Breitengrad des gefundenen Orts
+        - longitude (float): Längengrad des gefundenen Orts
+        - address (str): ganze Adresse
+        - details (dict): Teile der Adresse wie von Nominatim
+            ("road", "house_number", "postcode", "city", ...)
+
+    """
+
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "address": address,
+        "details": details,
+    }
+
+
+@functools.cache
+def user_agent() -> str:
+    """User-Agent für Nominatim (Umgebungsvariable oder secrets.toml)"""
+
+    agent: str | None = os.environ.get("GEO_USER_AGENT")
+    secrets = pathlib.Path(".streamlit/secrets.toml")
+    if agent is None and secrets.exists():
+        agent = toml.load(secrets).get("GEO_USER_AGENT")
+    if agent is None:
+        raise cle.NotFoundError(entry="GEO_USER_AGENT", where="Secrets")
+    return agent
+
+
+class TokenBucket:
+    """Begrenzung der Anfragen je Sekunde (für alle Threads gemeinsam)
+
+    Je Anfrage wird ein Token verbraucht, pro Sekunde kommen "rate" Tokens
+    dazu (höchstens "capacity"). Ist keins da, wird gewartet.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Args:
+        - rate (float): Anfragen je Sekunde
+        - capacity (float): Anfragen, die direkt hintereinander erlaubt sind
+        """
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.tokens: float = capacity
+        self.updated: float = time.monotonic()
+        self.lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Ein Token nehmen (wartet, bis eins da ist)"""
+        with self.lock:
+            now: float = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait: float = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class NominatimBackend:
+    """Nominatim (OpenStreetMap) mit einem Client für den ganzen Prozess
+
+    Alle Anfragen teilen sich einen TokenBucket - die Nutzungsbedingungen
+    von Nominatim erlauben höchstens eine Anfrage pro Sekunde.
+    """
+
+    def __init__(self) -> None:
+        """Begrenzung nach cont.GEOCODE_RATE_PER_SECOND"""
+        self.bucket = TokenBucket(cont.GEOCODE_RATE_PER_SECOND, cont.GEOCODE_BURST)
+
+    @functools.cached_property
+    def client(self) -> Nominatim:
+        """Nominatim-Client (wird beim ersten Gebrauch erstellt)"""
+        return Nominatim(user_agent=user_agent())
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        """Koordinaten einer Adresse (None = nicht gefunden)"""
+        self.bucket.acquire()
+        found = self.client.geocode(address, exactly_one=True)
+        return (found.latitude, found.longitude) if found else None  # type: ignore
+
+    def reverse(self, lat_lon: tuple[float, float]) -> dict[str, Any] | None:
+        """Ort an den Koordinaten"""
+        self.bucket.acquire()
+        found = self.client.reverse(lat_lon, exactly_one=True, addressdetails=True)
+        if not found:
+            return None
+        return place(
+            found.latitude,  # type: ignore
+            found.longitude,  # type: ignore
+            found.address,  # type: ignore
+            found.raw.get("address", {}),  # type: ignore
+        )
+
+
+class OfflineBackend:
+    """Ersatz für Nominatim ohne Netz (für Tests)
+
+    Adressen werden in einer festen Liste gesucht,
+    die Rückwärtssuche liefert den nächsten Ort der Liste.
+    """
+
+    def __init__(self, places: dict[str, dict[str, Any]]) -> None:
+        """Args:
+        - places (dict[str, dict]): {Adresse: place(...)}
+        """
+        self.places: dict[str, dict[str, Any]] = {
+            normalise(address): value for address, value in places.items()
+        }
+        self.calls: list[tuple[Kind, Any]] = []
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        """Koordinaten einer Adresse der Liste"""
+        self.calls.append(("forward", address))
+        found: dict[str, Any] | None = self.places.get(normalise(address))
+        return (found["latitude"], found["longitude"]) if found else None
+
+    def reverse(self, lat_lon: tuple[float, float]) -> dict[str, Any] | None:
+        """Nächster Ort der Liste"""
+        self.calls.append(("reverse", lat_lon))
+        if not self.places:
+            return None
+        return min(
+            self.places.values(),
+            key=lambda pla: (
+                (pla["latitude"] - lat_lon[0]) ** 2
+                + (pla["longitude"] - lat_lon[1]) ** 2
+            ),
+        )
+
+
+def backend() -> Backend:
+    """Dienst für die Geocodierung (Standard: Nominatim)"""
+
+    with LOCK:
+        return BACKEND.setdefault("current", NominatimBackend())
+
+
+def set_backend(new: Backend) -> None:
+    """Anderen Dienst verwenden (z.B. OfflineBackend für Tests)"""
+
+    with LOCK:
+        BACKEND["current"] = new
+
+
+def normalise(address: str) -> str:
+    """Adresse als Schlüssel (Groß-/Kleinschreibung und Leerzeichen egal)"""
+
+    return " ".join(address.casefold().split())
+
+
+def coordinate_key(lat_lon: tuple[float, float]) -> str:
+    """Gerundete Koordinaten als Schlüssel"""
+
+    decimals: int = cont.GEOCODE_DECIMALS
+    return f"{lat_lon[0]:.{decimals}f},{lat_lon[1]:.{decimals}f}"
+
+
+def rounded(lat_lon: tuple[float, float]) -> tuple[float, float]:
+    """Koordinaten gerundet auf cont.GEOCODE_DECIMALS Nachkommastellen"""
+
+    return (
+        round(lat_lon[0], cont.GEOCODE_DECIMALS),
+        round(lat_lon[1], cont.GEOCODE_DECIMALS),
+    )
+
+
+@contextlib.contextmanager
+def database() -> Iterator[sqlite3.Connection]:
+    """Verbindung zum Speicher (je Abfrage eine - sicher für mehrere Threads)"""
+
+    cont.GEOCODE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    connection: sqlite3.Connection = sqlite3.connect(
+        cont.GEOCODE_CACHE_FILE, timeout=30
+    )
+    try:
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "kind TEXT, key TEXT, value TEXT, stored REAL, "
+                "PRIMARY KEY (kind, key))"
+            )
+            yield connection
+    finally:
+        connection.close()
+
+
+def read_cache(kind: Kind, key: str) -> tuple[bool, Any]:
+    """Gespeichertes Ergebnis, wenn noch gültig
+
+    Returns:
+        - bool: gültiger Eintrag gefunden
+        - Any: gespeichertes Ergebnis (None = nicht gefunden)
+
+    """
+
+    with database() as db:
+        row: tuple[str, float] | None = db.execute(
+            "SELECT value, stored FROM geocode WHERE kind = ? AND key = ?",
+            (kind, key),
+        ).fetchone()
+    if row is None:
+        return False, None
+
+    value: Any = json.loads(row[0])
+    ttl_days: float = (
+        cont.GEOCODE_CACHE_TTL_DAYS
+        if value is not None
+        else cont.GEOCODE_CACHE_TTL_NOT_FOUND_DAYS
+    )
+    if time.time() - row[1] > ttl_days * 24 * 3600:
+        return False, None
+    return True, value
+
+
+def write_cache(kind: Kind, key: str, value: Any) -> None:
+    """Ergebnis speichern (ersetzt einen alten Eintrag)"""
+
+    with database() as db:
+        db.execute(
+            "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)",
+            (kind, key, json.dumps(value), time.time()),
+        )
+
+
+def geocode(address: str) -> tuple[float, float] | None:
+    """Koordinaten einer Adresse
+
+    Args:
+        - address (str): Adresse
+
+    Returns:
+        - tuple[float, float] | None: Breiten- und Längengrad (None = nicht gefunden)
+
+    """
+
+    key: str = normalise(address)
+    hit, value = read_cache("forward", key)
+    if hit:
+        logger.info(f"Geocoding '{address}' taken from cache")
+        return tuple(value) if value else None
+
+    found: tuple[float, float] | None = backend().geocode(address)
+    write_cache("forward", key, found)
+    return found
+
+
+def reverse(lat_lon: tuple[float, float]) -> dict[str, Any] | None:
+    """Ort an den Koordinaten (Rückwärtssuche)
+
+    Args:
+        - lat_lon (tuple[float, float]): Breiten- und Längengrad
+
+    Returns:
+        - dict | None: Ort wie von place() (None = nichts gefunden)
+
+    """
+
+    key: str = coordinate_key(lat_lon)
+    hit, value = read_cache("reverse", key)
+    if hit:
+        logger.info(f"Reverse geocoding '{key}' taken from cache")
+        return value
+
+    found: dict[str, Any] | None = backend().reverse(rounded(lat_lon))
+    write_cache("reverse", key, found)
+    return found
+
+
+def number(value: Any) -> int | None:
+    """Hausnummer oder Postleitzahl als Zahl (None, wenn keine reine Zahl)"""
+
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isnumeric():
+        return int(value)
+    return None
+
+
+def location_fields(found: dict[str, Any]) -> dict[str, Any]:
+    """Ort von reverse() als Attribute von cld.Location (siehe LOCATION_SCHEMA)"""
+
+    details: dict[str, Any] = found["details"]
+    return {
+        "latitude": found["latitude"],
+        "longitude": found["longitude"],
+        "address_geopy": found["address"],
+        "street": details.get("road", "unbekannt"),
+        "house_number": number(details.get("house_number")),
+        "post_code": number(details.get("postcode")),
+        "city": details.get("city"),
+        "suburb": details.get("suburb"),
+        "country": details.get("country"),
+    }
+
+
+def from_cache(address: str) -> tuple[bool, dict[str, Any] | None]:
+    """Ort einer Adresse nur aus dem Speicher
+
+    Returns:
+        - bool: Adresse (und Rückwärtssuche) im Speicher
+        - dict | None: Ort wie von place() (None = nicht gefunden)
+
+    """
+
+    hit, point = read_cache("forward", normalise(address))
+    if not hit or point is None:
+        return hit, None
+    return read_cache("reverse", coordinate_key(tuple(point)))
+
+
+def lookup(address: str) -> dict[str, Any] | None:
+    """Ort einer Adresse (Geocodierung und Rückwärtssuche)"""
+
+    point: tuple[float, float] | None = geocode(address)
+    return reverse(point) if point else None
+
+
+def geocode_batch(
+    addresses: list[str],
+    workers: int = cont.GEOCODE_WORKERS,
+    progress: Callable[[int, int], None] | None = None,
+) -> pl.DataFrame:
+    """Viele Adressen geocodieren
+
+    Jede Adresse wird nur einmal gesucht (Schreibweise egal).
+    Adressen aus dem Speicher kommen sofort, der Rest wird parallel abgefragt
+    (die Anzahl der Anfragen je Sekunde begrenzt der TokenBucket).
+
+    Args:
+        - addresses (list[str]): Adressen
+        - workers (int, optional): gleichzeitige Abfragen
+        - progress (Callable[[int, int], None], optional): wird nach jeder
+            abgefragten Adresse aufgerufen (fertig, Anzahl der Abfragen)
+
+    Returns:
+        - pl.DataFrame: eine Zeile je Adresse (gleiche Reihenfolge),
+            Spalten "address" und LOCATION_SCHEMA (leer = nicht gefunden)
+
+    """
+
+    unique: dict[str, str] = {}
+    for address in addresses:
+        unique.setdefault(normalise(address), address)
+
+    found: dict[str, dict[str, Any] | None] = {}
+    missing: list[str] = []
+    for key, address in unique.items():
+        hit, value = from_cache(address)
+        if hit:
+            found[key] = value
+        else:
+            missing.append(key)
+    logger.info(
+        f"Geocoding {len(unique)} addresses: "
+        f"{len(unique) - len(missing)} from cache, {len(missing)} to look up"
+    )
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = {pool.submit(lookup, unique[key]): key for key in missing}
+            for done, future in enumerate(as_completed(futures), start=1):
+                found[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(missing))
+
+    fields: list[dict[str, Any] | None] = [
+        location_fields(place) if (place := found[normalise(address)]) else None
+        for address in addresses
+    ]
+    return pl.DataFrame(
+        {
+            "address": addresses,
+            **{
+                column: [row[column] if row else None for row in fields]
+                for column in LOCATION_SCHEMA
+            },
+        },
+        schema={"address": pl.String, **LOCATION_SCHEMA},
+    )
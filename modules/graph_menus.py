@@ -2,22 +2,26 @@
 
 import datetime as dt
 import pathlib
-from typing import TYPE_CHECKING, Any
+from typing import Any
 
 import plotly.graph_objects as go
+import polars as pl
 import streamlit as st
 
 from modules import classes_data as cld
 from modules import classes_errors as cle
 from modules import constants as cont
+from modules import day_profiles as dp
+from modules import degree_days as dd
 from modules import export as ex
 from modules import fig_creation as fig_cr
 from modules import fig_general_functions as fgf
+from modules import fig_plotly_plots as ploplo
 from modules import general_functions as gf
+from modules import histogram as hist
+from modules import peak_analysis as pa
 from modules import streamlit_functions as sf
-
-if TYPE_CHECKING:
-    import polars as pl
+from modules import time_filter as tf
 
 
 def sidebar_file_upload() -> Any:
@@ -62,6 +66,20 @@ def sidebar_file_upload() -> Any:
             ),
             key="f_up",
         )
+        st.file_uploader(
+            label="Portfolio (mehrere Dateien)",
+            type=["xlsx", "xlsm"],
+            accept_multiple_files=True,
+            help=(
+                f"""
+                Die Leistungs- und Arbeitswerte aller Dateien werden
+                auf ein gemeinsames {cont.PORTFOLIO_GRID_MINUTES}-Minuten-Raster
+                gebracht und zu einem Summenlastgang addiert.
+                Einspeisung und Lieferung werden nicht mitgezählt.
+                """
+            ),
+            key="f_up_portfolio",
+        )
 
     return sf.s_get("f_up")
 
@@ -137,6 +155,21 @@ def select_graphs(mdf: cld.MetaAndDfs) -> None:
             value=True,
             key="cb_jdl",
         )
+        st.file_uploader(
+            label="Dauerlinien aus Stützstellen",
+            type=["xlsx", "xlsm"],
+            accept_multiple_files=False,
+            help=(
+                f"""
+                Tabelle mit einer Spalte "{cont.DURATION_CURVE_HOUR_COLUMN}"
+                (0 … {cont.TimeHoursIn.year}) und beliebig vielen Dauerlinien,
+                die nur an einigen Stunden Werte haben (z.B. Planungswerte).
+                Die Linien werden auf Stundenwerte interpoliert
+                und in der Jahresdauerlinie dargestellt.
+                """
+            ),
+            key="f_up_duration_curves",
+        )
 
         st.checkbox(
             label="Monatswerte",
@@ -169,7 +202,6 @@ def select_graphs(mdf: cld.MetaAndDfs) -> None:
             ),
             value=False,
             key="cb_days",
-            disabled=True,
         )
 
         st.number_input(
@@ -210,6 +242,32 @@ def select_graphs(mdf: cld.MetaAndDfs) -> None:
                 key=f"day_{num!s}",
             )
 
+        st.markdown("---")
+
+        # Carpet Plot
+        st.checkbox(
+            label="Carpet Plot",
+            help=(
+                """
+                Heatmap mit der Uhrzeit auf der y-Achse und den Tagen
+                auf der x-Achse - zeigt auf einen Blick Betriebszeiten
+                und Fahrpläne.
+                """
+            ),
+            value=False,
+            key="cb_carpet",
+        )
+        st.selectbox(
+            label="Linie für den Carpet Plot",
+            options=[
+                col
+                for col in mdf.df.columns
+                if gf.check_if_not_exclude(col)
+                and mdf.df.get_column(col).dtype.is_numeric()
+            ],
+            key="sb_carpet",
+        )
+
         st.markdown("---")
         st.markdown("###")
 
@@ -248,6 +306,17 @@ def meteo_sidebar() -> None:
             ),
             key="ta_adr",
         )
+        st.checkbox(
+            label="Lücken aus Nachbarstationen füllen",
+            value=False,
+            help=(
+                """
+                Fehlende Werte der nächstgelegenen Wetterstation werden
+                mit Werten der nächsten Stationen gefüllt.
+                """
+            ),
+            key="cb_dwd_fusion",
+        )
 
         if sf.s_get("cb_temp"):
             st.plotly_chart(
@@ -261,34 +330,151 @@ def meteo_sidebar() -> None:
         st.markdown("###")
 
 
+def time_filter(mdf: cld.MetaAndDfs) -> None:
+    """Menu für den Zeitfilter (nur Arbeitszeit, Wochenenden, Zeitraum, ...)"""
+
+    first, last = tf.first_and_last_day(mdf)
+    with st.sidebar, st.expander("Zeitfilter", expanded=False), st.form("Zeitfilter"):
+        st.selectbox(
+            label="Vorlage",
+            options=["kein Filter", *cont.TIME_FILTER_PRESETS, "benutzerdefiniert"],
+            help=(
+                """
+                Die Grafiken zeigen nur die Werte, die alle Bedingungen erfüllen.
+                Die Datei muss dafür nicht neu eingelesen werden.
+                """
+            ),
+            key="sb_time_filter",
+        )
+        st.multiselect(
+            label="Tagtypen",
+            options=cont.DAY_TYPES.list_all(),
+            key="ms_time_filter_days",
+        )
+        st.multiselect(
+            label="Monate",
+            options=list(cont.MONTH_NAMES),
+            format_func=lambda month: cont.MONTH_NAMES[month],
+            key="ms_time_filter_months",
+        )
+        st.slider(
+            label="Uhrzeit",
+            min_value=0,
+            max_value=24,
+            value=(0, 24),
+            format="%d Uhr",
+            key="sl_time_filter_hours",
+        )
+        st.date_input(
+            label="Zeitraum",
+            value=(first, last),
+            min_value=first,
+            max_value=last,
+            format="DD.MM.YYYY",
+            key="di_time_filter_dates",
+        )
+
+        st.markdown("###")
+
+        st.session_state["but_time_filter"] = st.form_submit_button("Knöpfle")
+
+
+def redraw_requested() -> bool:
+    """Wurden Einstellungen bestätigt, nach denen alle Grafiken neu erzeugt werden?
+
+    (Grundeinstellungen, Wetterdaten oder Zeitfilter)
+    """
+    return any(
+        sf.s_get(button)
+        for button in ["but_base_settings", "but_meteo_sidebar", "but_time_filter"]
+    )
+
+
+def time_filter_from_menu() -> cld.TimeFilter:
+    """Zeitfilter aus dem Menu (Vorlage oder benutzerdefiniert)"""
+
+    preset: str | None = sf.s_get("sb_time_filter")
+    if preset in cont.TIME_FILTER_PRESETS:
+        return cld.TimeFilter(**cont.TIME_FILTER_PRESETS[preset])
+    if preset != "benutzerdefiniert":
+        return cld.TimeFilter()
+
+    hours: tuple[int, int] = sf.s_get("sl_time_filter_hours") or (0, 24)
+    dates: tuple[dt.date, ...] = tuple(sf.s_get("di_time_filter_dates") or ())
+    return cld.TimeFilter(
+        day_types=sf.s_get("ms_time_filter_days") or [],
+        months=sf.s_get("ms_time_filter_months") or [],
+        hours=None if hours == (0, 24) else hours,
+        dates=dates if len(dates) == 2 else None,  # noqa: PLR2004
+    )
+
+
 def clean_outliers() -> None:
-    """Menu zur Ausreißerbereinigung"""
+    """Menu zur Ausreißerbereinigung (Prüfung der Datenqualität)"""
 
+    defaults: cld.QualitySettings = cld.QualitySettings()
     with st.sidebar, st.expander("Ausreißerbereinigung", expanded=False), st.form(
         "Ausreißerbereinigung"
     ):
-        if "abs_max" not in st.session_state:
-            st.session_state["abs_max"] = float(
-                max(
-                    line["y"].max()
-                    for line in st.session_state["fig_base"].data
-                    if "orgidx" not in line.name
-                )
-            )
+        st.multiselect(
+            label="Prüfungen",
+            options=list(cont.QUALITY_FLAG_NAMES),
+            default=list(defaults.checks),
+            format_func=lambda check: cont.QUALITY_FLAG_NAMES[check],
+            help=(
+                """
+                - Ausreißer: Abweichung vom gleitenden Median  \n
+                - hängende Werte: Wert ändert sich über längere Zeit nicht  \n
+                - negative Werte: bei Leistung / Arbeit (außer Einspeisung etc.)  \n
+                - Sprünge: Änderung viel größer als die typische Änderung
+                """
+            ),
+            key="ms_dq_checks",
+        )
 
         st.number_input(
-            label="Bereinigung von Werten über:",
-            value=st.session_state["abs_max"],
-            format="%.0f",
+            label="Fensterbreite (Zeitschritte)",
+            min_value=3,
+            value=defaults.window,
+            step=2,
+            format="%i",
+            help="Breite des gleitenden Fensters für Median und MAD",
+            key="ni_dq_window",
+        )
+        st.number_input(
+            label="Schwelle Ausreißer (x MAD)",
+            min_value=1.0,
+            value=float(defaults.mad_threshold),
+            step=0.5,
+            key="ni_dq_mad",
+        )
+        st.number_input(
+            label="hängend ab (Zeitschritte)",
+            min_value=2,
+            value=defaults.stuck_min_run,
+            format="%i",
+            key="ni_dq_stuck",
+        )
+        st.number_input(
+            label="Sprung ab (x typische Änderung)",
+            min_value=1.0,
+            value=float(defaults.jump_factor),
+            step=1.0,
+            key="ni_dq_jump",
+        )
+
+        st.checkbox(
+            label="markierte Werte ersetzen",
+            value=False,
             help=(
                 """
-                Ist ein Wert in den Daten höher als der hier eingegebene, 
-                wird dieser Datenpunkt aus der Reihe gelöscht 
-                und die Lücke interpoliert.
+                Markierte Werte werden aus der Reihe gelöscht 
+                und die Lücke interpoliert.  \n
+                _(Um die Originaldaten wiederherzustellen, 
+                die Datei neu hochladen.)_
                 """
             ),
-            key="ni_outl",
-            disabled=True,
+            key="cb_dq_repair",
         )
 
         st.markdown("###")
@@ -296,6 +482,481 @@ def clean_outliers() -> None:
         st.session_state["but_clean_outliers"] = st.form_submit_button("Knöpfle")
 
 
+def quality_settings_from_menu() -> cld.QualitySettings:
+    """Einstellungen der Qualitätsprüfung aus dem Menu"""
+
+    return cld.QualitySettings(
+        window=int(sf.s_get("ni_dq_window") or cld.QualitySettings.window),
+        mad_threshold=float(sf.s_get("ni_dq_mad") or cld.QualitySettings.mad_threshold),
+        stuck_min_run=int(sf.s_get("ni_dq_stuck") or cld.QualitySettings.stuck_min_run),
+        jump_factor=float(sf.s_get("ni_dq_jump") or cld.QualitySettings.jump_factor),
+        checks=tuple(sf.s_get("ms_dq_checks") or ()),
+    )
+
+
+def quality_report() -> None:
+    """Bericht der letzten Qualitätsprüfung"""
+
+    report: cld.QualityReport | None = sf.s_get("dq_report")
+    if report is None:
+        return
+
+    with st.expander("Bericht Datenqualität", expanded=False):
+        st.dataframe(
+            report.summary,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Anteil": st.column_config.NumberColumn(format="%.2f %%"),
+            },
+        )
+
+
+def portfolio_report() -> None:
+    """Kennwerte der Zähler im Portfolio"""
+
+    report: cld.PortfolioReport | None = sf.s_get("portfolio")
+    if report is None:
+        return
+
+    number: st.column_config.NumberColumn = st.column_config.NumberColumn(
+        format="%.1f"
+    )
+    with st.expander("Portfolio", expanded=False):
+        st.markdown(f"Gleichzeitigkeitsfaktor: {report.simultaneity:.2f}")
+        st.dataframe(
+            report.meters,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                col: number
+                for col in report.meters.columns
+                if col not in ["Datei", "Linie", "Zeitpunkt"]
+            }
+            | {"Zeitpunkt": st.column_config.DatetimeColumn(format="DD.MM.YYYY HH:mm")},
+        )
+
+
+def battery(mdf: cld.MetaAndDfs) -> None:
+    """Menu für die Simulation eines Batteriespeichers (Peak Shaving)"""
+
+    columns: list[str] = pa.power_columns(mdf)
+    if not columns:
+        return
+
+    defaults: cld.BatterySettings = cld.BatterySettings()
+    with st.sidebar, st.expander("Batteriespeicher", expanded=False), st.form(
+        "Batteriespeicher"
+    ):
+        st.selectbox(label="Lastgang", options=columns, key="sb_bat_col")
+
+        st.text_input(
+            label="Kapazitäten",
+            value=", ".join(f"{cap:g}" for cap in defaults.capacities),
+            help="Speicherkapazitäten (z.B. in kWh), durch Komma getrennt",
+            key="ti_bat_capacities",
+        )
+        st.text_input(
+            label="Leistungen",
+            value=", ".join(f"{pwr:g}" for pwr in defaults.powers),
+            help="Lade- / Entladeleistungen (z.B. in kW), durch Komma getrennt",
+            key="ti_bat_powers",
+        )
+        st.number_input(
+            label="Wirkungsgrad (Laden und Entladen)",
+            min_value=0.5,
+            max_value=1.0,
+            value=defaults.efficiency,
+            step=0.01,
+            key="ni_bat_efficiency",
+        )
+        st.slider(
+            label="Ladezustand",
+            min_value=0.0,
+            max_value=1.0,
+            value=(defaults.soc_min, defaults.soc_max),
+            step=0.05,
+            help="nutzbarer Bereich des Ladezustands (Anteil der Kapazität)",
+            key="sl_bat_soc",
+        )
+        st.number_input(
+            label="Leistungspreis (€ pro kW und Jahr)",
+            min_value=0.0,
+            value=0.0,
+            step=10.0,
+            help="_(0 = ohne Berechnung der Einsparung)_",
+            key="ni_bat_demand_price",
+        )
+
+        st.markdown("###")
+
+        st.session_state["but_battery"] = st.form_submit_button("Knöpfle")
+
+
+def battery_settings_from_menu() -> cld.BatterySettings:
+    """Einstellungen der Speichersimulation aus dem Menu"""
+
+    def values(key: str, default: tuple[float, ...]) -> tuple[float, ...]:
+        text: str = sf.s_get(key) or ""
+        try:
+            parsed: tuple[float, ...] = tuple(
+                float(val) for val in text.replace(";", ",").split(",") if val.strip()
+            )
+        except ValueError:
+            st.warning(f"Eingabe '{text}' nicht lesbar - Standardwerte verwendet")
+            return default
+        return parsed or default
+
+    defaults: cld.BatterySettings = cld.BatterySettings()
+    soc_min, soc_max = sf.s_get("sl_bat_soc") or (defaults.soc_min, defaults.soc_max)
+    return cld.BatterySettings(
+        capacities=values("ti_bat_capacities", defaults.capacities),
+        powers=values("ti_bat_powers", defaults.powers),
+        efficiency=float(sf.s_get("ni_bat_efficiency") or defaults.efficiency),
+        soc_min=float(soc_min),
+        soc_max=float(soc_max),
+        demand_price=sf.s_get("ni_bat_demand_price") or None,
+    )
+
+
+def battery_report() -> None:
+    """Ergebnis der letzten Speichersimulation"""
+
+    df_bat: pl.DataFrame | None = sf.s_get("df_battery")
+    if df_bat is None:
+        return
+
+    with st.expander("Batteriespeicher (Peak Shaving)", expanded=False):
+        st.dataframe(
+            df_bat,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                col: st.column_config.NumberColumn(format="%.1f")
+                for col in df_bat.columns
+            },
+        )
+
+
+def peaks(mdf: cld.MetaAndDfs) -> None:
+    """Menu für die Auswertung der Lastspitzen (Netzentgelte)"""
+
+    if not pa.power_columns(mdf):
+        return
+
+    defaults: cld.PeakSettings = cld.PeakSettings()
+    with st.sidebar, st.expander("Lastspitzen / Netzentgelte", expanded=False), st.form(
+        "Lastspitzen / Netzentgelte"
+    ):
+        st.number_input(
+            label="Anzahl höchster Werte",
+            min_value=1,
+            value=defaults.top_n,
+            format="%i",
+            help="Anzahl der höchsten Werte je Linie und Jahr",
+            key="ni_peak_top_n",
+        )
+
+        st.markdown("Hochlastzeitfenster (werktags)")
+        for season, windows in cont.HLZF_DEFAULT.items():
+            st.text_input(
+                label=season,
+                value=windows,
+                help="z.B. 08:00-13:00, 16:30-19:30 (leer = kein Zeitfenster)",
+                key=f"ti_hlzf_{season}",
+            )
+
+        st.number_input(
+            label="Erheblichkeitsschwelle (%)",
+            min_value=0.0,
+            max_value=100.0,
+            value=defaults.min_share * 100,
+            step=1.0,
+            help=(
+                """
+                Mindestabstand der Spitze im Hochlastzeitfenster
+                zur Jahreshöchstleistung für die atypische Netznutzung
+                """
+            ),
+            key="ni_peak_min_share",
+        )
+        st.number_input(
+            label="Mindestabstand (kW)",
+            min_value=0.0,
+            value=float(defaults.min_reduction),
+            step=10.0,
+            key="ni_peak_min_reduction",
+        )
+        st.checkbox(
+            label="höchste Werte in der Grafik beschriften",
+            value=False,
+            key="cb_peak_anno",
+        )
+
+        st.markdown("###")
+
+        st.session_state["but_peaks"] = st.form_submit_button("Knöpfle")
+
+
+def peak_settings_from_menu() -> cld.PeakSettings:
+    """Einstellungen der Lastspitzen-Auswertung aus dem Menu"""
+
+    defaults: cld.PeakSettings = cld.PeakSettings()
+    hlzf: dict[str, tuple[tuple[dt.time, dt.time], ...]] = {}
+    for season, default in cont.HLZF_DEFAULT.items():
+        text: str = sf.s_get(f"ti_hlzf_{season}") or default
+        try:
+            hlzf[season] = pa.parse_time_windows(text)
+        except ValueError:
+            st.warning(f"Zeitfenster '{text}' nicht lesbar ({season})")
+            hlzf[season] = ()
+
+    min_share: float | None = sf.s_get("ni_peak_min_share")
+    min_reduction: float | None = sf.s_get("ni_peak_min_reduction")
+    return cld.PeakSettings(
+        top_n=int(sf.s_get("ni_peak_top_n") or defaults.top_n),
+        hlzf=hlzf,
+        min_share=defaults.min_share if min_share is None else min_share / 100,
+        min_reduction=(
+            defaults.min_reduction if min_reduction is None else min_reduction
+        ),
+    )
+
+
+def peak_report(report: cld.PeakReport | None) -> None:
+    """Tabellen der Lastspitzen-Auswertung"""
+
+    if report is None:
+        return
+
+    number: st.column_config.NumberColumn = st.column_config.NumberColumn(
+        format="%.1f"
+    )
+    time: st.column_config.DatetimeColumn = st.column_config.DatetimeColumn(
+        format="DD.MM.YYYY HH:mm"
+    )
+    with st.expander("Lastspitzen / Netzentgelte", expanded=False):
+        st.markdown("Jahreswerte")
+        st.dataframe(
+            report.years,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Jahr": st.column_config.NumberColumn(format="%i"),
+                "Höchstleistung": number,
+                "Energie": number,
+                "Höchstleistung HLZF": number,
+                "Benutzungsstunden": number,
+                "Abstand HLZF": number,
+                "Abstand HLZF [%]": number,
+                "Zeitpunkt": time,
+                "Zeitpunkt HLZF": time,
+            },
+        )
+        st.markdown("Monatswerte")
+        st.dataframe(
+            report.months,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Monat": st.column_config.DatetimeColumn(format="MM.YYYY"),
+                "Höchstleistung": number,
+                "Höchstleistung HLZF": number,
+                "Energie": number,
+                "Zeitpunkt": time,
+                "Zeitpunkt HLZF": time,
+            },
+        )
+        st.markdown(f"höchste {report.settings.top_n} Werte je Jahr")
+        st.dataframe(
+            report.top,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Jahr": st.column_config.NumberColumn(format="%i"),
+                "Leistung": number,
+                "Zeitpunkt": time,
+            },
+        )
+
+
+def histogram(mdf: cld.MetaAndDfs) -> None:
+    """Menu für die Häufigkeitsverteilung"""
+
+    defaults: cld.HistogramSettings = cld.HistogramSettings()
+    columns: list[str] = hist.value_columns(mdf.df)
+    with st.sidebar, st.expander("Häufigkeitsverteilung", expanded=False), st.form(
+        "Häufigkeitsverteilung"
+    ):
+        st.multiselect(
+            label="Linien",
+            options=columns,
+            default=columns,
+            key="ms_hist_columns",
+        )
+        st.number_input(
+            label="Anzahl Klassen",
+            min_value=2,
+            max_value=200,
+            value=defaults.bins,
+            step=1,
+            key="ni_hist_bins",
+        )
+        st.checkbox(
+            label="Klassengrenzen aus Quantilen",
+            value=defaults.quantile_edges,
+            help=(
+                """
+                gleich viele Werte je Klasse statt gleich breiter Klassen
+                """
+            ),
+            key="cb_hist_quantiles",
+        )
+
+        st.markdown("###")
+
+        st.session_state["but_hist"] = st.form_submit_button("Knöpfle")
+
+
+def histogram_settings_from_menu(*, by_year: bool) -> cld.HistogramSettings:
+    """Einstellungen der Häufigkeitsverteilung aus dem Menu"""
+
+    return cld.HistogramSettings(
+        bins=int(sf.s_get("ni_hist_bins") or cld.HistogramSettings().bins),
+        quantile_edges=bool(sf.s_get("cb_hist_quantiles")),
+        columns=sf.s_get("ms_hist_columns") or [],
+        by_year=by_year,
+    )
+
+
+def histogram_report(report: cld.HistogramReport | None) -> None:
+    """Balken und Tabelle der Häufigkeitsverteilung"""
+
+    if report is None:
+        return
+
+    number: st.column_config.NumberColumn = st.column_config.NumberColumn(
+        format="%.1f"
+    )
+    with st.expander("Häufigkeitsverteilung", expanded=False):
+        st.plotly_chart(
+            ploplo.histogram_bars(report),
+            use_container_width=True,
+            theme=cont.ST_PLOTLY_THEME,
+        )
+        st.dataframe(
+            report.counts,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Jahr": st.column_config.NumberColumn(format="%i"),
+                "Klasse von": number,
+                "Klasse bis": number,
+                "Stunden": number,
+                "Anteil [%]": number,
+            },
+        )
+
+
+def climate(mdf: cld.MetaAndDfs) -> None:
+    """Menu für Gradtagzahlen und Witterungsbereinigung
+
+    Braucht die Außentemperatur (Menu "Außentemperatur").
+    """
+
+    if not sf.s_get("cb_temp") or not (columns := dd.energy_columns(mdf)):
+        return
+
+    with st.sidebar, st.expander("Witterungsbereinigung", expanded=False), st.form(
+        "Witterungsbereinigung"
+    ):
+        st.multiselect(
+            label="Linien",
+            options=columns,
+            default=columns,
+            key="ms_climate_columns",
+        )
+        st.number_input(
+            label="Raumtemperatur (°C)",
+            value=float(cont.DEGREE_DAY_INDOOR),
+            step=0.5,
+            key="ni_climate_indoor",
+        )
+        st.number_input(
+            label="Heizgrenze (°C)",
+            value=float(cont.DEGREE_DAY_HEATING_LIMIT),
+            step=0.5,
+            key="ni_climate_limit",
+        )
+        st.checkbox(
+            label="langjähriges Mittel als Referenz",
+            value=True,
+            help=(
+                f"""
+                Tagesmitteltemperaturen der letzten
+                {cont.DEGREE_DAY_REFERENCE_YEARS} Jahre
+                der nächstgelegenen DWD-Station
+                (werden nach dem ersten Mal lokal gespeichert)
+                """
+            ),
+            key="cb_climate_reference",
+        )
+
+        st.markdown("###")
+
+        st.session_state["but_climate"] = st.form_submit_button("Knöpfle")
+
+
+def climate_report(report: cld.ClimateReport | None) -> None:
+    """Tabellen der Witterungsbereinigung"""
+
+    if report is None:
+        return
+
+    number: st.column_config.NumberColumn = st.column_config.NumberColumn(
+        format="%.1f"
+    )
+    year: st.column_config.NumberColumn = st.column_config.NumberColumn(format="%i")
+    with st.expander("Witterungsbereinigung", expanded=False):
+        st.markdown("Energiesignatur (Tageswerte)")
+        st.dataframe(
+            report.signatures,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Jahr": year,
+                "Grundlast": number,
+                "Steigung": st.column_config.NumberColumn(format="%.2f"),
+                "Änderungspunkt": number,
+                "Bestimmtheitsmaß": st.column_config.NumberColumn(format="%.3f"),
+            },
+        )
+        if report.normalised is not None:
+            st.markdown("witterungsbereinigter Verbrauch")
+            st.dataframe(
+                report.normalised,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    col: number
+                    for col in report.normalised.columns
+                    if col not in ["Linie", "Jahr", "Tage"]
+                }
+                | {"Jahr": year},
+            )
+        st.markdown("Gradtagzahlen")
+        st.dataframe(
+            report.degree_days,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Jahr": year,
+                dd.COL_DEGREE_DAYS: number,
+                "mittlere Außentemperatur": number,
+            },
+        )
+
+
 def smooth() -> None:
     """Einstellungen für die geglätteten Linien"""
 
@@ -555,6 +1216,7 @@ def display_options_main() -> bool:
                     for anno in fig_layout["annotations"]
                     if gf.check_if_not_exclude(anno["name"])
                     and gf.check_if_not_exclude(line_name)
+                    and not anno["name"].startswith(cont.PEAK_ANNO_PREFIX)
                 ]:
                     if line_name in anno:
                         anno_name = anno.split(": ")[0]
@@ -579,7 +1241,7 @@ def display_smooth_main() -> bool:
     with st.expander("Anzeigeoptionen für geglättete Linien", expanded=False), st.form(
         "Anzeigeoptionen für geglättete Linien"
     ):
-        col_general: list = st.columns([3, 1])
+        col_general: list = st.columns([3, 1, 1])
         with col_general[0]:
             st.slider(
                 label="Glättung",
@@ -609,6 +1271,21 @@ def display_smooth_main() -> bool:
                 ),
                 key="gl_deg",
             )
+        with col_general[2]:
+            st.selectbox(
+                label="Verfahren",
+                options=list(cont.SMOOTH_METHODS),
+                format_func=lambda method: cont.SMOOTH_METHODS[method],
+                help=(
+                    """
+                    Savitzky-Golay folgt der Kurve am genauesten,  \n
+                    der gleitende Mittelwert und LOWESS
+                    sind bei großen Datenmengen schneller.  \n
+                    _(der Polynomgrad gilt nur für Savitzky-Golay)_
+                    """
+                ),
+                key="sb_smooth_method",
+            )
 
         st.markdown("---")
 
@@ -680,6 +1357,29 @@ def display_smooth_main() -> bool:
     return but_smooth
 
 
+def analysis_sheets(mdf: cld.MetaAndDfs) -> dict[str, pl.DataFrame]:
+    """Tabellenblätter der Auswertungen (Batterie, Lastspitzen, Klima, ...)"""
+
+    sheets: dict[str, pl.DataFrame] = {}
+    if (portfolio := sf.s_get("portfolio")) is not None:
+        sheets["Portfolio"] = portfolio.meters
+    if (df_bat := sf.s_get("df_battery")) is not None:
+        sheets["Batteriespeicher"] = df_bat
+    if mdf.peaks is not None:
+        sheets["Lastspitzen Jahre"] = mdf.peaks.years
+        sheets["Lastspitzen Monate"] = mdf.peaks.months
+        sheets["höchste Werte"] = mdf.peaks.top
+    if mdf.climate is not None:
+        sheets["Energiesignatur"] = mdf.climate.signatures
+        sheets["Gradtagzahlen"] = mdf.climate.degree_days
+        if mdf.climate.normalised is not None:
+            sheets["Witterungsbereinigung"] = mdf.climate.normalised
+    if mdf.histogram is not None:
+        sheets["Häufigkeitsverteilung"] = mdf.histogram.counts
+
+    return sheets
+
+
 def downloads(mdf: cld.MetaAndDfs) -> None:
     """Dateidownloads"""
 
@@ -692,6 +1392,11 @@ def downloads(mdf: cld.MetaAndDfs) -> None:
         dic_df_ex["Jahresdauerlinie"] = mdf.jdl
     if mdf.mon is not None:
         dic_df_ex["Monatswerte"] = mdf.mon
+    if sf.s_get("cb_days"):
+        dic_df_ex["Typtage"] = dp.typical_days(
+            mdf, "df_h" if sf.s_get("cb_h") and mdf.df_h is not None else "df"
+        )
+    dic_df_ex |= analysis_sheets(mdf)
 
     st.download_button(
         **cont.Buttons.download_excel.func_args(),
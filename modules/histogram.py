@@ -0,0 +1,225 @@
+"""Häufigkeitsverteilung (Histogramm) der Werte je Linie und Jahr
+
+Alle Linien (und Jahre) werden in einem Durchlauf klassiert:
+Die Werte jeder Spalte werden auf ihre Klassengrenzen normiert
+und spaltenweise versetzt, sodass ein einziges 'np.searchsorted'
+und ein einziges 'np.bincount' die Anzahl aller Klassen aller Spalten liefern.
+An die Grafik gehen nur die Anzahlen je Klasse, nie die einzelnen Werte.
+"""
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import df_manipulation as df_man
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+
+
+def value_columns(df: pl.DataFrame) -> list[str]:
+    """Zahlen-Spalten eines Data Frames (ohne Index)"""
+
+    return [
+        col
+        for col in df.columns
+        if gf.check_if_not_exclude(col) and df.get_column(col).dtype.is_numeric()
+    ]
+
+
+def value_matrix(frames: list[pl.DataFrame], columns: list[str]) -> np.ndarray:
+    """Werte aller Data Frames nebeneinander als Matrix (Zeilen x Spalten)
+
+    Kürzere Data Frames (z.B. Jahre mit weniger Tagen) werden mit NaN aufgefüllt.
+    """
+
+    selected: list[pl.DataFrame] = [
+        df.select([col for col in columns if col in df.columns]) for df in frames
+    ]
+    height: int = max(df.height for df in selected)
+    matrix: np.ndarray = np.full((height, sum(df.width for df in selected)), np.nan)
+    position: int = 0
+    for df in selected:
+        matrix[: df.height, position : position + df.width] = df.cast(
+            pl.Float64
+        ).to_numpy()
+        position += df.width
+    return matrix
+
+
+def bin_edges(values: np.ndarray, bins: int, *, quantile_edges: bool) -> np.ndarray:
+    """Klassengrenzen je Spalte (bins + 1 Grenzen x Spalten)
+
+    Gleich breite Klassen zwischen Minimum und Maximum
+    oder Grenzen an den Quantilen (gleich viele Werte je Klasse).
+    """
+
+    if quantile_edges:
+        return np.nanquantile(values, np.linspace(0, 1, bins + 1), axis=0)
+
+    low: np.ndarray = np.nanmin(values, axis=0)
+    high: np.ndarray = np.nanmax(values, axis=0)
+    high = np.where(high > low, high, low + 1)
+    return low + (high - low) * np.linspace(0, 1, bins + 1)[:, None]
+
+
+def bin_counts(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Anzahl der Werte je Klasse für alle Spalten in einem Durchlauf
+
+    Args:
+        - values (np.ndarray): Werte (Zeilen x Spalten, NaN = kein Wert)
+        - edges (np.ndarray): Klassengrenzen (bins + 1 x Spalten, aufsteigend)
+
+    Returns:
+        - np.ndarray: Anzahl je Klasse (bins x Spalten); der größte Wert
+            zählt zur obersten Klasse, Werte außerhalb der Grenzen zählen nicht
+
+    """
+
+    bins: int = len(edges) - 1
+    columns: int = values.shape[1]
+    low: np.ndarray = edges[0]
+    span: np.ndarray = np.where(edges[-1] > low, edges[-1] - low, 1)
+
+    # normieren auf [0, 1] und je Spalte um 2 versetzen -> eine aufsteigende Reihe
+    offset: np.ndarray = 2 * np.arange(columns)
+    scaled_edges: np.ndarray = ((edges - low) / span + offset).T.ravel()
+    scaled: np.ndarray = (values - low) / span
+
+    valid: np.ndarray = ~np.isnan(scaled) & (scaled >= 0) & (scaled <= 1)
+    column: np.ndarray = np.broadcast_to(np.arange(columns), values.shape)[valid]
+    position: np.ndarray = np.searchsorted(
+        scaled_edges, scaled[valid] + offset[column], side="right"
+    )
+    index_in_column: np.ndarray = np.minimum(
+        position - 1 - column * (bins + 1), bins - 1
+    )
+
+    return (
+        np.bincount(index_in_column + column * bins, minlength=bins * columns)
+        .reshape(columns, bins)
+        .T
+    )
+
+
+def year_frames(
+    mdf: cld.MetaAndDfs, frame: str, columns: list[str]
+) -> tuple[list[pl.DataFrame], list[tuple[str, int | None]]]:
+    """Data Frames und (Linie, Jahr) je Spalte der Matrix
+
+    Mit 'by_year' werden die Jahres-Data-Frames aus 'split_multi_years'
+    verwendet (Spaltennamen mit Jahreszahl).
+    """
+
+    multi: dict[int, pl.DataFrame] | None = getattr(mdf, f"{frame}_multi", None)
+    if not multi:
+        return [getattr(mdf, frame)], [(col, None) for col in columns]
+
+    frames: list[pl.DataFrame] = []
+    labels: list[tuple[str, int | None]] = []
+    for year, df_year in multi.items():
+        rename: dict[str, str] = df_man.multi_year_column_rename(
+            getattr(mdf, frame).select(columns), year
+        )
+        present: dict[str, str] = {
+            rename[col]: col for col in columns if rename[col] in df_year.columns
+        }
+        frames.append(df_year.select(list(present)).rename(present))
+        labels.extend((col, year) for col in present.values())
+
+    return frames, labels
+
+
+@gf.func_timer
+def histogram(
+    mdf: cld.MetaAndDfs,
+    settings: cld.HistogramSettings | None = None,
+    frame: str = "df",
+    edges: dict[str, np.ndarray] | None = None,
+) -> cld.HistogramReport:
+    """Häufigkeitsverteilung der gewählten Linien (je Jahr)
+
+    Args:
+        - mdf (cld.MetaAndDfs): Daten
+        - settings (cld.HistogramSettings | None): Einstellungen
+        - frame (str): "df" oder "df_h"
+        - edges (dict[str, np.ndarray] | None): schon berechnete Klassengrenzen
+
+    Returns:
+        - cld.HistogramReport: Anzahl, Stunden und Anteil je Klasse
+
+    """
+
+    settings = settings or cld.HistogramSettings()
+    df: pl.DataFrame | None = getattr(mdf, frame)
+    if df is None:
+        raise cle.NotFoundError(entry=frame, where="mdf")
+
+    columns: list[str] = [
+        col for col in settings.columns or value_columns(df) if col in df.columns
+    ]
+    if edges is None or any(col not in edges for col in columns):
+        values: np.ndarray = df.select(columns).cast(pl.Float64).to_numpy()
+        matrix_edges: np.ndarray = bin_edges(
+            values, settings.bins, quantile_edges=settings.quantile_edges
+        )
+        edges = {col: matrix_edges[:, pos] for pos, col in enumerate(columns)}
+
+    frames, labels = (
+        year_frames(mdf, frame, columns)
+        if settings.by_year
+        else ([df], [(col, None) for col in columns])
+    )
+    counts: np.ndarray = bin_counts(
+        value_matrix(frames, columns),
+        np.column_stack([edges[col] for col, _ in labels]),
+    )
+
+    step_h: float = (
+        df.get_column(COL_IND).diff().median().total_seconds()  # type: ignore[union-attr]
+        / cont.TimeSecondsIn.hour
+    )
+    total: np.ndarray = np.maximum(counts.sum(axis=0), 1)
+    df_counts: pl.DataFrame = pl.DataFrame(
+        {
+            "Linie": np.repeat([col for col, _ in labels], settings.bins),
+            "Jahr": np.repeat([year for _, year in labels], settings.bins),
+            "Klasse von": np.concatenate([edges[col][:-1] for col, _ in labels]),
+            "Klasse bis": np.concatenate([edges[col][1:] for col, _ in labels]),
+            "Anzahl": counts.T.ravel(),
+            "Stunden": counts.T.ravel() * step_h,
+            "Anteil [%]": (counts / total * 100).T.ravel(),
+        },
+        strict=False,
+    )
+    logger.info(f"Histogram for {len(labels)} columns with {settings.bins} bins")
+
+    return cld.HistogramReport(
+        counts=df_counts, edges=edges, settings=settings, frame=frame
+    )
+
+
+def get_histogram(
+    mdf: cld.MetaAndDfs, settings: cld.HistogramSettings, frame: str = "df"
+) -> cld.HistogramReport:
+    """Häufigkeitsverteilung (gespeichert in mdf.histogram)
+
+    Die Klassengrenzen werden wiederverwendet, solange Klassenanzahl,
+    Art der Grenzen und Data Frame gleich bleiben
+    (z.B. wenn nur zwischen einzeln und je Jahr gewechselt wird).
+    """
+
+    cached: cld.HistogramReport | None = mdf.histogram
+    reuse: bool = (
+        cached is not None
+        and cached.frame == frame
+        and cached.settings.bins == settings.bins
+        and cached.settings.quantile_edges == settings.quantile_edges
+    )
+    mdf.histogram = histogram(
+        mdf, settings, frame, cached.edges if reuse and cached else None
+    )
+    return mdf.histogram
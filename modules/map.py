@@ -1,6 +1,8 @@
 """Show stuff on maps"""
 
+import dataclasses
 import os
+from collections.abc import Callable
 from pathlib import Path
 from zipfile import ZipFile
 
@@ -14,6 +16,7 @@ from loguru import logger
 from modules import classes_data as cld
 from modules import classes_errors as cle
 from modules import general_functions as gf
+from modules import geocoding as geo
 from modules import streamlit_functions as sf
 
 
@@ -197,8 +200,23 @@ def get_zoom_level_from_locations(locations: list[cld.Location]) -> float:
 
 
 @gf.func_timer
-def create_list_of_locations_from_df(df: pl.DataFrame) -> list[cld.Location]:
-    """From a DataFrame with the correct columns, create a list of locations"""
+def create_list_of_locations_from_df(
+    df: pl.DataFrame,
+    *,
+    geocode: bool = True,
+    progress: Callable[[int, int], None] | None = None,
+) -> list[cld.Location]:
+    """From a DataFrame with the correct columns, create a list of locations
+
+    Args:
+        - df (pl.DataFrame): Spalten "Name" und "Adresse"
+            oder "Breitengrad" und "Längengrad"
+        - geocode (bool, optional): Adressen gleich geocodieren. Defaults to True.
+            (False -> Koordinaten fehlen, z.B. um parallel zu geocodieren)
+        - progress (Callable[[int, int], None], optional): Fortschritt der
+            Geocodierung (siehe geocoding.geocode_batch)
+
+    """
 
     col_nam: str = "Name"
     col_lat: str = "Breitengrad"
@@ -226,15 +244,53 @@ def create_list_of_locations_from_df(df: pl.DataFrame) -> list[cld.Location]:
                 address=row[col_adr],
                 attr_size=row[col_siz] if col_siz in df.columns else None,
                 attr_colour=row[col_col] if col_col in df.columns else None,
-            ).fill_using_geopy()
+            )
             for row in df.iter_rows(named=True)
         ]
+        if geocode:
+            locations = geocode_locations(locations, progress)
     else:
         raise cle.WrongColumnNamesError(None)
 
     return locations
 
 
+def geocode_locations(
+    locations: list[cld.Location],
+    progress: Callable[[int, int], None] | None = None,
+) -> list[cld.Location]:
+    """Standorte ohne Koordinaten über ihre Adresse geocodieren
+
+    Alle Adressen auf einmal (siehe geocoding.geocode_batch) -
+    nicht gefundene Standorte bleiben ohne Koordinaten.
+    """
+
+    to_find: list[int] = [
+        num
+        for num, loc in enumerate(locations)
+        if isinstance(loc.address, str)
+        and (loc.latitude is None or loc.longitude is None)
+    ]
+    if not to_find:
+        return locations
+
+    table: pl.DataFrame = geo.geocode_batch(
+        [str(locations[num].address) for num in to_find], progress=progress
+    )
+    located: list[cld.Location] = list(locations)
+    for num, row in zip(
+        to_find, table.drop("address").iter_rows(named=True), strict=True
+    ):
+        if row["latitude"] is None:
+            logger.critical(
+                f"Could not find location of address \n{locations[num].address}"
+            )
+        else:
+            located[num] = dataclasses.replace(locations[num], **row)
+
+    return located
+
+
 def marker_layout(locations: list[cld.Location]) -> dict:
     """Generate marker properties for a plot.
 
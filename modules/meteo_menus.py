@@ -10,10 +10,12 @@ from loguru import logger
 
 from modules import classes_data as cld
 from modules import constants as cont
+from modules import excel_import as ex_i
 from modules import export as ex
 from modules import general_functions as gf
 from modules import meteorolog as met
 from modules import streamlit_functions as sf
+from modules import weather_batch as wb
 
 
 def sidebar_address_dates() -> None:
@@ -126,12 +128,90 @@ def sidebar_dwd_query_limits() -> None:
             format="%i",
             key="ni_limit_time",
         )
+        st.checkbox(
+            label="Lücken aus Nachbarstationen füllen",
+            value=False,
+            help=(
+                f"""
+                Fehlende Werte der nächstgelegenen Station werden
+                mit Werten der bis zu {cont.DWD_FUSION_MAX_STATIONS} nächsten Stationen
+                gefüllt (Temperaturen auf die Höhe der nächstgelegenen
+                Station umgerechnet).
+                """
+            ),
+            key="cb_dwd_fusion",
+        )
 
         st.session_state["but_dwd_query_limits"] = st.form_submit_button(
             "Knöpfle", use_container_width=True
         )
 
 
+def sidebar_batch() -> None:
+    """Wetterdaten für viele Standorte (Liste im Format der Karten-Seite)"""
+
+    with st.sidebar, st.expander("Mehrere Standorte"), st.form("Weather Batch"):
+        st.file_uploader(
+            label="Liste der Standorte",
+            type=["xlsx"],
+            help=(
+                """
+                Excel-Datei wie für die Kartografische Datenauswertung:  \n
+                Spalten "Name" und "Adresse"
+                oder "Name", "Breitengrad" und "Längengrad".  \n
+                Es werden Stundenwerte für das gewählte Jahr erzeugt
+                (Polysun-Dateien, wenn "Polysun Wetterdaten" eingeschaltet ist).
+                """
+            ),
+            key="f_up_weather_batch",
+        )
+        st.number_input(
+            label="Jahr",
+            value=dt.datetime.now().year - 1,
+            format="%i",
+            key="ni_weather_batch_year",
+        )
+        st.session_state["but_weather_batch"] = st.form_submit_button(
+            "Knöpfle", use_container_width=True
+        )
+
+
+@gf.func_timer
+def download_batch() -> None:
+    """ZIP-Datei mit den Wetterdaten aller Standorte der Liste"""
+
+    if sf.s_get("but_weather_batch") and sf.s_get("f_up_weather_batch"):
+        year: int = int(sf.s_get("ni_weather_batch_year"))
+        with st.spinner("Wetterdaten für alle Standorte werden gesammelt..."):
+            sf.s_set(
+                "weather_batch",
+                wb.weather_files_from_list(
+                    ex_i.general_excel_import(sf.s_get("f_up_weather_batch")),
+                    cld.TimeSpan(
+                        dt.datetime(year, 1, 1, 0, 0), dt.datetime(year, 12, 31, 23, 59)
+                    ),
+                    polysun=bool(sf.s_get("tog_polysun")),
+                    parameters=sf.s_get("selected_params") or cont.DWD_DEFAULT_PARAMS,
+                ),
+            )
+
+    batch: tuple[bytes, list[str]] | None = sf.s_get("weather_batch")
+    if batch is None:
+        return
+
+    zip_file, without_data = batch
+    if without_data:
+        st.warning(
+            "Keine Daten gefunden für:  \n"
+            + "  \n".join(f"- {name}" for name in without_data)
+        )
+    st.download_button(
+        **cont.Buttons.download_weather_batch.func_args(),
+        data=zip_file,
+        file_name=f"Wetterdaten {sf.s_get('ni_weather_batch_year')}.zip",
+    )
+
+
 @gf.func_timer
 def parameter_selection() -> None:
     """DWD-Parameter data editor"""
@@ -147,7 +227,7 @@ def parameter_selection() -> None:
                 else cont.DWD_DEFAULT_PARAMS
             ),
         }
-        for par in met.ALL_PARAMETERS.values()
+        for par in met.all_parameters().values()
     ]
 
     st.markdown("###")
@@ -220,6 +300,7 @@ def parameter_selection() -> None:
         )
 
         explanation_of_results(params)
+        provenance_of_results(params)
 
 
 def explanation_of_results(params: list[cld.DWDParam]) -> Any:
@@ -316,6 +397,25 @@ def explanation_of_results(params: list[cld.DWDParam]) -> Any:
     return st.success("_Daten für alle Parameter in gewünschter Auflösung gefunden._")
 
 
+def provenance_of_results(params: list[cld.DWDParam]) -> None:
+    """Herkunft der Werte, wenn Lücken aus Nachbarstationen gefüllt wurden"""
+
+    filled: dict[str, pl.DataFrame] = {
+        par.name_de: par.closest_available_res.provenance
+        for par in params
+        if par.closest_available_res is not None
+        and par.closest_available_res.provenance is not None
+        and par.closest_available_res.provenance.height > 1
+    }
+    if not filled:
+        return
+
+    with st.expander("Herkunft der Werte (gefüllte Lücken)", expanded=False):
+        for name_de, provenance in filled.items():
+            st.markdown(f"__{name_de}__")
+            st.dataframe(provenance, use_container_width=True, hide_index=True)
+
+
 def download_weatherdata() -> None:
     """Data as Excel-File"""
 
@@ -352,38 +452,9 @@ def download_weatherdata() -> None:
 def download_polysun(df_ex: pl.DataFrame, file_suffix: str) -> None:
     """Wenn 'Datei erzeugen'-Knopf gedrückt wurde"""
 
-    df_ex = (
-        pl.DataFrame(
-            {"Time [s]": range(0, cont.TimeSecondsIn.year, cont.TimeSecondsIn.hour)}
-        )
-        .join(
-            df_ex.with_columns(
-                (
-                    pl.col("Datum")
-                    - dt.datetime(df_ex.get_column("Datum")[0].year, 1, 1, 0, 0)
-                )
-                .dt.seconds()
-                .alias("Time [s]")
-            ),
-            "Time [s]",
-            "left",
-            join_nulls=True,
-        )
-        .fill_null(0)
-    ).select(
-        [
-            pl.col("Time [s]"),
-            *[
-                pl.col(name_en).alias(poly)
-                for name_en, poly in cont.DWD_PARAMS_POLYSUN.items()
-                if name_en in df_ex.columns
-            ],
-        ]
-    )
-
     st.download_button(
         **cont.Buttons.download_weather.func_args(),
-        data=f"# {df_ex.write_csv()}",
+        data=met.polysun_csv(df_ex),
         file_name=f"Polysun Wetterdaten{file_suffix}.csv",
         mime="text/csv",
     )
@@ -393,25 +464,12 @@ def download_excel(
     df_ex: pl.DataFrame, dat: list[cld.DWDParam], file_suffix: str
 ) -> None:
     """Download Excel-file"""
-    meta: cld.MetaData = cld.MetaData(
-        lines={
-            par.name_de: cld.MetaLine(
-                name=par.name_de,
-                name_orgidx="Datum",
-                orig_tit=par.name_de,
-                tit=par.name_de,
-                unit=par.unit,
-                excel_number_format=par.num_format,
-            )
-            for par in dat
-        }
-    )
 
     st.download_button(
         **cont.Buttons.download_weather.func_args(),
         data=ex.excel_download(
             {cont.ST_PAGES.meteo.excel_ws_name: df_ex},
-            meta,
+            met.excel_meta(dat),
         ),
         file_name=f"Wetterdaten{file_suffix}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
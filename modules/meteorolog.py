@@ -5,21 +5,34 @@
 # sourcery skip: do-not-use-bare-except
 
 import datetime as dt
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from typing import Any
 
 import polars as pl
+import streamlit as st
 from loguru import logger
 
 from modules import classes_data as cld
 from modules import classes_errors as cle
 from modules import constants as cont
 from modules import df_manipulation as dfm
+from modules import dwd_discover as dsc
 from modules import general_functions as gf
 from modules import streamlit_functions as sf
 
-ALL_PARAMETERS: dict[str, cld.DWDParam] = {
-    par_name: cld.DWDParam(par_name) for par_name in cont.DWD_GOOD_PARAMS
-}
+
+# Abfragen im Hintergrund für alle Sitzungen (siehe start_prefetch)
+PREFETCH_POOL: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=cont.DWD_PREFETCH_WORKERS, thread_name_prefix="dwd_prefetch"
+)
+
+
+@functools.cache
+def all_parameters() -> dict[str, cld.DWDParam]:
+    """Alle Parameter ohne Daten (für die Auswahl auf der Meteorologie-Seite)"""
+
+    return {par_name: cld.DWDParam(par_name) for par_name in dsc.good_parameters()}
 
 
 def start_end_time(**kwargs) -> cld.TimeSpan:
@@ -59,6 +72,130 @@ def start_end_time(**kwargs) -> cld.TimeSpan:
     return cld.TimeSpan(start=start_time, end=end_time)
 
 
+def resolve_location() -> cld.Location:
+    """Standort zur Adresse im Textfeld (gespeichert als "geo_location")"""
+
+    address: str = sf.s_get("ta_adr") or "Bremen"
+    location: Any | None = sf.s_get("geo_location")
+    if not isinstance(location, cld.Location) or location.address != sf.s_get("ta_adr"):
+        logger.info("Standortdaten werden aus gegebener Adresse bestimmt.")
+        location = cld.Location(address).fill_using_geopy()
+    sf.s_set("geo_location", location)
+
+    return location
+
+
+def prefetch_key(
+    location: cld.Location, time_span: cld.TimeSpan, res_en: str, *, fusion: bool
+) -> tuple:
+    """Alles, wovon die Daten eines Parameters abhängen"""
+
+    return (
+        location.latitude,
+        location.longitude,
+        time_span.start,
+        time_span.end,
+        res_en,
+        fusion,
+        cont.DWD_QUERY_DISTANCE_LIMIT,
+        cont.DWD_QUERY_TIME_LIMIT,
+    )
+
+
+def start_prefetch() -> None:
+    """Standardparameter im Hintergrund laden, sobald eine Adresse bestätigt wurde
+
+    Geladen werden cont.DWD_DEFAULT_PARAMS (bzw. cont.DWD_PARAMS_POLYSUN,
+    wenn "tog_polysun" an ist), während noch Parameter ausgewählt werden.
+    Vor dem ersten Bestätigen einer Adresse ("but_addr_dates") passiert nichts.
+    Fehler werden nur protokolliert - die Parameter werden dann
+    wie ohne Vorladen beim Bestätigen der Auswahl abgefragt.
+    """
+
+    if not sf.s_get("but_addr_dates") and sf.s_get("dwd_prefetch") is None:
+        return
+    try:
+        submit_prefetch(resolve_location())
+    except Exception:
+        logger.exception("Background prefetch could not be started")
+
+
+def submit_prefetch(location: cld.Location) -> None:
+    """Abfragen für den Standort in den Hintergrund geben
+
+    Die Abfragen gehören zur Sitzung (Eintrag "dwd_prefetch") - ändern sich
+    Standort, Zeitraum oder Einstellungen, werden die alten abgebrochen.
+    collect_meteo_data_for_list_of_parameters übernimmt die Ergebnisse
+    (und wartet, falls eine Abfrage noch läuft).
+    """
+
+    if location.latitude is None or location.longitude is None:
+        return
+
+    time_span: cld.TimeSpan = start_end_time(page=sf.s_get("page"))
+    selected_res: str = sf.s_get("sb_resolution") or "hourly"
+    res_en: str = cont.DWD_RESOLUTION_OPTIONS.get(selected_res, selected_res)
+    fusion: bool = bool(sf.s_get("cb_dwd_fusion"))
+    key: tuple = prefetch_key(location, time_span, res_en, fusion=fusion)
+    names: list[str] = (
+        list(cont.DWD_PARAMS_POLYSUN)
+        if sf.s_get("tog_polysun")
+        else cont.DWD_DEFAULT_PARAMS
+    )
+
+    running: dict[str, Any] | None = sf.s_get("dwd_prefetch")
+    if running is None or running["key"] != key:
+        cancel_prefetch()
+        running = {"key": key, "futures": {}}
+    futures: dict[str, Future[cld.DWDParam]] = running["futures"]
+    new: list[str] = [name for name in names if name not in futures]
+    for name in new:
+        futures[name] = PREFETCH_POOL.submit(
+            fill_parameter,
+            cld.DWDParam(name, location, time_span, fusion=fusion),
+            res_en,
+        )
+    sf.s_set("dwd_prefetch", running)
+    if new:
+        logger.info(f"Background prefetch started for {new}")
+
+
+def cancel_prefetch() -> None:
+    """Abfragen im Hintergrund abbrechen
+    (laufende Abfragen können nicht unterbrochen werden, ihr Ergebnis
+    landet nur noch im lokalen Speicher)
+    """
+
+    running: dict[str, Any] | None = sf.s_get("dwd_prefetch")
+    if running is None:
+        return
+    for future in running["futures"].values():
+        future.cancel()
+    sf.s_delete("dwd_prefetch")
+
+
+def prefetched(name_en: str, key: tuple) -> cld.DWDParam | None:
+    """Parameter aus dem Hintergrund (None = nicht vorgeladen oder fehlgeschlagen)
+
+    Args:
+        - name_en (str): Parameter
+        - key (tuple): siehe prefetch_key - nur passende Ergebnisse werden genommen
+
+    """
+
+    running: dict[str, Any] | None = sf.s_get("dwd_prefetch")
+    if running is None or running["key"] != key:
+        return None
+    future: Future[cld.DWDParam] | None = running["futures"].get(name_en)
+    if future is None or future.cancelled():
+        return None
+    try:
+        return future.result()
+    except Exception:
+        logger.exception(f"Background prefetch of '{name_en}' failed")
+        return None
+
+
 @gf.func_timer
 def collect_meteo_data_for_list_of_parameters(
     parameter_names: list[str],
@@ -71,13 +208,7 @@ def collect_meteo_data_for_list_of_parameters(
     """
 
     time_span: cld.TimeSpan = start_end_time(page=sf.s_get("page"))
-
-    address: str = sf.s_get("ta_adr") or "Bremen"
-    location: Any | None = sf.s_get("geo_location")
-    if not isinstance(location, cld.Location) or location.address != sf.s_get("ta_adr"):
-        logger.info("Standortdaten werden aus gegebener Adresse bestimmt.")
-        location = cld.Location(address).fill_using_geopy()
-    sf.s_set("geo_location", location)
+    location: cld.Location = resolve_location()
 
     selected_res: str = temporal_resolution or sf.s_get("sb_resolution") or "hourly"
     selected_res_en: str = cont.DWD_RESOLUTION_OPTIONS.get(selected_res, selected_res)
@@ -96,6 +227,8 @@ def collect_meteo_data_for_list_of_parameters(
         )
     )
 
+    fusion: bool = bool(sf.s_get("cb_dwd_fusion"))
+    key: tuple = prefetch_key(location, time_span, selected_res_en, fusion=fusion)
     previously_collected_params: list[cld.DWDParam] = sf.s_get("params_list") or []
     selected_params: list[cld.DWDParam] = []
 
@@ -112,44 +245,30 @@ def collect_meteo_data_for_list_of_parameters(
                     prev_par.location == location,
                     prev_par.time_span == time_span,
                     prev_par.requested_res_name_en == selected_res_en,
+                    prev_par.fusion == fusion,
                     prev_par.closest_available_res.data.is_empty() is False,
                 ]
             )
         ):
             logger.info(f"Parameter '{prev_par.name_en}' available from previous run.")
             selected_params.append(prev_par)
+        elif (pre_par := prefetched(sel, key)) is not None:
+            logger.info(f"Parameter '{sel}' available from background prefetch.")
+            selected_params.append(pre_par)
         else:
-            selected_params.append(cld.DWDParam(sel, location, time_span))
+            selected_params.append(
+                cld.DWDParam(sel, location, time_span, fusion=fusion)
+            )
             logger.info(f"Parameter '{sel}' added to list.")
 
-    for par in selected_params:
-        if (
-            par.closest_available_res is None
-            or par.closest_available_res.data.is_empty()
-        ):
-            par.requested_res_name_en = selected_res_en
-            if selected_res_en in par.available_resolutions:
-                logger.info(
-                    f"Gathering data for Parameter '{par.name_en}' "
-                    f"in requested resolution ({selected_res_en})."
-                )
-                par.fill_specific_resolution(selected_res_en)
-                par.closest_available_res = getattr(par.resolutions, selected_res_en)
-            else:
-                closest_res: str = next(
-                    res
-                    for res in gf.sort_from_selection_to_front_then_to_back(
-                        list(cont.DWD_RESOLUTION_OPTIONS.values()), selected_res_en
-                    )
-                    if res in par.available_resolutions
-                )
-                logger.info(
-                    f"Requested resoltion ({selected_res_en}) not available...\n"
-                    f"Gathering data for Parameter '{par.name_en}' "
-                    f"in closest resolution ({closest_res})."
-                )
-                par.fill_specific_resolution(closest_res)
-                par.closest_available_res = getattr(par.resolutions, closest_res)
+    missing: list[cld.DWDParam] = [
+        par
+        for par in selected_params
+        if par.closest_available_res is None
+        or par.closest_available_res.data.is_empty()
+    ]
+    if missing:
+        fill_parameters(missing, selected_res_en)
 
     sf.s_set("params_list", selected_params)
     sf.s_set("stations_distance", all_available_stations(selected_params))
@@ -157,37 +276,100 @@ def collect_meteo_data_for_list_of_parameters(
     return selected_params
 
 
+def fill_parameter(par: cld.DWDParam, selected_res_en: str) -> cld.DWDParam:
+    """Daten für einen Parameter in der gewünschten (oder nächsten) Auflösung"""
+
+    par.requested_res_name_en = selected_res_en
+    if selected_res_en in par.available_resolutions:
+        logger.info(
+            f"Gathering data for Parameter '{par.name_en}' "
+            f"in requested resolution ({selected_res_en})."
+        )
+        par.fill_specific_resolution(selected_res_en)
+        par.closest_available_res = getattr(par.resolutions, selected_res_en)
+    else:
+        closest_res: str = next(
+            res
+            for res in gf.sort_from_selection_to_front_then_to_back(
+                list(cont.DWD_RESOLUTION_OPTIONS.values()), selected_res_en
+            )
+            if res in par.available_resolutions
+        )
+        logger.info(
+            f"Requested resoltion ({selected_res_en}) not available...\n"
+            f"Gathering data for Parameter '{par.name_en}' "
+            f"in closest resolution ({closest_res})."
+        )
+        par.fill_specific_resolution(closest_res)
+        par.closest_available_res = getattr(par.resolutions, closest_res)
+
+    return par
+
+
 @gf.func_timer
-def all_available_stations(param_list: list[cld.DWDParam]) -> pl.DataFrame:
-    """Combine the 'all_stations' attr of all Parameters in the given list"""
+def fill_parameters(params: list[cld.DWDParam], selected_res_en: str) -> None:
+    """Daten für mehrere Parameter gleichzeitig suchen
 
-    first: cld.DWDParam = param_list[0]
+    Die Suche läuft für bis zu cont.DWD_PARAM_WORKERS Parameter parallel.
+    Parameter aus demselben Datensatz einer Station teilen sich einen Download
+    (siehe dwd_cache.download). Der Fortschritt wird je Parameter angezeigt.
+    """
 
-    if (
-        first.closest_available_res is None
-        or first.closest_available_res.all_stations is None
-    ):
-        raise ValueError
+    progress: Any = st.progress(0.0, text="Wetterdaten werden gesucht...")
+    with ThreadPoolExecutor(max_workers=cont.DWD_PARAM_WORKERS) as pool:
+        futures: dict[Future[cld.DWDParam], cld.DWDParam] = {
+            pool.submit(fill_parameter, par, selected_res_en): par for par in params
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            par: cld.DWDParam = future.result()
+            found: bool = (
+                par.closest_available_res is not None
+                and not par.closest_available_res.data.is_empty()
+            )
+            progress.progress(
+                done / len(params),
+                text=(
+                    f"{done} von {len(params)}: {par.name_de} "
+                    f"{'gefunden' if found else '- keine Daten'}"
+                ),
+            )
+    progress.empty()
 
-    df: pl.DataFrame = first.closest_available_res.all_stations
 
-    if len(param_list) > 1:
-        others: list[cld.DWDParam] = param_list[1:]
-        for par in others:
-            if (
-                par.closest_available_res is None
-                or par.closest_available_res.all_stations is None
-            ):
-                raise ValueError
+@gf.func_timer
+def all_available_stations(param_list: list[cld.DWDParam]) -> pl.DataFrame:
+    """Combine the 'all_stations' attr of all Parameters in the given list
+    (all from the offline station catalog - see dwd_stations)
+    """
 
-            df = df.vstack(par.closest_available_res.all_stations)
+    frames: list[pl.DataFrame] = []
+    for par in param_list:
+        if (
+            par.closest_available_res is None
+            or par.closest_available_res.all_stations is None
+        ):
+            raise ValueError
+        frames.append(par.closest_available_res.all_stations)
 
-    return df.unique(subset="station_id", keep="any").sort("distance")
+    return (
+        pl.concat(frames, how="diagonal_relaxed")
+        .unique(subset="station_id", keep="any")
+        .sort("distance")
+    )
 
 
 @gf.func_timer
-def df_from_param_list(param_list: list[cld.DWDParam]) -> pl.DataFrame:
-    """DataFrame from list[cld.DWDParameter] as returned from collect_meteo_data"""
+def df_from_param_list(
+    param_list: list[cld.DWDParam], *, polysun: bool | None = None
+) -> pl.DataFrame:
+    """DataFrame from list[cld.DWDParameter] as returned from collect_meteo_data
+
+    Args:
+        - param_list (list[cld.DWDParam]): Parameter mit Daten
+        - polysun (bool | None, optional): Spaltennamen und Einheiten für Polysun.
+            Defaults to None (-> Schalter "tog_polysun").
+
+    """
 
     dic: dict[str, pl.DataFrame] = {
         par.name_de: dfm.change_temporal_resolution(
@@ -222,7 +404,7 @@ def df_from_param_list(param_list: list[cld.DWDParam]) -> pl.DataFrame:
     for df_add in other_dfs:
         df = df.join(df_add, on="Datum", how="outer_coalesce")
 
-    if sf.s_get("tog_polysun"):
+    if sf.s_get("tog_polysun") if polysun is None else polysun:
         df = df.rename(
             {
                 name_de: name_en
@@ -250,6 +432,71 @@ def df_from_param_list(param_list: list[cld.DWDParam]) -> pl.DataFrame:
     return df
 
 
+def polysun_table(df_ex: pl.DataFrame) -> pl.DataFrame:
+    """Wetterdaten im Polysun-Format (ein Jahr in Sekunden, Polysun-Spalten)
+
+    Args:
+        - df_ex (pl.DataFrame): Stundenwerte aus df_from_param_list(polysun=True)
+
+    Returns:
+        - pl.DataFrame: Spalte "Time [s]" und die Spalten aus cont.DWD_PARAMS_POLYSUN
+
+    """
+
+    return (
+        pl.DataFrame(
+            {"Time [s]": range(0, cont.TimeSecondsIn.year, cont.TimeSecondsIn.hour)}
+        )
+        .join(
+            df_ex.with_columns(
+                (
+                    pl.col("Datum")
+                    - dt.datetime(df_ex.get_column("Datum")[0].year, 1, 1, 0, 0)
+                )
+                .dt.total_seconds()
+                .alias("Time [s]")
+            ),
+            "Time [s]",
+            "left",
+            join_nulls=True,
+        )
+        .fill_null(0)
+    ).select(
+        [
+            pl.col("Time [s]"),
+            *[
+                pl.col(name_en).alias(poly)
+                for name_en, poly in cont.DWD_PARAMS_POLYSUN.items()
+                if name_en in df_ex.columns
+            ],
+        ]
+    )
+
+
+def polysun_csv(df_ex: pl.DataFrame) -> str:
+    """Inhalt der csv-Datei für Polysun (Kopfzeile als Kommentar)"""
+
+    return f"# {polysun_table(df_ex).write_csv()}"
+
+
+def excel_meta(param_list: list[cld.DWDParam]) -> cld.MetaData:
+    """Meta-Daten (Einheiten, Zahlenformate) für den Excel-Export"""
+
+    return cld.MetaData(
+        lines={
+            par.name_de: cld.MetaLine(
+                name=par.name_de,
+                name_orgidx="Datum",
+                orig_tit=par.name_de,
+                tit=par.name_de,
+                unit=par.unit,
+                excel_number_format=par.num_format,
+            )
+            for par in param_list
+        }
+    )
+
+
 def match_resolution(df_resolution: int) -> str:
     """Match a temporal resolution of a data frame given as an integer
     to the resolution as string needed for the weather data.
@@ -0,0 +1,270 @@
+"""Lastspitzen für die Netzentgelte
+
+Jahres- und Monatshöchstleistung, die höchsten Viertelstunden,
+Benutzungsstunden und die Spitzen in den Hochlastzeitfenstern
+(atypische Netznutzung) aller Leistungs-Linien.
+
+Alle Kennwerte kommen aus einem einzigen Durchlauf über den Data Frame,
+gruppiert nach Monaten (wie bei den Monatswerten).
+Jahreswerte und die höchsten Werte des Jahres werden aus den Monaten abgeleitet.
+"""
+
+import datetime as dt
+
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import day_profiles as dp
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+COL_HLZF: str = "_hlzf"
+
+
+def power_columns(mdf: cld.MetaAndDfs) -> list[str]:
+    """Spalten mit Leistungseinheit (z.B. aus convert_15min_kwh_to_kw)"""
+
+    return [
+        col
+        for col in mdf.df.columns
+        if gf.check_if_not_exclude(col)
+        and (line := mdf.meta.lines.get(col)) is not None
+        and (line.unit or "").strip() in cont.ARBEIT_LEISTUNG.leistung.possible_units
+    ]
+
+
+def parse_time_windows(text: str) -> tuple[tuple[dt.time, dt.time], ...]:
+    """Zeitfenster aus Text wie "08:00-13:00, 16:30-19:30" lesen
+
+    Args:
+        - text (str): Zeitfenster "hh:mm-hh:mm", durch Komma getrennt
+
+    Returns:
+        - tuple[tuple[dt.time, dt.time], ...]: Beginn und Ende je Zeitfenster
+
+    """
+
+    windows: list[tuple[dt.time, dt.time]] = []
+    for window in text.replace(";", ",").split(","):
+        if not window.strip():
+            continue
+        start, end = (
+            dt.datetime.strptime(part.strip(), "%H:%M").time()
+            for part in window.split("-")
+        )
+        if end <= start:
+            err_msg: str = f"Time window '{window.strip()}' ends before it starts."
+            raise ValueError(err_msg)
+        windows.append((start, end))
+
+    return tuple(windows)
+
+
+def hlzf_expr(settings: cld.PeakSettings, years: list[int]) -> pl.Expr:
+    """Liegt der Zeitstempel in einem Hochlastzeitfenster?
+
+    Hochlastzeitfenster gelten nur an Werktagen (Montag bis Freitag ohne Feiertage).
+    """
+
+    index: pl.Expr = pl.col(COL_IND)
+    time: pl.Expr = index.dt.time()
+    in_window: list[pl.Expr] = [
+        index.dt.month().is_in(cont.HLZF_SEASONS[season])
+        & pl.any_horizontal([(time >= start) & (time < end) for start, end in windows])
+        for season, windows in settings.hlzf.items()
+        if windows
+    ]
+    if not in_window:
+        return pl.lit(False).alias(COL_HLZF)  # noqa: FBT003
+
+    working_day: pl.Expr = (index.dt.weekday() <= 5) & ~index.dt.date().is_in(  # noqa: PLR2004
+        list(dp.public_holidays(years))
+    )
+    return (working_day & pl.any_horizontal(in_window)).alias(COL_HLZF)
+
+
+def monthly_aggregations(col: str, top_n: int) -> list[pl.Expr]:
+    """Kennwerte einer Linie je Monat"""
+
+    value: pl.Expr = pl.col(col)
+    value_hlzf: pl.Expr = pl.when(pl.col(COL_HLZF)).then(value)
+    by_value: pl.Expr = pl.col(COL_IND).sort_by(value, descending=True, nulls_last=True)
+
+    return [
+        value.max().alias(f"{col}|max"),
+        by_value.first().alias(f"{col}|max_time"),
+        value.sum().alias(f"{col}|sum"),
+        value_hlzf.max().alias(f"{col}|hlzf"),
+        pl.when(value_hlzf.max().is_not_null())
+        .then(
+            pl.col(COL_IND)
+            .sort_by(value_hlzf, descending=True, nulls_last=True)
+            .first()
+        )
+        .alias(f"{col}|hlzf_time"),
+        value.sort(descending=True, nulls_last=True).head(top_n).alias(f"{col}|top"),
+        by_value.head(top_n).alias(f"{col}|top_time"),
+    ]
+
+
+def months_of_column(grouped: pl.DataFrame, col: str, step_h: float) -> pl.DataFrame:
+    """Monatskennwerte einer Linie aus dem gruppierten Durchlauf"""
+
+    return grouped.select(
+        pl.lit(col).alias("Linie"),
+        pl.col(COL_IND).alias("Monat"),
+        pl.col(f"{col}|max").alias("Höchstleistung"),
+        pl.col(f"{col}|max_time").alias("Zeitpunkt"),
+        pl.col(f"{col}|hlzf").alias("Höchstleistung HLZF"),
+        pl.col(f"{col}|hlzf_time").alias("Zeitpunkt HLZF"),
+        (pl.col(f"{col}|sum") * step_h).alias("Energie"),
+        pl.col(f"{col}|top").alias("top"),
+        pl.col(f"{col}|top_time").alias("top_time"),
+    )
+
+
+def yearly_values(months: pl.DataFrame, settings: cld.PeakSettings) -> pl.DataFrame:
+    """Jahreskennwerte aus den Monatskennwerten"""
+
+    peak: pl.Expr = pl.col("Höchstleistung")
+    peak_hlzf: pl.Expr = pl.col("Höchstleistung HLZF")
+    reduction: pl.Expr = peak - peak_hlzf
+
+    return (
+        months.group_by("Linie", pl.col("Monat").dt.year().alias("Jahr"))
+        .agg(
+            peak.max(),
+            pl.col("Zeitpunkt").sort_by(peak, descending=True, nulls_last=True).first(),
+            pl.col("Energie").sum(),
+            peak_hlzf.max(),
+            pl.col("Zeitpunkt HLZF")
+            .sort_by(peak_hlzf, descending=True, nulls_last=True)
+            .first(),
+        )
+        .with_columns(
+            (pl.col("Energie") / peak).alias("Benutzungsstunden"),
+            reduction.alias("Abstand HLZF"),
+            (reduction / peak * 100).alias("Abstand HLZF [%]"),
+        )
+        .with_columns(
+            (pl.col("Benutzungsstunden") >= cont.GRID_FEE_UTILISATION_HOURS).alias(
+                f"≥ {cont.GRID_FEE_UTILISATION_HOURS} h"
+            ),
+            (
+                (reduction >= peak * settings.min_share)
+                & (reduction >= settings.min_reduction)
+            )
+            .fill_null(False)  # noqa: FBT003
+            .alias("atypische Netznutzung"),
+        )
+        .sort("Linie", "Jahr")
+    )
+
+
+def top_values(months: pl.DataFrame, top_n: int) -> pl.DataFrame:
+    """Die höchsten Werte je Linie und Jahr
+
+    Die höchsten Werte eines Jahres sind immer unter den höchsten Werten
+    der einzelnen Monate, deshalb reichen die Listen aus dem Monatsdurchlauf.
+    """
+
+    return (
+        months.select("Linie", "top", "top_time")
+        .explode("top", "top_time")
+        .drop_nulls("top")
+        .rename({"top": "Leistung", "top_time": "Zeitpunkt"})
+        .with_columns(pl.col("Zeitpunkt").dt.year().alias("Jahr"))
+        .sort("Leistung", descending=True)
+        .with_columns(pl.int_range(1, pl.len() + 1).over("Linie", "Jahr").alias("Rang"))
+        .filter(pl.col("Rang") <= top_n)
+        .select("Linie", "Jahr", "Rang", "Zeitpunkt", "Leistung")
+        .sort("Linie", "Jahr", "Rang")
+    )
+
+
+@gf.func_timer
+def peak_report(
+    df: pl.DataFrame,
+    columns: list[str],
+    settings: cld.PeakSettings | None = None,
+) -> cld.PeakReport:
+    """Lastspitzen aller gegebenen Linien
+
+    Args:
+        - df (pl.DataFrame): nach Zeit sortierter Data Frame (Leistungswerte)
+        - columns (list[str]): auszuwertende Linien
+        - settings (cld.PeakSettings | None): Einstellungen der Auswertung
+
+    Returns:
+        - cld.PeakReport: Jahres-, Monatswerte und die höchsten Werte
+
+    """
+
+    if COL_IND not in df.columns:
+        raise cle.NotFoundError(entry=COL_IND, where="data frame columns")
+    for col in columns:
+        if col not in df.columns:
+            raise cle.NotFoundError(entry=col, where="data frame columns")
+
+    settings = settings or cld.PeakSettings()
+    index: pl.Series = df.get_column(COL_IND)
+    step_h: float = (
+        index.diff().median().total_seconds()  # type: ignore[union-attr]
+        / cont.TimeSecondsIn.hour
+    )
+    years: list[int] = index.dt.year().unique().to_list()
+
+    grouped: pl.DataFrame = (
+        df.lazy()
+        .select(COL_IND, *columns)
+        .with_columns(hlzf_expr(settings, years))
+        .group_by_dynamic(COL_IND, every="1mo")
+        .agg(
+            [
+                agg
+                for col in columns
+                for agg in monthly_aggregations(col, settings.top_n)
+            ]
+        )
+        .collect()
+    )
+    months: pl.DataFrame = pl.concat(
+        [months_of_column(grouped, col, step_h) for col in columns]
+    )
+
+    report: cld.PeakReport = cld.PeakReport(
+        years=yearly_values(months, settings),
+        months=months.drop("top", "top_time"),
+        top=top_values(months, settings.top_n),
+        settings=settings,
+        columns=columns,
+    )
+    logger.info(f"Peak analysis for {len(columns)} columns")
+
+    return report
+
+
+def get_peak_report(
+    mdf: cld.MetaAndDfs, settings: cld.PeakSettings | None = None
+) -> cld.PeakReport | None:
+    """Lastspitzen von mdf.df (gespeichert in mdf.peaks)
+
+    Die Auswertung wird nur neu berechnet,
+    wenn sich die Einstellungen oder die Leistungs-Linien geändert haben.
+    """
+
+    columns: list[str] = power_columns(mdf)
+    if not columns:
+        return None
+
+    settings = settings or cld.PeakSettings()
+    cached: cld.PeakReport | None = mdf.peaks
+    if cached is not None and cached.settings == settings and cached.columns == columns:
+        logger.info("Peak analysis taken from cache")
+        return cached
+
+    mdf.peaks = peak_report(mdf.df, columns, settings)
+    return mdf.peaks
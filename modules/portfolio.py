@@ -0,0 +1,283 @@
+"""Portfolio - Summenlastgang vieler Zähler
+
+Die Zähler (vorgefertigte Excel-Dateien oder schon importierte Daten)
+werden nacheinander auf ein gemeinsames Raster gebracht und aufsummiert.
+Im Speicher liegen immer nur die laufende Summe (ein Array über das Raster)
+und der gerade bearbeitete Zähler - der Speicherbedarf wächst nicht mit
+der Anzahl der Zähler.
+
+Die Summe ist ein gewöhnliches MetaAndDfs (Leistung in kW) und läuft
+danach durch die gleichen Auswertungen wie eine einzelne Datei
+(Stundenwerte, Jahresdauerlinie, Monatswerte).
+"""
+
+import datetime as dt
+from collections.abc import Iterable, Iterator
+from io import BytesIO
+
+import numpy as np
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import excel_import as ex_in
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+COL_SUM: str = cont.PORTFOLIO_COLUMN
+
+
+def meters_from_files(
+    files: Iterable[BytesIO | str],
+) -> Iterator[tuple[str, cld.MetaAndDfs]]:
+    """Zähler aus Excel-Dateien - eine Datei nach der anderen importiert"""
+
+    for file in files:
+        name: str = file if isinstance(file, str) else file.name
+        yield name, ex_in.import_prefab_excel(file)
+
+
+def meter_columns(mdf: cld.MetaAndDfs) -> dict[str, float]:
+    """Spalten eines Zählers, die in die Summe eingehen
+
+    Leistungs-Spalten werden direkt verwendet, Arbeits-Spalten nur,
+    wenn es keine Leistungs-Spalte dazu gibt (bei 15-Minuten-Daten
+    hat 'convert_15min_kwh_to_kw' schon eine Leistungs-Spalte eingefügt).
+    Einspeisung, Lieferung etc. (cont.NEGATIVE_VALUES) gehören nicht
+    zum Bezug und werden nicht mit aufsummiert.
+
+    Returns:
+        - dict[str, float]: Spalte und Faktor für die Umrechnung in kW
+            (bei Arbeit pro Stunde Zeitschritt - wird noch durch die
+            Länge eines Zeitschritts geteilt)
+
+    """
+
+    columns: dict[str, float] = {}
+    for col in mdf.df.columns:
+        line: cld.MetaLine | None = mdf.meta.lines.get(col)
+        if line is None or not gf.check_if_not_exclude(col):
+            continue
+        if any(neg in col for neg in cont.NEGATIVE_VALUES):
+            logger.info(f"Portfolio: '{col}' skipped (feed-in / delivery)")
+            continue
+        unit: str = (line.unit or "").strip()
+        if unit in cont.ARBEIT_LEISTUNG.leistung.possible_units:
+            columns[col] = cont.POWER_UNIT_FACTORS[unit]
+        elif unit in cont.ARBEIT_LEISTUNG.arbeit.possible_units and not col.endswith(
+            cont.Suffixes.col_arbeit
+        ):
+            columns[col] = cont.POWER_UNIT_FACTORS[unit.removesuffix("h")]
+
+    return columns
+
+
+def grid_slots(
+    index: pl.Series, origin: np.datetime64, grid: np.timedelta64
+) -> tuple[np.ndarray, int, float]:
+    """Rasterplatz je Zeitstempel
+
+    Ist der Zähler gröber als das Raster (z.B. Stundenwerte auf 15 Minuten),
+    gilt ein Wert für alle Rasterplätze seines Zeitschritts.
+
+    Returns:
+        - tuple[np.ndarray, int, float]: Rasterplatz je Zeitstempel,
+            Anzahl der Rasterplätze je Zeitschritt und Zeitschritt in Stunden
+
+    """
+
+    times: np.ndarray = index.to_numpy().astype("datetime64[us]")
+    step: np.timedelta64 = (
+        np.median(np.diff(times)) if len(times) > 1 else grid
+    ).astype("timedelta64[us]")
+    repeat: int = max(int(step // grid), 1)
+    return (times - origin) // grid, repeat, step / np.timedelta64(1, "h")
+
+
+def extend_grid(
+    arrays: tuple[np.ndarray, np.ndarray], before: int, after: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Laufende Summe und Anzahl vorne und hinten mit Nullen verlängern"""
+
+    return tuple(  # type: ignore[return-value]
+        np.pad(array, (max(before, 0), max(after, 0))) for array in arrays
+    )
+
+
+def meter_on_grid(
+    values: np.ndarray, slots: np.ndarray, repeat: int, size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Mittelwert je Rasterplatz (Summe und Anzahl über np.bincount)
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: Mittelwert (NaN ohne Wert)
+            und ob der Rasterplatz einen Wert hat
+
+    """
+
+    valid: np.ndarray = ~np.isnan(values)
+    positions: np.ndarray = (slots[valid, None] + np.arange(repeat)).ravel()
+    weights: np.ndarray = np.repeat(values[valid], repeat)
+    sums: np.ndarray = np.bincount(positions, weights=weights, minlength=size)
+    counts: np.ndarray = np.bincount(positions, minlength=size)
+    has_value: np.ndarray = counts > 0
+    mean: np.ndarray = np.full(size, np.nan)
+    np.divide(sums, counts, out=mean, where=has_value)
+    return mean, has_value
+
+
+def meter_statistics(
+    power: np.ndarray,
+    has_value: np.ndarray,
+    first_slot: int,
+    origin: np.datetime64,
+    grid: np.timedelta64,
+) -> dict:
+    """Kennwerte eines Zählers auf dem Raster (Leistung in kW)"""
+
+    grid_h: float = grid / np.timedelta64(1, "h")
+    covered: int = int(has_value.sum())
+    if not covered:
+        return {"Energie [kWh]": 0.0, "Höchstleistung [kW]": None, "Zeitpunkt": None}
+
+    peak_slot: int = int(np.nanargmax(power))
+    energy: float = float(np.nansum(power)) * grid_h
+    span: int = int(np.flatnonzero(has_value)[-1] - np.flatnonzero(has_value)[0]) + 1
+    return {
+        "Energie [kWh]": energy,
+        "Höchstleistung [kW]": float(power[peak_slot]),
+        "Zeitpunkt": (origin + (first_slot + peak_slot) * grid).astype(dt.datetime),
+        "Benutzungsstunden": energy / power[peak_slot] if power[peak_slot] else None,
+        "Abdeckung [%]": covered / span * 100,
+    }
+
+
+@gf.func_timer
+def aggregate(
+    meters: Iterable[tuple[str, cld.MetaAndDfs]],
+    grid_minutes: int = cont.PORTFOLIO_GRID_MINUTES,
+) -> cld.PortfolioReport:
+    """Summenlastgang vieler Zähler mit laufender Summe
+
+    Die Zähler werden einzeln abgeholt (z.B. über 'meters_from_files'),
+    auf das Raster gebracht, zur laufenden Summe addiert und wieder verworfen.
+    Das Raster wird erweitert, wenn ein Zähler früher beginnt
+    oder später endet als die bisherigen.
+
+    Args:
+        - meters (Iterable[tuple[str, cld.MetaAndDfs]]): Name und Daten je Zähler
+        - grid_minutes (int): Raster in Minuten
+
+    Returns:
+        - cld.PortfolioReport: Summenlastgang, Kennwerte je Zähler
+            und Gleichzeitigkeitsfaktor
+
+    """
+
+    grid: np.timedelta64 = np.timedelta64(grid_minutes * 60_000_000, "us")
+    origin: np.datetime64 | None = None
+    total: np.ndarray = np.zeros(0)
+    count: np.ndarray = np.zeros(0, dtype=np.int64)
+    stats: list[dict] = []
+
+    for name, mdf in meters:
+        columns: dict[str, float] = meter_columns(mdf)
+        if not columns or mdf.df.is_empty():
+            logger.warning(f"'{name}': keine Leistungs- oder Arbeitswerte")
+            continue
+
+        index: pl.Series = mdf.df.get_column(COL_IND)
+        if origin is None:
+            start: dt.datetime = index.min()  # type: ignore[assignment]
+            origin = np.datetime64(start.replace(minute=0, second=0), "us")
+        slots, repeat, step_h = grid_slots(index, origin, grid)
+
+        first: int = int(slots.min())
+        size: int = int(slots.max()) - first + repeat
+        total, count = extend_grid((total, count), -first, first + size - len(total))
+        if first < 0:
+            origin = origin + first * grid
+            slots -= first
+            first = 0
+
+        for col, factor in columns.items():
+            unit: str = (mdf.meta.lines[col].unit or "").strip()
+            to_kw: float = factor / step_h if unit.endswith("h") else factor
+            values: np.ndarray = (
+                mdf.df.get_column(col).cast(pl.Float64).fill_null(np.nan).to_numpy()
+                * to_kw
+            )
+            power, has_value = meter_on_grid(values, slots - first, repeat, size)
+            total[first : first + size] += np.nan_to_num(power)
+            count[first : first + size] += has_value
+            stats.append(
+                {"Datei": name, "Linie": col}
+                | meter_statistics(power, has_value, first, origin, grid)
+            )
+
+        logger.info(f"Portfolio: '{name}' added ({len(columns)} columns)")
+
+    if origin is None:
+        err_msg: str = "No meter with power or energy values found."
+        raise ValueError(err_msg)
+
+    return portfolio_report(total, count, origin, grid, stats)
+
+
+def portfolio_report(
+    total: np.ndarray,
+    count: np.ndarray,
+    origin: np.datetime64,
+    grid: np.timedelta64,
+    stats: list[dict],
+) -> cld.PortfolioReport:
+    """Summenlastgang als MetaAndDfs und Kennwerte je Zähler"""
+
+    index: np.ndarray = origin + np.arange(len(total)) * grid
+    df: pl.DataFrame = pl.DataFrame(
+        {
+            COL_IND: index,
+            COL_SUM: np.where(count > 0, total, np.nan),
+        }
+    ).with_columns(pl.col(COL_SUM).fill_nan(None))
+
+    meters: pl.DataFrame = pl.DataFrame(stats, infer_schema_length=None)
+    energy: float = meters.get_column("Energie [kWh]").sum()
+    meters = meters.with_columns(
+        (pl.col("Energie [kWh]") / energy * 100 if energy else pl.lit(None)).alias(
+            "Anteil Energie [%]"
+        )
+    ).sort("Energie [kWh]", descending=True)
+
+    peaks_sum: float = meters.get_column("Höchstleistung [kW]").sum()
+    simultaneity: float = (
+        float(np.nanmax(df.get_column(COL_SUM).to_numpy())) / peaks_sum
+        if peaks_sum
+        else float("nan")
+    )
+
+    mdf: cld.MetaAndDfs = cld.MetaAndDfs(
+        meta=cld.MetaData(
+            lines={
+                COL_SUM: cld.MetaLine(
+                    name=COL_SUM,
+                    name_orgidx=f"{COL_SUM}{cont.Suffixes.col_original_index}",
+                    orig_tit=COL_SUM,
+                    tit=COL_SUM,
+                    unit=" kW",
+                    unit_h=" kW",
+                )
+            }
+        ),
+        df=df,
+    )
+    mdf = ex_in.temporal_metadata(mdf, COL_IND)
+    mdf.meta = ex_in.meta_number_format(mdf)
+
+    logger.success(
+        f"Portfolio of {meters.height} lines on {len(total)} time steps "
+        f"(simultaneity {simultaneity:.2f})"
+    )
+
+    return cld.PortfolioReport(mdf=mdf, meters=meters, simultaneity=simultaneity)
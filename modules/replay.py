@@ -0,0 +1,178 @@
+"""Antworten von DWD und Nominatim aufzeichnen und wieder abspielen
+
+Für reproduzierbare Zeitmessungen und Tests ohne Netz
+(z.B. DWDParam.get_data, collect_meteo_data_for_list_of_parameters
+oder add_temperature_data).
+
+Aufgezeichnet wird an den Stellen, an denen Daten aus dem Netz kommen:
+- dwd_cache.download_dataset (Werte einer Station)
+- dwd_stations.station_list (Stationsliste)
+- Geocodierung (Backend in geocoding)
+
+Mit mode="record" werden die echten Antworten unter "directory" gespeichert
+(DataFrames als Parquet, Geocodierung als JSON), mit mode="replay" werden sie
+von dort gelesen - auf Wunsch mit künstlicher Wartezeit je Antwort ("latency").
+Damit die lokalen Speicher die Messung nicht verfälschen, läuft jede Sitzung
+mit leeren Speichern in einem eigenen Verzeichnis ("cache_dir").
+
+Beispiel:
+    with replay.session("tests/replay/bremen", "replay", latency=0.2):
+        met.collect_meteo_data_for_list_of_parameters(["temperature_air_mean_2m"])
+"""
+
+import contextlib
+import hashlib
+import json
+import pathlib
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, Literal
+
+import polars as pl
+from loguru import logger
+
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import dwd_cache as dwc
+from modules import dwd_stations as dws
+from modules import geocoding as geo
+
+Mode = Literal["record", "replay"]
+
+
+def file_key(name: str, args: tuple) -> str:
+    """Dateiname für einen Aufruf (Name der Funktion und Hash der Argumente)"""
+
+    digest: str = hashlib.sha1(repr(args).encode(), usedforsecurity=False).hexdigest()
+    return f"{name}_{digest[:20]}"
+
+
+def frames(
+    directory: pathlib.Path,
+    name: str,
+    live: Callable[..., pl.DataFrame],
+    mode: Mode,
+    latency: float,
+) -> Callable[..., pl.DataFrame]:
+    """Funktion, die DataFrames aufzeichnet oder abspielt
+
+    Args:
+        - directory (pathlib.Path): Verzeichnis der Aufzeichnung
+        - name (str): Name der Funktion (für den Dateinamen)
+        - live (Callable): echte Abfrage (nur für mode="record")
+        - mode (Mode): "record" oder "replay"
+        - latency (float): Wartezeit je abgespielter Antwort in Sekunden
+
+    """
+
+    def wrapped(*args: Any) -> pl.DataFrame:
+        path: pathlib.Path = directory / f"{file_key(name, args)}.parquet"
+        if mode == "record":
+            data: pl.DataFrame = live(*args)
+            dwc.write_parquet(data, path)
+            return data
+        if not path.exists():
+            raise cle.NotFoundError(entry=f"{name}{args}", where=str(directory))
+        time.sleep(latency)
+        return pl.read_parquet(path)
+
+    return wrapped
+
+
+class ReplayBackend:
+    """Geocodierung aus der Aufzeichnung (oder aufzeichnen)"""
+
+    def __init__(
+        self, directory: pathlib.Path, mode: Mode, latency: float, live: geo.Backend
+    ) -> None:
+        """Args wie frames()"""
+        self.directory: pathlib.Path = directory
+        self.mode: Mode = mode
+        self.latency: float = latency
+        self.live: geo.Backend = live
+
+    def answer(self, name: str, args: tuple, live: Callable[[], Any]) -> Any:
+        """Antwort aufzeichnen oder abspielen"""
+        path: pathlib.Path = self.directory / f"{file_key(name, args)}.json"
+        if self.mode == "record":
+            value: Any = live()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(value), encoding="utf-8")
+            return value
+        if not path.exists():
+            raise cle.NotFoundError(entry=f"{name}{args}", where=str(self.directory))
+        time.sleep(self.latency)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        """Koordinaten einer Adresse"""
+        value: list[float] | None = self.answer(
+            "geocode", (address,), lambda: self.live.geocode(address)
+        )
+        return (value[0], value[1]) if value else None
+
+    def reverse(self, lat_lon: tuple[float, float]) -> dict[str, Any] | None:
+        """Ort an den Koordinaten"""
+        return self.answer(
+            "reverse", (tuple(lat_lon),), lambda: self.live.reverse(lat_lon)
+        )
+
+
+@contextlib.contextmanager
+def session(
+    directory: str | pathlib.Path,
+    mode: Mode,
+    *,
+    latency: float = 0.0,
+    cache_dir: pathlib.Path | None = None,
+) -> Iterator[pathlib.Path]:
+    """Aufzeichnen oder Abspielen für alle Abfragen innerhalb des "with"-Blocks
+
+    Args:
+        - directory (str | pathlib.Path): Verzeichnis der Aufzeichnung
+        - mode (Mode): "record" (echte Abfragen speichern)
+            oder "replay" (nur aus der Aufzeichnung - fehlt etwas -> NotFoundError)
+        - latency (float, optional): Wartezeit je abgespielter Antwort in Sekunden.
+            Defaults to 0.
+        - cache_dir (pathlib.Path | None, optional): Verzeichnis für die lokalen
+            Speicher während der Sitzung. Defaults to None (neues Temp-Verzeichnis).
+
+    Yields:
+        - pathlib.Path: Verzeichnis der lokalen Speicher
+
+    """
+
+    recording = pathlib.Path(directory)
+    cache: pathlib.Path = cache_dir or pathlib.Path(tempfile.mkdtemp(prefix="replay_"))
+    patches: list[tuple[Any, str, Any]] = [
+        (
+            dwc,
+            "download_dataset",
+            frames(recording, "download_dataset", dwc.download_dataset, mode, latency),
+        ),
+        (
+            dws,
+            "station_list",
+            frames(recording, "station_list", dws.station_list, mode, latency),
+        ),
+        (dwc, "IN_FLIGHT", {}),
+        (dws, "CATALOG", {}),
+        (cont, "DWD_CACHE_DIR", cache / "dwd"),
+        (cont, "GEOCODE_CACHE_FILE", cache / "geocoding.sqlite"),
+    ]
+    originals: list[tuple[Any, str, Any]] = [
+        (module, attr, getattr(module, attr)) for module, attr, _ in patches
+    ]
+    live_backend: geo.Backend = geo.backend()
+
+    logger.info(f"Replay session ({mode}) with recording '{recording}'")
+    try:
+        for module, attr, value in patches:
+            setattr(module, attr, value)
+        geo.set_backend(ReplayBackend(recording, mode, latency, live_backend))
+        yield cache
+    finally:
+        for module, attr, value in originals:
+            setattr(module, attr, value)
+        geo.set_backend(live_backend)
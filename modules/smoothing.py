@@ -0,0 +1,214 @@
+"""Geglättete Linien
+
+Savitzky-Golay, gleitender Mittelwert und LOWESS mit vorhersehbarem Aufwand:
+- Savitzky-Golay wird ab cont.SMOOTH_FFT_MIN_WINDOW per FFT gefaltet
+    (O(n·log n) statt O(n·w))
+- der gleitende Mittelwert läuft über kumulierte Summen (O(n))
+- LOWESS rechnet auf höchstens cont.SMOOTH_LOWESS_MAX_POINTS gemittelten Punkten
+
+Ergebnisse werden pro (Linie, Verfahren, Fenster, Grad) in einem
+LRU-Speicher gehalten, damit das Ein- und Ausblenden einer Linie
+oder das Ändern einer anderen Linie nichts neu berechnet.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Literal
+
+import numpy as np
+from loguru import logger
+from scipy import signal
+
+from modules import constants as cont
+
+SmoothMethod = Literal["savgol", "mean", "lowess"]
+
+_CACHE: OrderedDict[tuple[str, str, int, int], np.ndarray] = OrderedDict()
+_CACHE_LOCK: threading.Lock = threading.Lock()
+
+
+def fingerprint(values: np.ndarray) -> str:
+    """Fingerabdruck der y-Werte einer Linie (Schlüssel für den Speicher)"""
+
+    return hashlib.blake2b(
+        np.ascontiguousarray(values).tobytes(), digest_size=16
+    ).hexdigest()
+
+
+def clear_cache() -> None:
+    """Gespeicherte geglättete Linien löschen"""
+
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def odd_window(window: int, length: int) -> int:
+    """Fensterbreite ungerade machen und auf die Länge der Linie begrenzen"""
+
+    window = max(int(window), 1)
+    window = min(window, length if length % 2 else length - 1)
+    return window if window % 2 else window - 1
+
+
+def fill_gaps(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Fehlende Werte linear überbrücken
+
+    Args:
+        - values (np.ndarray): y-Werte
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: y-Werte ohne Lücken, Maske der Lücken
+
+    """
+
+    gaps: np.ndarray = np.isnan(values)
+    if not gaps.any() or gaps.all():
+        return values, gaps
+
+    positions: np.ndarray = np.arange(len(values))
+    filled: np.ndarray = values.copy()
+    filled[gaps] = np.interp(positions[gaps], positions[~gaps], values[~gaps])
+    return filled, gaps
+
+
+def savgol(values: np.ndarray, window: int, deg: int) -> np.ndarray:
+    """Savitzky-Golay-Filter (Randbehandlung 'mirror')
+
+    Bei großen Fenstern wird mit den Koeffizienten des Filters
+    per FFT gefaltet, das Ergebnis ist das gleiche wie mit signal.savgol_filter.
+    """
+
+    deg = min(max(int(deg), 0), window - 1)
+    if window < cont.SMOOTH_FFT_MIN_WINDOW:
+        return signal.savgol_filter(
+            values, window_length=window, polyorder=deg, mode="mirror"
+        )
+
+    half: int = window // 2
+    coeffs: np.ndarray = signal.savgol_coeffs(window, deg)
+    padded: np.ndarray = np.pad(values, half, mode="reflect")
+    return signal.fftconvolve(padded, coeffs, mode="valid")
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Zentrierter gleitender Mittelwert über kumulierte Summen"""
+
+    half: int = window // 2
+    padded: np.ndarray = np.pad(values, half, mode="reflect")
+    cum: np.ndarray = np.concatenate(([0.0], np.cumsum(padded)))
+    return (cum[window:] - cum[:-window]) / window
+
+
+def decimate(values: np.ndarray, max_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """Linie auf höchstens 'max_points' Mittelwerte gleich breiter Abschnitte reduzieren
+
+    Args:
+        - values (np.ndarray): y-Werte
+        - max_points (int): maximale Anzahl an Punkten
+
+    Returns:
+        - tuple[np.ndarray, np.ndarray]: Position (Mitte der Abschnitte), Mittelwerte
+
+    """
+
+    positions: np.ndarray = np.arange(len(values), dtype=float)
+    if len(values) <= max_points:
+        return positions, values
+
+    bins: np.ndarray = np.arange(len(values)) * max_points // len(values)
+    counts: np.ndarray = np.bincount(bins, minlength=max_points)
+    return (
+        np.bincount(bins, positions, minlength=max_points) / counts,
+        np.bincount(bins, values, minlength=max_points) / counts,
+    )
+
+
+def lowess(values: np.ndarray, window: int) -> np.ndarray:
+    """LOWESS (lokal lineare Regression mit Tricube-Gewichten)
+
+    Die Regression läuft auf höchstens cont.SMOOTH_LOWESS_MAX_POINTS
+    gemittelten Punkten und wird danach linear auf die Linie interpoliert.
+    Die Fensterbreite ('window' Punkte der Linie) wird dabei umgerechnet.
+    """
+
+    x_dec, y_dec = decimate(values, cont.SMOOTH_LOWESS_MAX_POINTS)
+    points: int = len(x_dec)
+    span: int = min(max(round(window * points / len(values)), 3), points)
+
+    start: np.ndarray = np.clip(np.arange(points) - span // 2, 0, points - span)
+    neighbours: np.ndarray = start[:, None] + np.arange(span)
+    x_n: np.ndarray = x_dec[neighbours]
+    y_n: np.ndarray = y_dec[neighbours]
+
+    dist: np.ndarray = np.abs(x_n - x_dec[:, None])
+    max_dist: np.ndarray = dist.max(axis=1, keepdims=True)
+    weights: np.ndarray = (1 - (dist / np.where(max_dist > 0, max_dist, 1)) ** 3) ** 3
+
+    sum_w: np.ndarray = weights.sum(axis=1)
+    mean_x: np.ndarray = (weights * x_n).sum(axis=1) / sum_w
+    mean_y: np.ndarray = (weights * y_n).sum(axis=1) / sum_w
+    dev_x: np.ndarray = x_n - mean_x[:, None]
+    var_x: np.ndarray = (weights * dev_x**2).sum(axis=1)
+    cov_xy: np.ndarray = (weights * dev_x * (y_n - mean_y[:, None])).sum(axis=1)
+    slope: np.ndarray = np.divide(
+        cov_xy, var_x, out=np.zeros_like(cov_xy), where=var_x > 0
+    )
+    fitted: np.ndarray = mean_y + slope * (x_dec - mean_x)
+
+    return np.interp(np.arange(len(values), dtype=float), x_dec, fitted)
+
+
+def smooth_values(
+    values: np.ndarray | list,
+    window: int,
+    deg: int = 3,
+    method: SmoothMethod = "savgol",
+) -> np.ndarray:
+    """Geglättete y-Werte (aus dem Speicher, falls schon berechnet)
+
+    Args:
+        - values (np.ndarray | list): y-Werte der Linie
+        - window (int): Fensterbreite in Punkten (wird ungerade gemacht)
+        - deg (int): Grad des Polynoms (nur Savitzky-Golay)
+        - method (SmoothMethod): Verfahren aus cont.SMOOTH_METHODS
+
+    Returns:
+        - np.ndarray: geglättete y-Werte (schreibgeschützt)
+
+    """
+
+    if method not in cont.SMOOTH_METHODS:
+        err_msg: str = f"Unknown smoothing method '{method}'."
+        raise ValueError(err_msg)
+
+    y_values: np.ndarray = np.asarray(values, dtype=float)
+    window = odd_window(window, len(y_values))
+    deg = int(deg) if method == "savgol" else 0
+    key: tuple[str, str, int, int] = (fingerprint(y_values), method, window, deg)
+
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+
+    logger.info(f"Smoothing {len(y_values)} values ({method}, window {window})")
+
+    filled, gaps = fill_gaps(y_values)
+    if window < 3 or gaps.all():  # noqa: PLR2004
+        smoothed: np.ndarray = filled.copy()
+    elif method == "savgol":
+        smoothed = savgol(filled, window, deg)
+    elif method == "mean":
+        smoothed = rolling_mean(filled, window)
+    else:
+        smoothed = lowess(filled, window)
+    smoothed[gaps] = np.nan
+    smoothed.setflags(write=False)
+
+    with _CACHE_LOCK:
+        _CACHE[key] = smoothed
+        while len(_CACHE) > cont.SMOOTH_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+    return smoothed
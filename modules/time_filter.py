@@ -0,0 +1,207 @@
+"""Zeitfilter (z.B. nur Arbeitszeit, Wochenenden, Heizperiode, Zeitraum)
+
+Die Bedingungen werden nicht auf die Excel-Datei angewandt,
+sondern als Polars-Prädikate auf die schon berechneten Data Frames
+(df, df_h, jdl, mon und die Jahres-Data-Frames):
+- Kalender-Bedingungen (Tagtyp, Monat, Zeitraum) werden einmal
+    auf der Kalender-Tabelle des Tages-Index ausgewertet
+    und ergeben die Menge der erlaubten Tage
+- je Data Frame bleibt ein einziger (lazy) Filter über die Original-Zeitspalte
+
+Die Jahresdauerlinie bleibt beim Filtern sortiert, Monatswerte werden nur neu
+gebildet, wenn der Filter Teile eines Monats entfernt.
+"""
+
+import dataclasses
+import datetime as dt
+
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import day_profiles as dp
+from modules import df_manipulation as df_man
+from modules import general_functions as gf
+
+COL_IND: str = cont.SpecialCols.index
+COL_ORG: str = cont.SpecialCols.original_index
+
+
+def calendar_predicate(time_filter: cld.TimeFilter) -> pl.Expr:
+    """Bedingung für die Kalender-Tabelle (Spalten aus cld.DayIndex.days)"""
+
+    predicate: pl.Expr = pl.lit(value=True)
+    if time_filter.day_types:
+        predicate &= pl.col("Tagtyp").is_in(time_filter.day_types)
+    if time_filter.months:
+        predicate &= pl.col("Monat").is_in(time_filter.months)
+    if time_filter.dates:
+        predicate &= pl.col("Datum").is_between(*time_filter.dates)
+    return predicate
+
+
+def allowed_dates(index: cld.DayIndex, time_filter: cld.TimeFilter) -> pl.Series:
+    """Tage, die die Kalender-Bedingungen erfüllen"""
+
+    return (
+        index.days.lazy()
+        .filter(calendar_predicate(time_filter))
+        .select("Datum")
+        .collect()
+        .get_column("Datum")
+    )
+
+
+def row_predicate(
+    time_filter: cld.TimeFilter, dates: pl.Series, time_column: str = COL_ORG
+) -> pl.Expr:
+    """Bedingung für die Zeilen eines Data Frames
+
+    Zeilen ohne Zeitstempel (z.B. Dauerlinien aus Stützstellen) bleiben erhalten.
+    """
+
+    time: pl.Expr = pl.col(time_column)
+    predicate: pl.Expr = time.dt.date().is_in(dates)
+    if time_filter.hours:
+        start, end = time_filter.hours
+        predicate &= time.dt.hour().is_between(start, end, closed="left")
+    return time.is_null() | predicate
+
+
+def filter_frame(df: pl.DataFrame | None, predicate: pl.Expr) -> pl.DataFrame | None:
+    """Einen Data Frame filtern (lazy, damit Polars das Prädikat optimiert)"""
+
+    return None if df is None else df.lazy().filter(predicate).collect()
+
+
+def filter_multi(
+    multi: dict[int, pl.DataFrame] | None, predicate: pl.Expr
+) -> dict[int, pl.DataFrame] | None:
+    """Jahres-Data-Frames filtern"""
+
+    if multi is None:
+        return None
+    return {year: df.lazy().filter(predicate).collect() for year, df in multi.items()}
+
+
+def filter_jdl(
+    jdl: pl.DataFrame | None,
+    time_filter: cld.TimeFilter,
+    dates: pl.Series,
+) -> pl.DataFrame | None:
+    """Jahresdauerlinie filtern
+
+    Jede Linie hat ihre eigene Zeitspalte ("Linie - orgidx").
+    Gefiltert wird jede Linie für sich - die Reihenfolge (absteigend sortiert)
+    bleibt erhalten, die Stunden rücken nur zusammen.
+    """
+
+    if jdl is None:
+        return None
+
+    lines: list[str] = [
+        col
+        for col in jdl.columns
+        if f"{col}{cont.Suffixes.col_original_index}" in jdl.columns
+    ]
+    filtered: list[pl.DataFrame] = [
+        jdl.lazy()
+        .select(col, org := f"{col}{cont.Suffixes.col_original_index}")
+        .filter(row_predicate(time_filter, dates, org))
+        .collect()
+        for col in lines
+    ]
+    return (
+        pl.concat(filtered, how="horizontal") if filtered else jdl.clear().drop(COL_IND)
+    ).with_row_index(COL_IND)
+
+
+def month_predicate(time_filter: cld.TimeFilter) -> pl.Expr:
+    """Bedingung für Monatswerte (nur für Filter auf ganze Monate)"""
+
+    return pl.col(COL_ORG).dt.month().is_in(time_filter.months)
+
+
+def filter_mon(
+    mdf: cld.MetaAndDfs, filtered: cld.MetaAndDfs, time_filter: cld.TimeFilter
+) -> tuple[pl.DataFrame | None, dict[int, pl.DataFrame] | None]:
+    """Monatswerte (und Monatswerte je Jahr) filtern
+
+    Nimmt der Filter nur ganze Monate heraus, werden die Monate gefiltert.
+    Sonst werden die Monatswerte aus den gefilterten Stundenwerten gebildet
+    (Summen über Teile eines Monats lassen sich nicht herausfiltern).
+    """
+
+    if mdf.mon is None and mdf.mon_multi is None:
+        return None, None
+    if time_filter.whole_months:
+        return (
+            filter_frame(mdf.mon, month_predicate(time_filter)),
+            filter_multi(mdf.mon_multi, month_predicate(time_filter)),
+        )
+
+    df_h: pl.DataFrame = (
+        filtered.df_h
+        if filtered.df_h is not None
+        else df_man.hourly_values(filtered.df)
+    )
+    mon: pl.DataFrame = df_man.monthly_values(df_h, mdf.meta.lines)
+    mon_multi: dict[int, pl.DataFrame] | None = (
+        None
+        if mdf.mon_multi is None
+        else {
+            year: df_man.split_year(
+                mon.filter(pl.col(COL_IND).dt.year() == year), year
+            )[0]
+            for year in mdf.mon_multi
+        }
+    )
+    return (None if mdf.mon is None else mon), mon_multi
+
+
+@gf.func_timer
+def apply_time_filter(
+    mdf: cld.MetaAndDfs, time_filter: cld.TimeFilter
+) -> cld.MetaAndDfs:
+    """Gefilterte Kopie von mdf (das Original bleibt unverändert)
+
+    Args:
+        - mdf (cld.MetaAndDfs): Daten mit allen abgeleiteten Data Frames
+        - time_filter (cld.TimeFilter): Bedingungen
+
+    Returns:
+        - cld.MetaAndDfs: Kopie mit gefilterten df, df_h, jdl, mon
+            (und Jahres-Data-Frames)
+
+    """
+
+    if not time_filter.is_active:
+        return mdf
+
+    dates: pl.Series = allowed_dates(dp.get_day_index(mdf, "df"), time_filter)
+    predicate: pl.Expr = row_predicate(time_filter, dates)
+
+    filtered: cld.MetaAndDfs = dataclasses.replace(
+        mdf,
+        df=filter_frame(mdf.df, predicate),
+        df_h=filter_frame(mdf.df_h, predicate),
+        jdl=filter_jdl(mdf.jdl, time_filter, dates),
+        df_multi=filter_multi(mdf.df_multi, predicate),
+        df_h_multi=filter_multi(mdf.df_h_multi, predicate),
+        day_index={},
+    )
+    filtered.mon, filtered.mon_multi = filter_mon(mdf, filtered, time_filter)
+    logger.info(
+        f"Time filter: {dates.len()} days, "
+        f"{filtered.df.height} of {mdf.df.height} rows left"
+    )
+
+    return filtered
+
+
+def first_and_last_day(mdf: cld.MetaAndDfs) -> tuple[dt.date, dt.date]:
+    """Erster und letzter Tag der Daten (Grenzen für den Zeitraum im Menu)"""
+
+    days: pl.Series = dp.get_day_index(mdf, "df").days.get_column("Datum")
+    return days.min(), days.max()  # type: ignore[return-value]
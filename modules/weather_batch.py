@@ -0,0 +1,301 @@
+"""Wetterdaten für viele Standorte (z.B. für Quartiersstudien)
+
+Ablauf:
+- Standorte aus einer Excel-Liste im Format der Karten-Seite
+    ("Name" und "Adresse" oder "Name", "Breitengrad" und "Längengrad")
+- Adressen geocodieren (alle auf einmal, siehe geocoding.geocode_batch)
+- je Standort und Parameter parallel die Stationen im Umkreis suchen
+    (offline im Stationskatalog, siehe dwd_stations)
+- Werte je Parameter und Station nur einmal abfragen (über den lokalen Speicher) -
+    Standorte mit derselben Station teilen sich die Daten
+- alle Dateien (Polysun-csv oder Excel) in einer ZIP-Datei
+"""
+
+import io
+import re
+import zipfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+from loguru import logger
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import dwd_cache as dwc
+from modules import dwd_stations as dws
+from modules import export as ex
+from modules import general_functions as gf
+from modules import map as mp
+from modules import meteorolog as met
+
+SiteParam = tuple[int, str]  # (Nummer des Standorts, Parameter)
+ParamStation = tuple[str, str]  # (Parameter, Station)
+
+
+def has_coordinates(location: cld.Location) -> bool:
+    """Sind Breiten- und Längengrad bekannt?"""
+    return location.latitude is not None and location.longitude is not None
+
+
+def closest_with_data(
+    candidates: dict[SiteParam, list[str]],
+    fetch: Callable[[str, str], pl.DataFrame],
+    workers: int = cont.WEATHER_BATCH_WORKERS,
+) -> tuple[dict[SiteParam, str | None], dict[ParamStation, pl.DataFrame]]:
+    """Je Standort und Parameter die nächstgelegene Station mit Daten
+
+    Runde für Runde werden die nächsten noch nicht geprüften Stationen
+    aller Standorte gesammelt. Jede Kombination aus Parameter und Station
+    wird dabei nur einmal abgefragt (parallel).
+
+    Args:
+        - candidates (dict[SiteParam, list[str]]): Stationen nach Entfernung
+        - fetch (Callable[[str, str], pl.DataFrame]): Abfrage (Parameter, Station)
+        - workers (int, optional): parallele Abfragen
+
+    Returns:
+        - dict[SiteParam, str | None]: Station mit Daten (None = keine gefunden)
+        - dict[ParamStation, pl.DataFrame]: abgefragte Werte
+
+    """
+
+    found: dict[SiteParam, str | None] = {
+        key: None for key, stations in candidates.items() if not stations
+    }
+    position: dict[SiteParam, int] = {
+        key: 0 for key, stations in candidates.items() if stations
+    }
+    values: dict[ParamStation, pl.DataFrame] = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while position:
+            needed: set[ParamStation] = {
+                (key[1], candidates[key][pos]) for key, pos in position.items()
+            }
+            missing: list[ParamStation] = sorted(needed - values.keys())
+            values.update(
+                zip(missing, pool.map(lambda key: fetch(*key), missing), strict=True)
+            )
+
+            for key, pos in list(position.items()):
+                station: str = candidates[key][pos]
+                if not values[(key[1], station)].is_empty():
+                    found[key] = station
+                elif pos + 1 < len(candidates[key]):
+                    position[key] += 1
+                    continue
+                else:
+                    found[key] = None
+                del position[key]
+
+    logger.info(
+        f"{len(values)} queries for {len(candidates)} site-parameter combinations"
+    )
+    return found, values
+
+
+def station_properties(stations: pl.DataFrame, station_id: str) -> cld.DWDStation:
+    """Eigenschaften einer Station aus der Stationsliste von wetterdienst"""
+
+    row: dict = stations.filter(pl.col("station_id") == station_id).row(0, named=True)
+    return cld.DWDStation(
+        **{key: row[key] for key in cld.DWDStation.__dataclass_fields__ if key in row}
+    )
+
+
+def site_params(
+    location: cld.Location,
+    time_span: cld.TimeSpan,
+    results: dict[str, tuple[pl.DataFrame, str | None, pl.DataFrame]],
+) -> list[cld.DWDParam]:
+    """Parameter eines Standorts wie aus DWDParam.fill_specific_resolution
+
+    Args:
+        - location (cld.Location): Standort
+        - time_span (cld.TimeSpan): Zeitraum
+        - results (dict[str, tuple]): je Parameter die Stationen im Umkreis,
+            die Station mit Daten (oder None) und deren Werte
+
+    Returns:
+        - list[cld.DWDParam]: Parameter mit "closest_available_res"
+
+    """
+
+    res: str = cont.WEATHER_BATCH_RESOLUTION
+    params: list[cld.DWDParam] = []
+    for name_en, (all_stations, station_id, data) in results.items():
+        param = cld.DWDParam(name_en, location, time_span, requested_res_name_en=res)
+        res_data: cld.DWDResData = getattr(param.resolutions, res)
+        res_data.all_stations = all_stations
+        if station_id is not None:
+            res_data.data = data
+            res_data.closest_station = station_properties(all_stations, station_id)
+            res_data.no_data = None
+        param.closest_available_res = res_data
+        params.append(param)
+
+    return params
+
+
+def file_name(name: str, used: set[str]) -> str:
+    """Dateiname ohne unerlaubte Zeichen (bei Doppelungen nummeriert)"""
+
+    clean: str = re.sub(r'[\\/:*?"<>|]+', "_", name).strip() or "Standort"
+    unique: str = clean
+    number: int = 2
+    while unique in used:
+        unique = f"{clean} ({number})"
+        number += 1
+    used.add(unique)
+    return unique
+
+
+def site_file(
+    name: str, params: list[cld.DWDParam], *, polysun: bool
+) -> tuple[str, str | bytes]:
+    """Dateiname und Inhalt für einen Standort"""
+
+    df_ex: pl.DataFrame = met.df_from_param_list(params, polysun=polysun)
+    if polysun:
+        return f"Polysun Wetterdaten -{name}-.csv", met.polysun_csv(df_ex)
+
+    return f"Wetterdaten -{name}-.xlsx", ex.excel_download(
+        {cont.ST_PAGES.meteo.excel_ws_name: df_ex}, met.excel_meta(params)
+    )
+
+
+def zip_files(files: dict[str, str | bytes]) -> bytes:
+    """Alle Dateien in einer ZIP-Datei"""
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, content in files.items():
+            zip_file.writestr(name, content)
+    return buffer.getvalue()
+
+
+def weather_zip(
+    sites: dict[str, list[cld.DWDParam]], *, polysun: bool
+) -> tuple[bytes, list[str]]:
+    """ZIP-Datei mit einer Datei je Standort
+
+    Returns:
+        - bytes: ZIP-Datei
+        - list[str]: Standorte, für die keine Daten gefunden wurden
+
+    """
+
+    files: dict[str, str | bytes] = {}
+    without_data: list[str] = []
+    for name, params in sites.items():
+        if not any(
+            par.closest_available_res is not None
+            and par.closest_available_res.no_data is None
+            for par in params
+        ):
+            without_data.append(name)
+            continue
+        file, content = site_file(name, params, polysun=polysun)
+        files[file] = content
+
+    return zip_files(files), without_data
+
+
+@gf.func_timer
+def collect_sites(
+    locations: list[cld.Location],
+    parameters: list[str],
+    time_span: cld.TimeSpan,
+) -> dict[str, list[cld.DWDParam]]:
+    """Wetterdaten für alle Standorte
+
+    Args:
+        - locations (list[cld.Location]): Standorte (mit oder ohne Koordinaten)
+        - parameters (list[str]): Parameter (name_en)
+        - time_span (cld.TimeSpan): Zeitraum
+
+    Returns:
+        - dict[str, list[cld.DWDParam]]: Parameter je Standort (Dateiname)
+
+    """
+
+    located: list[cld.Location] = mp.geocode_locations(locations)
+    sites: dict[int, cld.Location] = {
+        number: loc for number, loc in enumerate(located) if has_coordinates(loc)
+    }
+    for loc in located:
+        if not has_coordinates(loc):
+            logger.critical(f"Location '{loc.name}' not found - skipped")
+
+    res: str = cont.WEATHER_BATCH_RESOLUTION
+    span = (time_span.start, time_span.end)
+
+    def around(key: SiteParam) -> pl.DataFrame:
+        loc: cld.Location = sites[key[0]]
+        return dws.nearest_stations(
+            key[1],
+            res,
+            (loc.latitude, loc.longitude),  # type: ignore[arg-type]
+            span,
+            cont.DWD_QUERY_DISTANCE_LIMIT,
+        ).head(cont.WEATHER_BATCH_MAX_STATIONS)
+
+    def fetch(par: str, station_id: str) -> pl.DataFrame:
+        return dwc.station_values(par, res, station_id, span)
+
+    keys: list[SiteParam] = [(site, par) for site in sites for par in parameters]
+    with ThreadPoolExecutor(max_workers=cont.WEATHER_BATCH_WORKERS) as pool:
+        stations: dict[SiteParam, pl.DataFrame] = dict(
+            zip(keys, pool.map(around, keys), strict=True)
+        )
+
+    found, values = closest_with_data(
+        {key: df.get_column("station_id").to_list() for key, df in stations.items()},
+        fetch,
+    )
+
+    collected: dict[str, list[cld.DWDParam]] = {}
+    used: set[str] = set()
+    for site, loc in sites.items():
+        results: dict[str, tuple[pl.DataFrame, str | None, pl.DataFrame]] = {}
+        for par in parameters:
+            station_id: str | None = found[(site, par)]
+            results[par] = (
+                stations[(site, par)],
+                station_id,
+                pl.DataFrame() if station_id is None else values[(par, station_id)],
+            )
+        name: str = file_name(loc.name or loc.address or f"Standort {site + 1}", used)
+        collected[name] = site_params(loc, time_span, results)
+
+    return collected
+
+
+def weather_files_from_list(
+    df: pl.DataFrame, time_span: cld.TimeSpan, *, polysun: bool, parameters: list[str]
+) -> tuple[bytes, list[str]]:
+    """ZIP-Datei mit Wetterdaten für eine Liste von Standorten
+
+    Args:
+        - df (pl.DataFrame): Liste im Format der Karten-Seite
+        - time_span (cld.TimeSpan): Zeitraum
+        - polysun (bool): Polysun-csv (sonst Excel)
+        - parameters (list[str]): Parameter für Excel-Dateien
+            (für Polysun immer cont.DWD_PARAMS_POLYSUN)
+
+    Returns:
+        - bytes: ZIP-Datei
+        - list[str]: Standorte ohne Daten
+
+    """
+
+    locations: list[cld.Location] = mp.create_list_of_locations_from_df(
+        df, geocode=False
+    )
+    sites: dict[str, list[cld.DWDParam]] = collect_sites(
+        locations,
+        list(cont.DWD_PARAMS_POLYSUN) if polysun else parameters,
+        time_span,
+    )
+    return weather_zip(sites, polysun=polysun)
@@ -9,13 +9,14 @@ import pytest
 
 from modules import classes_data as cld
 from modules import constants as cont
+from modules import dwd_discover as dsc
 
 LOCATION = cld.Location("Bremen").fill_using_geopy()
 TIME_SPAN = cld.TimeSpan(
     dt.datetime(2017, 1, 1, 0, 0), dt.datetime(2019, 12, 31, 23, 59)
 )
 
-PARS_TO_TEST: set[str] = cont.DWD_GOOD_PARAMS  # set(DWD_ALL_PAR_DIC)
+PARS_TO_TEST: set[str] = set(dsc.good_parameters())  # set(dsc.all_parameters())
 BAD_PARS: set[str] = set(cont.DWD_PROBLEMATIC_PARAMS)
 
 PARS_TO_TEST_CLOUD: set[str] = {par for par in PARS_TO_TEST if "cloud" in par}
@@ -53,10 +54,10 @@ def general_assumptions_param(par: cld.DWDParam, par_name: str) -> None:
     assert par.name_de == cont.DWD_PARAM_TRANSLATION.get(par_name, par.name_en)
     assert par.location == LOCATION
     assert par.time_span == TIME_SPAN
-    assert par.unit == cont.DWD_ALL_PAR_DIC[par_name]["unit"]
+    assert par.unit == dsc.all_parameters()[par_name]["unit"]
     assert (
         par.available_resolutions
-        == cont.DWD_ALL_PAR_DIC[par_name]["available_resolutions"]
+        == dsc.all_parameters()[par_name]["available_resolutions"]
     )
     assert isinstance(par.resolutions, cld.DWDResolutions)
 
@@ -0,0 +1,112 @@
+"""Tests for the battery-module (peak shaving)"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from modules import battery as bat
+from modules import classes_data as cld
+from modules import constants as cont
+
+COL_IND: str = cont.SpecialCols.index
+
+
+def single_peak() -> pl.DataFrame:
+    """One day of hourly values at 100 kW with a two-hour peak of 200 kW"""
+    load: np.ndarray = np.full(24, 100.0)
+    load[12:14] = 200
+    return pl.DataFrame(
+        {
+            COL_IND: pl.datetime_range(
+                dt.datetime(2021, 1, 1), dt.datetime(2021, 1, 1, 23), "1h", eager=True
+            ),
+            "Strom": load,
+        }
+    )
+
+
+class TestSimulate:
+    """Dispatch with a fixed peak limit"""
+
+    def test_limits_respected(self) -> None:
+        """Power and usable capacity limit the shaved peak"""
+        load: np.ndarray = single_peak().get_column("Strom").to_numpy()
+        settings: cld.BatterySettings = cld.BatterySettings(
+            efficiency=1, soc_min=0, soc_max=1
+        )
+        result: dict[str, np.ndarray] = bat.simulate(
+            load,
+            1,
+            cld.BatteryConfigs(
+                capacity=np.array([500.0, 500.0, 100.0]),
+                power=np.array([100.0, 40.0, 100.0]),
+                limit=np.array([120.0, 120.0, 120.0]),
+            ),
+            settings,
+        )
+        # enough power and capacity / power limit / capacity limit (100 kWh)
+        assert result["peak"].tolist() == pytest.approx([120, 160, 180])
+        assert result["discharged"][0] == pytest.approx(160)
+
+    def test_efficiency_losses(self) -> None:
+        """Losses of charging and discharging with sqrt(efficiency) each"""
+        load: np.ndarray = np.array([200.0, 0.0, 0.0])
+        settings: cld.BatterySettings = cld.BatterySettings(
+            efficiency=0.81, soc_min=0, soc_max=1
+        )
+        configs: cld.BatteryConfigs = cld.BatteryConfigs(
+            capacity=np.array([100.0]), power=np.array([100.0]), limit=np.array([100.0])
+        )
+        result: dict[str, np.ndarray] = bat.simulate(load, 1, configs, settings)
+        assert result["discharged"][0] == pytest.approx(90)
+        assert result["charged"][0] == pytest.approx(100 / 0.9)
+        assert result["losses"][0] == pytest.approx(90 / 0.9 - 90 + 100 / 0.9 - 100)
+
+    def test_chunks_carry_state(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Time chunks give the same result as one pass (state of charge carried)"""
+        load: np.ndarray = np.tile(single_peak().get_column("Strom").to_numpy(), 3)
+        settings: cld.BatterySettings = cld.BatterySettings()
+        configs: cld.BatteryConfigs = cld.BatteryConfigs(
+            capacity=np.array([50.0, 200.0, 500.0]),
+            power=np.array([25.0, 100.0, 250.0]),
+            limit=np.array([150.0, 120.0, 100.0]),
+        )
+        whole: dict[str, np.ndarray] = bat.simulate(load, 1, configs, settings)
+
+        monkeypatch.setattr(bat, "SIMULATION_CELLS", 3 * 5)
+        chunked: dict[str, np.ndarray] = bat.simulate(load, 1, configs, settings)
+        for key, values in whole.items():
+            assert chunked[key] == pytest.approx(values)
+
+
+class TestPeakShaving:
+    """Grid of capacities and powers"""
+
+    def test_grid(self) -> None:
+        """One row per configuration with the lowest achievable peak"""
+        settings: cld.BatterySettings = cld.BatterySettings(
+            capacities=(100, 400),
+            powers=(50, 150),
+            efficiency=1,
+            soc_min=0,
+            soc_max=1,
+            demand_price=100,
+        )
+        df_res: pl.DataFrame = bat.peak_shaving(single_peak(), "Strom", settings)
+        assert df_res.height == 4
+        peaks: list[float] = df_res.get_column("Spitze mit Speicher [kW]").to_list()
+        # power limit, except 400 kWh / 150 kW:
+        # starts full, so the whole day can be shaved (24 h x limit + 400 = 2600)
+        assert peaks == pytest.approx([150, 150, 150, 2200 / 24], abs=0.1)
+        assert df_res.get_column("Einsparung Leistungspreis [€/a]").to_list()[
+            -1
+        ] == pytest.approx((200 - 2200 / 24) * 100, abs=10)
+
+    def test_missing_column(self) -> None:
+        """Unknown columns raise NotFoundError"""
+        with pytest.raises(Exception, match="Spannung"):
+            bat.peak_shaving(single_peak(), "Spannung")
@@ -0,0 +1,69 @@
+"""Tests for the data quality checks"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import data_quality as dq
+from modules import df_manipulation as df_man
+
+COL_IND: str = cont.SpecialCols.index
+
+
+def df_with_errors() -> pl.DataFrame:
+    """Daily sine wave with a spike, a stuck period and a negative value"""
+    index: pl.Series = pl.datetime_range(
+        dt.datetime(2021, 1, 1), dt.datetime(2021, 1, 10), "15m", eager=True
+    )
+    values: np.ndarray = np.sin(np.arange(len(index)) / 96 * 2 * np.pi) * 10 + 20
+    values[100] = 500
+    values[300:320] = values[300]
+    values[500] = -5
+    return pl.DataFrame({COL_IND: index, "Strom": values, "ok": values * 0})
+
+
+class TestCheckQuality:
+    """Per-cell quality mask and summary"""
+
+    df: pl.DataFrame = df_with_errors()
+    report: cld.QualityReport = dq.check_quality(
+        df, cld.QualitySettings(non_negative=["Strom"])
+    )
+
+    def flagged_rows(self, flag: str) -> list[int]:
+        """Rows with the given flag set in column 'Strom'"""
+        bit: int = getattr(cont.QUALITY_FLAGS, flag)
+        return (
+            self.report.mask.with_row_index("row")
+            .filter((pl.col("Strom") & bit) > 0)
+            .get_column("row")
+            .to_list()
+        )
+
+    def test_spike(self) -> None:
+        """The single high value is a spike"""
+        assert 100 in self.flagged_rows("spike")
+
+    def test_stuck(self) -> None:
+        """20 equal values in a row are stuck"""
+        assert self.flagged_rows("stuck") == list(range(300, 320))
+
+    def test_negative(self) -> None:
+        """Negative value in a column that must not be negative"""
+        assert self.flagged_rows("negative") == [500]
+
+    def test_constant_column_is_ok(self) -> None:
+        """Zero values are not flagged as stuck by default"""
+        assert self.report.mask.get_column("ok").sum() == 0
+
+    def test_repair(self) -> None:
+        """Only flagged values are replaced"""
+        repaired: pl.DataFrame = df_man.repair_quality_issues(self.df, self.report)
+        assert repaired.item(100, "Strom") < 50
+        assert repaired.item(500, "Strom") > 0
+        assert repaired.item(0, "Strom") == self.df.item(0, "Strom")
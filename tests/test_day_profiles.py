@@ -0,0 +1,165 @@
+"""Tests for the day index and the typical-day engine"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import day_profiles as dp
+
+
+def mdf_quarter_hours(start: dt.datetime, end: dt.datetime) -> cld.MetaAndDfs:
+    """MetaAndDfs with 15-minute values (value = hour of the day)"""
+    index: pl.Series = pl.datetime_range(start, end, "15m", eager=True)
+    df: pl.DataFrame = pl.DataFrame(
+        {
+            cont.SpecialCols.index: index,
+            "Strom": index.dt.hour().cast(pl.Float64),
+            cont.SpecialCols.original_index: index,
+        }
+    )
+    return cld.MetaAndDfs(meta=cld.MetaData(lines={}, td_mnts=15), df=df)
+
+
+@pytest.mark.parametrize(
+    ("year", "easter"),
+    [
+        (2019, dt.date(2019, 4, 21)),
+        (2020, dt.date(2020, 4, 12)),
+        (2024, dt.date(2024, 3, 31)),
+        (2025, dt.date(2025, 4, 20)),
+    ],
+)
+def test_easter_sunday(year: int, easter: dt.date) -> None:
+    """Easter dates calculated with the Gauss formula"""
+    assert dp.easter_sunday(year) == easter
+
+
+class TestDayIndex:
+    """Day index built from a data frame"""
+
+    mdf: cld.MetaAndDfs = mdf_quarter_hours(
+        dt.datetime(2021, 1, 1), dt.datetime(2021, 12, 31, 23, 45)
+    )
+
+    def test_offsets(self) -> None:
+        """Every day starts 96 rows after the previous one"""
+        index: cld.DayIndex = dp.get_day_index(self.mdf)
+        assert index.steps_per_day == 96
+        assert index.days.height == 365
+        offsets: pl.Series = index.days.get_column("offset")
+        assert offsets.diff().drop_nulls().unique().to_list() == [96]
+
+    def test_day_types(self) -> None:
+        """Holidays take precedence over weekends"""
+        days: pl.DataFrame = dp.get_day_index(self.mdf).days
+        day_type: dict[dt.date, str] = dict(
+            zip(days["Datum"].to_list(), days["Tagtyp"].to_list(), strict=True)
+        )
+        assert day_type[dt.date(2021, 4, 5)] == cont.DAY_TYPES.holiday
+        assert day_type[dt.date(2021, 5, 1)] == cont.DAY_TYPES.holiday
+        assert day_type[dt.date(2021, 1, 2)] == cont.DAY_TYPES.weekend
+        assert day_type[dt.date(2021, 1, 4)] == cont.DAY_TYPES.workday
+
+    def test_slice_days(self) -> None:
+        """Sliced days are mapped onto the reference day"""
+        date: dt.date = dt.date(2021, 7, 14)
+        days: dict[dt.date, pl.DataFrame] = dp.slice_days(self.mdf, [date])
+        day: pl.DataFrame = days[date]
+        assert day.height == 96
+        assert day.item(0, cont.SpecialCols.index) == dp.REFERENCE_DAY
+        assert day.item(0, cont.SpecialCols.original_index).date() == date
+
+    def test_index_is_rebuilt(self) -> None:
+        """A cached index is not used for a data frame of different height"""
+        mdf: cld.MetaAndDfs = mdf_quarter_hours(
+            dt.datetime(2021, 1, 1), dt.datetime(2021, 1, 31, 23, 45)
+        )
+        assert dp.get_day_index(mdf).days.height == 31
+        mdf.df = mdf.df.head(96 * 10)
+        assert dp.get_day_index(mdf).days.height == 10
+
+    def test_index_is_rebuilt_for_shifted_data(self) -> None:
+        """Same height, other time stamps: the index is built again"""
+        mdf: cld.MetaAndDfs = mdf_quarter_hours(
+            dt.datetime(2021, 1, 1), dt.datetime(2021, 1, 31, 23, 45)
+        )
+        assert dp.get_day_index(mdf).days.get_column("Datum")[0] == dt.date(2021, 1, 1)
+        mdf.df = mdf.df.with_columns(
+            pl.col(cont.SpecialCols.index) + dt.timedelta(hours=12)
+        )
+        days: pl.DataFrame = dp.get_day_index(mdf).days
+        assert days.get_column("Datum")[0] == dt.date(2021, 1, 1)
+        assert days.get_column("Datum")[-1] == dt.date(2021, 2, 1)
+        assert days.get_column("offset")[1] == 48
+
+
+class TestTypicalDays:
+    """Typical days (mean, median and percentiles per group)"""
+
+    mdf: cld.MetaAndDfs = mdf_quarter_hours(
+        dt.datetime(2021, 1, 1, 6), dt.datetime(2021, 3, 31, 23, 45)
+    )
+
+    def test_shape(self) -> None:
+        """One row per group, statistic and time step"""
+        typ: pl.DataFrame = dp.typical_days(self.mdf, percentiles=(10, 90))
+        groups: int = typ.select("Jahr", "Monat", "Tagtyp").unique().height
+        assert typ.height == groups * 4 * 96
+
+    def test_incomplete_days_are_ignored(self) -> None:
+        """The first day starts at 06:00 and must not be counted"""
+        typ: pl.DataFrame = dp.typical_days(self.mdf, group_by=("Monat",))
+        january: pl.DataFrame = typ.filter(pl.col("Monat") == 1)
+        assert january.item(0, "Anzahl Tage") == 30
+
+    def test_values(self) -> None:
+        """Every day has the same profile -> all statistics equal the profile"""
+        typ: pl.DataFrame = dp.typical_days(self.mdf, group_by=("Tagtyp",))
+        expected: np.ndarray = np.repeat(np.arange(24, dtype=float), 4)
+        for _, group in typ.group_by("Tagtyp", "Kennwert"):
+            assert np.allclose(group.get_column("Strom").to_numpy(), expected)
+
+
+class TestCarpetMatrix:
+    """Hour-of-day x day-of-year matrix for the carpet plot"""
+
+    def test_regular_series_is_a_view(self) -> None:
+        """A complete year of 15-minute values is reshaped without a copy"""
+        mdf: cld.MetaAndDfs = mdf_quarter_hours(
+            dt.datetime(2021, 1, 1), dt.datetime(2021, 12, 31, 23, 45)
+        )
+        index: cld.DayIndex = dp.get_day_index(mdf)
+        dates, matrix = dp.carpet_matrix(mdf.df, index, "Strom")
+
+        assert matrix.shape == (365, 96)
+        assert dates.len() == 365
+        assert matrix.base is not None
+        assert matrix[10, 4 * 13] == 13
+
+    def test_gaps_are_filled(self) -> None:
+        """Missing days and a missing hour (DST) become NaN in a calendar grid"""
+        mdf: cld.MetaAndDfs = mdf_quarter_hours(
+            dt.datetime(2021, 3, 26), dt.datetime(2021, 3, 31, 23, 45)
+        )
+        mdf.df = mdf.df.filter(
+            (pl.col(cont.SpecialCols.index).dt.date() != dt.date(2021, 3, 27))
+            & ~(
+                (pl.col(cont.SpecialCols.index).dt.date() == dt.date(2021, 3, 28))
+                & (pl.col(cont.SpecialCols.index).dt.hour() == 2)
+            )
+        )
+        index: cld.DayIndex = dp.build_day_index(mdf.df, 15)
+        dates, matrix = dp.carpet_matrix(mdf.df, index, "Strom")
+
+        assert matrix.shape == (6, 96)
+        assert dates.to_list()[1] == dt.date(2021, 3, 27)
+        assert np.isnan(matrix[1]).all()
+        assert np.isnan(matrix[2, 8:12]).all()
+        assert matrix[2, 12] == 3
+        assert not np.isnan(matrix[3]).any()
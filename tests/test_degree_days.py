@@ -0,0 +1,144 @@
+"""Tests for the degree_days-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from modules import classes_data as cld
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import degree_days as dd
+
+COL_IND: str = cont.SpecialCols.index
+COL_TEMP: str = dd.COL_TEMP
+
+
+def hourly_data() -> pl.DataFrame:
+    """Two years of hourly temperatures and a heat load with change point 15 °C
+
+    Daily heat: 240 kWh base + 48 kWh per Kelvin below 15 °C
+    (hourly: 10 kW + 2 kW/K).
+    """
+    index: pl.Series = pl.datetime_range(
+        dt.datetime(2021, 1, 1), dt.datetime(2022, 12, 31, 23), "1h", eager=True
+    )
+    day: np.ndarray = index.dt.ordinal_day().to_numpy()
+    offset: np.ndarray = np.where(index.dt.year().to_numpy() == 2022, 1.0, 0.0)
+    temp: np.ndarray = 10 - 12 * np.cos(2 * np.pi * (day - 15) / 365) + offset
+    heat: np.ndarray = 10 + 2 * np.maximum(15 - temp, 0)
+    return pl.DataFrame({COL_IND: index, COL_TEMP: temp, "Wärme": heat})
+
+
+LINES: dict[str, cld.MetaLine] = {
+    "Wärme": cld.MetaLine(
+        name="Wärme", name_orgidx="Wärme", orig_tit="Wärme", tit="Wärme", unit=" kW"
+    )
+}
+
+
+class TestDailyValues:
+    """Daily temperatures and energy"""
+
+    def test_power_to_daily_energy(self) -> None:
+        """Power is averaged and multiplied with 24 h"""
+        daily: pl.DataFrame = dd.daily_values(hourly_data(), ["Wärme"], LINES)
+        assert daily.height == 365 * 2
+        first: dict = daily.row(0, named=True)
+        assert first["Datum"] == dt.date(2021, 1, 1)
+        assert first["Wärme"] == pytest.approx(24 * (10 + 2 * (15 - first[COL_TEMP])))
+
+    def test_missing_column(self) -> None:
+        """Unknown columns raise NotFoundError"""
+        with pytest.raises(cle.NotFoundError):
+            dd.daily_values(hourly_data(), ["Gas"], LINES)
+
+
+class TestDegreeDays:
+    """Gradtagzahl G20/15"""
+
+    def test_monthly(self) -> None:
+        """Only days below the heating limit count, with 20 °C - temperature"""
+        daily: pl.DataFrame = pl.DataFrame(
+            {
+                "Datum": [
+                    dt.date(2021, 1, 1),
+                    dt.date(2021, 1, 2),
+                    dt.date(2021, 2, 1),
+                ],
+                "Jahr": [2021, 2021, 2021],
+                COL_TEMP: [0.0, 16.0, 14.0],
+            }
+        )
+        months: pl.DataFrame = dd.degree_days(daily)
+        assert months.get_column(dd.COL_DEGREE_DAYS).to_list() == [20.0, 6.0]
+        assert months.get_column("Heiztage").to_list() == [1, 1]
+
+
+class TestSignatures:
+    """Change-point energy signature"""
+
+    def test_known_signature(self) -> None:
+        """Base load, slope and change point are found for every year"""
+        daily: pl.DataFrame = dd.daily_values(hourly_data(), ["Wärme"], LINES)
+        sig: pl.DataFrame = dd.fit_signatures(daily, ["Wärme"])
+        assert sig.get_column("Jahr").to_list() == [2021, 2022]
+        assert sig.get_column("Änderungspunkt").to_list() == [15.0, 15.0]
+        assert sig.get_column("Grundlast").to_numpy() == pytest.approx(240)
+        assert sig.get_column("Steigung").to_numpy() == pytest.approx(48)
+        assert sig.get_column("Bestimmtheitsmaß").to_numpy() == pytest.approx(1)
+
+    def test_no_heating(self) -> None:
+        """Loads independent of temperature have no change point"""
+        daily: pl.DataFrame = dd.daily_values(
+            hourly_data().with_columns(pl.lit(5.0).alias("Wärme")), ["Wärme"], LINES
+        )
+        sig: pl.DataFrame = dd.fit_signatures(daily, ["Wärme"])
+        assert sig.get_column("Änderungspunkt").null_count() == 2
+        assert sig.get_column("Grundlast").to_numpy() == pytest.approx(120)
+        assert sig.get_column("Steigung").to_numpy() == pytest.approx(0)
+
+
+class TestNormalise:
+    """Weather normalisation with a long-term reference"""
+
+    def test_reference_equals_actual(self) -> None:
+        """Reference = 2021: 2021 stays the same, the warmer 2022 is scaled up"""
+        data: pl.DataFrame = hourly_data()
+        daily: pl.DataFrame = dd.daily_values(data, ["Wärme"], LINES)
+        sig: pl.DataFrame = dd.fit_signatures(daily, ["Wärme"])
+        reference: pl.DataFrame = dd.climatology(
+            daily.filter(pl.col("Jahr") == 2021).select("Datum", COL_TEMP)
+        )
+        norm: pl.DataFrame = dd.normalise(daily, sig, reference, ["Wärme"])
+
+        first, second = norm.iter_rows(named=True)
+        assert first["Verbrauch bereinigt"] == pytest.approx(first["Verbrauch"])
+        assert first["Grundlast"] == pytest.approx(240 * 365)
+        # 2022 war wärmer -> bereinigt (fast) wie 2021
+        assert second["Verbrauch"] < second["Verbrauch bereinigt"]
+        assert second["Verbrauch bereinigt"] == pytest.approx(
+            first["Verbrauch"], rel=0.01
+        )
+
+    def test_settings(self) -> None:
+        """Default settings match no settings, other temperatures change the sums"""
+        daily: pl.DataFrame = dd.daily_values(hourly_data(), ["Wärme"], LINES)
+        sig: pl.DataFrame = dd.fit_signatures(daily, ["Wärme"])
+        reference: pl.DataFrame = dd.climatology(daily.select("Datum", COL_TEMP))
+
+        default: pl.DataFrame = dd.normalise(daily, sig, reference, ["Wärme"])
+        explicit: pl.DataFrame = dd.normalise(
+            daily, sig, reference, ["Wärme"], cld.DegreeDaySettings()
+        )
+        warmer: pl.DataFrame = dd.normalise(
+            daily, sig, reference, ["Wärme"], cld.DegreeDaySettings(indoor=22)
+        )
+        assert default.equals(explicit)
+        assert (
+            warmer.get_column("Gradtagzahl").sum()
+            > default.get_column("Gradtagzahl").sum()
+        )
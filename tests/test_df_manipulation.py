@@ -0,0 +1,131 @@
+"""Tests for the df_manipulation-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import df_manipulation as df_man
+
+COL_IND: str = cont.SpecialCols.index
+
+
+class TestInterpolateAkima:
+    """Gaps filled per column"""
+
+    def test_integer_column(self) -> None:
+        """Interpolated values of integer columns are not truncated"""
+        df: pl.DataFrame = pl.DataFrame(
+            {
+                COL_IND: pl.datetime_range(
+                    dt.datetime(2021, 1, 1),
+                    dt.datetime(2021, 1, 1, 4),
+                    "1h",
+                    eager=True,
+                ),
+                "Zähler": pl.Series([0, 1, None, 9, 16], dtype=pl.Int64),
+            }
+        )
+        filled: pl.DataFrame = df_man.interpolate_missing_data_akima(df)
+        assert filled.schema["Zähler"] == pl.Float64
+        value: float = filled.item(2, "Zähler")
+        assert 1 < value < 9
+        assert value != int(value)
+
+
+class TestAlignTimeWeighted:
+    """Alignment of 10-minute weather data to the index of the uploaded data"""
+
+    start: dt.datetime = dt.datetime(2021, 1, 1)
+    weather: pl.DataFrame = pl.DataFrame(
+        {
+            COL_IND: pl.datetime_range(
+                start, dt.datetime(2021, 1, 1, 2), "10m", eager=True
+            ),
+            "Temperatur": np.arange(13, dtype=float),
+        }
+    )
+
+    def test_quarter_hours(self) -> None:
+        """15-minute index between two 10-minute values"""
+        index: pl.Series = pl.datetime_range(
+            self.start, dt.datetime(2021, 1, 1, 1), "15m", eager=True
+        )
+        aligned: pl.DataFrame = df_man.align_time_weighted(index, self.weather)
+        assert aligned.get_column(COL_IND).equals(index.alias(COL_IND))
+        assert aligned.get_column("Temperatur").to_list() == [0, 1.5, 3, 4.5, 6]
+
+    def test_edges_and_gaps(self) -> None:
+        """Edges use the closest value, missing values are bridged"""
+        weather: pl.DataFrame = self.weather.with_columns(
+            pl.when(pl.col("Temperatur") == 3)
+            .then(None)
+            .otherwise(pl.col("Temperatur"))
+            .alias("Temperatur")
+        )
+        index: pl.Series = pl.Series(
+            [
+                dt.datetime(2020, 12, 31, 23),
+                dt.datetime(2021, 1, 1, 0, 30),
+                dt.datetime(2021, 1, 1, 3),
+            ]
+        )
+        aligned: pl.DataFrame = df_man.align_time_weighted(index, weather)
+        assert aligned.get_column("Temperatur").to_list() == [0, 3, 12]
+
+
+class TestDeriveMultiYear:
+    """Parallel per-year derivation gives the same frames as the serial path"""
+
+    @staticmethod
+    def mdf_three_years() -> cld.MetaAndDfs:
+        """Three years of 15-minute power values"""
+        index: pl.Series = pl.datetime_range(
+            dt.datetime(2019, 1, 1),
+            dt.datetime(2021, 12, 31, 23, 45),
+            "15m",
+            eager=True,
+        )
+        col: str = f"Strom{cont.Suffixes.col_leistung}"
+        df: pl.DataFrame = pl.DataFrame(
+            {
+                COL_IND: index,
+                col: np.random.default_rng(0).random(len(index)),
+                cont.SpecialCols.original_index: index,
+            }
+        )
+        lines: dict[str, cld.MetaLine] = {
+            name: cld.MetaLine(name, f"{name} - orgidx", name, name, "kW", "kW")
+            for name in [col, "Strom"]
+        }
+        meta: cld.MetaData = cld.MetaData(
+            lines=lines, years=[2019, 2020, 2021], multi_years=True, td_mnts=15
+        )
+        return cld.MetaAndDfs(meta=meta, df=df)
+
+    def test_same_as_serial(self) -> None:
+        """df_h_multi, mon_multi and jdl match the serial calculation"""
+        serial: cld.MetaAndDfs = self.mdf_three_years()
+        serial.df_h = df_man.hourly_values(serial.df)
+        serial = df_man.split_multi_years(serial, "df_h")
+        serial = df_man.jdl(serial)
+        serial.mon = df_man.monthly_values(serial.df_h, serial.meta.lines)
+        serial = df_man.split_multi_years(serial, "mon")
+
+        parallel: cld.MetaAndDfs = df_man.derive_multi_year(self.mdf_three_years())
+
+        assert parallel.df_multi is not None
+        assert serial.df_h_multi is not None
+        assert parallel.df_h_multi is not None
+        assert serial.mon_multi is not None
+        assert parallel.mon_multi is not None
+        assert parallel.df_h.equals(serial.df_h)  # type: ignore[union-attr]
+        for year in [2019, 2020, 2021]:
+            assert parallel.df_h_multi[year].equals(serial.df_h_multi[year])
+            assert parallel.mon_multi[year].equals(serial.mon_multi[year])
+        assert parallel.jdl.equals(serial.jdl)  # type: ignore[union-attr]
+        assert parallel.jdl.height == cont.TimeHoursIn.leap_year  # type: ignore[union-attr]
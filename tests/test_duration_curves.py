@@ -0,0 +1,87 @@
+"""Tests for the duration_curves-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import numpy as np
+import polars as pl
+import pytest
+from scipy import interpolate
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import duration_curves as dc
+
+COL_IND: str = cont.SpecialCols.index
+
+
+def support_table() -> pl.DataFrame:
+    """Two planning curves, 'B' with an extra support point"""
+    return pl.DataFrame(
+        {
+            dc.COL_HOUR: [0, 1_000, 4_000, 8_760, 2_000],
+            "A": [100.0, 80.0, 40.0, 5.0, None],
+            "B": [50.0, 45.0, 30.0, 0.0, 35.0],
+        }
+    )
+
+
+class TestUpsample:
+    """Sparse support points to hourly values"""
+
+    def test_hits_support_points(self) -> None:
+        """Hourly grid 0 … 8760 passes through every support point"""
+        df: pl.DataFrame = dc.upsample_duration_curves(support_table())
+        assert df.height == cont.TimeHoursIn.year + 1
+        rows: pl.DataFrame = df.filter(pl.col(COL_IND).is_in([1_000, 2_000, 4_000]))
+        assert rows.get_column("A").to_list()[::2] == pytest.approx([80, 40])
+        assert rows.get_column("B").to_list() == pytest.approx([45, 35, 30])
+
+    def test_non_increasing(self) -> None:
+        """Curves never rise, even for noisy support points"""
+        table: pl.DataFrame = support_table().with_columns(
+            pl.Series("C", [100.0, 60.0, 61.0, 0.0, None])
+        )
+        df: pl.DataFrame = dc.upsample_duration_curves(table)
+        values: np.ndarray = df.drop(COL_IND).to_numpy()
+        assert (np.diff(values, axis=0) <= 1e-9).all()
+
+    def test_same_as_single_pchip(self) -> None:
+        """The batch gives the same values as one interpolation per curve"""
+        df: pl.DataFrame = dc.upsample_duration_curves(support_table())
+        hours: np.ndarray = np.array([0, 1_000, 2_000, 4_000, 8_760])
+        values: np.ndarray = np.array([50.0, 45.0, 35.0, 30.0, 0.0])
+        expected: np.ndarray = interpolate.PchipInterpolator(hours, values)(
+            np.arange(8_761)
+        )
+        assert df.get_column("B").to_numpy() == pytest.approx(expected)
+
+
+class TestAddToJdl:
+    """Planning curves in the regular duration curve"""
+
+    def test_without_measured_data(self) -> None:
+        """Curves become 'mdf.jdl' with meta data for the figure and export"""
+        mdf: cld.MetaAndDfs = cld.MetaAndDfs(
+            meta=cld.MetaData(lines={}), df=pl.DataFrame()
+        )
+        dc.add_to_jdl(mdf, dc.upsample_duration_curves(support_table()))
+
+        assert mdf.jdl is not None
+        assert set(mdf.meta.lines) == {"A", "B"}
+        assert mdf.meta.lines["A"].name_orgidx in mdf.jdl.columns
+
+    def test_replaces_on_rerun(self) -> None:
+        """Adding the same curves again does not duplicate columns"""
+        jdl: pl.DataFrame = pl.DataFrame(
+            {"Strom": np.arange(8_760.0, 0, -1)}
+        ).with_row_index(COL_IND)
+        mdf: cld.MetaAndDfs = cld.MetaAndDfs(
+            meta=cld.MetaData(lines={}), df=pl.DataFrame(), jdl=jdl
+        )
+        curves: pl.DataFrame = dc.upsample_duration_curves(support_table())
+        dc.add_to_jdl(mdf, curves)
+        dc.add_to_jdl(mdf, curves)
+
+        assert mdf.jdl is not None
+        assert mdf.jdl.height == 8_760
+        assert mdf.jdl.columns[:4] == [COL_IND, "Strom", "A", "B"]
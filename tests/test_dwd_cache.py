@@ -0,0 +1,300 @@
+"""Tests for the dwd_cache-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+import pytest
+
+from modules import constants as cont
+from modules import dwd_cache as dwc
+from modules import dwd_fusion as fus
+
+START: dt.datetime = dt.datetime(2022, 12, 31)
+STEP: dt.timedelta = dt.timedelta(hours=1)
+NEW_YEAR: dt.datetime = dt.datetime(2023, 1, 1)
+
+
+class FakeDWD:
+    """Hourly values for every hour asked for (records the queried ranges)"""
+
+    def __init__(self, skip: tuple[dt.datetime, dt.datetime] | None = None) -> None:
+        """Values in 'skip' are missing at the station"""
+        self.calls: list[tuple[dt.datetime, dt.datetime]] = []
+        self.skip = skip
+
+    def __call__(
+        self,
+        parameter: str,
+        _resolution: str,
+        station_id: str,
+        start: dt.datetime,
+        end: dt.datetime,
+    ) -> pl.DataFrame:
+        """Like dwd_cache.download"""
+        self.calls.append((start, end))
+        date: pl.Series = pl.datetime_range(start, end, STEP, eager=True)
+        if self.skip:
+            date = date.filter(~date.is_between(*self.skip))
+        if date.is_empty():
+            return pl.DataFrame()
+        return pl.DataFrame(
+            {
+                "station_id": station_id,
+                "parameter": parameter,
+                "date": date,
+                "value": date.dt.hour().cast(pl.Float64),
+                "quality": 1.0,
+            }
+        ).with_columns(pl.col("date").dt.replace_time_zone("UTC"))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Every test gets an empty cache"""
+    monkeypatch.setattr(cont, "DWD_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(dwc, "IN_FLIGHT", {})
+
+
+class TestRanges:
+    """Covered and missing time ranges"""
+
+    def test_chunk_ranges(self) -> None:
+        """Ranges are split at the start of a year (or every n years)"""
+        span: dwc.Range = (dt.datetime(2019, 6, 1), dt.datetime(2022, 3, 1))
+        assert dwc.chunk_ranges([span], 1) == [
+            (dt.datetime(2019, 6, 1), dt.datetime(2020, 1, 1)),
+            (dt.datetime(2020, 1, 1), dt.datetime(2021, 1, 1)),
+            (dt.datetime(2021, 1, 1), dt.datetime(2022, 1, 1)),
+            (dt.datetime(2022, 1, 1), dt.datetime(2022, 3, 1)),
+        ]
+        assert dwc.chunk_ranges([span], 2) == [
+            (dt.datetime(2019, 6, 1), dt.datetime(2020, 1, 1)),
+            (dt.datetime(2020, 1, 1), dt.datetime(2022, 1, 1)),
+            (dt.datetime(2022, 1, 1), dt.datetime(2022, 3, 1)),
+        ]
+
+    def test_missing_ranges(self) -> None:
+        """Only the parts outside the covered ranges are missing"""
+        day: dt.timedelta = dt.timedelta(days=1)
+        covered: list[dwc.Range] = [
+            (START + 2 * day, START + 4 * day),
+            (START + 3 * day, START + 5 * day),
+        ]
+        assert dwc.missing_ranges(covered, START, START + 10 * day) == [
+            (START, START + 2 * day),
+            (START + 5 * day, START + 10 * day),
+        ]
+        assert dwc.missing_ranges(covered, START + 3 * day, START + 4 * day) == []
+
+
+class TestStationValues:
+    """Values from the local cache"""
+
+    def test_only_missing_ranges_downloaded(self) -> None:
+        """The second request is served locally, a longer one adds the rest"""
+        fake = FakeDWD()
+        first: dwc.Range = (START, START + 47 * STEP)
+        values: pl.DataFrame = dwc.station_values(
+            "humidity", "hourly", "1", first, fake
+        )
+        assert values.height == 48
+        assert dwc.station_values("humidity", "hourly", "1", first, fake).height == 48
+        assert fake.calls == [first]
+
+        longer: pl.DataFrame = dwc.station_values(
+            "humidity", "hourly", "1", (START, START + 71 * STEP), fake
+        )
+        assert fake.calls[1] == (START + 47 * STEP, START + 71 * STEP)
+        assert longer.height == 72
+        assert longer.get_column("date").is_unique().all()
+        assert longer.get_column("date").dt.year().unique().to_list() == [2022, 2023]
+
+    def test_one_download_for_long_spans(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Several years: one download of the dataset, stored year by year"""
+        calls: list[dwc.Range] = []
+
+        def download_dataset(
+            _dataset: str,
+            _resolution: str,
+            station_id: str,
+            start: dt.datetime,
+            end: dt.datetime,
+        ) -> pl.DataFrame:
+            calls.append((start, end))
+            return FakeDWD()("humidity", "hourly", station_id, start, end)
+
+        monkeypatch.setattr(dwc, "download_dataset", download_dataset)
+        monkeypatch.setattr(dwc, "dataset_of", lambda *_: "air_temperature")
+        span: dwc.Range = (dt.datetime(2019, 6, 1), dt.datetime(2022, 3, 1))
+        values: pl.DataFrame = dwc.station_values("humidity", "hourly", "1", span)
+
+        assert calls == [span]
+        assert values.height == (span[1] - span[0]) // STEP + 1
+        directory: pathlib.Path = dwc.partition_dir("humidity", "hourly", "1")
+        assert sorted(path.stem for path in directory.glob("20*.parquet")) == [
+            "2019",
+            "2020",
+            "2021",
+            "2022",
+        ]
+        assert dwc.read_coverage(directory) == [span]
+
+    def test_chunks_for_minute_data(self) -> None:
+        """Minute archives are split by time: one download per chunk"""
+        fake = FakeDWD()
+        span: dwc.Range = (dt.datetime(2019, 6, 1), dt.datetime(2022, 3, 1))
+        values: pl.DataFrame = dwc.stored_values(
+            "humidity", "minute_10", "1", span, fake
+        )
+
+        assert sorted(fake.calls) == dwc.chunk_ranges([span], 1)
+        assert values.height == (span[1] - span[0]) // STEP + 1
+        assert values.get_column("date").is_unique().all()
+        directory: pathlib.Path = dwc.partition_dir("humidity", "minute_10", "1")
+        assert dwc.read_coverage(directory) == [span]
+
+    def test_resumable_chunks(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Chunks finished before an error are kept, only the rest is repeated"""
+        monkeypatch.setattr(cont, "DWD_CACHE_CHUNK_WORKERS", 1)
+        fake = FakeDWD()
+        span: dwc.Range = (dt.datetime(2019, 12, 31), dt.datetime(2022, 1, 1, 23))
+
+        def failing(*args: str | dt.datetime) -> pl.DataFrame:
+            if args[3] == dt.datetime(2022, 1, 1):
+                msg = "connection lost"
+                raise ConnectionError(msg)
+            return fake(*args)  # type: ignore[arg-type]
+
+        with pytest.raises(ConnectionError):
+            dwc.stored_values("humidity", "minute_10", "1", span, failing)
+        assert len(fake.calls) == 3
+
+        values: pl.DataFrame = dwc.stored_values(
+            "humidity", "minute_10", "1", span, fake
+        )
+        assert fake.calls[3:] == [(dt.datetime(2022, 1, 1), span[1])]
+        assert values.height == (span[1] - span[0]) // STEP + 1
+
+    def test_resumable(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Chunks stored before an error are kept, only the rest is repeated"""
+        fake = FakeDWD()
+        span: dwc.Range = (dt.datetime(2019, 12, 31), dt.datetime(2022, 1, 1, 23))
+        write_values = dwc.write_values
+
+        def failing(directory: pathlib.Path, data: pl.DataFrame) -> None:
+            if data.get_column("date").dt.year().min() == 2022:
+                msg = "disk full"
+                raise OSError(msg)
+            write_values(directory, data)
+
+        monkeypatch.setattr(dwc, "write_values", failing)
+        with pytest.raises(OSError, match="disk full"):
+            dwc.station_values("humidity", "hourly", "1", span, fake)
+        assert fake.calls == [span]
+
+        monkeypatch.setattr(dwc, "write_values", write_values)
+        values: pl.DataFrame = dwc.station_values("humidity", "hourly", "1", span, fake)
+        assert fake.calls[1:] == [(dt.datetime(2022, 1, 1), span[1])]
+        assert values.height == (span[1] - span[0]) // STEP + 1
+
+    def test_incomplete(self) -> None:
+        """Like wetterdienst, too incomplete data counts as no data"""
+        fake = FakeDWD(skip=(START, START + 30 * STEP))
+        values: pl.DataFrame = dwc.station_values(
+            "humidity", "hourly", "1", (START, START + 47 * STEP), fake
+        )
+        assert values.is_empty()
+
+    def test_partial_donor(self) -> None:
+        """A donor covering only part of a gap still fills that part"""
+        span: dwc.Range = (START, START + 47 * STEP)
+        target: pl.DataFrame = FakeDWD(skip=(START + STEP, span[1]))(
+            "humidity", "hourly", "1", *span
+        )
+        series: pl.DataFrame = fus.on_grid(target, *span, STEP)
+
+        donor = FakeDWD(skip=(START, START + 30 * STEP))
+        gap: dwc.Range = (START + STEP, span[1])
+        assert dwc.station_values("humidity", "hourly", "2", gap, donor).is_empty()
+        values: pl.DataFrame = dwc.stored_values("humidity", "hourly", "2", gap, donor)
+        assert values.height == 17
+
+        series = fus.fill_gaps(series, values)
+        assert series.get_column("value").null_count() == 30
+        provenance: pl.DataFrame = fus.provenance(series)
+        assert provenance.get_column("Station").to_list() == ["1", None, "2"]
+
+
+class TestSharedDownload:
+    """Parameters of the same dataset share one download"""
+
+    def test_one_download_for_two_parameters(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Humidity and temperature are both in the dataset 'air_temperature'"""
+        calls: list[str] = []
+        lock = threading.Lock()
+
+        def download_dataset(
+            dataset: str,
+            _resolution: str,
+            station_id: str,
+            start: dt.datetime,
+            end: dt.datetime,
+        ) -> pl.DataFrame:
+            with lock:
+                calls.append(dataset)
+            time.sleep(0.1)
+            return pl.concat(
+                FakeDWD()(par, "hourly", station_id, start, end)
+                for par in ["humidity", "temperature_air_mean_2m"]
+            )
+
+        monkeypatch.setattr(dwc, "download_dataset", download_dataset)
+        span: dwc.Range = (START, START + 23 * STEP)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results: list[pl.DataFrame] = list(
+                pool.map(
+                    lambda par: dwc.station_values(par, "hourly", "1", span),
+                    ["humidity", "temperature_air_mean_2m"],
+                )
+            )
+
+        assert calls == ["air_temperature"]
+        assert [df.get_column("parameter").unique().to_list() for df in results] == [
+            ["humidity"],
+            ["temperature_air_mean_2m"],
+        ]
+        assert all(df.height == 24 for df in results)
+        assert dwc.IN_FLIGHT == {}
+
+    def test_finished_downloads_not_kept(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A later request downloads again, errors reach all waiters"""
+        calls: list[str] = []
+
+        def download_dataset(
+            dataset: str,
+            _resolution: str,
+            station_id: str,
+            start: dt.datetime,
+            end: dt.datetime,
+        ) -> pl.DataFrame:
+            calls.append(dataset)
+            if len(calls) > 1:
+                msg = "DWD not reachable"
+                raise ConnectionError(msg)
+            return FakeDWD()("humidity", "hourly", station_id, start, end)
+
+        monkeypatch.setattr(dwc, "download_dataset", download_dataset)
+        monkeypatch.setattr(dwc, "dataset_of", lambda *_: "air_temperature")
+        assert dwc.download("humidity", "hourly", "1", START, NEW_YEAR).height == 25
+        with pytest.raises(ConnectionError, match="not reachable"):
+            dwc.download("humidity", "hourly", "1", START, NEW_YEAR)
+        assert calls == ["air_temperature"] * 2
+        assert dwc.IN_FLIGHT == {}
@@ -0,0 +1,60 @@
+"""Tests for the dwd_discover-module"""
+
+# ruff: noqa: S101
+
+import json
+import pathlib
+from collections.abc import Iterator
+
+import pytest
+
+from modules import constants as cont
+from modules import dwd_discover as dsc
+
+DISCOVERED: dict[str, dict[str, dict[str, str]]] = {
+    "hourly": {
+        "temperature_air_mean_2m": {"origin": "°C", "si": "K"},
+        "humidity": {"origin": "%", "si": "%"},
+    },
+    "daily": {"temperature_air_mean_2m": {"origin": "°C", "si": "K"}},
+}
+
+
+@pytest.fixture
+def catalog_dir(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[pathlib.Path]:
+    """Empty cache directory, cached results cleared"""
+    monkeypatch.setattr(cont, "DWD_CACHE_DIR", tmp_path)
+    for func in (dsc.discover, dsc.all_parameters, dsc.good_parameters):
+        func.cache_clear()
+    yield tmp_path
+    for func in (dsc.discover, dsc.all_parameters, dsc.good_parameters):
+        func.cache_clear()
+
+
+class TestDiscover:
+    """Discovery catalog saved per wetterdienst version"""
+
+    def test_saved_catalog_is_used(self, catalog_dir: pathlib.Path) -> None:
+        """A saved catalog is read without asking wetterdienst"""
+        path: pathlib.Path = dsc.catalog_path()
+        assert path.parent == catalog_dir
+        path.write_text(json.dumps(DISCOVERED), encoding="utf-8")
+
+        assert dsc.discover() == DISCOVERED
+        assert dsc.all_parameters()["temperature_air_mean_2m"] == {
+            "available_resolutions": {"hourly", "daily"},
+            "unit": " °C",
+        }
+        assert list(dsc.all_parameters()) == ["humidity", "temperature_air_mean_2m"]
+        assert dsc.good_parameters() == {"humidity", "temperature_air_mean_2m"}
+
+    def test_catalog_is_saved(self, catalog_dir: pathlib.Path) -> None:
+        """Without a saved catalog wetterdienst is asked once and the result saved"""
+        discovered: dict = dsc.discover()
+        assert "hourly" in discovered
+
+        saved: dict = json.loads(dsc.catalog_path().read_text(encoding="utf-8"))
+        assert saved == discovered
+        assert not list(catalog_dir.glob("*.tmp"))
@@ -0,0 +1,93 @@
+"""Tests for the dwd_fusion-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import polars as pl
+import pytest
+
+from modules import constants as cont
+from modules import dwd_fusion as fus
+
+START: dt.datetime = dt.datetime(2023, 1, 1)
+END: dt.datetime = dt.datetime(2023, 1, 1, 9)
+STEP: dt.timedelta = dt.timedelta(hours=1)
+
+
+def station(station_id: str, hours: list[int], value: float) -> pl.DataFrame:
+    """Values from wetterdienst (UTC) for the given hours"""
+    return pl.DataFrame(
+        {
+            "station_id": station_id,
+            "dataset": "climate_summary",
+            "parameter": "temperature_air_mean_2m",
+            "date": [START + hour * STEP for hour in hours],
+            "value": value,
+            "quality": 1.0,
+        }
+    ).with_columns(pl.col("date").dt.replace_time_zone("UTC"))
+
+
+class TestGaps:
+    """Grid and missing intervals"""
+
+    def test_missing_intervals(self) -> None:
+        """Missing time steps are found as intervals, also at the start and end"""
+        series: pl.DataFrame = fus.on_grid(
+            station("A", [1, 2, 5, 6, 7], 10), START, END, STEP
+        )
+        assert series.height == 10
+        gaps: pl.DataFrame = fus.missing_intervals(series)
+        assert gaps.get_column("Anzahl").to_list() == [1, 2, 2]
+        assert gaps.get_column("von").dt.hour().to_list() == [0, 3, 8]
+        assert gaps.get_column("bis").dt.hour().to_list() == [0, 4, 9]
+
+    def test_query_ranges(self) -> None:
+        """Each gap is queried for itself, close gaps together"""
+        series: pl.DataFrame = fus.on_grid(
+            station("A", [1, 2, 5, 6, 7], 10), START, END, STEP
+        )
+        gaps: pl.DataFrame = fus.missing_intervals(series)
+        hours: list[tuple[int, int]] = [
+            (von.hour, bis.hour) for von, bis in fus.query_ranges(gaps, STEP)
+        ]
+        assert hours == [(0, 0), (3, 4), (8, 9)]
+        hours = [(von.hour, bis.hour) for von, bis in fus.query_ranges(gaps, 3 * STEP)]
+        assert hours == [(0, 4), (8, 9)]
+
+
+class TestFill:
+    """Filling from other stations"""
+
+    def test_fill_and_provenance(self) -> None:
+        """Only gaps are filled, every interval knows its station"""
+        series: pl.DataFrame = fus.on_grid(
+            station("A", [0, 1, 2, 5, 6, 7], 10), START, END, STEP
+        )
+        series = fus.fill_gaps(series, station("B", list(range(10)), 20))
+        series = fus.fill_gaps(series, station("C", list(range(9)), 30))
+
+        assert (
+            series.get_column("value").to_list()
+            == [10] * 3 + [20] * 2 + [10] * 3 + [20] * 2
+        )
+        provenance: pl.DataFrame = fus.provenance(series)
+        assert provenance.get_column("Station").to_list() == ["A", "B", "A", "B"]
+        assert provenance.get_column("Anzahl").to_list() == [3, 2, 3, 2]
+
+    def test_unfilled_gap(self) -> None:
+        """Gaps no station can fill stay in the provenance without station"""
+        series: pl.DataFrame = fus.on_grid(station("A", [0, 1], 10), START, END, STEP)
+        provenance: pl.DataFrame = fus.provenance(series)
+        assert provenance.get_column("Station").to_list() == ["A", None]
+        assert provenance.get_column("Anzahl").to_list() == [2, 8]
+
+    def test_lapse_rate(self) -> None:
+        """A station 200 m higher is 1.3 K colder"""
+        corrected: pl.DataFrame = fus.lapse_rate_correction(
+            station("B", [0], 10), donor_height=300, target_height=100
+        )
+        assert corrected.get_column("value")[0] == pytest.approx(
+            10 + cont.DWD_LAPSE_RATE * 200
+        )
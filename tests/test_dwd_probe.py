@@ -0,0 +1,90 @@
+"""Tests for the dwd_probe-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import threading
+import time
+
+import polars as pl
+
+from modules import dwd_probe as prb
+
+DATA: pl.DataFrame = pl.DataFrame({"value": [1.0]})
+
+
+class TestFirstWithData:
+    """Concurrent probing of the closest stations"""
+
+    def test_closest_wins(self) -> None:
+        """A closer station wins even if a farther one answers first"""
+
+        def fetch(station_id: str) -> pl.DataFrame:
+            if station_id == "B":
+                time.sleep(0.2)
+                return DATA
+            return pl.DataFrame() if station_id == "A" else DATA
+
+        station_id, data, timed_out = prb.first_with_data(
+            ["A", "B", "C"], fetch, timeout=5, workers=3
+        )
+        assert station_id == "B"
+        assert data.equals(DATA)
+        assert not timed_out
+
+    def test_waiting_probes_cancelled(self) -> None:
+        """Stations behind the winner are not probed any more"""
+        probed: list[str] = []
+        lock = threading.Lock()
+
+        def fetch(station_id: str) -> pl.DataFrame:
+            with lock:
+                probed.append(station_id)
+            time.sleep(0.05)
+            return DATA
+
+        station_id, _, _ = prb.first_with_data(
+            [str(num) for num in range(20)], fetch, timeout=5, workers=2
+        )
+        time.sleep(0.2)
+        assert station_id == "0"
+        assert len(probed) < 6
+
+    def test_nothing_found(self) -> None:
+        """No station with data, no time out"""
+        station_id, data, timed_out = prb.first_with_data(
+            ["A", "B"], lambda _: pl.DataFrame(), timeout=5
+        )
+        assert station_id is None
+        assert data.is_empty()
+        assert not timed_out
+
+    def test_time_limit(self) -> None:
+        """The time limit never drops the closest station's answer"""
+
+        def fetch(_: str) -> pl.DataFrame:
+            time.sleep(0.3)
+            return DATA
+
+        station_id, data, timed_out = prb.first_with_data(
+            ["A", "B"], fetch, timeout=0.1
+        )
+        assert station_id == "A"
+        assert data.equals(DATA)
+        assert not timed_out
+
+    def test_no_new_probes_after_limit(self) -> None:
+        """After the time limit no farther stations are started"""
+        probed: list[str] = []
+
+        def fetch(station_id: str) -> pl.DataFrame:
+            probed.append(station_id)
+            time.sleep(0.2)
+            return pl.DataFrame()
+
+        station_id, _, timed_out = prb.first_with_data(
+            [str(num) for num in range(10)], fetch, timeout=0.3, workers=2
+        )
+        assert station_id is None
+        assert timed_out
+        # 0 and 1 at the start, 2 and 3 after 0.2 s, nothing after 0.4 s
+        assert sorted(probed) == ["0", "1", "2", "3"]
@@ -0,0 +1,107 @@
+"""Tests for the dwd_stations-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+import pathlib
+
+import numpy as np
+import polars as pl
+import pytest
+
+from modules import constants as cont
+from modules import dwd_stations as dws
+
+BREMEN: tuple[float, float] = (53.0758, 8.8072)
+SPAN: tuple[dt.datetime, dt.datetime] = (
+    dt.datetime(2020, 1, 1),
+    dt.datetime(2020, 12, 31, 23),
+)
+
+
+def listing() -> pl.DataFrame:
+    """Station list as returned from wetterdienst 'all()'"""
+    return pl.DataFrame(
+        {
+            "station_id": ["00691", "01975", "05745", "03987"],
+            "start_date": [
+                dt.datetime(1890, 1, 1),
+                dt.datetime(1950, 1, 1),
+                dt.datetime(1990, 1, 1),
+                dt.datetime(1893, 1, 1),
+            ],
+            "end_date": [
+                dt.datetime(2024, 1, 1),
+                dt.datetime(2024, 1, 1),
+                dt.datetime(2010, 12, 31),
+                dt.datetime(2024, 1, 1),
+            ],
+            "height": [4, 11, 40, 81],
+            "latitude": [53.0451, 53.6332, 53.1, 52.3813],
+            "longitude": [8.7981, 9.9881, 8.9, 13.0622],
+            "name": ["Bremen", "Hamburg-Fuhlsbüttel", "Bremen-Ost", "Potsdam"],
+            "state": ["Bremen", "Hamburg", "Bremen", "Brandenburg"],
+        }
+    ).with_columns(pl.col("start_date", "end_date").dt.replace_time_zone("UTC"))
+
+
+@pytest.fixture(autouse=True)
+def catalog(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Empty catalog in a temporary directory, station lists without network"""
+    calls: list[str] = []
+
+    def station_list(parameter: str, _resolution: str) -> pl.DataFrame:
+        calls.append(parameter)
+        return listing()
+
+    monkeypatch.setattr(cont, "DWD_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(dws, "CATALOG", {})
+    monkeypatch.setattr(dws, "station_list", station_list)
+    return calls
+
+
+class TestNearestStations:
+    """Offline search for the closest stations"""
+
+    def test_order_and_distance(self) -> None:
+        """Sorted by distance, stations without data in the time span are skipped"""
+        found: pl.DataFrame = dws.nearest_stations(
+            "temperature_air_mean_2m", "hourly", BREMEN, SPAN, 200
+        )
+        assert found.get_column("station_id").to_list() == ["00691", "01975"]
+        assert found.get_column("distance")[0] == pytest.approx(3.5, abs=0.2)
+        assert found.get_column("distance")[1] == pytest.approx(100, abs=2)
+
+        older: pl.DataFrame = dws.nearest_stations(
+            "temperature_air_mean_2m",
+            "hourly",
+            BREMEN,
+            (dt.datetime(2005, 1, 1), dt.datetime(2005, 12, 31)),
+            200,
+        )
+        assert older.get_column("station_id").to_list() == ["00691", "05745", "01975"]
+
+    def test_catalog_persisted(self, catalog: list[str]) -> None:
+        """The station list is fetched once per dataset and read from disk later"""
+        dws.nearest_stations("temperature_air_mean_2m", "hourly", BREMEN, SPAN, 500)
+        dws.nearest_stations("humidity", "hourly", BREMEN, SPAN, 500)
+        assert catalog == ["temperature_air_mean_2m"]
+
+        dws.CATALOG.clear()
+        found: pl.DataFrame = dws.nearest_stations(
+            "humidity", "hourly", BREMEN, SPAN, 500
+        )
+        assert catalog == ["temperature_air_mean_2m"]
+        assert found.height == 3
+
+    def test_haversine(self) -> None:
+        """The k-d tree radius and the great-circle distance agree"""
+        lat: np.ndarray = np.array([BREMEN[0], 52.5200])
+        lon: np.ndarray = np.array([BREMEN[1], 13.4050])
+        distance: np.ndarray = dws.haversine(lat, lon, BREMEN)
+        assert distance[0] == 0
+        assert distance[1] == pytest.approx(315, abs=3)
+        vectors: np.ndarray = dws.unit_vectors(lat, lon)
+        assert np.linalg.norm(vectors[1] - vectors[0]) == pytest.approx(
+            dws.chord(distance[1])
+        )
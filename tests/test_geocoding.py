@@ -0,0 +1,137 @@
+"""Tests for the geocoding-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import pathlib
+import sqlite3
+import time
+
+import pytest
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import geocoding as geo
+from modules import map as mp
+
+BREMEN: dict = geo.place(
+    53.0758,
+    8.8072,
+    "Am Markt 21, 28195 Bremen, Deutschland",
+    {
+        "road": "Am Markt",
+        "house_number": "21",
+        "postcode": "28195",
+        "city": "Bremen",
+        "country": "Deutschland",
+    },
+)
+
+
+@pytest.fixture
+def offline(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> geo.OfflineBackend:
+    """Offline backend with an empty cache"""
+    monkeypatch.setattr(cont, "GEOCODE_CACHE_FILE", tmp_path / "geocoding.sqlite")
+    backend = geo.OfflineBackend({"Am Markt 21, Bremen": BREMEN})
+    monkeypatch.setitem(geo.BACKEND, "current", backend)
+    return backend
+
+
+class TestCache:
+    """Forward and reverse lookups are cached"""
+
+    def test_forward_cached(self, offline: geo.OfflineBackend) -> None:
+        """The same address (any spelling) is only looked up once"""
+        assert geo.geocode("Am Markt 21, Bremen") == (53.0758, 8.8072)
+        assert geo.geocode("  am markt 21,   BREMEN ") == (53.0758, 8.8072)
+        assert geo.geocode("Nirgendwo") is None
+        assert geo.geocode("Nirgendwo") is None
+        assert [kind for kind, _ in offline.calls] == ["forward", "forward"]
+
+    def test_reverse_rounded(self, offline: geo.OfflineBackend) -> None:
+        """Nearby coordinates share one reverse lookup"""
+        assert geo.reverse((53.075812, 8.807161)) == BREMEN
+        assert geo.reverse((53.075848, 8.807239)) == BREMEN
+        assert offline.calls == [("reverse", (53.0758, 8.8072))]
+
+    def test_expired(self, offline: geo.OfflineBackend) -> None:
+        """Entries older than the TTL are looked up again"""
+        geo.geocode("Am Markt 21, Bremen")
+        with sqlite3.connect(cont.GEOCODE_CACHE_FILE) as db:
+            db.execute(
+                "UPDATE geocode SET stored = ?",
+                (time.time() - (cont.GEOCODE_CACHE_TTL_DAYS + 1) * 24 * 3600,),
+            )
+        geo.geocode("Am Markt 21, Bremen")
+        assert len(offline.calls) == 2
+
+
+class TestLocation:
+    """Location uses the shared geocoder"""
+
+    def test_from_address(self, offline: geo.OfflineBackend) -> None:
+        """Address details are filled from the (cached) reverse lookup"""
+        loc = cld.Location("Am Markt 21, Bremen").fill_using_geopy()
+        assert (loc.latitude, loc.longitude) == (53.0758, 8.8072)
+        assert loc.street == "Am Markt"
+        assert loc.house_number == 21
+        assert loc.post_code == 28195
+
+        cld.Location("am Markt 21, bremen").fill_using_geopy()
+        assert offline.calls == [
+            ("forward", "Am Markt 21, Bremen"),
+            ("reverse", (53.0758, 8.8072)),
+        ]
+
+
+class TestBatch:
+    """Many addresses at once"""
+
+    def test_duplicates_and_cache(self, offline: geo.OfflineBackend) -> None:
+        """Duplicates are looked up once, cached addresses not at all"""
+        geo.geocode_batch(["Am Markt 21, Bremen"])
+        offline.calls.clear()
+        progress: list[tuple[int, int]] = []
+
+        table = geo.geocode_batch(
+            ["Nirgendwo", "am markt 21, bremen", "Am Markt 21, Bremen", "Nirgendwo"],
+            progress=lambda done, total: progress.append((done, total)),
+        )
+
+        assert offline.calls == [("forward", "Nirgendwo")]
+        assert progress == [(1, 1)]
+        assert table.columns == ["address", *geo.LOCATION_SCHEMA]
+        assert table.get_column("latitude").to_list() == [None, 53.0758, 53.0758, None]
+        assert table.get_column("post_code").to_list() == [None, 28195, 28195, None]
+
+    def test_locations(self, offline: geo.OfflineBackend) -> None:
+        """Locations without coordinates are filled, the rest is kept"""
+        locations: list[cld.Location] = mp.geocode_locations(
+            [
+                cld.Location(name="Markt", address="Am Markt 21, Bremen"),
+                cld.Location(name="Weg", address="Nirgendwo"),
+                cld.Location(name="Punkt", latitude=52.0, longitude=9.0),
+            ]
+        )
+        assert locations[0].name == "Markt"
+        assert locations[0].street == "Am Markt"
+        assert locations[1].latitude is None
+        assert (locations[2].latitude, locations[2].street) == (52.0, None)
+        assert sorted(kind for kind, _ in offline.calls) == [
+            "forward",
+            "forward",
+            "reverse",
+        ]
+
+
+class TestTokenBucket:
+    """Rate limit for all threads"""
+
+    def test_rate(self) -> None:
+        """After the burst, requests wait for new tokens"""
+        bucket = geo.TokenBucket(rate=50, capacity=2)
+        start: float = time.monotonic()
+        for _ in range(7):
+            bucket.acquire()
+        assert time.monotonic() - start >= 5 / 50 * 0.9
@@ -0,0 +1,89 @@
+"""Tests for the histogram-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import df_manipulation as df_man
+from modules import histogram as hist
+
+COL_IND: str = cont.SpecialCols.index
+
+
+def data(years: list[int]) -> cld.MetaAndDfs:
+    """Hourly values 0 … 9 repeating (line 'A') and twice that (line 'B')"""
+    index: pl.Series = pl.concat(
+        [
+            pl.datetime_range(
+                dt.datetime(year, 1, 1), dt.datetime(year, 1, 5, 23), "1h", eager=True
+            )
+            for year in years
+        ]
+    )
+    values: np.ndarray = np.arange(len(index)) % 10.0
+    df: pl.DataFrame = pl.DataFrame({COL_IND: index, "A": values, "B": values * 2})
+    lines: dict[str, cld.MetaLine] = {
+        col: cld.MetaLine(name=col, name_orgidx=col, orig_tit=col, tit=col)
+        for col in ["A", "B"]
+    }
+    return cld.MetaAndDfs(meta=cld.MetaData(lines=lines, years=years), df=df)
+
+
+class TestBinCounts:
+    """Counting all columns in one pass"""
+
+    def test_same_as_numpy(self) -> None:
+        """Counts equal np.histogram for every column, NaN and outliers ignored"""
+        rng: np.random.Generator = np.random.default_rng(3)
+        values: np.ndarray = rng.normal(size=(500, 3)) * [1, 10, 100]
+        values[::7, 1] = np.nan
+        edges: np.ndarray = hist.bin_edges(values, 12, quantile_edges=False)
+        edges[:, 2] = np.linspace(-50, 50, 13)
+
+        counts: np.ndarray = hist.bin_counts(values, edges)
+        for col in range(3):
+            column: np.ndarray = values[:, col]
+            expected, _ = np.histogram(column[~np.isnan(column)], edges[:, col])
+            assert counts[:, col].tolist() == expected.tolist()
+
+    def test_quantile_edges(self) -> None:
+        """Quantile edges give (nearly) the same count in every bin"""
+        values: np.ndarray = np.random.default_rng(5).exponential(size=(1_000, 1))
+        edges: np.ndarray = hist.bin_edges(values, 4, quantile_edges=True)
+        assert hist.bin_counts(values, edges)[:, 0].tolist() == [250] * 4
+
+
+class TestHistogram:
+    """Report for a MetaAndDfs"""
+
+    def test_hours_and_share(self) -> None:
+        """Every line has the same distribution over its own range"""
+        mdf: cld.MetaAndDfs = data([2021])
+        report: cld.HistogramReport = hist.get_histogram(
+            mdf, cld.HistogramSettings(bins=5)
+        )
+        assert mdf.histogram is report
+        df: pl.DataFrame = report.counts
+        assert df.height == 10
+        assert df.get_column("Stunden").to_list() == [24.0] * 10
+        assert df.get_column("Anteil [%]").to_list() == pytest.approx([20] * 10)
+        assert report.edges["B"][-1] == 18
+
+    def test_by_year_shares_edges(self) -> None:
+        """Years from 'split_multi_years' are counted with the edges of the line"""
+        mdf: cld.MetaAndDfs = df_man.split_multi_years(data([2021, 2022]), "df")
+        settings: cld.HistogramSettings = cld.HistogramSettings(bins=2, columns=["A"])
+        first: cld.HistogramReport = hist.get_histogram(mdf, settings)
+        report: cld.HistogramReport = hist.get_histogram(
+            mdf, cld.HistogramSettings(bins=2, columns=["A"], by_year=True)
+        )
+
+        assert report.edges is first.edges
+        assert report.counts.get_column("Jahr").to_list() == [2021] * 2 + [2022] * 2
+        assert report.counts.get_column("Anzahl").to_list() == [60] * 4
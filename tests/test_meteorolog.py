@@ -0,0 +1,129 @@
+"""Tests for the meteorolog-module"""
+
+# ruff: noqa: S101
+
+import datetime as dt
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import meteorolog as met
+from modules import streamlit_functions as sf
+
+BREMEN = cld.Location(name="Bremen", latitude=53.08, longitude=8.81)
+HAMBURG = cld.Location(name="Hamburg", latitude=53.55, longitude=9.99)
+
+
+@pytest.fixture
+def session(monkeypatch: pytest.MonkeyPatch) -> Iterator[dict]:
+    """Session at the meteo page, DWD queries replaced by a gated fake"""
+    gate = threading.Event()
+    state: dict = {"location": BREMEN, "filled": [], "gate": gate}
+
+    def fill_parameter(par: cld.DWDParam, res_en: str) -> cld.DWDParam:
+        gate.wait(5)
+        state["filled"].append((par.name_en, par.location, res_en))
+        par.requested_res_name_en = res_en
+        return par
+
+    monkeypatch.setattr(met, "resolve_location", lambda: state["location"])
+    monkeypatch.setattr(met, "fill_parameter", fill_parameter)
+    monkeypatch.setattr(met, "PREFETCH_POOL", met.ThreadPoolExecutor(max_workers=1))
+    sf.s_set("page", cont.ST_PAGES.meteo.short)
+    sf.s_set("di_start", dt.date(2023, 1, 1))
+    sf.s_set("ti_start", dt.time(0, 0))
+    sf.s_set("di_end", dt.date(2023, 12, 31))
+    sf.s_set("ti_end", dt.time(23, 59))
+    sf.s_set("sb_resolution", "hourly")
+    sf.s_set("tog_polysun", value=False)
+    sf.s_set("but_addr_dates", value=True)
+    yield state
+    gate.set()
+    met.cancel_prefetch()
+    sf.s_delete("but_addr_dates")
+
+
+def current_key(location: cld.Location) -> tuple:
+    """Key of the prefetch for the session above"""
+    return met.prefetch_key(
+        location,
+        met.start_end_time(page=cont.ST_PAGES.meteo.short),
+        "hourly",
+        fusion=False,
+    )
+
+
+class TestPrefetch:
+    """Background prefetch of the default parameters"""
+
+    def test_result_taken(self, session: dict) -> None:
+        """The prefetched parameter is used (waiting until it is finished)"""
+        met.start_prefetch()
+        session["gate"].set()
+
+        par: cld.DWDParam | None = met.prefetched(
+            cont.DWD_DEFAULT_PARAMS[0], current_key(BREMEN)
+        )
+        assert par is not None
+        assert par.requested_res_name_en == "hourly"
+        assert met.prefetched(cont.DWD_DEFAULT_PARAMS[0], current_key(HAMBURG)) is None
+        assert met.prefetched("humidity", current_key(BREMEN)) is None
+
+    def test_polysun_added(self, session: dict) -> None:
+        """Switching to Polysun adds the missing parameters, nothing is repeated"""
+        met.start_prefetch()
+        sf.s_set("tog_polysun", value=True)
+        met.start_prefetch()
+        session["gate"].set()
+
+        futures: dict = sf.s_get("dwd_prefetch")["futures"]
+        assert set(futures) == {*cont.DWD_DEFAULT_PARAMS, *cont.DWD_PARAMS_POLYSUN}
+        for future in futures.values():
+            future.result()
+        names: list[str] = [name for name, _, _ in session["filled"]]
+        assert sorted(names) == sorted(set(names))
+
+    def test_cancelled_on_new_address(self, session: dict) -> None:
+        """A new address cancels waiting queries of the old one"""
+        sf.s_set("tog_polysun", value=True)
+        met.start_prefetch()
+        old: dict = sf.s_get("dwd_prefetch")["futures"]
+
+        session["location"] = HAMBURG
+        met.start_prefetch()
+        session["gate"].set()
+
+        assert sum(future.cancelled() for future in old.values()) >= len(old) - 1
+        assert met.prefetched(cont.DWD_DEFAULT_PARAMS[0], current_key(BREMEN)) is None
+        par: cld.DWDParam | None = met.prefetched(
+            cont.DWD_DEFAULT_PARAMS[0], current_key(HAMBURG)
+        )
+        assert par is not None
+        assert par.location == HAMBURG
+
+    @pytest.mark.usefixtures("session")
+    def test_not_before_address(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Nothing is started (or geocoded) before an address was confirmed"""
+        resolved: list[bool] = []
+        monkeypatch.setattr(met, "resolve_location", lambda: resolved.append(True))
+        sf.s_set("but_addr_dates", value=False)
+        met.start_prefetch()
+        assert not resolved
+        assert sf.s_get("dwd_prefetch") is None
+
+    def test_errors_logged(
+        self, session: dict, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """A failing address lookup does not break the page"""
+
+        def no_location() -> cld.Location:
+            msg = "geocoding failed"
+            raise ValueError(msg)
+
+        monkeypatch.setattr(met, "resolve_location", no_location)
+        met.start_prefetch()
+        assert sf.s_get("dwd_prefetch") is None
+        assert not session["filled"]
@@ -0,0 +1,140 @@
+"""Tests for the peak_analysis-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import plotly.graph_objects as go
+import polars as pl
+import pytest
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import fig_annotations as fig_anno
+from modules import peak_analysis as pa
+
+COL_IND: str = cont.SpecialCols.index
+
+
+def quarter_hours() -> pl.DataFrame:
+    """Two years of 15-minute power values at 100 kW with a few peaks"""
+    index: pl.Series = pl.datetime_range(
+        dt.datetime(2021, 1, 1), dt.datetime(2022, 12, 31, 23, 45), "15m", eager=True
+    )
+    power: np.ndarray = np.full(len(index), 100.0)
+    peaks: dict[dt.datetime, float] = {
+        dt.datetime(2021, 1, 5, 9): 300,  # Dienstag im Winter-HLZF
+        dt.datetime(2021, 1, 9, 9): 500,  # Samstag -> nicht im HLZF
+        dt.datetime(2021, 7, 1, 12): 400,  # Sommer ohne HLZF
+        dt.datetime(2022, 1, 4, 9): 240,  # Dienstag im Winter-HLZF
+        dt.datetime(2022, 3, 1, 12): 250,
+    }
+    times: list[dt.datetime] = index.to_list()
+    for time, value in peaks.items():
+        power[times.index(time)] = value
+    return pl.DataFrame({COL_IND: index, "Strom": power})
+
+
+SETTINGS: cld.PeakSettings = cld.PeakSettings(
+    top_n=3,
+    hlzf={"Winter": pa.parse_time_windows("08:00-13:00, 16:30-19:30")},
+    min_share=0.05,
+    min_reduction=100,
+)
+
+
+class TestParseTimeWindows:
+    """Hochlastzeitfenster from text"""
+
+    def test_windows(self) -> None:
+        """Several windows separated by commas, empty text -> no window"""
+        assert pa.parse_time_windows("08:00-13:00; 16:30-19:30") == (
+            (dt.time(8), dt.time(13)),
+            (dt.time(16, 30), dt.time(19, 30)),
+        )
+        assert pa.parse_time_windows(" ") == ()
+
+    def test_reversed_window(self) -> None:
+        """Windows that end before they start raise a ValueError"""
+        with pytest.raises(ValueError, match="ends before it starts"):
+            pa.parse_time_windows("13:00-08:00")
+
+
+class TestPeakReport:
+    """Annual and monthly peaks, top-N and atypical grid use"""
+
+    report: cld.PeakReport = pa.peak_report(quarter_hours(), ["Strom"], SETTINGS)
+
+    def test_years(self) -> None:
+        """Annual peak, Benutzungsstunden and HLZF peak per year"""
+        years: pl.DataFrame = self.report.years
+        assert years.get_column("Jahr").to_list() == [2021, 2022]
+        assert years.get_column("Höchstleistung").to_list() == [500, 250]
+        assert years.item(0, "Zeitpunkt") == dt.datetime(2021, 1, 9, 9)
+        assert years.item(0, "Höchstleistung HLZF") == 300
+        energy: float = 8760 * 100 + (200 + 400 + 300) * 0.25
+        assert years.item(0, "Energie") == pytest.approx(energy)
+        assert years.item(0, "Benutzungsstunden") == pytest.approx(energy / 500)
+        assert years.get_column("atypische Netznutzung").to_list() == [True, False]
+
+    def test_months(self) -> None:
+        """One row per month with the monthly maximum"""
+        months: pl.DataFrame = self.report.months
+        assert months.height == 24
+        assert months.item(6, "Höchstleistung") == 400
+        assert months.item(6, "Höchstleistung HLZF") is None
+
+    def test_top(self) -> None:
+        """Top-N values per year come from the monthly candidates"""
+        top: pl.DataFrame = self.report.top.filter(pl.col("Jahr") == 2021)
+        assert top.get_column("Leistung").to_list() == [500, 400, 300]
+        assert top.get_column("Rang").to_list() == [1, 2, 3]
+
+
+class TestCache:
+    """The report is stored in the MetaAndDfs object"""
+
+    def test_cached(self) -> None:
+        """Same settings return the stored report, new settings recalculate"""
+        mdf: cld.MetaAndDfs = cld.MetaAndDfs(
+            meta=cld.MetaData(
+                lines={"Strom": cld.MetaLine("Strom", "Strom", "Strom", "Strom", "kW")}
+            ),
+            df=quarter_hours(),
+        )
+        first: cld.PeakReport | None = pa.get_peak_report(mdf, SETTINGS)
+        assert first is not None
+        assert pa.get_peak_report(mdf, SETTINGS) is first
+        assert pa.get_peak_report(mdf, cld.PeakSettings(top_n=5)) is not first
+
+
+class TestPeakAnnotations:
+    """Arrows at the peaks in the base figure"""
+
+    def test_replaced(self) -> None:
+        """A new report replaces the arrows of the previous one"""
+        df: pl.DataFrame = quarter_hours()
+        fig: go.Figure = go.Figure(
+            go.Scatter(
+                x=df.get_column(COL_IND).to_list(),
+                y=df.get_column("Strom").to_list(),
+                name="Strom",
+                meta={"unit": " kW"},
+            ),
+            layout={"meta": {"title": "Lastgang"}},
+        )
+        fig.add_annotation(x=0, y=0, text="max Strom", name="max Strom")
+
+        fig = fig_anno.add_peak_annotations(
+            fig, pa.peak_report(df, ["Strom"], SETTINGS)
+        )
+        fig = fig_anno.add_peak_annotations(
+            fig, pa.peak_report(df, ["Strom"], cld.PeakSettings(top_n=1))
+        )
+        texts: list[str] = [anno.text for anno in fig.layout.annotations]
+        assert texts == [
+            "max Strom",
+            f"{cont.PEAK_ANNO_PREFIX} 1 Strom 2021: 500 kW",
+            f"{cont.PEAK_ANNO_PREFIX} 1 Strom 2022: 250 kW",
+        ]
@@ -0,0 +1,139 @@
+"""Tests for the portfolio-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+from collections.abc import Iterator
+
+import numpy as np
+import polars as pl
+import pytest
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import portfolio as pf
+
+COL_IND: str = cont.SpecialCols.index
+COL_SUM: str = cont.PORTFOLIO_COLUMN
+
+
+def meter(
+    start: dt.datetime,
+    steps: int,
+    minutes: int,
+    values: dict[str, tuple[str, float]],
+) -> cld.MetaAndDfs:
+    """Meter with constant values (column: (unit, value))"""
+    index: list[dt.datetime] = [
+        start + step * dt.timedelta(minutes=minutes) for step in range(steps)
+    ]
+    df: pl.DataFrame = pl.DataFrame(
+        {COL_IND: index}
+        | {col: np.full(steps, val) for col, (_, val) in values.items()}
+    )
+    lines: dict[str, cld.MetaLine] = {
+        col: cld.MetaLine(
+            name=col, name_orgidx=col, orig_tit=col, tit=col, unit=f" {unit}"
+        )
+        for col, (unit, _) in values.items()
+    }
+    return cld.MetaAndDfs(meta=cld.MetaData(lines=lines), df=df)
+
+
+class TestMeterColumns:
+    """Columns that go into the sum"""
+
+    def test_units(self) -> None:
+        """Power and energy count, energy twins of power columns and others don't"""
+        mdf: cld.MetaAndDfs = meter(
+            dt.datetime(2023, 1, 1),
+            4,
+            15,
+            {
+                "A → Leistung": ("MW", 1),
+                f"A{cont.Suffixes.col_arbeit}": ("MWh", 0.25),
+                "B": ("kWh", 1),
+                "Temperatur": ("°C", 5),
+            },
+        )
+        assert pf.meter_columns(mdf) == {"A → Leistung": 1_000, "B": 1}
+
+    def test_feed_in_skipped(self) -> None:
+        """Feed-in and delivery lines are not added to the consumption"""
+        mdf: cld.MetaAndDfs = meter(
+            dt.datetime(2023, 1, 1),
+            4,
+            15,
+            {
+                "Bezug": ("kW", 10),
+                "Netzeinspeisung": ("kW", 4),
+                "Stromlieferung": ("kWh", 1),
+            },
+        )
+        assert pf.meter_columns(mdf) == {"Bezug": 1}
+
+
+class TestAggregate:
+    """Running sum on a common grid"""
+
+    def test_mixed_resolutions(self) -> None:
+        """15-minute power, hourly energy and 5-minute power on a 15-minute grid"""
+        start: dt.datetime = dt.datetime(2023, 1, 1)
+        meters: list[tuple[str, cld.MetaAndDfs]] = [
+            ("a.xlsx", meter(start, 8, 15, {"Strom": ("kW", 10)})),
+            ("b.xlsx", meter(start, 2, 60, {"Wärme": ("kWh", 40)})),
+            ("c.xlsx", meter(start, 6, 5, {"Lüftung": ("W", 2_000)})),
+        ]
+        report: cld.PortfolioReport = pf.aggregate(meters)
+
+        total: list[float] = report.mdf.df.get_column(COL_SUM).to_list()
+        assert total == pytest.approx([52, 52, 50, 50, 50, 50, 50, 50])
+        assert report.mdf.meta.td_interval == "15min"
+
+        stats: dict[str, dict] = {
+            row["Linie"]: row for row in report.meters.iter_rows(named=True)
+        }
+        assert stats["Wärme"]["Energie [kWh]"] == pytest.approx(80)
+        assert stats["Strom"]["Energie [kWh]"] == pytest.approx(20)
+        assert stats["Lüftung"]["Höchstleistung [kW]"] == pytest.approx(2)
+        assert sum(row["Anteil Energie [%]"] for row in stats.values()) == (
+            pytest.approx(100)
+        )
+        assert report.simultaneity == pytest.approx(52 / 52)
+
+    def test_grid_grows_both_ways(self) -> None:
+        """Meters starting earlier or ending later extend the grid"""
+        meters: list[tuple[str, cld.MetaAndDfs]] = [
+            ("mid", meter(dt.datetime(2023, 1, 1, 1), 4, 15, {"A": ("kW", 1)})),
+            ("early", meter(dt.datetime(2023, 1, 1), 4, 15, {"B": ("kW", 2)})),
+            ("late", meter(dt.datetime(2023, 1, 1, 2), 4, 15, {"C": ("kW", 4)})),
+        ]
+        df: pl.DataFrame = pf.aggregate(meters).mdf.df
+
+        assert df.get_column(COL_IND).min() == dt.datetime(2023, 1, 1)
+        assert df.get_column(COL_IND).max() == dt.datetime(2023, 1, 1, 2, 45)
+        assert df.get_column(COL_SUM).to_list() == [2, 2, 2, 2, 1, 1, 1, 1, 4, 4, 4, 4]
+
+    def test_meters_are_consumed_one_by_one(self) -> None:
+        """Meters come from a generator and are not collected beforehand"""
+        consumed: list[int] = []
+
+        def generator() -> Iterator[tuple[str, cld.MetaAndDfs]]:
+            for number in range(50):
+                consumed.append(number)
+                yield (
+                    str(number),
+                    meter(dt.datetime(2023, 1, 1), 96, 15, {"P": ("kW", 1)}),
+                )
+
+        report: cld.PortfolioReport = pf.aggregate(generator())
+        assert consumed == list(range(50))
+        assert report.mdf.df.height == 96
+        assert report.mdf.df.get_column(COL_SUM).max() == 50
+        assert report.simultaneity == pytest.approx(1)
+
+    def test_nothing_to_sum(self) -> None:
+        """Without any power or energy columns a ValueError is raised"""
+        meters = [("x", meter(dt.datetime(2023, 1, 1), 4, 15, {"T": ("°C", 1)}))]
+        with pytest.raises(ValueError, match="No meter"):
+            pf.aggregate(meters)
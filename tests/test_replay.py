@@ -0,0 +1,128 @@
+"""Tests for the replay-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+import pathlib
+import time
+
+import polars as pl
+import pytest
+
+from modules import classes_errors as cle
+from modules import constants as cont
+from modules import dwd_cache as dwc
+from modules import dwd_stations as dws
+from modules import geocoding as geo
+from modules import replay as rpl
+
+BREMEN: dict = geo.place(53.0758, 8.8072, "Bremen", {"city": "Bremen"})
+SPAN: tuple[dt.datetime, dt.datetime] = (
+    dt.datetime(2020, 1, 1),
+    dt.datetime(2020, 1, 2, 23),
+)
+
+
+def listing(_parameter: str, _resolution: str) -> pl.DataFrame:
+    """Station list as returned from wetterdienst 'all()'"""
+    return pl.DataFrame(
+        {
+            "station_id": ["00691"],
+            "start_date": [dt.datetime(1890, 1, 1)],
+            "end_date": [dt.datetime(2024, 1, 1)],
+            "height": [4.0],
+            "latitude": [53.0451],
+            "longitude": [8.7981],
+            "name": ["Bremen"],
+            "state": ["Bremen"],
+        }
+    )
+
+
+def dataset(
+    _dataset: str,
+    _resolution: str,
+    station_id: str,
+    start: dt.datetime,
+    end: dt.datetime,
+) -> pl.DataFrame:
+    """Hourly values of one dataset as returned from wetterdienst"""
+    date: pl.Series = pl.datetime_range(start, end, "1h", eager=True, time_zone="UTC")
+    return pl.DataFrame(
+        {
+            "station_id": station_id,
+            "parameter": "temperature_air_mean_2m",
+            "date": date,
+            "value": 1.0,
+            "quality": 1.0,
+        }
+    )
+
+
+def offline(*_args: object) -> None:
+    """Stands in for the network in replay mode"""
+    msg = "network used in replay mode"
+    raise AssertionError(msg)
+
+
+def weather_path() -> pl.DataFrame:
+    """Geocoding, station search and values - like DWDParam.get_data"""
+    lat_lon: tuple[float, float] | None = geo.geocode("Bremen")
+    assert lat_lon is not None
+    assert geo.reverse(lat_lon) == BREMEN
+    stations: pl.DataFrame = dws.nearest_stations(
+        "temperature_air_mean_2m", "hourly", lat_lon, SPAN, 50
+    )
+    return dwc.station_values(
+        "temperature_air_mean_2m", "hourly", stations.item(0, "station_id"), SPAN
+    )
+
+
+@pytest.fixture
+def live(monkeypatch: pytest.MonkeyPatch) -> None:
+    """'Live' answers without network"""
+    monkeypatch.setattr(dwc, "download_dataset", dataset)
+    monkeypatch.setattr(dws, "station_list", listing)
+    monkeypatch.setitem(geo.BACKEND, "current", geo.OfflineBackend({"Bremen": BREMEN}))
+
+
+class TestSession:
+    """Record once, replay offline"""
+
+    @pytest.mark.usefixtures("live")
+    def test_record_and_replay(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Replay gives the recorded answers without the live functions"""
+        before: pathlib.Path = cont.DWD_CACHE_DIR
+        with rpl.session(tmp_path / "rec", "record", cache_dir=tmp_path / "a"):
+            recorded: pl.DataFrame = weather_path()
+        assert recorded.height == 48
+        assert before == cont.DWD_CACHE_DIR
+
+        monkeypatch.setattr(dwc, "download_dataset", offline)
+        monkeypatch.setattr(dws, "station_list", offline)
+        monkeypatch.setitem(geo.BACKEND, "current", offline)
+        with rpl.session(tmp_path / "rec", "replay", cache_dir=tmp_path / "b"):
+            assert weather_path().equals(recorded)
+        assert geo.backend() is offline
+
+    @pytest.mark.usefixtures("live")
+    def test_latency(self, tmp_path: pathlib.Path) -> None:
+        """Every replayed answer waits for the given latency"""
+        with rpl.session(tmp_path / "rec", "record"):
+            weather_path()
+
+        start: float = time.monotonic()
+        with rpl.session(tmp_path / "rec", "replay", latency=0.05):
+            weather_path()
+        # geocode, reverse, station list, values
+        assert time.monotonic() - start >= 4 * 0.05
+
+    def test_missing_recording(self, tmp_path: pathlib.Path) -> None:
+        """Answers that were not recorded are an error, not a live query"""
+        with (
+            rpl.session(tmp_path / "empty", "replay"),
+            pytest.raises(cle.NotFoundError),
+        ):
+            geo.geocode("Bremen")
@@ -0,0 +1,76 @@
+"""Tests for the smoothing-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from modules import constants as cont
+from modules import smoothing as smo
+
+RNG: np.random.Generator = np.random.default_rng(42)
+VALUES: np.ndarray = np.sin(np.linspace(0, 20, 5000)) + RNG.normal(0, 0.2, 5000)
+
+
+class TestSavgol:
+    """Savitzky-Golay filter with direct and FFT convolution"""
+
+    @pytest.mark.parametrize("window", [11, cont.SMOOTH_FFT_MIN_WINDOW + 1, 1667])
+    def test_same_as_scipy(self, window: int) -> None:
+        """Result equals signal.savgol_filter with mode 'mirror'"""
+        smo.clear_cache()
+        expected: np.ndarray = signal.savgol_filter(
+            VALUES, window_length=window, polyorder=3, mode="mirror"
+        )
+        assert np.allclose(smo.smooth_values(VALUES, window, 3), expected)
+
+    def test_gaps_stay_gaps(self) -> None:
+        """Missing values are bridged for the filter and kept missing"""
+        values: np.ndarray = VALUES.copy()
+        values[100:110] = np.nan
+        smoothed: np.ndarray = smo.smooth_values(values, 301, 3)
+        assert np.isnan(smoothed[100:110]).all()
+        assert not np.isnan(np.delete(smoothed, range(100, 110))).any()
+
+
+class TestAlternatives:
+    """Rolling mean and decimated LOWESS"""
+
+    def test_rolling_mean(self) -> None:
+        """Centred mean of a linear ramp is the ramp itself"""
+        ramp: np.ndarray = np.arange(100, dtype=float)
+        smoothed: np.ndarray = smo.smooth_values(ramp, 5, method="mean")
+        assert np.allclose(smoothed[2:-2], ramp[2:-2])
+        assert smoothed[0] == pytest.approx(np.mean([2, 1, 0, 1, 2]))
+
+    def test_lowess_follows_trend(self) -> None:
+        """LOWESS on decimated data stays close to the noise-free curve"""
+        smoothed: np.ndarray = smo.smooth_values(VALUES, 251, method="lowess")
+        clean: np.ndarray = np.sin(np.linspace(0, 20, 5000))
+        assert len(smoothed) == len(VALUES)
+        assert np.abs(smoothed - clean)[200:-200].max() < 0.2
+
+    def test_unknown_method(self) -> None:
+        """Unknown methods raise a ValueError"""
+        with pytest.raises(ValueError, match="Unknown smoothing method"):
+            smo.smooth_values(VALUES, 11, method="spline")  # type: ignore[arg-type]
+
+
+class TestCache:
+    """LRU cache of smoothed traces"""
+
+    def test_cached_result(self) -> None:
+        """Same trace and settings return the stored array"""
+        smo.clear_cache()
+        first: np.ndarray = smo.smooth_values(VALUES, 101, 3)
+        assert smo.smooth_values(VALUES.copy(), 101, 3) is first
+        assert smo.smooth_values(VALUES, 101, 2) is not first
+        assert not first.flags.writeable
+
+    def test_lru_bound(self) -> None:
+        """The cache never holds more than cont.SMOOTH_CACHE_SIZE traces"""
+        smo.clear_cache()
+        for window in range(3, 3 + 2 * (cont.SMOOTH_CACHE_SIZE + 5), 2):
+            smo.smooth_values(VALUES[:500], window, 1)
+        assert len(smo._CACHE) == cont.SMOOTH_CACHE_SIZE  # noqa: SLF001
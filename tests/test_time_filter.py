@@ -0,0 +1,129 @@
+"""Tests for the time_filter-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+
+import numpy as np
+import plotly.graph_objects as go
+import polars as pl
+
+from modules import classes_data as cld
+from modules import classes_figs as clf
+from modules import constants as cont
+from modules import df_manipulation as df_man
+from modules import graph_menus as menu_g
+from modules import streamlit_functions as sf
+from modules import time_filter as tf
+
+COL_IND: str = cont.SpecialCols.index
+COL_ORG: str = cont.SpecialCols.original_index
+
+
+def data() -> cld.MetaAndDfs:
+    """Hourly values for January and February 2023 with df_h, jdl and mon"""
+    index: pl.Series = pl.datetime_range(
+        dt.datetime(2023, 1, 1), dt.datetime(2023, 2, 28, 23), "1h", eager=True
+    )
+    df: pl.DataFrame = pl.DataFrame(
+        {COL_IND: index, "Strom": np.arange(len(index), dtype=float)}
+    ).with_columns(pl.col(COL_IND).alias(COL_ORG))
+    lines: dict[str, cld.MetaLine] = {
+        "Strom": cld.MetaLine(
+            name="Strom",
+            name_orgidx=f"Strom{cont.Suffixes.col_original_index}",
+            orig_tit="Strom",
+            tit="Strom",
+            unit=" kWh",
+        )
+    }
+    mdf: cld.MetaAndDfs = cld.MetaAndDfs(
+        meta=cld.MetaData(lines=lines, td_mnts=60), df=df, df_h=df
+    )
+    mdf = df_man.jdl(mdf)
+    mdf.mon = df_man.monthly_values(df, lines)
+    return mdf
+
+
+class TestApplyTimeFilter:
+    """Filtered copies of all frames"""
+
+    def test_inactive(self) -> None:
+        """Without conditions the same object is returned"""
+        mdf: cld.MetaAndDfs = data()
+        assert tf.apply_time_filter(mdf, cld.TimeFilter()) is mdf
+
+    def test_working_hours(self) -> None:
+        """Working days 7 - 18 h: the original stays, all frames are filtered"""
+        mdf: cld.MetaAndDfs = data()
+        filtered: cld.MetaAndDfs = tf.apply_time_filter(
+            mdf, cld.TimeFilter(**cont.TIME_FILTER_PRESETS["Werktage"], hours=(7, 18))
+        )
+        # Januar: 22 Werktage (Neujahr ist Sonntag), Februar: 20
+        assert filtered.df.height == (22 + 20) * 11
+        assert mdf.df.height == 59 * 24
+        times: pl.Series = filtered.df.get_column(COL_ORG)
+        assert times.dt.hour().min() == 7
+        assert times.dt.hour().max() == 17
+        assert times.dt.weekday().max() == 5
+
+        assert filtered.jdl is not None
+        strom: pl.Series = filtered.jdl.get_column("Strom").drop_nulls()
+        assert strom.len() == filtered.df.height
+        assert strom.is_sorted(descending=True)
+
+        assert filtered.mon is not None
+        assert filtered.mon.get_column("Strom").sum() == (
+            filtered.df.get_column("Strom").sum()
+        )
+
+    def test_whole_months(self) -> None:
+        """A month filter only filters the monthly values"""
+        mdf: cld.MetaAndDfs = data()
+        filtered: cld.MetaAndDfs = tf.apply_time_filter(mdf, cld.TimeFilter(months=[2]))
+        assert filtered.mon is not None
+        assert filtered.mon.height == 1
+        assert filtered.mon.row(0, named=True) == mdf.mon.row(1, named=True)  # type: ignore[union-attr]
+        assert filtered.df.get_column(COL_ORG).dt.month().unique().to_list() == [2]
+
+    def test_date_range(self) -> None:
+        """A date range includes both days"""
+        filtered: cld.MetaAndDfs = tf.apply_time_filter(
+            data(),
+            cld.TimeFilter(dates=(dt.date(2023, 1, 30), dt.date(2023, 2, 1))),
+        )
+        assert filtered.df.height == 3 * 24
+
+
+class TestRedraw:
+    """Confirming the time filter in the menu redraws the figures"""
+
+    def test_new_filter(self) -> None:
+        """A changed filter changes the data for the figures and drops old figures"""
+        mdf: cld.MetaAndDfs = data()
+        sf.s_set("sb_time_filter", "Werktage")
+        before: cld.MetaAndDfs = tf.apply_time_filter(
+            mdf, menu_g.time_filter_from_menu()
+        )
+        sf.s_set("sb_time_filter", "Wochenenden und Feiertage")
+        after: cld.MetaAndDfs = tf.apply_time_filter(
+            mdf, menu_g.time_filter_from_menu()
+        )
+        assert not after.df.equals(before.df)
+        assert not after.jdl.equals(before.jdl)  # type: ignore[union-attr]
+
+        figs: clf.Figs = clf.Figs(
+            base=clf.FigProp(fig=go.Figure(), st_key=cont.FIG_KEYS.lastgang),
+            jdl=clf.FigProp(fig=go.Figure(), st_key=cont.FIG_KEYS.jdl),
+        )
+        figs.write_all_to_st()
+        sf.s_set("but_time_filter", value=False)
+        assert not menu_g.redraw_requested()
+
+        sf.s_set("but_time_filter", value=True)
+        assert menu_g.redraw_requested()
+        figs.reset()
+        assert figs.list_all_figs() == []
+        assert sf.s_not_in(cont.FIG_KEYS.lastgang)
+        assert sf.s_not_in(cont.FIG_KEYS.jdl)
+        sf.s_delete("but_time_filter")
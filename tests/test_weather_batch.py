@@ -0,0 +1,124 @@
+"""Tests for the weather_batch-module"""
+
+# ruff: noqa: PLR2004, S101
+
+import datetime as dt
+import io
+import zipfile
+
+import polars as pl
+
+from modules import classes_data as cld
+from modules import constants as cont
+from modules import weather_batch as wb
+
+TIME_SPAN: cld.TimeSpan = cld.TimeSpan(
+    dt.datetime(2023, 1, 1), dt.datetime(2023, 12, 31, 23, 59)
+)
+
+
+def values(station_id: str, parameter: str) -> pl.DataFrame:
+    """Hourly values for one year as returned from wetterdienst (UTC)"""
+    date: pl.Series = pl.datetime_range(
+        TIME_SPAN.start, TIME_SPAN.end, "1h", eager=True, time_zone="UTC"
+    )
+    return pl.DataFrame(
+        {
+            "station_id": station_id,
+            "parameter": parameter,
+            "date": date,
+            "value": 1.0,
+            "quality": 1.0,
+        }
+    )
+
+
+def stations(*station_ids: str) -> pl.DataFrame:
+    """Station list as returned from filter_by_distance"""
+    return pl.DataFrame(
+        {
+            "station_id": list(station_ids),
+            "name": [f"Station {sid}" for sid in station_ids],
+            "state": "Bremen",
+            "height": 10.0,
+            "latitude": 53.0,
+            "longitude": 8.8,
+            "distance": [float(num) for num, _ in enumerate(station_ids)],
+        }
+    )
+
+
+class TestClosestWithData:
+    """Shared queries for sites with the same stations"""
+
+    def test_shared_and_fallback(self) -> None:
+        """Every station is queried once, empty stations fall back to the next"""
+        calls: list[tuple[str, str]] = []
+
+        def fetch(par: str, station_id: str) -> pl.DataFrame:
+            calls.append((par, station_id))
+            return pl.DataFrame() if station_id == "A" else values(station_id, par)
+
+        found, _ = wb.closest_with_data(
+            {
+                (0, "humidity"): ["A", "B"],
+                (1, "humidity"): ["A", "B", "C"],
+                (2, "humidity"): ["B"],
+                (3, "humidity"): [],
+                (0, "wind_speed"): ["A"],
+            },
+            fetch,
+            workers=2,
+        )
+
+        assert found == {
+            (0, "humidity"): "B",
+            (1, "humidity"): "B",
+            (2, "humidity"): "B",
+            (3, "humidity"): None,
+            (0, "wind_speed"): None,
+        }
+        assert sorted(calls) == [
+            ("humidity", "A"),
+            ("humidity", "B"),
+            ("wind_speed", "A"),
+        ]
+
+
+class TestFiles:
+    """File names and ZIP file"""
+
+    def test_file_name(self) -> None:
+        """Forbidden characters are replaced, duplicates are numbered"""
+        used: set[str] = set()
+        assert wb.file_name("Haus 1/2", used) == "Haus 1_2"
+        assert wb.file_name("Haus 1/2", used) == "Haus 1_2 (2)"
+
+    def test_polysun_zip(self) -> None:
+        """One Polysun file per site with data, sites without data are reported"""
+        loc = cld.Location(name="Bremen", latitude=53.08, longitude=8.81)
+        with_data: list[cld.DWDParam] = wb.site_params(
+            loc,
+            TIME_SPAN,
+            {
+                par: (stations("B"), "B", values("B", par))
+                for par in cont.DWD_PARAMS_POLYSUN
+            },
+        )
+        assert with_data[0].closest_available_res is not None
+        assert with_data[0].closest_available_res.closest_station.name == "Station B"
+
+        no_data: list[cld.DWDParam] = wb.site_params(
+            loc, TIME_SPAN, {"humidity": (stations(), None, pl.DataFrame())}
+        )
+        zip_file, without_data = wb.weather_zip(
+            {"Bremen": with_data, "Nirgendwo": no_data}, polysun=True
+        )
+
+        assert without_data == ["Nirgendwo"]
+        with zipfile.ZipFile(io.BytesIO(zip_file)) as archive:
+            assert archive.namelist() == ["Polysun Wetterdaten -Bremen-.csv"]
+            csv: str = archive.read(archive.namelist()[0]).decode()
+        df: pl.DataFrame = pl.read_csv(io.StringIO(csv.removeprefix("# ")))
+        assert df.height == 8760
+        assert df.columns == ["Time [s]", *cont.DWD_PARAMS_POLYSUN.values()]